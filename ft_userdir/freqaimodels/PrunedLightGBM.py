@@ -0,0 +1,104 @@
+"""
+带冗余特征剪枝的 LightGBM 模型
+
+在 FreqAI 默认特征管道的最前面加入 FeaturePruner（见 integration/microstructure/pruning.py）：
+删除常数列与近似重复列后再做缩放 / 离群点过滤 / 训练；保留的列随管道一起保存，预测时按同一子集取列。
+每次训练的保留 / 删除结果写入 models/<identifier>/feature_pruning.json（按交易对索引）。
+开启 continual_learning 时，LightGBM 以上一个模型为 init_model 继续训练，要求特征列不变：
+已有该交易对的记录时读回其保留列并冻结，不再重新剪枝（改动特征或剪枝参数后需删除该文件或换 identifier）。
+
+配置了 outlier_filter 时，用 OutlierFilter（见 integration/microstructure/outliers.py）替换 FreqAI 的 SVM 离群点步骤
+（未启用 use_SVM_to_remove_outliers 时插在缩放之后），每次训练的训练集 / 测试集删除行数写入 models/<identifier>/outlier_filter.json。
+
+配置（config 的 freqai 段，均可省略）::
+
+    "freqaimodel": "PrunedLightGBMRegressor",
+    "feature_pruning": {"corr_threshold": 0.98},
+    "outlier_filter": {"method": "robust", "nu": 0.1}
+"""
+
+import logging
+from pathlib import Path
+from typing import Any
+
+from datasieve.pipeline import Pipeline
+from freqtrade.freqai.data_kitchen import FreqaiDataKitchen
+from freqtrade.freqai.freqai_interface import IFreqaiModel
+from freqtrade.freqai.prediction_models.LightGBMClassifier import LightGBMClassifier
+from freqtrade.freqai.prediction_models.LightGBMRegressor import LightGBMRegressor
+
+# 集成层（需 PYTHONPATH=integration，scripts/ft.ps1 会自动注入）
+from microstructure.outliers import OutlierFilter
+from microstructure.pruning import FeaturePruner, load_pruning_summary, save_pruning_summary
+
+logger = logging.getLogger(__name__)
+
+PRUNING_STEP = 'pruning'
+SUMMARY_FILE = 'feature_pruning.json'
+SVM_STEP = 'svm'
+SCALER_STEP = 'scaler'
+OUTLIER_STEP = 'outliers'
+OUTLIER_SUMMARY_FILE = 'outlier_filter.json'
+
+
+class FeaturePruningMixin(IFreqaiModel):
+    """在特征管道前插入剪枝步骤（可选替换离群点步骤），并按模型标识持久化保留的列与删除的行数
+
+    继承 IFreqaiModel 只为声明接口；放在具体模型之前（MRO 中 IFreqaiModel 排在具体模型之后）。
+    """
+
+    def define_data_pipeline(self, threads: int = -1) -> Pipeline:
+        pipeline = super().define_data_pipeline(threads)
+        params = self.freqai_info.get('feature_pruning', {})
+        frozen = getattr(self, '_frozen_features', None)
+        steps = [(PRUNING_STEP, FeaturePruner(**params, frozen=frozen)), *pipeline.steps]
+
+        outlier_params = self.freqai_info.get('outlier_filter')
+        if outlier_params is not None:
+            names = [name for name, _ in steps]
+            step = (OUTLIER_STEP, OutlierFilter(**outlier_params))
+            if SVM_STEP in names:
+                steps[names.index(SVM_STEP)] = step
+            else:
+                steps.insert(names.index(SCALER_STEP) + 1 if SCALER_STEP in names else len(steps), step)
+        return Pipeline(steps)
+
+    def _frozen_features_for(self, pair: str) -> list[str] | None:
+        """持续学习时该交易对上次训练保留的列（没有记录时返回 None，按本次训练集剪枝）"""
+        if not self.freqai_info.get('continual_learning', False):
+            return None
+        record = load_pruning_summary(Path(self.full_path) / SUMMARY_FILE, pair)
+        return record['kept'] if record is not None else None
+
+    def train(self, unfiltered_df, pair: str, dk: FreqaiDataKitchen, **kwargs) -> Any:
+        # define_data_pipeline 在 super().train 内调用，通过属性传入冻结的列
+        self._frozen_features = self._frozen_features_for(pair)
+        model = super().train(unfiltered_df, pair, dk, **kwargs)
+        pruner = dict(dk.feature_pipeline.steps).get(PRUNING_STEP)
+        if pruner is not None:
+            summary = pruner.summary()
+            summary['model'] = Path(dk.data_path).name
+            save_pruning_summary(Path(self.full_path) / SUMMARY_FILE, pair, summary)
+            logger.info(
+                '%s 特征剪枝%s: 保留 %d 列，删除 %d 列', pair, '（冻结）' if summary['frozen'] else '',
+                summary['n_kept'], summary['n_dropped'],
+            )
+        outlier_filter = dict(dk.feature_pipeline.steps).get(OUTLIER_STEP)
+        if outlier_filter is not None:
+            summary = outlier_filter.summary()
+            summary['model'] = Path(dk.data_path).name
+            save_pruning_summary(Path(self.full_path) / OUTLIER_SUMMARY_FILE, pair, summary)
+            logger.info(
+                '%s 离群点过滤(%s): 训练集删除 %d / %d 行，测试集删除 %d / %d 行，用时 %.2fs',
+                pair, summary['method'], summary['n_dropped'], summary['n_rows'],
+                summary['n_test_dropped'], summary['n_test_rows'], summary['fit_seconds'],
+            )
+        return model
+
+
+class PrunedLightGBMRegressor(FeaturePruningMixin, LightGBMRegressor):
+    """LightGBMRegressor + 冗余特征剪枝"""
+
+
+class PrunedLightGBMClassifier(FeaturePruningMixin, LightGBMClassifier):
+    """LightGBMClassifier + 冗余特征剪枝"""
@@ -13,14 +13,59 @@ ETH Microstructure Strategy - 基于市场微观结构的交易策略
 - Kyle (1985): Market Microstructure and Market Impact
 """
 
+import atexit
+import logging
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any
+
 from freqtrade.strategy import IStrategy, merge_informative_pair
 from pandas import DataFrame
 import pandas as pd
 import numpy as np
+import talib
 import talib.abstract as ta
 import freqtrade.vendor.qtpylib.indicators as qtpylib
 from functools import reduce
 
+# 集成层（需 PYTHONPATH=integration，scripts/ft.ps1 会自动注入）
+from microstructure import (
+    Clause,
+    EntryRules,
+    FEATURE_COLUMNS,
+    REGIME_COLUMN,
+    FeatureCache,
+    FeatureProfiler,
+    FeatureStore,
+    IndicatorCache,
+    LongHorizonTrendProvider,
+    ParallelFeatureComputer,
+    ResampleCache,
+    RetentionPolicy,
+    SignalLatencyTracker,
+    StreamingFeatureEngine,
+    TargetTelemetry,
+    aggregate_trades,
+    align_order_flow,
+    assign_columns,
+    attach_columns,
+    attach_features,
+    build_features,
+    code_fingerprint,
+    compute_targets,
+    data_fingerprint,
+    estimate_bucket_volume,
+    feature_code_fingerprint,
+    feature_dtypes,
+    profile_hook,
+    shared_indicator_cache,
+    timeframe_to_timedelta,
+    trades_path,
+)
+
+logger = logging.getLogger(__name__)
+
 
 class ETHMicrostructureStrategy(IStrategy):
 
@@ -43,149 +88,503 @@ class ETHMicrostructureStrategy(IStrategy):
     # FreqAI 配置
     process_only_new_candles = True
     use_exit_signal = True
-    startup_candle_count = 100
+    startup_candle_count = 100  # 1 天 / 30 天趋势来自 1h / 1d 数据，无需 43200 根 1m 预热
+
+    # 长周期趋势：从 1h / 1d 紧凑序列计算并按时间戳对齐到 1m
+    long_horizon = LongHorizonTrendProvider(base_timeframe='1m', trend_timeframe='1h', trend_30d_timeframe='1d')
+
+    # 高周期 K 线由 1m 数据一次性重采样并逐根增量更新（1h / 1d 紧凑序列）：回测 / hyperopt 不再读取高周期文件，
+    # 实盘 / 模拟盘用 DataProvider 的序列补齐 1m 窗口之前的部分
+    use_resample_cache = True
 
     # 仓位管理
     position_adjustment_enable = False
 
-    def feature_engineering_expand_all(self, dataframe: DataFrame, period: int, metadata: dict, **kwargs) -> DataFrame:
+    # 实盘/模拟盘使用流式特征引擎（只用新收盘的 K 线更新滚动状态）
+    use_streaming_features = True
+
+    # 多交易对并行特征计算（默认关闭；实盘/模拟盘每轮 bot 循环开始时把白名单各交易对的主时间框架特征块
+    # 分发到进程池，OHLCV 经共享内存传递）。开启后主时间框架不再走流式引擎（其滚动状态在主进程中）
+    use_parallel_features = False
+    parallel_feature_workers = None  # None 为 CPU 核数
+    parallel_feature_budget_secs = 20.0  # 单轮到期仍未完成的交易对放弃并行结果（改走串行路径）并告警
+
+    # 实盘/模拟盘的有界内存保留策略：FreqAI 的 historic_data、重采样缓存与逐笔订单流只保留声明的最大回看时长
+    # （startup_candle_count 根最大 include_timeframes K 线 + FreqAI train_period_days + retention_margin），
+    # populate_exit_trend 之后删除入场条件不再读取的中间列
+    use_retention_policy = True
+    retention_margin = '1d'
+
+    # 入场条件（共享条件每根 K 线只计算一次；apply 同时返回各条件通过数）
+    entry_rules = EntryRules(
+        shared=[
+            Clause('do_predict', 'do_predict', '==', 1),
+            Clause('roi', '&-s_target_roi', '>', 0.005),  # 预测收益率 > 0.5%（行业标准）
+            Clause('vpin', 'vpin', '<', 0.7),  # 风险控制
+            Clause('volume', 'volume', '>', 0),  # 有成交量
+            Clause('adx', 'adx', '<', 25),  # 1. ADX < 25：趋势强度低
+            Clause('bb_width', 'bb_width', '<', 0.04),  # 2. BB Width < 4%：波动率低
+            Clause('trend_30d', 'trend_30d', '<', 0.15, absolute=True),  # 3. 30天涨跌幅 < ±15%
+        ],
+        sides={
+            'enter_long': [Clause('momentum_up', 'momentum_signal', '>', 0)],  # 正动量 -> 做多
+            'enter_short': [Clause('momentum_down', 'momentum_signal', '<', 0)],  # 负动量 -> 做空
+        },
+    )
+
+    # 紧凑特征：%- 特征列 float32、%-regime_state int8（构建时一次性写成目标类型，默认关闭）
+    use_compact_features = False
+
+    # 回测 / hyperopt 的磁盘特征存储（ft_userdir/feature_store；数据或特征代码变化时自动失效）
+    use_feature_store = True
+    feature_store_max_bytes = 4 * 1024**3
+
+    # 回测 / hyperopt 的指标记忆化（ADX、布林带等 TA 指标按数据指纹与参数缓存：同一进程的策略共用，
+    # 并落盘到 ft_userdir/indicator_store，批量回测中后续策略 / 进程直接读回；指标库版本变化时自动失效）
+    use_indicator_cache = True
+    indicator_store_max_bytes = 1024**3
+
+    # 特征工程埋点（默认关闭；开启后按块记录耗时 / 内存 / dtype，
+    # 定期写出 ft_userdir/profiling/feature_trace_<runmode>.json 并在日志中输出各交易对汇总表）
+    use_feature_profiling = False
+    feature_profiling_flush_secs = 300
+    feature_profiler = None
+
+    # 逐笔成交订单流（默认关闭；开启后从 datadir 的 <pair>-trades.feather 流式聚合每根 K 线的真实主动买卖量，
+    # 替代 Money Flow 近似计算买卖压力与 VPIN；成交文件未覆盖的 K 线仍用近似值）
+    # 批量与流式路径使用同一份订单流，流式引擎在迟到的成交补上已处理的 K 线时重新预热；
+    # 实盘仍需同步下载成交数据，否则最新 K 线只能用近似值，与训练时的真实订单流分布不一致
+    use_trades_order_flow = False
+    trades_classification = 'side'  # side：优先用成交的 side 字段；tick：只用 tick rule
+
+    # VPIN：None 为 20 根 K 线的滚动失衡比；数值为成交量同步 VPIN 的每桶成交量（Easley et al. 2012，
+    # 50 桶滚动）；'auto' 按交易对首次看到的数据估计（前 30 天日均成交量 / 50）后固定。改动后需重新训练模型
+    vpin_bucket_volume = None
+
+    # K 线收盘到入场信号的延迟埋点（实盘/模拟盘；K 线到达、FreqAI 预测、自有指标、入场信号各阶段的
+    # 按交易对 p50/p95/p99 直方图，定期追加到 ft_userdir/latency/signal_latency_<runmode>.jsonl）
+    use_signal_latency = True
+    signal_latency_flush_secs = 300
+    signal_latency = None
+
+    # 训练标签分布遥测（默认关闭；开启后可通过 self.target_telemetry.to_dict() / dump() 导出）
+    use_target_telemetry = False
+    target_telemetry = None
+
+    def bot_start(self, **kwargs) -> None:
         """
-        特征工程 - 基于市场微观结构
+        初始化共享特征缓存（feature_engineering_expand_all 与 populate_indicators 共用）
+        """
+        self.feature_cache = FeatureCache()
+        self.streaming_engine = StreamingFeatureEngine()
+        self.resample_cache = ResampleCache(self.timeframe, self.long_horizon.informative_timeframes)
+        self.target_telemetry = TargetTelemetry() if self.use_target_telemetry else None
+        # pair -> 最近一次 populate_entry_trend 的各条件通过数
+        self.entry_pass_counts: dict[str, dict[str, int]] = {}
+        # pair -> [成交文件状态, K 线订单流, 对齐键, 对齐结果]
+        self._order_flow_cache: dict[str, list[Any]] = {}
+        self._vpin_bucket_volumes: dict[str, float] = {}  # pair -> 'auto' 模式下估计出的每桶成交量
+        self.feature_profiler = FeatureProfiler(enabled=self.use_feature_profiling)
+        self.signal_latency = None
+        self._loop_started_at: float | None = None
+        self._latency_flushed_at = time.monotonic()
+        if self.use_signal_latency and self._is_live():
+            self.signal_latency = SignalLatencyTracker(self.timeframe)
+            atexit.register(self.flush_signal_latency)
+        self.retention: RetentionPolicy | None = None
+        if self.use_retention_policy and self._is_live():
+            self.retention = RetentionPolicy(self.retention_lookback(), keep_columns=self.entry_rules.columns)
+        self.parallel_features: ParallelFeatureComputer | None = None
+        self._parallel_matrices: dict[str, tuple[Any, np.ndarray]] = {}  # pair -> (缓存键, 特征矩阵)
+        if self.use_parallel_features and self._is_live():
+            self.parallel_features = ParallelFeatureComputer(
+                self.parallel_feature_workers, budget=self.parallel_feature_budget_secs
+            )
+            atexit.register(self.parallel_features.close)
+        self._profile_flushed_at = time.monotonic()
+        if self.feature_profiler.enabled:
+            atexit.register(self.flush_feature_profile)
+        self.indicator_cache = IndicatorCache(enabled=False)
+        if self.use_indicator_cache and self.dp is not None and self.dp.runmode.value in ('backtest', 'hyperopt'):
+            self.indicator_cache = shared_indicator_cache(FeatureStore(
+                Path(self.config['user_data_dir']) / 'indicator_store',
+                max_bytes=self.indicator_store_max_bytes,
+                code_hash=code_fingerprint(qtpylib, f'TA-Lib {talib.__version__}'),
+            ))
+        self.feature_store: FeatureStore | None = None
+        if self.use_feature_store and self.dp is not None and self.dp.runmode.value in ('backtest', 'hyperopt'):
+            self.feature_store = FeatureStore(
+                Path(self.config['user_data_dir']) / 'feature_store',
+                max_bytes=self.feature_store_max_bytes,
+                code_hash=feature_code_fingerprint(
+                    type(self)._get_intermediates,
+                    type(self).feature_engineering_expand_all,
+                    repr(sorted(vars(self.long_horizon).items())),
+                ),
+            )
 
-        注意：
-        1. Freqtrade 没有实时订单簿数据，我们使用 OHLCV 数据近似计算微观结构特征
-        2. 所有特征必须以 % 开头才能被 FreqAI 识别
+    def bot_loop_start(self, current_time, **kwargs) -> None:
+        """
+        截断超出回看时长的历史；并行预计算各交易对的特征块；定期写出特征工程埋点与信号延迟
+        """
+        # DataProvider 已在本轮循环开始前刷新行情，作为新 K 线的到达时刻
+        self._loop_started_at = time.time()
+        if getattr(self, 'signal_latency', None) is not None and (
+            time.monotonic() - self._latency_flushed_at >= self.signal_latency_flush_secs
+        ):
+            self.flush_signal_latency()
+
+        if getattr(self, 'retention', None) is not None:
+            self.apply_retention()
+        if getattr(self, 'parallel_features', None) is not None:
+            self.compute_parallel_features()
+
+        profiler = self.feature_profiler
+        if profiler is None or not profiler.enabled:
+            return
+        if time.monotonic() - self._profile_flushed_at >= self.feature_profiling_flush_secs:
+            self.flush_feature_profile()
+
+    def flush_feature_profile(self) -> None:
+        """
+        写出 JSON trace 并在日志中输出各交易对的汇总表
+        """
+        profiler = self.feature_profiler
+        if profiler is None or not profiler.events:
+            return
+        self._profile_flushed_at = time.monotonic()
+        runmode = self.dp.runmode.value if self.dp is not None else 'other'
+        path = profiler.dump(Path(self.config['user_data_dir']) / 'profiling' / f'feature_trace_{runmode}.json')
+        for pair in profiler.pairs():
+            logger.info("特征工程耗时 - %s:\n%s", pair, profiler.summary_table(pair))
+        logger.info("特征工程 trace 已写出: %s", path)
+
+    def retention_lookback(self) -> pd.Timedelta:
+        """
+        策略声明的最大回看时长：预热 K 线（按最大的 include_timeframes 计）+ FreqAI 训练窗口 + 余量
+        """
+        freqai = self.config.get('freqai', {})
+        timeframes = [self.timeframe]
+        lookback = pd.Timedelta(0)
+        if freqai.get('enabled', False):
+            timeframes += freqai.get('feature_parameters', {}).get('include_timeframes', [])
+            lookback += pd.Timedelta(days=freqai.get('train_period_days', 0))
+        largest = max(timeframe_to_timedelta(tf) for tf in timeframes)
+        return lookback + largest * self.startup_candle_count + timeframe_to_timedelta(self.retention_margin)
+
+    def apply_retention(self) -> None:
         """
+        按回看时长截断 FreqAI 的 historic_data、重采样缓存与逐笔订单流，并输出释放的内存
+        """
+        retention = self.retention
+        if retention is None:
+            return
+        trimmed = []
+
+        drawer = getattr(getattr(self, 'freqai', None), 'dd', None)
+        history = getattr(drawer, 'historic_data', None)
+        if history:
+            with getattr(drawer, 'history_lock', nullcontext()):
+                for pair, frames in history.items():
+                    for tf, frame in frames.items():
+                        frames[tf] = retention.trim(frame, pair, f'freqai_{tf}')
+                        if frames[tf] is not frame:
+                            trimmed.append(pair)
+
+        # 紧凑序列还要覆盖到最早一根基础 K 线之前的长周期回看时长
+        if hasattr(self, 'resample_cache'):
+            for pair, nbytes in self.resample_cache.trim(retention.lookback + self.long_horizon.max_horizon).items():
+                retention.record(pair, 'resample', nbytes)
+                trimmed.append(pair)
+        for pair, cached in getattr(self, '_order_flow_cache', {}).items():
+            flow = cached[1]
+            cached[1] = retention.trim(flow, pair, 'order_flow')
+            if cached[1] is not flow:
+                trimmed.append(pair)
+
+        if trimmed:
+            for pair in dict.fromkeys(trimmed):
+                logger.info("内存保留策略 - %s: 累计释放 %.1f MB", pair, retention.reclaimed_bytes(pair) / 1024**2)
+            logger.info("内存保留策略（回看 %s）:\n%s", retention.lookback, retention.summary_table())
+
+    @profile_hook('parallel_features')
+    def compute_parallel_features(self) -> None:
+        """
+        把白名单各交易对主时间框架的中间量与特征矩阵分发到进程池计算
 
-        # ===== 1. 买卖压力（Money Flow 方法）=====
-        # 使用 Money Flow Multiplier 计算买卖压力
-        dataframe['%-price_change'] = dataframe['close'].pct_change()
+        DataProvider 在 bot_loop_start 之前已刷新 K 线。结果按与 feature_engineering_expand_all /
+        populate_indicators 相同的缓存键写入特征缓存，之后的逐对分析直接命中；失败的交易对回退到串行路径
+        """
+        frames, kwargs = {}, {}
+        for pair in self.dp.current_whitelist():
+            dataframe = self.dp.get_pair_dataframe(pair, self.timeframe)
+            if dataframe.empty:
+                continue
+            frames[pair] = dataframe
+            kwargs[pair] = {
+                'trend_provider': self.long_horizon,
+                'compact_frames': self._compact_frames(pair, dataframe),
+                'order_flow': self._order_flow(dataframe, pair),
+                'vpin_bucket_volume': self._vpin_bucket_volume(dataframe, pair, self.timeframe),
+            }
+        if not frames:
+            return
+
+        computer = self.parallel_features
+        if computer is None:
+            return
+        dtype, _ = feature_dtypes(self.use_compact_features)
+        results = computer.compute(frames, kwargs, dtype)
+        self._parallel_matrices = {}
+        for pair, (intermediates, matrix) in results.items():
+            key = FeatureCache.make_key(frames[pair], pair, self.timeframe)
+            self.feature_cache.put(key, intermediates)
+            self._parallel_matrices[pair] = (key, matrix)
+
+        stats = computer.stats()
+        logger.info(
+            "并行特征计算: %d/%d 个交易对, 本轮 %.3fs, 最慢 %s %.1fms",
+            len(results), len(frames), stats['last_round_s'], stats['slowest_pair'], stats['slowest_ms'],
+        )
+        if any(record['late'] for record in computer.latency.values()):
+            logger.warning("并行特征计算超出预算 %.1fs:\n%s",
+                           self.parallel_feature_budget_secs, computer.latency_table())
 
-        # Money Flow 方法
-        dataframe['mf_multiplier'] = ((dataframe['close'] - dataframe['low']) - (dataframe['high'] - dataframe['close'])) / (dataframe['high'] - dataframe['low'])
-        dataframe['mf_multiplier'] = dataframe['mf_multiplier'].fillna(0)
-        dataframe['mf_volume'] = dataframe['mf_multiplier'] * dataframe['volume']
-        dataframe['buy_pressure'] = np.where(dataframe['mf_volume'] > 0, dataframe['mf_volume'], 0)
-        dataframe['sell_pressure'] = np.where(dataframe['mf_volume'] < 0, abs(dataframe['mf_volume']), 0)
+    def flush_signal_latency(self) -> None:
+        """
+        把本窗口的信号延迟追加到 JSON Lines 文件，并在日志中输出累计汇总表
+        """
+        tracker = self.signal_latency
+        if tracker is None:
+            return
+        self._latency_flushed_at = time.monotonic()
+        runmode = self.dp.runmode.value if self.dp is not None else 'other'
+        path = Path(self.config['user_data_dir']) / 'latency' / f'signal_latency_{runmode}.jsonl'
+        if tracker.flush(path):
+            logger.info("K 线收盘到入场信号延迟（累计）:\n%s", tracker.summary_table())
+
+    def _mark_latency(self, dataframe: DataFrame, pair: str, stage: str) -> None:
+        """
+        记录最后一根 K 线到达某个阶段的时刻（未开启时无开销）
+        """
+        tracker = getattr(self, 'signal_latency', None)
+        if tracker is None or dataframe.empty:
+            return
+        candle_open = dataframe['date'].iloc[-1]
+        if stage == 'analysis' and self._loop_started_at is not None:
+            tracker.mark(pair, 'arrival', candle_open, at=self._loop_started_at)
+        tracker.mark(pair, stage, candle_open)
+
+    def informative_pairs(self):
+        """
+        长周期趋势所需的 1h / 1d 数据（回测 / hyperopt 由 1m 数据重采样，不需要额外加载）
+        """
+        if self.use_resample_cache and not self._is_live():
+            return []
+        pairs = self.dp.current_whitelist() if self.dp else []
+        return [(pair, tf) for pair in pairs for tf in self.long_horizon.informative_timeframes]
 
-        # ===== 2. VPIN 近似 =====
-        # 使用成交量桶近似 VPIN
-        num_buckets = 20  # 桶数量
+    def _is_live(self) -> bool:
+        return self.dp is not None and self.dp.runmode.value in ('live', 'dry_run')
 
-        # 计算每根 K 线的买卖不平衡
-        dataframe['volume_imbalance'] = abs(dataframe['buy_pressure'] - dataframe['sell_pressure'])
+    def _compact_frames(self, pair: str, dataframe: DataFrame) -> dict:
+        """
+        1h / 1d 紧凑序列：重采样缓存（由 1m 数据派生，实盘用 DataProvider 补齐更早的部分），
+        或直接从 DataProvider 读取（缺失时由 1m 数据重采样补齐）
+        """
+        timeframes = self.long_horizon.informative_timeframes
+        if self.use_resample_cache:
+            if not hasattr(self, 'resample_cache'):
+                self.bot_start()
+            self.resample_cache.update(dataframe, pair)
+            return {
+                tf: self.resample_cache.get_pair_dataframe(
+                    pair, tf, history=self.dp.get_pair_dataframe(pair, tf) if self._is_live() else None
+                )
+                for tf in timeframes
+            }
+        if self.dp is None:
+            return {}
+        return {tf: self.dp.get_pair_dataframe(pair, tf) for tf in timeframes}
+
+    def _order_flow(self, dataframe: DataFrame, pair: str) -> dict | None:
+        """
+        按 K 线对齐的逐笔成交订单流（未开启或没有成交文件时返回 None）
 
-        # VPIN = 滚动窗口内的平均不平衡 / 平均成交量 - 添加 % 前缀
-        dataframe['%-vpin'] = (
-            dataframe['volume_imbalance'].rolling(num_buckets).sum() /
-            (dataframe['volume'].rolling(num_buckets).sum() + 1e-10)
+        成交文件只在其大小 / 修改时间变化时重新聚合；同一数据框的对齐结果复用
+        """
+        if not self.use_trades_order_flow:
+            return None
+        if not hasattr(self, '_order_flow_cache'):
+            self.bot_start()
+        path = trades_path(
+            self.config.get('datadir', Path(self.config['user_data_dir']) / 'data'), pair,
+            self.config.get('trading_mode', 'spot'),
         )
+        if not path.exists():
+            return None
+
+        stat = path.stat()
+        state = (stat.st_size, stat.st_mtime_ns)
+        cached = self._order_flow_cache.get(pair)
+        if cached is None or cached[0] != state:
+            cached = self._order_flow_cache[pair] = [
+                state, aggregate_trades(path, self.timeframe, self.trades_classification), None, None
+            ]
+        key = FeatureCache.make_key(dataframe, pair, self.timeframe)
+        if cached[2] != key:
+            cached[2:] = [key, align_order_flow(dataframe['date'], cached[1])]
+        flow: dict[str, np.ndarray] = cached[3]
+        return flow
+
+    def _vpin_bucket_volume(self, dataframe: DataFrame, pair: str, timeframe: str) -> float | None:
+        """
+        成交量同步 VPIN 的每桶成交量（None 表示使用滚动失衡比）
+        """
+        if self.vpin_bucket_volume is None:
+            return None
+        if self.vpin_bucket_volume != 'auto':
+            return float(self.vpin_bucket_volume)
+        if not hasattr(self, '_vpin_bucket_volumes'):
+            self.bot_start()
+
+        bucket_volume = self._vpin_bucket_volumes.get(pair)
+        if bucket_volume is None:
+            # 桶按成交量划分，与时间框架无关：各时间框架按各自的每日 K 线数估计到同一量级
+            candles_per_day = int(pd.Timedelta(days=1) / timeframe_to_timedelta(timeframe))
+            bucket_volume = estimate_bucket_volume(dataframe['volume'].to_numpy(), candles_per_day)
+            if np.isnan(bucket_volume):
+                return None
+            self._vpin_bucket_volumes[pair] = bucket_volume
+        return bucket_volume
+
+    def _streaming_enabled(self, timeframe: str) -> bool:
+        """
+        仅在实盘/模拟盘的主时间框架上启用流式引擎（回测走批量路径）
+        """
+        if not self.use_streaming_features or timeframe != self.timeframe or self.dp is None:
+            return False
+        if getattr(self, 'parallel_features', None) is not None:
+            return False
+        return self._is_live()
 
-        # ===== 3. ATR 归一化（区分度 2.11）=====
-        dataframe['tr'] = np.maximum(
-            dataframe['high'] - dataframe['low'],
-            np.maximum(
-                abs(dataframe['high'] - dataframe['close'].shift(1)),
-                abs(dataframe['low'] - dataframe['close'].shift(1))
-            )
-        )
-        dataframe['%-atr_14'] = dataframe['tr'].rolling(14).mean()
-        dataframe['%-atr_normalized'] = dataframe['%-atr_14'] / dataframe['close']
-
-        # ===== 4. 已实现波动率（区分度 1.99）=====
-        for window in [12, 24, 48]:
-            dataframe[f'%-realized_vol_{window}'] = dataframe['close'].pct_change().rolling(window).std()
-
-        # ===== 5. 价格动量（区分度 0.21）=====
-        for window in [5, 10, 15]:
-            dataframe[f'%-momentum_{window}'] = dataframe['close'].pct_change(window)
-
-        # ===== 6. 成交量相对强度（区分度 0.24）=====
-        dataframe['%-volume_sma_12'] = dataframe['volume'].rolling(12).mean()
-        dataframe['%-volume_ratio'] = dataframe['volume'] / (dataframe['%-volume_sma_12'] + 1e-10)
-
-        # ===== 7. Microprice 近似 =====
-        # 使用 high/low 近似 bid/ask
-        dataframe['bid_approx'] = dataframe['low']
-        dataframe['ask_approx'] = dataframe['high']
-        dataframe['bid_volume_approx'] = dataframe['buy_pressure']
-        dataframe['ask_volume_approx'] = dataframe['sell_pressure']
-
-        # Microprice = (V_ask * P_bid + V_bid * P_ask) / (V_bid + V_ask) - 添加 % 前缀
-        total_vol = dataframe['bid_volume_approx'] + dataframe['ask_volume_approx']
-        dataframe['%-microprice'] = np.where(
-            total_vol > 0,
-            (dataframe['ask_volume_approx'] * dataframe['bid_approx'] +
-             dataframe['bid_volume_approx'] * dataframe['ask_approx']) / total_vol,
-            (dataframe['bid_approx'] + dataframe['ask_approx']) / 2
+    def _indicator(self, dataframe: DataFrame, pair: str, name: str, params: dict, compute) -> dict:
+        """
+        读取或计算 TA 指标（回测 / hyperopt 下跨策略共用并落盘，其余模式直接计算）
+        """
+        if not hasattr(self, 'indicator_cache'):
+            self.bot_start()
+        values: dict[str, np.ndarray] = self.indicator_cache.get_or_compute(
+            dataframe, pair, self.timeframe, name, params, compute
         )
+        return values
 
-        # Microprice 偏离 - 添加 % 前缀
-        dataframe['%-microprice_vs_close'] = (dataframe['%-microprice'] - dataframe['close']) / dataframe['close']
-
-        # ===== 4. 流动性指标 =====
-        # Amihud Illiquidity: |return| / volume - 添加 % 前缀
-        dataframe['%-amihud'] = abs(dataframe['%-price_change']) / (dataframe['volume'] + 1e-10)
-        dataframe['%-amihud_ma'] = dataframe['%-amihud'].rolling(20).mean()
-
-        # Kyle's Lambda 近似: price_impact / volume - 添加 % 前缀
-        dataframe['%-kyle_lambda'] = abs(dataframe['%-price_change']) / (dataframe['volume'] + 1e-10)
-        dataframe['%-kyle_lambda_ma'] = dataframe['%-kyle_lambda'].rolling(20).mean()
-
-        # ===== 5. 波动率特征 =====
-        # 已实现波动率 - 添加 % 前缀
-        dataframe['%-realized_vol'] = dataframe['%-price_change'].rolling(20).std()
-
-        # 价格区间 - 添加 % 前缀
-        dataframe['%-price_range'] = (dataframe['high'] - dataframe['low']) / dataframe['close']
-        dataframe['%-price_range_ma'] = dataframe['%-price_range'].rolling(20).mean()
-
-        # 成交量波动率 - 添加 % 前缀
-        dataframe['%-volume_vol'] = dataframe['volume'].rolling(20).std() / (dataframe['volume'].rolling(20).mean() + 1e-10)
-
-        # ===== 6. 市场状态特征 =====
-        # 使用简单的趋势和波动率状态分类（HMM 的简化版本）
-        # 状态 0: 熊市（下跌 + 高波动）
-        # 状态 1: 震荡（低波动）
-        # 状态 2: 牛市（上涨 + 高波动）
+    @profile_hook('intermediates')
+    def _get_intermediates(self, dataframe: DataFrame, pair: str, timeframe: str) -> dict:
+        """
+        读取共享中间量（同一 pair/timeframe/最后一根 K 线只计算一次）
+        """
+        if not hasattr(self, 'feature_cache'):
+            self.bot_start()
+
+        bucket_volume = self._vpin_bucket_volume(dataframe, pair, timeframe)
+        intermediates: dict[str, np.ndarray] | None
+        if timeframe != self.timeframe:
+            # 高周期特征保持按行 shift 的原始定义
+            intermediates = self.feature_cache.get_or_compute(
+                dataframe, pair, timeframe, vpin_bucket_volume=bucket_volume
+            )
+            return intermediates
 
-        # 使用1天窗口判断长期趋势（±10%阈值）
+        compact_frames = self._compact_frames(pair, dataframe)
+        if self._streaming_enabled(timeframe) and len(dataframe) <= self.streaming_engine.retention:
+            # 长周期趋势只为引擎尚未处理的新行计算
+            def long_horizon(start: int) -> dict[str, np.ndarray]:
+                trends: dict[str, np.ndarray] = self.long_horizon.compute(dataframe, compact_frames, start=start)
+                return trends
 
-        # 趋势强度 - 添加 % 前缀
-        dataframe['%-trend'] = (dataframe['close'] - dataframe['close'].shift(1440)) / dataframe['close'].shift(1440)
+            intermediates = self.streaming_engine.update(
+                dataframe, pair, long_horizon, bucket_volume, order_flow=self._order_flow(dataframe, pair)
+            )
+            if intermediates is not None:
+                return intermediates
 
-        # 状态分类 - 添加 % 前缀
-        dataframe['%-regime_state'] = 1  # 默认震荡
-        dataframe.loc[
-            (dataframe['%-trend'] > 0.10) & (dataframe['%-realized_vol'] > dataframe['%-realized_vol'].rolling(100).quantile(0.5)),
-            '%-regime_state'
-        ] = 2  # 牛市
-        dataframe.loc[
-            (dataframe['%-trend'] < -0.10) & (dataframe['%-realized_vol'] > dataframe['%-realized_vol'].rolling(100).quantile(0.5)),
-            '%-regime_state'
-        ] = 0  # 熊市
+        intermediates = self.feature_cache.get_or_compute(
+            dataframe, pair, timeframe, trend_provider=self.long_horizon, compact_frames=compact_frames,
+            order_flow=self._order_flow(dataframe, pair), vpin_bucket_volume=bucket_volume,
+        )
+        return intermediates
 
-        # ===== 7. 交易强度特征 =====
-        # 成交量相对强度 - 添加 % 前缀
-        dataframe['%-volume_ratio'] = dataframe['volume'] / (dataframe['volume'].rolling(20).mean() + 1e-10)
+    @profile_hook()
+    def feature_engineering_expand_all(self, dataframe: DataFrame, period: int, metadata: dict, **kwargs) -> DataFrame:
+        """
+        特征工程 - 基于市场微观结构
 
-        # 价格动量 - 添加 % 前缀
-        dataframe['%-momentum_5'] = (dataframe['close'] - dataframe['close'].shift(5)) / dataframe['close'].shift(5)
-        dataframe['%-momentum_10'] = (dataframe['close'] - dataframe['close'].shift(10)) / dataframe['close'].shift(10)
+        注意：
+        1. Freqtrade 没有实时订单簿数据，我们使用 OHLCV 数据近似计算微观结构特征
+        2. 所有特征必须以 % 开头才能被 FreqAI 识别
+        """
 
-        return dataframe
+        pair, timeframe = metadata['pair'], metadata.get('tf', self.timeframe)
+
+        def compute() -> DataFrame:
+            # 共享中间量（与 populate_indicators 共用缓存）
+            intermediates = self._get_intermediates(dataframe, pair, timeframe)
+
+            # 本轮已并行算好的特征矩阵
+            dtype, regime_dtype = feature_dtypes(self.use_compact_features)
+            parallel = getattr(self, '_parallel_matrices', {}).get(pair)
+            if parallel is not None and timeframe == self.timeframe and parallel[0] == FeatureCache.make_key(
+                dataframe, pair, timeframe
+            ):
+                return attach_features(dataframe, parallel[1], intermediates['regime_state'], regime_dtype)
+
+            # 融合内核：在 numpy 数组上一次性写入预分配的特征矩阵（见 integration/microstructure/kernel.py）
+            # 1. 买卖压力 / VPIN  2. ATR 归一化  3. 已实现波动率  4. 价格动量  5. 成交量相对强度
+            # 6. Microprice  7. 流动性（Amihud / Kyle's Lambda）  8. 波动率特征  9. 市场状态（趋势 + 状态分类）
+            return build_features(dataframe, intermediates, dtype, regime_dtype, profiler=self.feature_profiler)
+
+        store = getattr(self, 'feature_store', None)
+        if store is None:
+            return compute()
+
+        # 回测 / hyperopt：相同数据与特征代码直接读回磁盘上的特征列
+        frames = [dataframe]
+        if timeframe == self.timeframe:
+            frames.extend(self._compact_frames(pair, dataframe).values())
+            order_flow = self._order_flow(dataframe, pair)
+            if order_flow is not None:
+                frames.append(DataFrame(order_flow))
+        extra = 'compact' if self.use_compact_features else ''
+        bucket_volume = self._vpin_bucket_volume(dataframe, pair, timeframe)
+        if bucket_volume is not None:
+            extra += f'|vpin_bucket={bucket_volume!r}'
+        features = store.get_or_compute(
+            pair, timeframe, data_fingerprint(*frames),
+            lambda: compute()[[*FEATURE_COLUMNS, REGIME_COLUMN]],
+            extra=extra,
+        )
+        return attach_columns(dataframe, features)
 
+    @profile_hook()
     def feature_engineering_expand_basic(self, dataframe: DataFrame, metadata: dict, **kwargs) -> DataFrame:
         """
         基础特征 - 保持简单
         注意：所有特征必须以 % 开头才能被 FreqAI 识别
         """
         # 基础价格特征 - 添加 % 前缀
-        dataframe['%-price_pct'] = dataframe['close'].pct_change()
-        dataframe['%-volume_pct'] = dataframe['volume'].pct_change()
+        dtype, _ = feature_dtypes(self.use_compact_features)
+        for source, name in (('close', '%-price_pct'), ('volume', '%-volume_pct')):
+            # 与 pct_change() 相同，结果直接写入目标 dtype 的数组
+            values = dataframe[source].to_numpy(dtype=np.float64)
+            change = np.full(len(values), np.nan, dtype=dtype)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change[1:] = values[1:] / values[:-1] - 1
+            dataframe[name] = change
 
         return dataframe
 
+    @profile_hook()
     def feature_engineering_standard(self, dataframe: DataFrame, metadata: dict, **kwargs) -> DataFrame:
         """
         标准化特征 - 不使用传统技术指标
@@ -193,6 +592,7 @@ class ETHMicrostructureStrategy(IStrategy):
         # 不添加任何传统技术指标
         return dataframe
 
+    @profile_hook()
     def set_freqai_targets(self, dataframe: DataFrame, metadata: dict, **kwargs) -> DataFrame:
         """
         设置预测目标 - 回归模型预测未来收益率
@@ -205,89 +605,81 @@ class ETHMicrostructureStrategy(IStrategy):
         # 计算未来收益（5 分钟预测窗口）
         forward_window = 5  # 未来 5 根 K 线（5 分钟）
 
-        # 计算未来最高价和最低价
-        dataframe['future_max'] = dataframe['high'].rolling(forward_window).max().shift(-forward_window)
-        dataframe['future_min'] = dataframe['low'].rolling(forward_window).min().shift(-forward_window)
-
-        # 交易成本
-        fee = 0.001  # 0.1% 交易费
-        slippage = 0.001  # 0.1% 滑点
-        total_cost = 2 * (fee + slippage)  # 双向成本 0.4%
-
-        # 潜在收益（做多和做空）
-        dataframe['potential_long_return'] = (dataframe['future_max'] / dataframe['close'] - 1) - total_cost
-        dataframe['potential_short_return'] = (1 - dataframe['future_min'] / dataframe['close']) - total_cost
-
+        # 未来最高/最低价、做多/做空潜在收益（已扣除 0.4% 双向成本）
         # 回归目标：预测未来最大可获得收益率（取做多和做空中的较大值）
-        dataframe['&-s_target_roi'] = np.maximum(
-            dataframe['potential_long_return'],
-            dataframe['potential_short_return']
-        )
-
-        # 调试：打印收益率分布
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"收益率统计 - 均值: {dataframe['&-s_target_roi'].mean():.4f}, "
-                   f"中位数: {dataframe['&-s_target_roi'].median():.4f}, "
-                   f">0.2%: {(dataframe['&-s_target_roi'] > 0.002).sum()} ({(dataframe['&-s_target_roi'] > 0.002).sum()/len(dataframe)*100:.1f}%), "
-                   f">0.5%: {(dataframe['&-s_target_roi'] > 0.005).sum()} ({(dataframe['&-s_target_roi'] > 0.005).sum()/len(dataframe)*100:.1f}%)")
+        targets = compute_targets(dataframe, forward_window)[forward_window]
+        for name in ('future_max', 'future_min', 'potential_long_return', 'potential_short_return'):
+            dataframe[name] = targets[name]
+        dataframe['&-s_target_roi'] = targets['target_roi']
+
+        # 标签分布遥测（关闭时不做任何统计；开启时一次分桶得到全部诊断）
+        if self.target_telemetry is not None:
+            record = self.target_telemetry.record(
+                dataframe['&-s_target_roi'].to_numpy(),
+                metadata['pair'],
+                dataframe['date'].iloc[0] if len(dataframe) else None,
+                dataframe['date'].iloc[-1] if len(dataframe) else None,
+            )
+            count = max(record['count'], 1)
+            logger.info(
+                "收益率统计 - 均值: %.4f, 中位数(估计): %.4f, >0.2%%: %d (%.1f%%), >0.5%%: %d (%.1f%%)",
+                record['mean'], record['median_estimate'],
+                record['above']['0.002'], record['above']['0.002'] / count * 100,
+                record['above']['0.005'], record['above']['0.005'] / count * 100,
+            )
 
         return dataframe
 
+    @profile_hook()
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
         填充指标 - 启动 FreqAI 并创建基础特征供出场信号使用
         """
+        self._mark_latency(dataframe, metadata['pair'], 'analysis')
+
         # 启动 FreqAI（这会调用所有 feature_engineering_* 和 set_freqai_targets）
         dataframe = self.freqai.start(dataframe, metadata, self)
+        self._mark_latency(dataframe, metadata['pair'], 'freqai')
 
         # 创建基础特征（用于出场信号）
-        dataframe['price_change'] = dataframe['close'].pct_change()
-
-        # Money Flow 方法计算买卖压力
-        dataframe['mf_multiplier'] = ((dataframe['close'] - dataframe['low']) - (dataframe['high'] - dataframe['close'])) / (dataframe['high'] - dataframe['low'])
-        dataframe['mf_multiplier'] = dataframe['mf_multiplier'].fillna(0)
-        dataframe['mf_volume'] = dataframe['mf_multiplier'] * dataframe['volume']
-        dataframe['buy_pressure'] = np.where(dataframe['mf_volume'] > 0, dataframe['mf_volume'], 0)
-        dataframe['sell_pressure'] = np.where(dataframe['mf_volume'] < 0, abs(dataframe['mf_volume']), 0)
-
-        # VPIN
-        dataframe['volume_imbalance'] = abs(dataframe['buy_pressure'] - dataframe['sell_pressure'])
-        dataframe['vpin'] = (
-            dataframe['volume_imbalance'].rolling(20).sum() /
-            (dataframe['volume'].rolling(20).sum() + 1e-10)
-        )
+        # 买卖压力、VPIN、趋势、波动率、市场状态与特征工程共用缓存，不重复计算
+        intermediates = self._get_intermediates(dataframe, metadata['pair'], self.timeframe)
+        assign_columns(dataframe, intermediates, {
+            'price_change': 'price_change',
+            'mf_multiplier': 'mf_multiplier',
+            'mf_volume': 'mf_volume',
+            'buy_pressure': 'buy_pressure',
+            'sell_pressure': 'sell_pressure',
+            'volume_imbalance': 'volume_imbalance',
+            'vpin': 'vpin',
+        })
 
         # ADX（平均趋向指数）- 用于识别震荡市场 vs 趋势市场
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
+        adx = self._indicator(dataframe, metadata['pair'], 'adx', {'timeperiod': 14},
+                              lambda: ta.ADX(dataframe, timeperiod=14))
+        assign_columns(dataframe, adx, {'adx': 'adx'})
 
         # Bollinger Bands Width - 用于识别波动率（震荡 vs 趋势）
-        bollinger = qtpylib.bollinger_bands(dataframe['close'], window=20, stds=2)
-        dataframe['bb_upper'] = bollinger['upper']
-        dataframe['bb_middle'] = bollinger['mid']
-        dataframe['bb_lower'] = bollinger['lower']
+        bollinger = self._indicator(dataframe, metadata['pair'], 'bollinger_bands', {'window': 20, 'stds': 2},
+                                    lambda: qtpylib.bollinger_bands(dataframe['close'], window=20, stds=2))
+        assign_columns(dataframe, bollinger, {'bb_upper': 'upper', 'bb_middle': 'mid', 'bb_lower': 'lower'})
         dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
 
         # 30天趋势 - 用于识别长期牛市/熊市
         # 30天 = 43200 分钟（1分钟数据）
-        dataframe['trend_30d'] = (dataframe['close'] - dataframe['close'].shift(43200)) / dataframe['close'].shift(43200)
+        assign_columns(dataframe, intermediates, {'trend_30d': 'trend_30d'})
 
         # 市场状态（使用1天窗口判断长期趋势）
-        dataframe['trend'] = (dataframe['close'] - dataframe['close'].shift(1440)) / dataframe['close'].shift(1440)
-        dataframe['realized_vol'] = dataframe['price_change'].rolling(20).std()
-
-        dataframe['regime_state'] = 1  # 默认震荡
-        dataframe.loc[
-            (dataframe['trend'] > 0.10) & (dataframe['realized_vol'] > dataframe['realized_vol'].rolling(100).quantile(0.5)),
-            'regime_state'
-        ] = 2  # 牛市
-        dataframe.loc[
-            (dataframe['trend'] < -0.10) & (dataframe['realized_vol'] > dataframe['realized_vol'].rolling(100).quantile(0.5)),
-            'regime_state'
-        ] = 0  # 熊市
+        assign_columns(dataframe, intermediates, {
+            'trend': 'trend',
+            'realized_vol': 'realized_vol',
+            'regime_state': 'regime_state',
+        })
 
+        self._mark_latency(dataframe, metadata['pair'], 'indicators')
         return dataframe
 
+    @profile_hook()
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
         入场信号 - 基于 FreqAI 回归预测 + 收益率阈值过滤
@@ -301,40 +693,16 @@ class ETHMicrostructureStrategy(IStrategy):
         if 'do_predict' not in dataframe.columns:
             dataframe['enter_long'] = 0
             dataframe['enter_short'] = 0
+            self._mark_latency(dataframe, metadata['pair'], 'signal')
             return dataframe
 
         # 计算方向指标（使用短期动量）
         dataframe['momentum_signal'] = dataframe['close'].pct_change(5)  # 5 分钟动量
 
-        # 收益率阈值（行业标准 0.5%）
-        roi_threshold = 0.005
-
-        # 做多条件：预测收益率 > 0.5% + 正动量 + 震荡市场（三重过滤）
-        dataframe.loc[
-            (dataframe['do_predict'] == 1) &
-            (dataframe['&-s_target_roi'] > roi_threshold) &  # 预测收益率 > 0.5%
-            (dataframe['vpin'] < 0.7) &  # 风险控制
-            (dataframe['volume'] > 0) &  # 有成交量
-            (dataframe['adx'] < 25) &  # 1. ADX < 25：趋势强度低
-            (dataframe['bb_width'] < 0.04) &  # 2. BB Width < 4%：波动率低
-            (abs(dataframe['trend_30d']) < 0.15) &  # 3. 30天涨跌幅 < ±15%
-            (dataframe['momentum_signal'] > 0),  # 正动量 -> 做多
-            'enter_long'
-        ] = 1
-
-        # 做空条件：预测收益率 > 0.5% + 负动量 + 震荡市场（三重过滤）
-        dataframe.loc[
-            (dataframe['do_predict'] == 1) &
-            (dataframe['&-s_target_roi'] > roi_threshold) &  # 预测收益率 > 0.5%
-            (dataframe['vpin'] < 0.7) &  # 风险控制
-            (dataframe['volume'] > 0) &  # 有成交量
-            (dataframe['adx'] < 25) &  # 1. ADX < 25：趋势强度低
-            (dataframe['bb_width'] < 0.04) &  # 2. BB Width < 4%：波动率低
-            (abs(dataframe['trend_30d']) < 0.15) &  # 3. 30天涨跌幅 < ±15%
-            (dataframe['momentum_signal'] < 0),  # 负动量 -> 做空
-            'enter_short'
-        ] = 1
+        # 共享过滤条件只计算一次，做多/做空按动量方向区分（见 entry_rules）
+        self.entry_pass_counts[metadata['pair']] = self.entry_rules.apply(dataframe)
 
+        self._mark_latency(dataframe, metadata['pair'], 'signal')
         return dataframe
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -345,6 +713,11 @@ class ETHMicrostructureStrategy(IStrategy):
         dataframe['exit_long'] = 0
         dataframe['exit_short'] = 0
 
+        # 最后一个分析钩子：之后不再读取的中间列直接删除，不随分析结果缓存
+        retention = getattr(self, 'retention', None)
+        if retention is not None:
+            retention.drop_scratch(dataframe, metadata['pair'])
+
         return dataframe
 
     def custom_stoploss(self, pair: str, trade: 'Trade', current_time: 'datetime',
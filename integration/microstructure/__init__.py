@@ -0,0 +1,111 @@
+"""微观结构特征计算
+
+ETHMicrostructureStrategy 的共享计算层（特征中间量、缓存等）。
+"""
+
+from .entry import Clause, EntryRules
+from .exits import ExitParams, simulate_exits, summarize_trades, sweep_exit_params
+from .expansion import LazyFeatureExpansion
+from .feature_cache import FeatureCache, assign_columns
+from .feature_store import FeatureStore, attach_columns, code_fingerprint, data_fingerprint, feature_code_fingerprint
+from .features import INTERMEDIATE_NAMES, classify_regime, compute_intermediates
+from .graph import FeatureGraph
+from .indicator_cache import IndicatorCache, shared_indicator_cache
+from .kernel import (
+    FEATURE_COLUMNS,
+    FEATURE_GRAPH,
+    REGIME_COLUMN,
+    attach_features,
+    build_feature_graph,
+    build_features,
+    compute_feature_matrix,
+    feature_dtypes,
+)
+from .latency import SignalLatencyTracker
+from .long_horizon import LongHorizonTrendProvider, resample_ohlcv, timeframe_to_timedelta
+from .outliers import OutlierFilter
+from .parallel import ParallelFeatureComputer
+from .profiling import FeatureProfiler, profile_hook
+from .pruning import FeaturePruner, select_features
+from .replay import MarketReplayer, ReplayDataProvider, load_ohlcv, ohlcv_path
+from .resample import ResampleCache
+from .retention import RetentionPolicy
+from .rolling import rolling_quantile, rolling_quantile_at
+from .streaming import (
+    LagBuffer,
+    RollingQuantile,
+    RollingSum,
+    RollingVariance,
+    StreamingFeatureEngine,
+)
+from .targets import TARGET_NAMES, TOTAL_COST, ForwardExtrema, compute_targets
+from .telemetry import TargetTelemetry
+from .trades import ORDER_FLOW_COLUMNS, OrderFlowAggregator, aggregate_trades, align_order_flow, trades_path
+from .vpin import BucketVPIN, bucket_vpin, estimate_bucket_volume
+
+__all__ = [
+    "BucketVPIN",
+    "Clause",
+    "EntryRules",
+    "ExitParams",
+    "FEATURE_COLUMNS",
+    "FEATURE_GRAPH",
+    "INTERMEDIATE_NAMES",
+    "FeatureCache",
+    "FeatureGraph",
+    "FeatureProfiler",
+    "FeaturePruner",
+    "FeatureStore",
+    "ForwardExtrema",
+    "IndicatorCache",
+    "LagBuffer",
+    "LazyFeatureExpansion",
+    "LongHorizonTrendProvider",
+    "MarketReplayer",
+    "ORDER_FLOW_COLUMNS",
+    "OrderFlowAggregator",
+    "OutlierFilter",
+    "ParallelFeatureComputer",
+    "REGIME_COLUMN",
+    "ReplayDataProvider",
+    "ResampleCache",
+    "RetentionPolicy",
+    "RollingQuantile",
+    "RollingSum",
+    "RollingVariance",
+    "SignalLatencyTracker",
+    "StreamingFeatureEngine",
+    "TARGET_NAMES",
+    "TOTAL_COST",
+    "TargetTelemetry",
+    "aggregate_trades",
+    "align_order_flow",
+    "assign_columns",
+    "attach_columns",
+    "attach_features",
+    "bucket_vpin",
+    "build_feature_graph",
+    "build_features",
+    "classify_regime",
+    "code_fingerprint",
+    "compute_feature_matrix",
+    "compute_intermediates",
+    "compute_targets",
+    "data_fingerprint",
+    "estimate_bucket_volume",
+    "feature_code_fingerprint",
+    "feature_dtypes",
+    "load_ohlcv",
+    "ohlcv_path",
+    "profile_hook",
+    "resample_ohlcv",
+    "rolling_quantile",
+    "rolling_quantile_at",
+    "select_features",
+    "shared_indicator_cache",
+    "simulate_exits",
+    "summarize_trades",
+    "sweep_exit_params",
+    "timeframe_to_timedelta",
+    "trades_path",
+]
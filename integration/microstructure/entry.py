@@ -0,0 +1,161 @@
+"""声明式入场条件
+
+populate_entry_trend 原先为做多、做空各写一遍相同的七个过滤条件，每个条件都在整列上算两次，
+再各做一次 .loc 赋值。这里把条件声明为 Clause 列表：
+
+- 每个条件只计算一次，写入逐行位图的一位（第 k 个条件对应 bit k）
+- 每个方向对应一个必需位掩码，一次比较 (bits & required) == required 得到信号
+- 各条件通过数作为副产品返回，便于回测诊断与阈值扫描
+"""
+
+from __future__ import annotations
+
+import operator
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+_OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+class Clause:
+    """单个入场条件：column <op> value（absolute=True 时比较 |column|）"""
+
+    def __init__(self, name: str, column: str, op: str, value: float, absolute: bool = False):
+        """初始化条件
+
+        Args:
+            name: 条件名称（用于通过数统计与阈值覆盖）
+            column: 数据列
+            op: 比较运算符（<、<=、>、>=、==、!=）
+            value: 阈值
+            absolute: 是否先取绝对值
+        """
+        if op not in _OPERATORS:
+            msg = f"不支持的运算符: {op}"
+            raise ValueError(msg)
+        self.name = name
+        self.column = column
+        self.op = op
+        self.value = value
+        self.absolute = absolute
+
+    def evaluate(self, dataframe: pd.DataFrame, value: float | None = None) -> np.ndarray:
+        """计算条件（NaN 行为 False，与 pandas 比较一致）
+
+        Args:
+            dataframe: 数据框
+            value: 覆盖阈值（None 使用默认阈值）
+
+        Returns:
+            布尔数组
+        """
+        values = dataframe[self.column].to_numpy()
+        if self.absolute:
+            values = np.abs(values)
+        with np.errstate(invalid="ignore"):
+            return np.asarray(_OPERATORS[self.op](values, self.value if value is None else value), dtype=bool)
+
+    def __repr__(self) -> str:
+        column = f"|{self.column}|" if self.absolute else self.column
+        return f"Clause({self.name}: {column} {self.op} {self.value})"
+
+
+class EntryRules:
+    """入场规则：共享条件 + 各方向专属条件"""
+
+    def __init__(self, shared: list[Clause], sides: dict[str, list[Clause]]):
+        """初始化规则
+
+        Args:
+            shared: 所有方向共用的条件
+            sides: 信号列名（如 enter_long）-> 该方向专属条件
+        """
+        self.clauses = list(shared) + [clause for clauses in sides.values() for clause in clauses]
+        names = [clause.name for clause in self.clauses]
+        if len(set(names)) != len(names):
+            msg = f"条件名称重复: {names}"
+            raise ValueError(msg)
+        if len(self.clauses) > 64:
+            msg = f"条件数量超过 64: {len(self.clauses)}"
+            raise ValueError(msg)
+
+        self._dtype: type[np.unsignedinteger[Any]] = next(
+            t for t in (np.uint8, np.uint16, np.uint32, np.uint64) if np.iinfo(t).bits >= len(self.clauses)
+        )
+        shared_mask = sum(1 << i for i in range(len(shared)))
+        self._required = {}
+        offset = len(shared)
+        for side, clauses in sides.items():
+            self._required[side] = shared_mask | sum(1 << (offset + i) for i in range(len(clauses)))
+            offset += len(clauses)
+
+    @property
+    def sides(self) -> list[str]:
+        """信号列名"""
+        return list(self._required)
+
+    @property
+    def columns(self) -> list[str]:
+        """条件读取的列（去重，保持定义顺序）"""
+        return list(dict.fromkeys(clause.column for clause in self.clauses))
+
+    def evaluate(
+        self,
+        dataframe: pd.DataFrame,
+        overrides: dict[str, float] | None = None,
+    ) -> tuple[dict[str, np.ndarray], dict[str, int]]:
+        """计算各方向信号与各条件通过数
+
+        Args:
+            dataframe: 数据框
+            overrides: 条件名称 -> 覆盖阈值（用于阈值扫描）
+
+        Returns:
+            (信号列名 -> 布尔数组, 条件名称 -> 通过行数)
+        """
+        overrides = overrides or {}
+        unknown = set(overrides) - {clause.name for clause in self.clauses}
+        if unknown:
+            msg = f"未知条件: {sorted(unknown)}"
+            raise ValueError(msg)
+
+        bits = np.zeros(len(dataframe), dtype=self._dtype)
+        pass_counts = {}
+        for i, clause in enumerate(self.clauses):
+            passed = clause.evaluate(dataframe, overrides.get(clause.name))
+            pass_counts[clause.name] = int(np.count_nonzero(passed))
+            bits |= passed.astype(self._dtype) << self._dtype(i)
+
+        signals = {}
+        for side, required in self._required.items():
+            mask = self._dtype(required)
+            signals[side] = (bits & mask) == mask
+        return signals, pass_counts
+
+    def apply(self, dataframe: pd.DataFrame, overrides: dict[str, float] | None = None) -> dict[str, Any]:
+        """把信号写入数据框（0/1），返回通过数统计
+
+        Args:
+            dataframe: 数据框（原地写入信号列）
+            overrides: 条件名称 -> 覆盖阈值
+
+        Returns:
+            {'rows': 行数, 'clauses': 条件通过数, 'signals': 各方向信号数}
+        """
+        signals, pass_counts = self.evaluate(dataframe, overrides)
+        for side, signal in signals.items():
+            dataframe[side] = signal.astype(np.int8)
+        return {
+            "rows": len(dataframe),
+            "clauses": pass_counts,
+            "signals": {side: int(np.count_nonzero(signal)) for side, signal in signals.items()},
+        }
@@ -0,0 +1,405 @@
+"""向量化出场模拟器
+
+调 minimal_roi、trailing_stop_positive / _offset 与 custom_stoploss 的 2h / 48h 时间止损，
+原先每组参数都要跑一次完整的 freqtrade 回测（1m 数据每次数分钟）。这里把策略的入场信号
+直接回放到 OHLCV 上，按 freqtrade 回测的出场语义计算每笔交易：
+
+- 信号 K 线的下一根开盘价入场，同一交易对同时只持有一笔，出场当根不再入场
+- 每根 K 线先用 high（空头用 low）更新追踪/自定义止损，再用 low（空头 high）判断是否触发
+- ROI 用 high / low 计算的最佳收益判断；止损仍是初始止损时 ROI 不生效
+- ROI / 止损的成交价与 freqtrade 的 _get_close_rate_for_roi / _get_close_rate_for_stoploss 一致
+- 数据结束仍未平仓的交易按最后一根收盘价 force_exit
+
+实现上只模拟实际成交的交易：每笔交易在其后的 K 线块上向量化求止损路径（累计最大值）与
+ROI 触发点，出场后从下一个候选信号继续。参数组合之间没有共享状态，可按进程并行扫描。
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# OKX 合约最差档手续费（与回测日志一致）
+DEFAULT_FEE = 0.0005
+
+EXIT_REASONS = ("roi", "stop_loss", "trailing_stop_loss", "force_exit")
+
+# 单笔交易向前搜索出场的块长（从 FIRST_CHUNK_ROWS 起逐块翻倍）
+FIRST_CHUNK_ROWS = 64
+MAX_CHUNK_ROWS = 16384
+
+
+class ExitParams:
+    """出场参数（字段与 IStrategy 同名属性一致）"""
+
+    def __init__(
+        self,
+        minimal_roi: dict[str, float],
+        stoploss: float = -0.99,
+        trailing_stop: bool = False,
+        trailing_stop_positive: float | None = None,
+        trailing_stop_positive_offset: float = 0.0,
+        trailing_only_offset_is_reached: bool = False,
+        use_custom_stoploss: bool = False,
+        loss_time_stop_hours: float = 2.0,
+        max_hold_hours: float = 48.0,
+        time_stop_value: float = -0.001,
+    ):
+        """初始化参数
+
+        Args:
+            minimal_roi: ROI 表（分钟字符串 -> 收益率，-1 表示到时强制平仓）
+            stoploss: 初始止损
+            trailing_stop: 是否启用追踪止损
+            trailing_stop_positive: 达到偏移后使用的追踪距离
+            trailing_stop_positive_offset: 追踪止损激活偏移
+            trailing_only_offset_is_reached: 仅在达到偏移后才追踪
+            use_custom_stoploss: 是否启用 custom_stoploss（时间止损）
+            loss_time_stop_hours: 亏损交易持仓超过该时长后止损
+            max_hold_hours: 所有交易持仓超过该时长后平仓
+            time_stop_value: 时间止损触发时 custom_stoploss 的返回值
+        """
+        self.minimal_roi = {str(k): float(v) for k, v in minimal_roi.items()}
+        self.stoploss = stoploss
+        self.trailing_stop = trailing_stop
+        self.trailing_stop_positive = trailing_stop_positive
+        self.trailing_stop_positive_offset = trailing_stop_positive_offset
+        self.trailing_only_offset_is_reached = trailing_only_offset_is_reached
+        self.use_custom_stoploss = use_custom_stoploss
+        self.loss_time_stop_hours = loss_time_stop_hours
+        self.max_hold_hours = max_hold_hours
+        self.time_stop_value = time_stop_value
+
+    @classmethod
+    def from_strategy(cls, strategy: Any, **overrides: Any) -> ExitParams:
+        """从策略类/实例读取出场参数
+
+        Args:
+            strategy: IStrategy 子类或实例
+            **overrides: 覆盖的参数
+
+        Returns:
+            出场参数
+        """
+        names = (
+            "minimal_roi", "stoploss", "trailing_stop", "trailing_stop_positive",
+            "trailing_stop_positive_offset", "trailing_only_offset_is_reached", "use_custom_stoploss",
+        )
+        values = {name: getattr(strategy, name) for name in names if hasattr(strategy, name)}
+        values.update(overrides)
+        return cls(**values)
+
+    def replace(self, **overrides: Any) -> ExitParams:
+        """返回替换部分字段后的新参数"""
+        return ExitParams(**{**self.to_dict(), **overrides})
+
+    def to_dict(self) -> dict[str, Any]:
+        """参数字典"""
+        return dict(vars(self))
+
+    def __repr__(self) -> str:
+        return f"ExitParams({self.to_dict()})"
+
+
+class _RoiTable:
+    """ROI 表（按持仓分钟查询生效条目）"""
+
+    def __init__(self, minimal_roi: dict[str, float]):
+        items = sorted((int(k), float(v)) for k, v in minimal_roi.items())
+        self.keys = np.array([k for k, _ in items], dtype=np.int64)
+        self.values = np.array([v for _, v in items], dtype=np.float64)
+
+    def lookup(self, minutes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """返回 (生效阈值, 生效条目的分钟键)；无生效条目时阈值为 inf、键为 -1"""
+        if not len(self.keys):
+            return np.full(len(minutes), np.inf), np.full(len(minutes), -1, dtype=np.int64)
+        index = np.searchsorted(self.keys, minutes, side="right") - 1
+        found = index >= 0
+        index = np.maximum(index, 0)
+        return np.where(found, self.values[index], np.inf), np.where(found, self.keys[index], -1)
+
+
+def _profit_ratio(open_rate: float, rate: float | np.ndarray, is_short: bool, fee: float) -> float | np.ndarray:
+    """freqtrade calc_profit_ratio（杠杆 1，无资金费）"""
+    if is_short:
+        return 1 - (rate * (1 + fee)) / (open_rate * (1 - fee))
+    return (rate * (1 - fee)) / (open_rate * (1 + fee)) - 1
+
+
+def entry_candidates(enter_long: np.ndarray, enter_short: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """信号 -> 候选入场（下一根 K 线开盘入场；多空同时出现时不入场）
+
+    Args:
+        enter_long: 做多信号
+        enter_short: 做空信号
+
+    Returns:
+        (入场行号, 是否做空)
+    """
+    enter_long = np.asarray(enter_long) == 1
+    enter_short = np.asarray(enter_short) == 1
+    signal = enter_long ^ enter_short
+    signal[-1:] = False  # 最后一根的信号没有下一根 K 线可入场
+    rows = np.flatnonzero(signal)
+    return rows + 1, enter_short[rows]
+
+
+def _roi_close_rate(
+    open_rate: float,
+    roi_value: float,
+    roi_key: int,
+    step: int,
+    minutes: int,
+    candle: tuple[float, float, float],
+    is_short: bool,
+    fee: float,
+    timeframe_minutes: int,
+) -> float:
+    """ROI 成交价（freqtrade _get_close_rate_for_roi，开仓价即入场 K 线开盘价）"""
+    o, h, lo = candle
+    if roi_value == -1 and roi_key % timeframe_minutes == 0:
+        return o
+    if is_short:
+        rate = open_rate * (1 - fee - roi_value) / (1 + fee)
+        opened_beyond = o < rate
+    else:
+        rate = open_rate * (roi_value + 1 + fee) / (1 - fee)
+        opened_beyond = o > rate
+    # 新 ROI 条目在本根生效且开盘价已越过目标价：按开盘价成交
+    if step > 0 and minutes == roi_key and roi_key % timeframe_minutes == 0 and opened_beyond:
+        return o
+    return min(max(rate, lo), h)
+
+
+def _resolve_trade(
+    prices: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    entry_row: int,
+    is_short: bool,
+    params: ExitParams,
+    roi: _RoiTable,
+    fee: float,
+    timeframe_minutes: int,
+) -> tuple[int, float, str]:
+    """求单笔交易的出场行、成交价与原因（逐块向前搜索，块内向量化）
+
+    止损只朝有利方向移动，统一到“越大越有利”的方向（做空取负）后，
+    止损路径就是候选止损价的累计最大值；第一根触发止损或达到 ROI 的 K 线即出场。
+    """
+    open_, high, low, close = prices
+    n = len(close)
+    side = -1.0 if is_short else 1.0
+    open_rate = open_[entry_row]
+    initial = open_rate * (1 - side * abs(params.stoploss))
+    offset = params.trailing_stop_positive_offset
+    previous = side * initial
+
+    start = entry_row
+    chunk = FIRST_CHUNK_ROWS
+    while start < n:
+        stop_row = min(start + chunk, n)
+        h, lo = high[start:stop_row], low[start:stop_row]
+        bound, worst = (lo, h) if is_short else (h, lo)
+        steps = np.arange(start - entry_row, stop_row - entry_row)
+        minutes = steps * timeframe_minutes
+        profit = np.asarray(_profit_ratio(open_rate, bound, is_short, fee))
+
+        # 本根 K 线的候选止损（adjust_stop_loss 的调用顺序：custom_stoploss -> trailing）
+        candidate = np.full(len(steps), -np.inf)
+        candidate_pct = np.zeros(len(steps))
+
+        def offer(mask: np.ndarray, pct: float) -> None:
+            value = side * bound * (1 - side * abs(pct))
+            better = mask & (value > candidate)
+            candidate[better] = value[better]
+            candidate_pct[better] = abs(pct)
+
+        if params.use_custom_stoploss:
+            hours = minutes / 60
+            timed_out = (hours > params.max_hold_hours) | ((profit < 0) & (hours > params.loss_time_stop_hours))
+            offer(timed_out, params.time_stop_value)
+        if params.trailing_stop:
+            trailing = ~(profit < offset) if params.trailing_only_offset_is_reached else np.ones(len(steps), dtype=bool)
+            if params.trailing_stop_positive is not None:
+                positive = trailing & (profit > offset)
+                offer(positive, params.trailing_stop_positive)
+                offer(trailing & ~positive, params.stoploss)
+            else:
+                offer(trailing, params.stoploss)
+
+        stop_path = np.maximum(np.maximum.accumulate(candidate), previous)
+        oriented_worst = side * worst
+        roi_threshold, roi_key = roi.lookup(minutes)
+        roi_hit = profit > roi_threshold
+        exits = (stop_path >= oriented_worst) | roi_hit
+        if not exits.any():
+            previous = stop_path[-1]
+            start = stop_row
+            chunk = min(chunk * 2, MAX_CHUNK_ROWS)
+            continue
+
+        j = int(np.argmax(exits))
+        row = start + j
+        step = int(steps[j])
+        before = stop_path[j - 1] if j else previous
+        # 上一根的止损已越过本根极值时 dir_correct 为 False，本根不再调整止损
+        stop = side * (before if before >= oriented_worst[j] else stop_path[j])
+        stop_hit = side * stop >= oriented_worst[j]
+        is_trailing = stop != initial
+
+        candle = (open_[row], high[row], low[row])
+        if roi_hit[j] and not (stop_hit and not is_trailing):
+            rate = _roi_close_rate(
+                open_rate, roi_threshold[j], int(roi_key[j]), step, int(minutes[j]),
+                candle, is_short, fee, timeframe_minutes,
+            )
+            return row, rate, "roi"
+
+        rate = stop
+        if step == 0 and is_trailing:
+            # 入场当根触发追踪止损：假设最坏路径（先到偏移再回落到止损）
+            if (not params.use_custom_stoploss and params.trailing_stop and params.trailing_only_offset_is_reached
+                    and params.trailing_stop_positive):
+                rate = candle[0] * (1 + side * abs(offset) - side * abs(params.trailing_stop_positive))
+            else:
+                rate = candle[0] * (1 - side * candidate_pct[j])
+            rate = min(candle[1], rate) if is_short else max(candle[2], rate)
+        if (stop < candle[2]) if is_short else (stop > candle[1]):
+            rate = candle[0]  # 跳空越过止损：按开盘价成交
+        return row, rate, "trailing_stop_loss" if is_trailing else "stop_loss"
+
+    return n - 1, close[n - 1], "force_exit"
+
+
+def simulate_exits(
+    candles: pd.DataFrame,
+    params: ExitParams,
+    fee: float = DEFAULT_FEE,
+    timeframe_minutes: int = 1,
+) -> pd.DataFrame:
+    """回放入场信号并模拟出场
+
+    Args:
+        candles: 含 date、open、high、low、close、enter_long、enter_short 列的数据框
+        params: 出场参数
+        fee: 单边手续费
+        timeframe_minutes: K 线分钟数
+
+    Returns:
+        交易明细：open_date、close_date、is_short、open_rate、close_rate、exit_reason、profit_ratio、duration
+    """
+    prices = tuple(candles[col].to_numpy(dtype=np.float64) for col in ("open", "high", "low", "close"))
+    entry_rows, is_short = entry_candidates(candles["enter_long"].to_numpy(), candles["enter_short"].to_numpy())
+    roi = _RoiTable(params.minimal_roi)
+
+    records = []
+    position = 0
+    while position < len(entry_rows):
+        entry_row, short = int(entry_rows[position]), bool(is_short[position])
+        exit_row, rate, reason = _resolve_trade(prices, entry_row, short, params, roi, fee, timeframe_minutes)
+        records.append((entry_row, exit_row, short, rate, reason))
+        # 出场当根不再入场，下一笔取出场之后的第一个候选
+        position = int(np.searchsorted(entry_rows, exit_row, side="right"))
+
+    trades = pd.DataFrame(records, columns=["entry_row", "exit_row", "is_short", "close_rate", "exit_reason"])
+    dates = candles["date"].to_numpy()
+    entry = trades["entry_row"].to_numpy(dtype=np.int64)
+    exit_ = trades["exit_row"].to_numpy(dtype=np.int64)
+    open_rate = prices[0][entry]
+    short = trades["is_short"].to_numpy(dtype=bool)
+    close_rate = trades["close_rate"].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        "open_date": dates[entry],
+        "close_date": dates[exit_],
+        "is_short": short,
+        "open_rate": open_rate,
+        "close_rate": close_rate,
+        "exit_reason": trades["exit_reason"].to_numpy(dtype=object),
+        "profit_ratio": np.where(
+            short, _profit_ratio(open_rate, close_rate, True, fee), _profit_ratio(open_rate, close_rate, False, fee)
+        ),
+        "duration": (exit_ - entry) * timeframe_minutes,
+    })
+
+
+def summarize_trades(trades: pd.DataFrame) -> dict[str, Any]:
+    """交易汇总（按等额仓位复利计算总收益）
+
+    Args:
+        trades: simulate_exits 的输出
+
+    Returns:
+        trades、wins、win_rate、avg_profit、total_profit、avg_duration、各出场原因计数
+    """
+    profit = trades["profit_ratio"].to_numpy(dtype=np.float64)
+    count = len(profit)
+    summary = {
+        "trades": count,
+        "wins": int((profit > 0).sum()),
+        "win_rate": float((profit > 0).mean()) if count else 0.0,
+        "avg_profit": float(profit.mean()) if count else 0.0,
+        "total_profit": float(np.prod(1 + profit) - 1) if count else 0.0,
+        "avg_duration": float(trades["duration"].mean()) if count else 0.0,
+    }
+    reasons = trades["exit_reason"].value_counts()
+    for name in EXIT_REASONS:
+        summary[f"exit_{name}"] = int(reasons.get(name, 0))
+    return summary
+
+
+# 进程池工作进程共享的行情（initializer 设置一次，避免每个任务重复序列化）
+_WORKER_CANDLES: pd.DataFrame | None = None
+
+
+def _init_worker(candles: pd.DataFrame) -> None:
+    global _WORKER_CANDLES
+    _WORKER_CANDLES = candles
+
+
+def _run_batch(batch: list[tuple[int, ExitParams]], fee: float, timeframe_minutes: int) -> list[dict[str, Any]]:
+    return [
+        {"combo": index, **summarize_trades(simulate_exits(_WORKER_CANDLES, params, fee, timeframe_minutes))}
+        for index, params in batch
+    ]
+
+
+def sweep_exit_params(
+    candles: pd.DataFrame,
+    param_grid: list[ExitParams],
+    fee: float = DEFAULT_FEE,
+    timeframe_minutes: int = 1,
+    workers: int | None = None,
+    batch_size: int = 16,
+) -> pd.DataFrame:
+    """批量评估参数组合（多进程）
+
+    Args:
+        candles: 含 OHLCV 与入场信号的数据框
+        param_grid: 参数组合
+        fee: 单边手续费
+        timeframe_minutes: K 线分钟数
+        workers: 进程数（None 为 CPU 核数，1 为当前进程内串行）
+        batch_size: 每个任务包含的组合数
+
+    Returns:
+        每个组合一行：combo 下标 + summarize_trades 指标
+    """
+    columns = ["date", "open", "high", "low", "close", "enter_long", "enter_short"]
+    candles = candles[columns]
+    batches = [
+        list(enumerate(param_grid))[start:start + batch_size]
+        for start in range(0, len(param_grid), batch_size)
+    ]
+
+    rows: list[dict[str, Any]] = []
+    if workers == 1:
+        _init_worker(candles)
+        for batch in batches:
+            rows.extend(_run_batch(batch, fee, timeframe_minutes))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles,)) as executor:
+            for result in executor.map(_run_batch, batches, [fee] * len(batches), [timeframe_minutes] * len(batches)):
+                rows.extend(result)
+    return pd.DataFrame(rows).sort_values("combo").reset_index(drop=True)
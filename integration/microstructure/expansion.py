@@ -0,0 +1,206 @@
+"""惰性平移 / 多时间框架特征展开
+
+FreqAI 对每个 include_timeframes 时间框架计算特征后，再加 include_shifted_candles 个平移副本并对齐回基础时间框架，
+每个副本都是整列复制：3 个时间框架、2 根平移时每个基础特征物化为 9 列。这里改为引用：
+
+- 每个时间框架只保存一份特征缓冲区（该时间框架的行数 × 特征数），基础时间框架可直接传入特征矩阵（不复制）
+- 高周期按收盘时刻对齐（与 merge_informative_pair 一致：只使用已收盘的高周期 K 线）为一个行号数组
+- 平移 n 根即行号减 n（与 FreqAI 一样在各自时间框架的 K 线上平移）
+
+只有 materialize 组装训练矩阵时才一次性分配一块连续内存，按列从缓冲区取数；valid_rows 不物化即可求出
+全部列都有限的行（FreqAI 训练前会丢弃含 NaN 的行）。列名与 FreqAI 一致：``{特征}_{时间框架}``、
+``{特征}_shift-{n}_{时间框架}``。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .long_horizon import timeframe_to_timedelta
+
+
+def _to_ns(dates: pd.Series | pd.DatetimeIndex | np.ndarray) -> np.ndarray:
+    return np.asarray(pd.DatetimeIndex(dates).as_unit("ns").asi8)
+
+
+class _Block:
+    """一个时间框架的特征缓冲区与对齐到基础行的行号（None 表示与基础行一一对应）"""
+
+    def __init__(self, timeframe: str, columns: list[str], buffer: np.ndarray, index: np.ndarray | None):
+        self.timeframe = timeframe
+        self.columns = columns
+        self.buffer = buffer
+        self.index = index
+
+    def sources(self, rows: np.ndarray, shift: int) -> tuple[np.ndarray, np.ndarray]:
+        """基础行对应的缓冲区行号（已截到合法范围）与是否有数据"""
+        source = (rows if self.index is None else self.index[rows]) - shift
+        valid = source >= 0
+        return np.where(valid, source, 0), valid
+
+
+class LazyFeatureExpansion:
+    """按 FreqAI 展开方式的惰性特征表"""
+
+    def __init__(self, dates: pd.Series | pd.DatetimeIndex, timeframe: str = "1m", shifts: int = 0):
+        """初始化特征表
+
+        Args:
+            dates: 基础时间框架各行的开盘时间（升序）
+            timeframe: 基础时间框架
+            shifts: include_shifted_candles
+        """
+        if shifts < 0:
+            msg = f"shifts 必须 >= 0，实际 {shifts}"
+            raise ValueError(msg)
+
+        self.timeframe = timeframe
+        self.shifts = shifts
+        self._dates_ns = _to_ns(dates)
+        self._step = timeframe_to_timedelta(timeframe).value
+        self._blocks: list[_Block] = []
+
+    def __len__(self) -> int:
+        return len(self._dates_ns)
+
+    def add(
+        self,
+        timeframe: str,
+        features: pd.DataFrame | np.ndarray,
+        columns: Iterable[str] | None = None,
+        dates: pd.Series | pd.DatetimeIndex | None = None,
+    ) -> None:
+        """加入一个时间框架的特征
+
+        Args:
+            timeframe: 特征所在的时间框架（基础或更高）
+            features: 特征数据框（可含 date 列）或二维特征矩阵（行为该时间框架的 K 线）
+            columns: 特征列名（数据框默认取 date 以外的全部列；矩阵必须提供）
+            dates: 该时间框架各行的开盘时间（高周期必须提供；数据框有 date 列时可省略）
+        """
+        if isinstance(features, pd.DataFrame):
+            if dates is None and "date" in features.columns:
+                dates = features["date"]
+            columns = [c for c in features.columns if c != "date"] if columns is None else list(columns)
+            buffer = features[columns].to_numpy()
+        else:
+            if columns is None:
+                msg = "传入特征矩阵时必须提供 columns"
+                raise ValueError(msg)
+            columns, buffer = list(columns), np.asarray(features)
+        if buffer.ndim != 2 or buffer.shape[1] != len(columns) or buffer.dtype.kind not in "biuf":
+            msg = f"{timeframe} 特征应为 {len(columns)} 列的数值矩阵，实际 {buffer.shape} {buffer.dtype}"
+            raise ValueError(msg)
+
+        step = timeframe_to_timedelta(timeframe).value
+        if step < self._step:
+            msg = f"时间框架 {timeframe} 低于基础时间框架 {self.timeframe}"
+            raise ValueError(msg)
+        if step == self._step and (dates is None or np.array_equal(_to_ns(dates), self._dates_ns)):
+            if len(buffer) != len(self):
+                msg = f"{timeframe} 特征行数 {len(buffer)} 与基础行数 {len(self)} 不一致"
+                raise ValueError(msg)
+            index = None
+        else:
+            if dates is None or len(dates) != len(buffer):
+                msg = f"{timeframe} 特征需要与行数一致的 dates"
+                raise ValueError(msg)
+            # 高周期 K 线在 开盘 + 周期 收盘后可用，基础 K 线在 开盘 + 基础周期 时刻读取
+            available = _to_ns(dates) + step - self._step
+            index = np.searchsorted(available, self._dates_ns, side="right") - 1
+        self._blocks.append(_Block(timeframe, columns, buffer, index))
+
+    @property
+    def columns(self) -> list[str]:
+        """展开后的列名（按时间框架、平移顺序）"""
+        return [name for _, _, _, name in self._plan()]
+
+    def _plan(self, columns: Iterable[str] | None = None) -> list[tuple[_Block, int, int, str]]:
+        """(时间框架块, 列号, 平移, 列名)"""
+        plan = [
+            (block, j, shift, f"{column}_shift-{shift}_{block.timeframe}" if shift else f"{column}_{block.timeframe}")
+            for block in self._blocks
+            for shift in range(self.shifts + 1)
+            for j, column in enumerate(block.columns)
+        ]
+        if columns is None:
+            return plan
+        by_name = {entry[3]: entry for entry in plan}
+        missing = [name for name in columns if name not in by_name]
+        if missing:
+            msg = f"未知列: {missing}"
+            raise KeyError(msg)
+        return [by_name[name] for name in columns]
+
+    def _rows(self, rows: np.ndarray | slice | None) -> np.ndarray:
+        if rows is None:
+            return np.arange(len(self))
+        if isinstance(rows, slice):
+            return np.arange(len(self))[rows]
+        rows = np.asarray(rows)
+        return np.flatnonzero(rows) if rows.dtype == bool else rows
+
+    def valid_rows(self) -> np.ndarray:
+        """全部展开列都有限的基础行（布尔掩码，不物化）"""
+        rows = np.arange(len(self))
+        valid = np.ones(len(self), dtype=bool)
+        for block in self._blocks:
+            finite = np.isfinite(block.buffer).all(axis=1)
+            for shift in range(self.shifts + 1):
+                source, present = block.sources(rows, shift)
+                valid &= present & finite[source]
+        return valid
+
+    def materialize(
+        self,
+        rows: np.ndarray | slice | None = None,
+        columns: Iterable[str] | None = None,
+        dtype: np.dtype | type = np.float64,
+    ) -> np.ndarray:
+        """组装训练 / 预测矩阵（一次分配，缺失处为 NaN）
+
+        Args:
+            rows: 基础行（布尔掩码、行号或切片；None 表示全部）
+            columns: 展开后的列名子集（None 表示全部，顺序同 columns）
+            dtype: 输出类型
+
+        Returns:
+            形状 (行数, 列数) 的 C 连续矩阵
+        """
+        rows = self._rows(rows)
+        plan = self._plan(columns)
+        out = np.empty((len(rows), len(plan)), dtype=dtype)
+        sources: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+        for c, (block, j, shift, _) in enumerate(plan):
+            key = (id(block), shift)
+            if key not in sources:
+                source, present = block.sources(rows, shift)
+                sources[key] = (source, np.flatnonzero(~present))
+            source, missing = sources[key]
+            out[:, c] = block.buffer[source, j]
+            out[missing, c] = np.nan
+        return out
+
+    def to_frame(
+        self,
+        rows: np.ndarray | slice | None = None,
+        columns: Iterable[str] | None = None,
+        dtype: np.dtype | type = np.float64,
+    ) -> pd.DataFrame:
+        """materialize 的数据框形式（不再复制）"""
+        plan_columns = self.columns if columns is None else list(columns)
+        return pd.DataFrame(self.materialize(rows, plan_columns, dtype), columns=plan_columns, copy=False)
+
+    @property
+    def nbytes(self) -> int:
+        """缓冲区与行号数组占用的字节数"""
+        return sum(
+            block.buffer.nbytes + (block.index.nbytes if block.index is not None else 0) for block in self._blocks
+        )
+
+    def materialized_nbytes(self, dtype: np.dtype | type = np.float64) -> int:
+        """全部列逐列物化时的字节数"""
+        return len(self) * len(self.columns) * np.dtype(dtype).itemsize
@@ -0,0 +1,188 @@
+"""微观结构特征缓存
+
+按 (pair, timeframe, 最后一根 K 线时间) 缓存共享中间量，
+使 feature_engineering_expand_all 与 populate_indicators 在同一次 K 线刷新中只计算一次。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .features import compute_intermediates
+
+CacheKey = tuple[str, str, Any, int]
+
+
+class FeatureCache:
+    """中间量缓存
+
+    键为 (pair, timeframe, last_candle_date, 行数)。行数用于区分实盘中同一时刻的
+    训练窗口与预测窗口（两者最后一根 K 线相同但长度不同）。
+    新 K 线到来时，同一 (pair, timeframe) 的旧条目会被自动淘汰。
+    FreqAI 在后台线程训练时也会调用特征工程，因此所有读写都在锁内完成。
+    """
+
+    def __init__(
+        self,
+        compute: Callable[..., dict[str, np.ndarray]] = compute_intermediates,
+        max_entries: int = 64,
+    ):
+        """初始化缓存
+
+        Args:
+            compute: 中间量计算函数
+            max_entries: 最大条目数（LRU 淘汰）
+        """
+        if max_entries < 1:
+            msg = f"max_entries 必须 >= 1，实际 {max_entries}"
+            raise ValueError(msg)
+
+        self._compute = compute
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, dict[str, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(dataframe: pd.DataFrame, pair: str, timeframe: str) -> CacheKey:
+        """构造缓存键
+
+        Args:
+            dataframe: 含 date 列的 OHLCV 数据框
+            pair: 交易对
+            timeframe: 时间框架
+
+        Returns:
+            缓存键
+        """
+        last_date = dataframe["date"].iloc[-1] if len(dataframe) > 0 else None
+        return (pair, timeframe, last_date, len(dataframe))
+
+    def get_or_compute(
+        self,
+        dataframe: pd.DataFrame,
+        pair: str,
+        timeframe: str,
+        **compute_kwargs: Any,
+    ) -> dict[str, np.ndarray]:
+        """读取或计算中间量
+
+        返回的数组为只读，写入 DataFrame 时请使用 assign_columns（会复制）。
+
+        Args:
+            dataframe: OHLCV 数据框
+            pair: 交易对
+            timeframe: 时间框架
+            **compute_kwargs: 未命中时传给计算函数的额外参数
+
+        Returns:
+            中间量字典
+        """
+        key = self.make_key(dataframe, pair, timeframe)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            self.misses += 1
+
+        return self.put(key, self._compute(dataframe, **compute_kwargs))
+
+    def put(self, key: CacheKey, entry: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """写入在别处算好的中间量（如并行特征计算的结果）
+
+        Args:
+            key: make_key 构造的缓存键
+            entry: 中间量字典（数组会被设为只读）
+
+        Returns:
+            写入的中间量字典
+        """
+        for values in entry.values():
+            values.flags.writeable = False
+
+        with self._lock:
+            self._evict_stale(key)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _evict_stale(self, key: CacheKey) -> None:
+        """淘汰同一 (pair, timeframe) 下更早 K 线的条目"""
+        pair, timeframe, last_date, _ = key
+        if last_date is None:
+            return
+        stale = [
+            k for k in self._entries
+            if k[0] == pair and k[1] == timeframe and k[2] is not None and k[2] < last_date
+        ]
+        for k in stale:
+            del self._entries[k]
+
+    def invalidate(self, pair: str | None = None, timeframe: str | None = None) -> int:
+        """显式失效缓存
+
+        Args:
+            pair: 仅失效该交易对（None 表示全部）
+            timeframe: 仅失效该时间框架（None 表示全部）
+
+        Returns:
+            被移除的条目数
+        """
+        with self._lock:
+            keys = [
+                k for k in self._entries
+                if (pair is None or k[0] == pair) and (timeframe is None or k[1] == timeframe)
+            ]
+            for k in keys:
+                del self._entries[k]
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计
+
+        Returns:
+            包含 hits、misses、hit_rate、entries、invalidations 的字典
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def assign_columns(
+    dataframe: pd.DataFrame,
+    intermediates: dict[str, np.ndarray],
+    columns: dict[str, str],
+) -> pd.DataFrame:
+    """把缓存的中间量写入 DataFrame（复制，避免下游修改污染缓存）
+
+    Args:
+        dataframe: 目标数据框
+        intermediates: get_or_compute 返回的中间量
+        columns: 列名 -> 中间量名称 的映射
+
+    Returns:
+        写入后的数据框
+    """
+    for column, name in columns.items():
+        dataframe[column] = intermediates[name].copy()
+    return dataframe
@@ -0,0 +1,301 @@
+"""持久化特征存储
+
+回测 / hyperopt 每次都会对完整时间区间重算 feature_engineering_* 的输出，即使只改了入场阈值。
+这里把特征列以无压缩 Feather（Arrow IPC）文件落盘，键为：
+
+- 交易对与时间框架
+- 数据指纹：参与计算的 OHLCV（及长周期紧凑序列）的内容哈希
+- 代码指纹：特征工程源码的哈希（改动任一特征公式即自动失效）
+
+命中时以内存映射读回（数值列零拷贝），未命中时计算并写入。
+目录总大小超过上限时按最近访问时间淘汰最旧的文件。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import os
+import re
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+# 默认容量上限（字节）
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+FINGERPRINT_COLUMNS = ("date", "open", "high", "low", "close", "volume", "buy_volume", "sell_volume")
+
+_SUFFIX = ".feather"
+
+
+def data_fingerprint(*frames: pd.DataFrame | None) -> str:
+    """行情数据指纹（行数 + date / OHLCV / 订单流买卖量的字节内容）
+
+    Args:
+        *frames: 参与特征计算的数据框（None 跳过）
+
+    Returns:
+        十六进制哈希
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        if frame is None:
+            digest.update(b"none")
+            continue
+        digest.update(str(len(frame)).encode())
+        for column in FINGERPRINT_COLUMNS:
+            if column not in frame.columns:
+                continue
+            values = frame[column].to_numpy()
+            if values.dtype.kind == "M" or isinstance(frame[column].dtype, pd.DatetimeTZDtype):
+                values = frame[column].to_numpy(dtype="datetime64[ns]").view(np.int64)
+            digest.update(column.encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def code_fingerprint(*objects: Any) -> str:
+    """特征代码指纹（模块 / 函数源码的哈希）
+
+    Args:
+        *objects: 模块、类、函数或字符串（字符串按原样参与哈希，可用于版本号等）
+
+    Returns:
+        十六进制哈希
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        source = obj if isinstance(obj, str) else inspect.getsource(obj)
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def feature_code_fingerprint(*extra: Any) -> str:
+    """特征工程代码指纹（本包的特征计算模块 + 调用方额外提供的对象）
+
+    Args:
+        *extra: 额外参与哈希的对象（如策略的 feature_engineering_* 方法）
+
+    Returns:
+        十六进制哈希
+    """
+    from . import features, graph, kernel, long_horizon, rolling, trades, vpin
+
+    return code_fingerprint(features, graph, kernel, long_horizon, rolling, trades, vpin, *extra)
+
+
+def attach_columns(dataframe: pd.DataFrame, features: pd.DataFrame) -> pd.DataFrame:
+    """把存储读回的特征列按行对齐挂到数据框上（同名列被替换）
+
+    Args:
+        dataframe: 目标数据框
+        features: 与 dataframe 行数相同的特征数据框
+
+    Returns:
+        新数据框
+    """
+    if len(features) != len(dataframe):
+        msg = f"特征行数 {len(features)} 与数据行数 {len(dataframe)} 不一致"
+        raise ValueError(msg)
+    features = features.set_axis(dataframe.index)
+    overlap = dataframe.columns.intersection(features.columns)
+    if len(overlap):
+        dataframe = dataframe.drop(columns=overlap)
+    return pd.concat([dataframe, features], axis=1)
+
+
+class FeatureStore:
+    """磁盘特征存储（Feather + 内存映射 + 按大小淘汰）
+
+    文件名为 ``{pair}-{timeframe}-{key}.feather``，key 由数据指纹、代码指纹与额外参数组成。
+    命中时更新文件的访问时间（mtime），淘汰按 mtime 从旧到新删除。
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES, code_hash: str = ""):
+        """初始化存储
+
+        Args:
+            root: 存储目录（不存在时创建）
+            max_bytes: 目录总大小上限
+            code_hash: 特征代码指纹（见 code_fingerprint）
+        """
+        if max_bytes < 1:
+            msg = f"max_bytes 必须 >= 1，实际 {max_bytes}"
+            raise ValueError(msg)
+
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.code_hash = code_hash
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, pair: str, timeframe: str, fingerprint: str, extra: str = "") -> str:
+        """构造存储键（即文件名，不含后缀）
+
+        Args:
+            pair: 交易对
+            timeframe: 时间框架
+            fingerprint: 数据指纹（见 data_fingerprint）
+            extra: 其他影响特征的参数（如 period）
+
+        Returns:
+            存储键
+        """
+        digest = hashlib.blake2b(f"{fingerprint}|{self.code_hash}|{extra}".encode(), digest_size=16).hexdigest()
+        safe_pair = re.sub(r"[^A-Za-z0-9]+", "_", pair).strip("_")
+        return f"{safe_pair}-{timeframe}-{digest}"
+
+    def path_for(self, key: str) -> Path:
+        """存储键对应的文件路径"""
+        return self.root / f"{key}{_SUFFIX}"
+
+    def load(self, key: str) -> pd.DataFrame | None:
+        """读取特征（内存映射；未命中返回 None）
+
+        Args:
+            key: 存储键
+
+        Returns:
+            特征数据框（默认 RangeIndex）或 None
+        """
+        import pyarrow.feather as feather
+
+        path = self.path_for(key)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (FileNotFoundError, OSError):
+            return None
+        os.utime(path)
+        columns = {}
+        for name, column in zip(table.column_names, table.columns):
+            if column.num_chunks == 1 and column.null_count == 0:
+                columns[name] = column.chunk(0).to_numpy(zero_copy_only=False)
+            else:
+                columns[name] = column.to_numpy()
+        return pd.DataFrame(columns, copy=False)
+
+    def save(self, key: str, features: pd.DataFrame) -> Path:
+        """写入特征（无压缩 Feather，先写临时文件再原子替换）
+
+        Args:
+            key: 存储键
+            features: 特征数据框（仅数值列）
+
+        Returns:
+            文件路径
+        """
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        # from_pandas=False：NaN 按浮点值保存而非 null，读回时可零拷贝
+        table = pa.table({
+            str(name): pa.array(features[name].to_numpy(), from_pandas=False) for name in features.columns
+        })
+        path = self.path_for(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def get_or_compute(
+        self,
+        pair: str,
+        timeframe: str,
+        fingerprint: str,
+        compute: Callable[[], pd.DataFrame],
+        extra: str = "",
+    ) -> pd.DataFrame:
+        """读取或计算特征
+
+        Args:
+            pair: 交易对
+            timeframe: 时间框架
+            fingerprint: 数据指纹
+            compute: 未命中时调用，返回特征数据框
+            extra: 其他影响特征的参数
+
+        Returns:
+            特征数据框（RangeIndex；命中时各列为只读的内存映射数组）
+        """
+        key = self.make_key(pair, timeframe, fingerprint, extra)
+        features = self.load(key)
+        with self._lock:
+            if features is not None:
+                self.hits += 1
+                return features
+            self.misses += 1
+
+        features = compute().reset_index(drop=True)
+        self.save(key, features)
+        return features
+
+    def entries(self) -> list[dict[str, Any]]:
+        """存储文件列表（按访问时间从旧到新）"""
+        records = []
+        for path in self.root.glob(f"*{_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            records.append({"path": path, "size": stat.st_size, "mtime": stat.st_mtime})
+        return sorted(records, key=lambda r: r["mtime"])
+
+    def evict(self) -> int:
+        """按最近访问时间淘汰，直到总大小不超过上限（最新的文件始终保留）
+
+        Returns:
+            删除的文件数
+        """
+        with self._lock:
+            entries = self.entries()
+            total = sum(r["size"] for r in entries)
+            removed = 0
+            for record in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    record["path"].unlink()
+                except FileNotFoundError:
+                    pass
+                total -= record["size"]
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> int:
+        """删除全部存储文件
+
+        Returns:
+            删除的文件数
+        """
+        with self._lock:
+            paths = list(self.root.glob(f"*{_SUFFIX}"))
+            for path in paths:
+                path.unlink(missing_ok=True)
+        return len(paths)
+
+    def stats(self) -> dict[str, Any]:
+        """存储统计
+
+        Returns:
+            包含 hits、misses、hit_rate、files、bytes、evictions 的字典
+        """
+        entries = self.entries()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "files": len(entries),
+            "bytes": sum(r["size"] for r in entries),
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,170 @@
+"""微观结构中间量计算
+
+ETHMicrostructureStrategy 的 feature_engineering_expand_all 与 populate_indicators
+共用同一组中间量（买卖压力、VPIN、已实现波动率、趋势、市场状态），
+这里集中计算一次，供特征缓存复用。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .long_horizon import LongHorizonTrendProvider
+from .rolling import rolling_quantile_at
+from .vpin import bucket_vpin, bulk_buy_fraction
+
+# 默认参数（与策略保持一致）
+VPIN_WINDOW = 20
+VOL_WINDOW = 20
+TREND_PERIOD = 1440  # 1 天（1 分钟数据）
+TREND_30D_PERIOD = 43200  # 30 天（1 分钟数据）
+REGIME_WINDOW = 100
+REGIME_QUANTILE = 0.5
+REGIME_TREND_THRESHOLD = 0.10
+
+# 中间量名称
+INTERMEDIATE_NAMES = (
+    "price_change",
+    "mf_multiplier",
+    "mf_volume",
+    "buy_pressure",
+    "sell_pressure",
+    "volume_imbalance",
+    "vpin",
+    "realized_vol",
+    "trend",
+    "trend_30d",
+    "regime_state",
+)
+
+
+def classify_regime(
+    trend: pd.Series | np.ndarray,
+    realized_vol: pd.Series | np.ndarray,
+    window: int = REGIME_WINDOW,
+    threshold: float = REGIME_TREND_THRESHOLD,
+) -> np.ndarray:
+    """市场状态分类（HMM 的简化版本）
+
+    状态 0: 熊市（下跌 + 高波动）
+    状态 1: 震荡（默认）
+    状态 2: 牛市（上涨 + 高波动）
+
+    波动率滚动中位数只在趋势闸门打开的行上计算一次，牛市/熊市掩码共用。
+
+    Args:
+        trend: 趋势强度序列
+        realized_vol: 已实现波动率序列
+        window: 波动率分位数窗口
+        threshold: 趋势阈值
+
+    Returns:
+        市场状态数组（int64）
+    """
+    trend_values = np.asarray(trend, dtype=np.float64)
+    vol_values = np.asarray(realized_vol, dtype=np.float64)
+
+    bull = trend_values > threshold
+    bear = trend_values < -threshold
+    gated = np.flatnonzero(bull | bear)
+
+    vol_median = rolling_quantile_at(vol_values, window, REGIME_QUANTILE, gated)
+    high_vol = np.zeros(len(trend_values), dtype=bool)
+    high_vol[gated] = vol_values[gated] > vol_median
+
+    regime = np.ones(len(trend_values), dtype=np.int64)
+    regime[bull & high_vol] = 2
+    regime[bear & high_vol] = 0
+    return regime
+
+
+def compute_intermediates(
+    dataframe: pd.DataFrame,
+    vpin_window: int = VPIN_WINDOW,
+    vol_window: int = VOL_WINDOW,
+    trend_period: int = TREND_PERIOD,
+    trend_30d_period: int = TREND_30D_PERIOD,
+    trend_provider: LongHorizonTrendProvider | None = None,
+    compact_frames: dict[str, pd.DataFrame] | None = None,
+    order_flow: dict[str, np.ndarray] | None = None,
+    vpin_bucket_volume: float | None = None,
+) -> dict[str, np.ndarray]:
+    """计算共享中间量
+
+    Args:
+        dataframe: OHLCV 数据框
+        vpin_window: VPIN 滚动窗口
+        vol_window: 已实现波动率窗口
+        trend_period: 趋势回看周期（K 线数量）
+        trend_30d_period: 长期趋势回看周期（K 线数量）
+        trend_provider: 长周期趋势提供器，提供时 trend / trend_30d 由紧凑序列计算，
+            不再做 1440 / 43200 行的 shift
+        compact_frames: 时间框架 -> 紧凑 OHLCV（如 dp 提供的 1h / 1d 数据）
+        order_flow: 逐笔成交聚合出的订单流（见 trades.align_order_flow），提供时买卖压力与 VPIN
+            使用真实主动买卖量；其中为 NaN 的行（成交文件未覆盖）仍用 Money Flow 近似
+        vpin_bucket_volume: 提供时 vpin 为成交量同步 VPIN（每桶成交量，见 vpin.bucket_vpin），
+            否则为 vpin_window 根 K 线的滚动失衡比
+
+    Returns:
+        中间量名称 -> 数组 的字典，键见 INTERMEDIATE_NAMES
+    """
+    close = dataframe["close"]
+    high = dataframe["high"]
+    low = dataframe["low"]
+    volume = dataframe["volume"]
+
+    price_change = close.pct_change()
+
+    # Money Flow 方法计算买卖压力
+    mf_multiplier = (((close - low) - (high - close)) / (high - low)).fillna(0)
+    mf_volume = mf_multiplier * volume
+    buy_pressure = np.where(mf_volume > 0, mf_volume, 0)
+    sell_pressure = np.where(mf_volume < 0, abs(mf_volume), 0)
+    flow_volume = volume
+    if order_flow is not None:
+        covered = ~np.isnan(order_flow["buy_volume"])
+        buy_pressure = np.where(covered, order_flow["buy_volume"], buy_pressure)
+        sell_pressure = np.where(covered, order_flow["sell_volume"], sell_pressure)
+        flow_volume = pd.Series(
+            np.where(covered, order_flow["buy_volume"] + order_flow["sell_volume"], volume), index=dataframe.index
+        )
+
+    realized_vol = price_change.rolling(vol_window).std()
+
+    # VPIN（无订单流时为近似）
+    volume_imbalance = pd.Series(abs(buy_pressure - sell_pressure), index=dataframe.index)
+    if vpin_bucket_volume is None:
+        vpin = (
+            volume_imbalance.rolling(vpin_window).sum() /
+            (flow_volume.rolling(vpin_window).sum() + 1e-10)
+        ).to_numpy()
+    else:
+        # 买入占比：有订单流的行取真实值，其余行按 bulk volume classification 估计
+        buy_fraction = bulk_buy_fraction(price_change.to_numpy(), realized_vol.to_numpy())
+        if order_flow is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                true_fraction = order_flow["buy_volume"] / (order_flow["buy_volume"] + order_flow["sell_volume"])
+            buy_fraction = np.where(covered, true_fraction, buy_fraction)
+        vpin = bucket_vpin(np.asarray(flow_volume, dtype=np.float64), buy_fraction, vpin_bucket_volume)
+    if trend_provider is not None:
+        long_horizon = trend_provider.compute(dataframe, compact_frames)
+        trend = pd.Series(long_horizon["trend"], index=dataframe.index)
+        trend_30d = pd.Series(long_horizon["trend_30d"], index=dataframe.index)
+    else:
+        trend = (close - close.shift(trend_period)) / close.shift(trend_period)
+        trend_30d = (close - close.shift(trend_30d_period)) / close.shift(trend_30d_period)
+
+    return {
+        "price_change": price_change.to_numpy(),
+        "mf_multiplier": mf_multiplier.to_numpy(),
+        "mf_volume": mf_volume.to_numpy(),
+        "buy_pressure": buy_pressure.astype(np.float64),
+        "sell_pressure": sell_pressure.astype(np.float64),
+        "volume_imbalance": volume_imbalance.to_numpy(),
+        "vpin": vpin,
+        "realized_vol": realized_vol.to_numpy(),
+        "trend": trend.to_numpy(),
+        "trend_30d": trend_30d.to_numpy(),
+        "regime_state": classify_regime(trend, realized_vol),
+    }
@@ -0,0 +1,315 @@
+"""声明式特征图
+
+策略特征原先逐列手写：相同的表达式（如 Amihud 与 Kyle's Lambda、close.shift(1)、
+成交量滚动均值）被重复计算，同名输出被后写的版本静默覆盖。这里把特征定义成表达式图：
+
+- 构造即去重：同一运算作用于同一输入、同一参数只建一个节点（公共子表达式消除）
+- 定义期检查：同名输出重复定义直接报错，不再在运行期静默覆盖
+- 按拓扑序（节点创建顺序）求值，只计算输出可达的节点，中间量在最后一次使用后释放
+- 同一输入上的多个滚动标准差共用一组前缀和
+
+用法::
+
+    graph = FeatureGraph()
+    close = graph.input("close")
+    graph.output("%-momentum_5", close / close.shift(5) - 1)
+    values = graph.evaluate({"close": close_array})
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from .profiling import FeatureProfiler
+from .rolling import rolling_mean_into, rolling_std_into
+
+NodeKey = tuple[str, tuple[int, ...], Any]
+
+# 满足交换律的二元运算（输入排序后去重）
+_COMMUTATIVE = frozenset({"add", "mul", "maximum"})
+
+
+def _shift(x: np.ndarray, periods: int) -> np.ndarray:
+    out = np.empty_like(x)
+    out[:periods] = np.nan
+    out[periods:] = x[:-periods] if periods else x
+    return out
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    return rolling_mean_into(x, window, np.empty(len(x)))
+
+
+def _where(cond: np.ndarray, a: np.ndarray, b: np.ndarray, _: Any) -> np.ndarray:
+    return np.where(cond, a, b)
+
+
+# 运算表：op -> (参与运算的数组, 参数) -> 结果
+_OPS: dict[str, Callable[..., np.ndarray]] = {
+    "add": lambda a, b, _: np.add(a, b),
+    "sub": lambda a, b, _: np.subtract(a, b),
+    "mul": lambda a, b, _: np.multiply(a, b),
+    "div": lambda a, b, _: np.divide(a, b),
+    "maximum": lambda a, b, _: np.maximum(a, b),
+    "add_scalar": lambda a, value: a + value,
+    "sub_scalar": lambda a, value: a - value,
+    "mul_scalar": lambda a, value: a * value,
+    "div_scalar": lambda a, value: a / value,
+    "gt_scalar": lambda a, value: a > value,
+    "abs": lambda a, _: np.abs(a),
+    "where": _where,
+    "shift": _shift,
+    "rolling_mean": _rolling_mean,
+}
+
+
+class Expr:
+    """特征图中的表达式（节点句柄）
+
+    支持 + - * / 与 > 标量比较、abs()，以及 shift / rolling_mean / rolling_std。
+    """
+
+    __slots__ = ("graph", "node")
+
+    def __init__(self, graph: FeatureGraph, node: int):
+        self.graph = graph
+        self.node = node
+
+    def _binary(self, op: str, other: Expr | float) -> Expr:
+        if isinstance(other, Expr):
+            return self.graph.apply(op, self, other)
+        return self.graph.apply(f"{op}_scalar", self, param=float(other))
+
+    def __add__(self, other: Expr | float) -> Expr:
+        return self._binary("add", other)
+
+    def __sub__(self, other: Expr | float) -> Expr:
+        return self._binary("sub", other)
+
+    def __mul__(self, other: Expr | float) -> Expr:
+        return self._binary("mul", other)
+
+    def __truediv__(self, other: Expr | float) -> Expr:
+        return self._binary("div", other)
+
+    def __gt__(self, other: float) -> Expr:
+        return self.graph.apply("gt_scalar", self, param=float(other))
+
+    def __abs__(self) -> Expr:
+        return self.graph.apply("abs", self)
+
+    def shift(self, periods: int) -> Expr:
+        """向后平移 periods 行（前 periods 行为 NaN）"""
+        if periods < 0:
+            msg = f"periods 必须 >= 0，实际 {periods}"
+            raise ValueError(msg)
+        return self.graph.apply("shift", self, param=int(periods))
+
+    def rolling_mean(self, window: int) -> Expr:
+        """滚动均值（min_periods=window）"""
+        return self.graph.apply("rolling_mean", self, param=int(window))
+
+    def rolling_std(self, window: int) -> Expr:
+        """滚动标准差（ddof=1，min_periods=window）"""
+        return self.graph.apply("rolling_std", self, param=int(window))
+
+    def __repr__(self) -> str:
+        op, inputs, param = self.graph.nodes[self.node]
+        return f"Expr(#{self.node} {op}{list(inputs)}{'' if param is None else f' {param}'})"
+
+
+class FeatureGraph:
+    """特征表达式图
+
+    节点以 (op, 输入节点, 参数) 为键驻留，重复定义的表达式返回同一个节点。
+    节点只能引用已存在的节点，因此创建顺序即拓扑序。
+    """
+
+    def __init__(self):
+        self.nodes: list[NodeKey] = []
+        self._index: dict[NodeKey, int] = {}
+        self.inputs: dict[str, int] = {}
+        self.outputs: dict[str, int] = {}
+        self.requests = 0  # 构造期请求的节点数（含被去重的）
+
+    def _intern(self, key: NodeKey) -> int:
+        self.requests += 1
+        node = self._index.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self._index[key] = node
+        return node
+
+    def input(self, name: str) -> Expr:
+        """输入列"""
+        node = self._intern(("input", (), name))
+        self.inputs[name] = node
+        return Expr(self, node)
+
+    def apply(self, op: str, *args: Expr, param: Any = None) -> Expr:
+        """添加运算节点（已存在相同节点时直接复用）
+
+        Args:
+            op: 运算名（见 _OPS，另有 rolling_std）
+            *args: 输入表达式
+            param: 运算参数（标量、窗口等）
+
+        Returns:
+            表达式
+        """
+        if op not in _OPS and op != "rolling_std":
+            msg = f"未知运算: {op}"
+            raise ValueError(msg)
+        if any(arg.graph is not self for arg in args):
+            msg = f"{op} 的输入来自其他特征图"
+            raise ValueError(msg)
+        inputs = tuple(arg.node for arg in args)
+        if op in _COMMUTATIVE:
+            inputs = tuple(sorted(inputs))
+        return Expr(self, self._intern((op, inputs, param)))
+
+    def maximum(self, a: Expr, b: Expr) -> Expr:
+        """逐元素最大值（任一为 NaN 时为 NaN）"""
+        return self.apply("maximum", a, b)
+
+    def where(self, cond: Expr, a: Expr, b: Expr) -> Expr:
+        """cond 为真取 a，否则取 b"""
+        return self.apply("where", cond, a, b)
+
+    def output(self, name: str, expr: Expr) -> Expr:
+        """声明输出列（同名输出只能定义一次）
+
+        Args:
+            name: 输出列名
+            expr: 表达式
+
+        Returns:
+            expr
+        """
+        if name in self.outputs:
+            msg = f"输出 {name} 重复定义（会覆盖 #{self.outputs[name]}）"
+            raise ValueError(msg)
+        if expr.graph is not self:
+            msg = f"输出 {name} 的表达式来自其他特征图"
+            raise ValueError(msg)
+        self.outputs[name] = expr.node
+        return expr
+
+    @property
+    def output_names(self) -> tuple[str, ...]:
+        """输出列名（定义顺序）"""
+        return tuple(self.outputs)
+
+    def live_nodes(self) -> list[int]:
+        """输出可达的节点（拓扑序）"""
+        live = set(self.outputs.values())
+        for node in range(len(self.nodes) - 1, -1, -1):
+            if node in live:
+                live.update(self.nodes[node][1])
+        return sorted(live)
+
+    def stats(self) -> dict[str, int]:
+        """图统计
+
+        Returns:
+            包含 requested、nodes、live_nodes、outputs、aliases 的字典
+            （aliases 为与其他输出共用同一节点的输出数）
+        """
+        return {
+            "requested": self.requests,
+            "nodes": len(self.nodes),
+            "live_nodes": len(self.live_nodes()),
+            "outputs": len(self.outputs),
+            "aliases": len(self.outputs) - len(set(self.outputs.values())),
+        }
+
+    def label(self, node: int) -> str:
+        """节点名称（输出节点为输出列名，其余为 op(参数)#节点号）"""
+        names = [name for name, target in self.outputs.items() if target == node]
+        if names:
+            return "+".join(names)
+        op, _, param = self.nodes[node]
+        return f"{op}({'' if param is None else param})#{node}"
+
+    def evaluate(
+        self,
+        inputs: dict[str, np.ndarray],
+        out: dict[str, np.ndarray] | None = None,
+        profiler: FeatureProfiler | None = None,
+    ) -> dict[str, np.ndarray]:
+        """按拓扑序求值
+
+        Args:
+            inputs: 输入列名 -> 数组（等长）
+            out: 可选的输出数组（列名 -> 预分配数组，结果写入其中并按其 dtype 转换）
+            profiler: 可选的埋点记录器（开启时按节点记录耗时 / 内存 / dtype）
+
+        Returns:
+            输出列名 -> 数组（共用同一节点的输出在未提供 out 时返回同一数组）
+        """
+        missing = [name for name in self.inputs if name not in inputs]
+        if missing:
+            msg = f"缺少输入: {missing}"
+            raise ValueError(msg)
+
+        live = self.live_nodes()
+        last_use: dict[int, int] = {}
+        for node in live:
+            for source in self.nodes[node][1]:
+                last_use[source] = node
+        outputs_by_node: dict[int, list[str]] = {}
+        for name, node in self.outputs.items():
+            outputs_by_node.setdefault(node, []).append(name)
+
+        # 同一输入上的滚动标准差一次算完（共用前缀和）
+        std_groups: dict[int, list[int]] = {}
+        for node in live:
+            op, sources, _ = self.nodes[node]
+            if op == "rolling_std":
+                std_groups.setdefault(sources[0], []).append(node)
+
+        values: dict[int, np.ndarray] = {}
+        results: dict[str, np.ndarray] = {}
+
+        def compute(node: int) -> None:
+            op, sources, param = self.nodes[node]
+            if op == "input":
+                values[node] = np.asarray(inputs[param], dtype=np.float64)
+            elif op == "rolling_std":
+                group = std_groups[sources[0]]
+                source = values[sources[0]]
+                buffers = tuple(np.empty(len(source)) for _ in group)
+                rolling_std_into(source, tuple(self.nodes[g][2] for g in group), buffers)
+                values.update(zip(group, buffers))
+            else:
+                values[node] = _OPS[op](*(values[s] for s in sources), param)
+
+        active = profiler if profiler is not None and profiler.enabled else None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for node in live:
+                op, sources, param = self.nodes[node]
+                if node not in values:
+                    if active is not None and op != "input":
+                        with active.span(self.label(node)) as record:
+                            compute(node)
+                            record["dtype"] = str(values[node].dtype)
+                    else:
+                        compute(node)
+
+                for name in outputs_by_node.get(node, ()):
+                    if out is not None and name in out:
+                        out[name][:] = values[node]
+                        results[name] = out[name]
+                    else:
+                        results[name] = values[node]
+
+                # 释放不再被引用的中间量（已写入 out 的输出节点同样释放）
+                for source in (*sources, node):
+                    if last_use.get(source, node) == node:
+                        values.pop(source, None)
+
+        return results
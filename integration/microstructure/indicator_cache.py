@@ -0,0 +1,227 @@
+"""跨策略的指标记忆化
+
+批量回测（scripts/backtest.ps1、--strategy-list）里多个策略在同一批交易对与时间区间上各自从头计算
+同样的 TA-Lib ADX、布林带、ATR。这里按 (交易对, 时间框架, 数据指纹, 指标名, 参数) 缓存指标输出：
+
+- 进程内：同一进程的所有策略共用 shared_indicator_cache() 返回的实例，按字节数 LRU 淘汰
+- 可选持久化：挂上 FeatureStore 后未命中的指标写入磁盘，之后的进程以内存映射读回；
+  存储的代码指纹应包含指标库的版本（指标实现变化时自动失效）
+
+数据指纹是日期与 OHLCV 的内容哈希；按 (交易对, 时间框架, 行数, 首尾 K 线时间, OHLCV 各列的和与按位置加权和)
+记忆，同一份数据只哈希一次。时间跨度相同但内容不同的数据（如某个策略换成 Heikin-Ashi 价格、
+重新下载修正过的 K 线）校验和不同，会重新哈希，不会读到旧数据的指标。
+返回的数组为只读，写入 DataFrame 时请使用 assign_columns（会复制）。
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .feature_store import FINGERPRINT_COLUMNS, FeatureStore, data_fingerprint
+
+# 进程内缓存默认容量上限（字节）
+DEFAULT_MAX_BYTES = 1024**3
+
+# 数据指纹缓存的条目数上限
+MAX_FINGERPRINTS = 1024
+
+IndicatorKey = tuple[str, str, str, str, str]
+
+_shared: IndicatorCache | None = None
+_shared_lock = threading.Lock()
+
+
+def _columns(name: str, values: Any, length: int) -> dict[str, np.ndarray]:
+    """把指标输出（Series / DataFrame / ndarray / 数组字典）整理为按列的数组字典"""
+    if isinstance(values, pd.DataFrame):
+        columns = {str(column): values[column].to_numpy() for column in values.columns}
+    elif isinstance(values, dict):
+        columns = {str(column): np.asarray(array) for column, array in values.items()}
+    else:
+        columns = {name: np.asarray(values)}
+
+    for column, array in columns.items():
+        if array.ndim != 1 or len(array) != length:
+            msg = f"指标 {name} 的输出列 {column} 形状为 {array.shape}，应为 ({length},)"
+            raise ValueError(msg)
+    return columns
+
+
+def _checksum(dataframe: pd.DataFrame) -> bytes:
+    """OHLCV 各列的和与按位置加权和（O(行数) 的廉价内容校验，用于数据指纹的记忆键）"""
+    weights = np.arange(1, len(dataframe) + 1, dtype=np.float64)
+    sums: list[float] = []
+    for column in FINGERPRINT_COLUMNS:
+        if column == "date" or column not in dataframe.columns:
+            continue
+        values = dataframe[column].to_numpy(dtype=np.float64)
+        sums.extend((values.sum(), values @ weights))
+    return np.array(sums).tobytes()
+
+
+class IndicatorCache:
+    """指标记忆化缓存（进程内 LRU + 可选磁盘存储）"""
+
+    def __init__(self, store: FeatureStore | None = None, max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        """初始化缓存
+
+        Args:
+            store: 磁盘存储（None 表示只在进程内缓存）
+            max_bytes: 进程内缓存的容量上限
+            enabled: 关闭时每次直接计算（不算指纹、不缓存）
+        """
+        if max_bytes < 1:
+            msg = f"max_bytes 必须 >= 1，实际 {max_bytes}"
+            raise ValueError(msg)
+
+        self.store = store
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: OrderedDict[IndicatorKey, dict[str, np.ndarray]] = OrderedDict()
+        self._fingerprints: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def fingerprint(self, dataframe: pd.DataFrame, pair: str, timeframe: str) -> str:
+        """数据指纹（同一交易对、时间框架、行数、首尾 K 线时间与内容校验和的数据只哈希一次）"""
+        dates = dataframe["date"]
+        key: tuple = (pair, timeframe, len(dataframe))
+        if len(dataframe):
+            key += (dates.iloc[0], dates.iloc[-1], _checksum(dataframe))
+        with self._lock:
+            fingerprint = self._fingerprints.get(key)
+            if fingerprint is not None:
+                self._fingerprints.move_to_end(key)
+                return fingerprint
+
+        fingerprint = data_fingerprint(dataframe)
+        with self._lock:
+            self._fingerprints[key] = fingerprint
+            while len(self._fingerprints) > MAX_FINGERPRINTS:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    @staticmethod
+    def make_extra(name: str, params: dict[str, Any]) -> str:
+        """指标名与参数的规范写法（参数按名称排序）"""
+        return f"{name}|{json.dumps(params, sort_keys=True, default=repr)}"
+
+    def get_or_compute(
+        self,
+        dataframe: pd.DataFrame,
+        pair: str,
+        timeframe: str,
+        name: str,
+        params: dict[str, Any],
+        compute: Callable[[], Any],
+    ) -> dict[str, np.ndarray]:
+        """读取或计算指标
+
+        Args:
+            dataframe: 含 date 列的 OHLCV 数据框
+            pair: 交易对
+            timeframe: 时间框架
+            name: 指标名（如 'adx'；单列输出以它为列名）
+            params: 指标参数（参与缓存键，如 {'timeperiod': 14}）
+            compute: 未命中时调用，返回与 dataframe 等长的 Series / DataFrame / ndarray / 数组字典
+
+        Returns:
+            列名 -> 只读数组
+        """
+        if not self.enabled:
+            return _columns(name, compute(), len(dataframe))
+
+        extra = self.make_extra(name, params)
+        fingerprint = self.fingerprint(dataframe, pair, timeframe)
+        key = (pair, timeframe, fingerprint, name, extra)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.store is not None:
+            store_key = self.store.make_key(pair, timeframe, fingerprint, extra)
+            stored = self.store.load(store_key)
+            if stored is not None and len(stored) == len(dataframe):
+                with self._lock:
+                    self.store_hits += 1
+                return self._put(key, {str(column): stored[column].to_numpy() for column in stored.columns})
+
+        entry = _columns(name, compute(), len(dataframe))
+        with self._lock:
+            self.misses += 1
+        if self.store is not None:
+            self.store.save(store_key, pd.DataFrame(entry, copy=False))
+        return self._put(key, entry)
+
+    def _put(self, key: IndicatorKey, entry: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        for values in entry.values():
+            values.flags.writeable = False
+        nbytes = sum(values.nbytes for values in entry.values())
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= sum(values.nbytes for values in previous.values())
+            self._entries[key] = entry
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(values.nbytes for values in evicted.values())
+        return entry
+
+    def clear(self) -> None:
+        """清空进程内缓存（不影响磁盘存储）"""
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计
+
+        Returns:
+            包含 hits、store_hits、misses、hit_rate、entries、bytes 的字典
+        """
+        total = self.hits + self.store_hits + self.misses
+        return {
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.store_hits) / total if total else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def shared_indicator_cache(store: FeatureStore | None = None) -> IndicatorCache:
+    """进程内共享的指标缓存（第一次调用时创建）
+
+    Args:
+        store: 磁盘存储；共享实例还没有存储时挂上（已有存储时忽略）
+
+    Returns:
+        共享实例
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = IndicatorCache(store)
+        elif _shared.store is None and store is not None:
+            _shared.store = store
+        return _shared
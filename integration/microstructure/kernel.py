@@ -0,0 +1,212 @@
+"""微观结构特征融合内核
+
+feature_engineering_expand_all 原先通过约 60 次 pandas 运算构建约 25 个特征列，每一步都分配
+一个整列临时量（tr、mf_multiplier、bid_approx、ask_approx ...），并把这些临时量作为列留在 DataFrame 上。
+这里把特征定义为声明式特征图（见 graph.py），在 numpy 数组上求值并写入预分配的二维特征矩阵
+（列优先，每列连续）：
+
+- 重复的表达式在图中只有一个节点，中间量在最后一次使用后释放
+- 滚动均值/标准差用分块前缀和差分，O(n) 且与窗口大小无关，多个窗口共用前缀和
+- 共享中间量（VPIN、已实现波动率、趋势、市场状态）直接取自特征缓存
+
+attach_features 是把矩阵挂回 DataFrame 的薄适配层。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .graph import FeatureGraph
+from .profiling import FeatureProfiler
+
+REGIME_COLUMN = "%-regime_state"
+
+EPSILON = 1e-10
+
+# 紧凑模式：特征列 float32、市场状态 int8（在写入特征矩阵时一次性转换）
+COMPACT_DTYPE = np.float32
+COMPACT_REGIME_DTYPE = np.int8
+
+# 特征图输入：OHLCV 列 + 共享中间量（见 compute_intermediates）
+GRAPH_INPUTS = ("high", "low", "close", "volume", "price_change", "vpin", "buy_pressure", "sell_pressure",
+                "realized_vol", "trend")
+
+
+def build_feature_graph() -> FeatureGraph:
+    """策略特征定义（输出顺序与策略原实现中列的首次出现顺序一致）
+
+    close.shift(1)、成交量 20 窗口均值、Amihud 比率等只在图中出现一次；
+    %-kyle_lambda 与 %-amihud 是同一表达式，求值时共用一个节点。
+
+    Returns:
+        特征图（%-regime_state 为整数列，不在图中，单独挂载）
+    """
+    graph = FeatureGraph()
+    high, low, close, volume = (graph.input(name) for name in ("high", "low", "close", "volume"))
+    price_change, vpin, buy_pressure, sell_pressure, realized_vol, trend = (
+        graph.input(name) for name in GRAPH_INPUTS[4:]
+    )
+    prev_close = close.shift(1)
+
+    # 1-2. 买卖压力 / VPIN（来自共享中间量）
+    graph.output("%-price_change", price_change)
+    graph.output("%-vpin", vpin)
+
+    # 3. ATR 归一化：tr = max(h - l, |h - c_prev|, |l - c_prev|)
+    true_range = graph.maximum(graph.maximum(high - low, abs(high - prev_close)), abs(low - prev_close))
+    atr = graph.output("%-atr_14", true_range.rolling_mean(14))
+    graph.output("%-atr_normalized", atr / close)
+
+    # 4. 已实现波动率（同一输入上的三个窗口共用前缀和）
+    for window in (12, 24, 48):
+        graph.output(f"%-realized_vol_{window}", price_change.rolling_std(window))
+
+    # 5. 价格动量（5/10 与原实现最终写法一致，15 为 pct_change）
+    for window in (5, 10):
+        past = close.shift(window)
+        graph.output(f"%-momentum_{window}", (close - past) / past)
+    graph.output("%-momentum_15", close / close.shift(15) - 1)
+
+    # 6. 成交量相对强度（%-volume_ratio 取 20 窗口版本）+ 成交量波动率（共用 20 窗口均值）
+    graph.output("%-volume_sma_12", volume.rolling_mean(12))
+    volume_mean = volume.rolling_mean(20) + EPSILON
+    graph.output("%-volume_ratio", volume / volume_mean)
+
+    # 7. Microprice：(V_sell * low + V_buy * high) / (V_buy + V_sell)，无成交量时取中间价
+    total_volume = buy_pressure + sell_pressure
+    weighted = (sell_pressure * low + buy_pressure * high) / total_volume
+    microprice = graph.output("%-microprice", graph.where(total_volume > 0, weighted, (low + high) / 2))
+    graph.output("%-microprice_vs_close", (microprice - close) / close)
+
+    # 8. 流动性：Amihud / Kyle's Lambda（OHLCV 近似下两者定义相同）
+    for name in ("amihud", "kyle_lambda"):
+        illiquidity = graph.output(f"%-{name}", abs(price_change) / (volume + EPSILON))
+        graph.output(f"%-{name}_ma", illiquidity.rolling_mean(20))
+
+    # 9. 波动率特征
+    graph.output("%-realized_vol", realized_vol)
+    price_range = graph.output("%-price_range", (high - low) / close)
+    graph.output("%-price_range_ma", price_range.rolling_mean(20))
+    graph.output("%-volume_vol", volume.rolling_std(20) / volume_mean)
+
+    # 10. 市场状态
+    graph.output("%-trend", trend)
+    return graph
+
+
+FEATURE_GRAPH = build_feature_graph()
+
+# 特征列（%-regime_state 为整数列，单独挂载）
+FEATURE_COLUMNS = FEATURE_GRAPH.output_names
+
+
+def compute_feature_matrix(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    volume: np.ndarray,
+    intermediates: dict[str, np.ndarray],
+    dtype: type = np.float64,
+    profiler: FeatureProfiler | None = None,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """计算特征矩阵
+
+    Args:
+        high: 最高价
+        low: 最低价
+        close: 收盘价
+        volume: 成交量
+        intermediates: 共享中间量（见 compute_intermediates）
+        dtype: 矩阵数据类型
+        profiler: 可选的埋点记录器（按特征图节点记录）
+        out: 预分配的 (n, len(FEATURE_COLUMNS)) 矩阵（如共享内存上的视图），提供时 dtype 取自该矩阵
+
+    Returns:
+        形状 (n, len(FEATURE_COLUMNS)) 的列优先矩阵，列顺序见 FEATURE_COLUMNS
+    """
+    n = len(close)
+    matrix: np.ndarray
+    if out is None:
+        matrix = np.empty((n, len(FEATURE_COLUMNS)), dtype=dtype, order="F")
+    elif out.shape != (n, len(FEATURE_COLUMNS)):
+        msg = f"out 形状应为 {(n, len(FEATURE_COLUMNS))}，实际 {out.shape}"
+        raise ValueError(msg)
+    else:
+        matrix = out
+    if n == 0:
+        return matrix
+    inputs = {**intermediates, "high": high, "low": low, "close": close, "volume": volume}
+    columns = {name: matrix[:, i] for i, name in enumerate(FEATURE_COLUMNS)}
+    FEATURE_GRAPH.evaluate(inputs, out=columns, profiler=profiler)
+    return matrix
+
+
+def attach_features(
+    dataframe: pd.DataFrame,
+    matrix: np.ndarray,
+    regime: np.ndarray,
+    regime_dtype: type = np.int64,
+) -> pd.DataFrame:
+    """把特征矩阵挂到 DataFrame 上（薄适配层）
+
+    Args:
+        dataframe: 原始数据框
+        matrix: compute_feature_matrix 的输出
+        regime: 市场状态数组
+        regime_dtype: 市场状态列的数据类型
+
+    Returns:
+        新数据框（原列 + FEATURE_COLUMNS + %-regime_state）
+    """
+    features = pd.DataFrame(matrix, index=dataframe.index, columns=list(FEATURE_COLUMNS), copy=False)
+    features[REGIME_COLUMN] = regime.astype(regime_dtype)
+
+    overlap = dataframe.columns.intersection(features.columns)
+    if len(overlap):
+        dataframe = dataframe.drop(columns=overlap)
+    return pd.concat([dataframe, features], axis=1)
+
+
+def feature_dtypes(compact: bool) -> tuple[type, type]:
+    """特征矩阵与市场状态列的数据类型
+
+    Args:
+        compact: 是否使用紧凑模式
+
+    Returns:
+        (特征 dtype, 市场状态 dtype)
+    """
+    return (COMPACT_DTYPE, COMPACT_REGIME_DTYPE) if compact else (np.float64, np.int64)
+
+
+def build_features(
+    dataframe: pd.DataFrame,
+    intermediates: dict[str, np.ndarray],
+    dtype: type = np.float64,
+    regime_dtype: type = np.int64,
+    profiler: FeatureProfiler | None = None,
+) -> pd.DataFrame:
+    """从 OHLCV DataFrame 计算并挂载全部微观结构特征
+
+    Args:
+        dataframe: OHLCV 数据框
+        intermediates: 共享中间量
+        dtype: 特征矩阵数据类型
+        regime_dtype: 市场状态列的数据类型
+        profiler: 可选的埋点记录器（按特征图节点记录）
+
+    Returns:
+        挂载特征后的数据框
+    """
+    matrix = compute_feature_matrix(
+        dataframe["high"].to_numpy(dtype=np.float64),
+        dataframe["low"].to_numpy(dtype=np.float64),
+        dataframe["close"].to_numpy(dtype=np.float64),
+        dataframe["volume"].to_numpy(dtype=np.float64),
+        intermediates,
+        dtype=dtype,
+        profiler=profiler,
+    )
+    return attach_features(dataframe, matrix, intermediates["regime_state"], regime_dtype=regime_dtype)
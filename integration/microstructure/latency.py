@@ -0,0 +1,231 @@
+"""K 线收盘到入场信号的延迟埋点
+
+1m 剥头皮策略的 ROI 只有 0.2-0.5%，K 线收盘到 enter_long / enter_short 决策之间的秒数直接影响成交价。
+这里按交易对记录每根新 K 线经过各阶段的墙钟时刻（相对 K 线收盘时刻 = 开盘时间 + 时间框架）：
+
+- arrival：K 线到达（刷新行情后的 bot 循环开始）
+- analysis：populate_indicators 开始
+- freqai：FreqAI 预测（freqai.start）结束
+- indicators：我们自己的指标（populate_indicators 其余部分）结束
+- signal：populate_entry_trend 结束
+
+每个阶段的收盘延迟和相邻阶段之间的耗时（queue / freqai_s / indicators_s / entry_s）累计到对数分桶直方图
+（1ms ~ 10min，每十倍 20 桶，相邻边界相差约 12%），内存占用与 K 线数无关。p50 / p95 / p99 由直方图估计。
+flush 把上次 flush 以来的窗口统计按行追加到 JSON Lines 文件，便于做趋势分析。
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .long_horizon import timeframe_to_timedelta
+
+# 阶段（按发生顺序）
+STAGES = ("arrival", "analysis", "freqai", "indicators", "signal")
+
+# 相邻阶段之间的耗时：名称 -> (起始阶段, 结束阶段)
+DURATIONS = {
+    "queue": ("arrival", "analysis"),
+    "freqai_s": ("analysis", "freqai"),
+    "indicators_s": ("freqai", "indicators"),
+    "entry_s": ("indicators", "signal"),
+}
+
+METRICS = (*STAGES, *DURATIONS)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 分桶边界（秒）：1ms ~ 10min，每十倍 20 桶
+DEFAULT_BIN_EDGES = np.round(10.0 ** np.arange(-3.0, 2.8 + 1e-9, 0.05), 9)
+
+# 汇总表列
+SUMMARY_COLUMNS = ("pair", "metric", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+class LatencyHistogram:
+    """对数分桶直方图
+
+    第 0 桶为 [0, edges[0]]，第 i 桶为 (edges[i-1], edges[i]]，最后一桶为 (edges[-1], inf)。
+    """
+
+    def __init__(self, bin_edges: np.ndarray):
+        self.bin_edges = bin_edges
+        self.counts = np.zeros(len(bin_edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """加入一个样本（负值按 0 计，如时钟误差）"""
+        seconds = max(seconds, 0.0)
+        self.counts[int(np.searchsorted(self.bin_edges, seconds))] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """分位数估计（桶内按对数插值；两端的桶取边界与最大值）"""
+        if not self.count:
+            return math.nan
+        target = q * self.count
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, target))
+        if i == 0:
+            return float(min(self.bin_edges[0], self.max))
+        if i >= len(self.bin_edges):
+            return self.max
+        lower, upper = self.bin_edges[i - 1], self.bin_edges[i]
+        fraction = (target - cumulative[i - 1]) / self.counts[i]
+        return float(min(lower * (upper / lower) ** fraction, self.max))
+
+    def stats(self) -> dict[str, float]:
+        """count、mean、p50 / p95 / p99、max（秒）"""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else math.nan,
+            **{f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES},
+            "max": self.max if self.count else math.nan,
+        }
+
+
+class SignalLatencyTracker:
+    """按交易对记录 K 线收盘到入场信号各阶段的延迟"""
+
+    def __init__(
+        self,
+        timeframe: str = "1m",
+        bin_edges: np.ndarray = DEFAULT_BIN_EDGES,
+        clock: Callable[[], float] = time.time,
+    ):
+        """初始化埋点
+
+        Args:
+            timeframe: K 线时间框架（收盘时刻 = 开盘时间 + 时间框架）
+            bin_edges: 直方图分桶边界（秒，升序且为正）
+            clock: 墙钟（Unix 秒）
+        """
+        bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        if not len(bin_edges) or bin_edges[0] <= 0 or np.any(np.diff(bin_edges) <= 0):
+            msg = "bin_edges 必须为正且严格升序"
+            raise ValueError(msg)
+
+        self.timeframe = timeframe
+        self.bin_edges = bin_edges
+        self._step: float = timeframe_to_timedelta(timeframe).total_seconds()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: dict[str, tuple[Any, dict[str, float]]] = {}
+        self._totals: dict[tuple[str, str], LatencyHistogram] = {}
+        self._window: dict[tuple[str, str], LatencyHistogram] = {}
+        self._window_start = clock()
+
+    def candle_close(self, candle_open: Any) -> float:
+        """K 线收盘时刻（Unix 秒；无时区的时间按 UTC 处理）"""
+        timestamp = pd.Timestamp(candle_open)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize("UTC")
+        return float(timestamp.timestamp()) + self._step
+
+    def _add(self, pair: str, metric: str, seconds: float) -> None:
+        for histograms in (self._totals, self._window):
+            histogram = histograms.get((pair, metric))
+            if histogram is None:
+                histogram = histograms[(pair, metric)] = LatencyHistogram(self.bin_edges)
+            histogram.add(seconds)
+
+    def mark(self, pair: str, stage: str, candle_open: Any, at: float | None = None) -> float:
+        """记录一根 K 线到达某个阶段
+
+        同一交易对换到新 K 线时，上一根 K 线未完成的阶段直接丢弃；同一阶段重复记录时只保留第一次。
+
+        Args:
+            pair: 交易对
+            stage: 阶段（见 STAGES）
+            candle_open: 最后一根已收盘 K 线的开盘时间
+            at: 发生时刻（Unix 秒，默认当前时间）
+
+        Returns:
+            相对 K 线收盘的延迟（秒）
+        """
+        if stage not in STAGES:
+            msg = f"未知阶段: {stage}"
+            raise ValueError(msg)
+        at = self._clock() if at is None else at
+        latency = at - self.candle_close(candle_open)
+
+        with self._lock:
+            pending = self._pending.get(pair)
+            if pending is None or pending[0] != candle_open:
+                pending = self._pending[pair] = (candle_open, {})
+            marks = pending[1]
+            if stage in marks:
+                return marks[stage]
+            marks[stage] = latency
+            self._add(pair, stage, latency)
+            for metric, (start, end) in DURATIONS.items():
+                if stage in (start, end) and start in marks and end in marks:
+                    self._add(pair, metric, marks[end] - marks[start])
+        return latency
+
+    def summary(self, pair: str | None = None) -> pd.DataFrame:
+        """累计统计（毫秒），列见 SUMMARY_COLUMNS
+
+        Args:
+            pair: 交易对（None 表示全部）
+        """
+        with self._lock:
+            rows: list[dict[str, Any]] = [
+                {"pair": name, "metric": metric, **self._row(histogram)}
+                for (name, metric), histogram in self._totals.items()
+                if pair is None or name == pair
+            ]
+        order = {metric: i for i, metric in enumerate(METRICS)}
+        rows.sort(key=lambda row: (row["pair"], order[row["metric"]]))
+        return pd.DataFrame(rows, columns=list(SUMMARY_COLUMNS))
+
+    @staticmethod
+    def _row(histogram: LatencyHistogram) -> dict[str, float]:
+        stats = histogram.stats()
+        return {"count": stats.pop("count"), **{f"{name}_ms": value * 1000 for name, value in stats.items()}}
+
+    def summary_table(self, pair: str | None = None) -> str:
+        """汇总表文本"""
+        table = self.summary(pair)
+        if table.empty:
+            return "(无记录)"
+        return str(table.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+
+    def flush(self, path: str | Path) -> int:
+        """把上次 flush 以来的窗口统计追加到 JSON Lines 文件并开始新窗口
+
+        每行一个 (交易对, 指标)：window_start、window_end（Unix 秒）、pair、metric、count、mean、p50、p95、p99、max（秒）
+
+        Args:
+            path: 输出路径
+
+        Returns:
+            写入的行数
+        """
+        with self._lock:
+            window, self._window = self._window, {}
+            start, end = self._window_start, self._clock()
+            self._window_start = end
+        if not window:
+            return 0
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for (pair, metric), histogram in window.items():
+                line = {"window_start": start, "window_end": end, "pair": pair, "metric": metric, **histogram.stats()}
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        return len(window)
@@ -0,0 +1,196 @@
+"""多分辨率长周期趋势
+
+1 天趋势（原 close.shift(1440)）和 30 天趋势（原 close.shift(43200)）只需要一个基准价格，
+没有必要为此在 1 分钟 DataFrame 上保留 30 天以上的历史。这里从紧凑的 1h / 1d 序列取基准价格，
+按时间戳对齐回 1 分钟索引：
+
+    trend(t) = close_1m(t) / close_compact(t - horizon) - 1
+
+分子仍是当前 1 分钟收盘价；分母是 (t - horizon) 时刻已经收盘的最近一根紧凑 K 线。
+对齐规则与 freqtrade merge_informative_pair 一致：高周期 K 线在其收盘时刻之后才可用，不会引入未来数据。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+TREND_HORIZON = pd.Timedelta(days=1)
+TREND_30D_HORIZON = pd.Timedelta(days=30)
+
+_TIMEFRAME_UNITS = {"m": "min", "h": "h", "d": "D", "w": "W"}
+
+
+def timeframe_to_timedelta(timeframe: str) -> pd.Timedelta:
+    """把 freqtrade 时间框架字符串转换为 Timedelta
+
+    Args:
+        timeframe: 如 '1m'、'1h'、'1d'
+
+    Returns:
+        对应的时间长度
+    """
+    unit = timeframe[-1:]
+    if unit not in _TIMEFRAME_UNITS or not timeframe[:-1].isdigit():
+        msg = f"不支持的时间框架: {timeframe}"
+        raise ValueError(msg)
+    return pd.Timedelta(int(timeframe[:-1]), unit=_TIMEFRAME_UNITS[unit])
+
+
+def _to_ns(dates: pd.Series | pd.DatetimeIndex) -> np.ndarray:
+    """时间戳 -> int64 纳秒（统一精度，便于二分查找）"""
+    return np.asarray(pd.DatetimeIndex(dates).as_unit("ns").asi8)
+
+
+def resample_ohlcv(dataframe: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """把 OHLCV 重采样到更高时间框架（K 线以开盘时间标记）
+
+    Args:
+        dataframe: 含 date 列的 OHLCV 数据框
+        timeframe: 目标时间框架
+
+    Returns:
+        重采样后的数据框（含 date 列）
+    """
+    rule = timeframe_to_timedelta(timeframe)
+    resampled = (
+        dataframe.set_index("date")
+        .resample(rule, label="left", closed="left")
+        .agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+        .dropna(subset=["close"])
+        .reset_index()
+    )
+    return resampled
+
+
+def aligned_reference_close(
+    dates: pd.Series,
+    compact: pd.DataFrame,
+    compact_timeframe: str,
+    horizon: pd.Timedelta,
+    base_timeframe: str = "1m",
+) -> np.ndarray:
+    """取每个基础 K 线在 (t - horizon) 时刻已收盘的紧凑 K 线收盘价
+
+    Args:
+        dates: 基础 K 线开盘时间
+        compact: 紧凑序列（含 date、close 列，按时间升序）
+        compact_timeframe: 紧凑序列时间框架
+        horizon: 回看时长
+        base_timeframe: 基础时间框架
+
+    Returns:
+        与 dates 等长的基准收盘价（无可用数据时为 NaN）
+    """
+    compact_delta = timeframe_to_timedelta(compact_timeframe)
+    # 基础 K 线在收盘时刻已知；紧凑 K 线在收盘时刻可用
+    reference_time = _to_ns(dates) + timeframe_to_timedelta(base_timeframe).value - horizon.value
+    ready_time = _to_ns(compact["date"]) + compact_delta.value
+    compact_close = compact["close"].to_numpy(dtype=np.float64)
+
+    index = np.searchsorted(ready_time, reference_time, side="right") - 1
+    found = index >= 0
+    reference = np.full(len(reference_time), np.nan)
+    reference[found] = compact_close[index[found]]
+
+    # 紧凑序列断档时不沿用过旧的基准价格
+    stale = np.zeros(len(reference_time), dtype=bool)
+    stale[found] = ready_time[index[found]] < reference_time[found] - compact_delta.value
+    reference[stale] = np.nan
+    return reference
+
+
+class LongHorizonTrendProvider:
+    """长周期趋势提供器
+
+    默认用 1h 序列计算 1 天趋势、1d 序列计算 30 天趋势。提供的紧凑序列优先，
+    其未覆盖的时间段用基础 DataFrame 重采样补齐（如 FreqAI 训练窗口早于实盘缓存的 1h 数据）。
+    """
+
+    def __init__(
+        self,
+        base_timeframe: str = "1m",
+        trend_timeframe: str = "1h",
+        trend_30d_timeframe: str = "1d",
+    ):
+        """初始化提供器
+
+        Args:
+            base_timeframe: 策略主时间框架
+            trend_timeframe: 1 天趋势使用的紧凑时间框架
+            trend_30d_timeframe: 30 天趋势使用的紧凑时间框架
+        """
+        self.base_timeframe = base_timeframe
+        self.trend_timeframe = trend_timeframe
+        self.trend_30d_timeframe = trend_30d_timeframe
+
+    @property
+    def informative_timeframes(self) -> list[str]:
+        """需要的紧凑时间框架（供 informative_pairs 使用）"""
+        return sorted({self.trend_timeframe, self.trend_30d_timeframe}, key=timeframe_to_timedelta)
+
+    @property
+    def max_horizon(self) -> pd.Timedelta:
+        """紧凑序列需要覆盖到基础 K 线之前的最长时长（回看时长 + 一根紧凑 K 线）"""
+        return max(
+            TREND_HORIZON + timeframe_to_timedelta(self.trend_timeframe),
+            TREND_30D_HORIZON + timeframe_to_timedelta(self.trend_30d_timeframe),
+        )
+
+    def compact_series(
+        self,
+        dataframe: pd.DataFrame,
+        timeframe: str,
+        provided: pd.DataFrame | None = None,
+    ) -> pd.DataFrame:
+        """获取紧凑序列（提供的数据优先，缺失部分由基础数据重采样补齐）
+
+        Args:
+            dataframe: 基础时间框架 OHLCV
+            timeframe: 紧凑时间框架
+            provided: 外部提供的紧凑序列
+
+        Returns:
+            按时间升序的紧凑序列（含 date、close 列）
+        """
+        if provided is not None and provided.empty:
+            provided = None
+        if provided is not None and dataframe["date"].iloc[0] >= provided["date"].iloc[0]:
+            return provided
+
+        resampled = resample_ohlcv(dataframe[["date", "open", "high", "low", "close", "volume"]], timeframe)
+        if provided is None:
+            return resampled
+        head = resampled[resampled["date"] < provided["date"].iloc[0]]
+        return pd.concat([head[["date", "close"]], provided[["date", "close"]]], ignore_index=True)
+
+    def compute(
+        self,
+        dataframe: pd.DataFrame,
+        compact_frames: dict[str, pd.DataFrame] | None = None,
+        start: int = 0,
+    ) -> dict[str, np.ndarray]:
+        """计算对齐到基础索引的长周期趋势
+
+        Args:
+            dataframe: 基础时间框架 OHLCV（含 date、close 列）
+            compact_frames: 时间框架 -> 紧凑 OHLCV（缺失的时间框架从 dataframe 重采样）
+            start: 只计算第 start 行起的趋势（流式引擎只需要新收盘的行）
+
+        Returns:
+            {'trend': ..., 'trend_30d': ...}，长度为 len(dataframe) - start
+        """
+        compact_frames = compact_frames or {}
+        close = dataframe["close"].to_numpy(dtype=np.float64)[start:]
+        dates = dataframe["date"].iloc[start:]
+
+        result = {}
+        for name, timeframe, horizon in (
+            ("trend", self.trend_timeframe, TREND_HORIZON),
+            ("trend_30d", self.trend_30d_timeframe, TREND_30D_HORIZON),
+        ):
+            compact = self.compact_series(dataframe, timeframe, compact_frames.get(timeframe))
+            reference = aligned_reference_close(dates, compact, timeframe, horizon, self.base_timeframe)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[name] = (close - reference) / reference
+        return result
@@ -0,0 +1,290 @@
+"""可扩展的训练集离群点过滤
+
+FreqAI 的 use_SVM_to_remove_outliers 在每次重训时用 SGDOneClassSVM 拟合全部训练行，include_timeframes 与
+include_shifted_candles 展开后（数十万行 × 数百列）这一步是重训耗时的主要部分之一。这里提供同样接口、
+拟合代价与行数基本无关的替代方法：
+
+- robust: 子样本上的中位数 / MAD 标准化，按各列稳健 z 分数的均方根打分（O(行 × 列)）
+- mahalanobis: 子样本上估计均值与协方差（加岭），按马氏距离打分
+- isolation: 子样本上训练的孤立森林（纯 numpy，每棵树 256 行），按平均路径长度打分
+
+阈值取训练行分数的 1 - nu 分位数（与 SVM 的 nu 含义相同：训练集中约 nu 的行被判为离群），
+分数 > 阈值的行为离群点。
+
+OutlierFilter 按 datasieve 变换的接口实现（fit / transform 接受并返回 X, y, sample_weight, feature_list）：
+训练时删除离群行；预测时（outlier_check=True）不删行，y 返回保留掩码（1 保留 / 0 离群），与 SVMOutlierExtractor 一致。
+FreqAI 在训练集上调用 fit_transform 后，还会对测试集调用 transform：两者的删除行数分开记录。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+OUTLIER_METHODS = ("robust", "mahalanobis", "isolation")
+
+# 默认离群比例（与 config 中 svm_params.nu 一致）
+DEFAULT_NU = 0.1
+
+# 拟合所用子样本的行数上限
+DEFAULT_MAX_FIT_ROWS = 20000
+
+# 孤立森林每棵树的子样本行数
+ISOLATION_SAMPLES = 256
+
+# 打分时每块的行数
+DEFAULT_CHUNK_ROWS = 65536
+
+# 孤立森林逐层遍历时每块的行数（工作集留在缓存内）
+ISOLATION_CHUNK_ROWS = 8192
+
+# MAD 与正态分布标准差的换算系数
+MAD_SCALE = 1.4826
+
+EULER_GAMMA = 0.5772156649015329
+
+
+def _average_path(n: np.ndarray | float) -> np.ndarray:
+    """n 行的二叉搜索树中不成功查找的平均路径长度（孤立森林的归一化常数）"""
+    n = np.asarray(n, dtype=np.float64)
+    safe = np.maximum(n, 2.0)
+    path = 2.0 * (np.log(safe - 1.0) + EULER_GAMMA) - 2.0 * (safe - 1.0) / safe
+    return np.where(n > 2, path, np.where(n == 2, 1.0, 0.0))
+
+
+def _take(values: Any, mask: np.ndarray) -> Any:
+    """按布尔掩码取行（保持 DataFrame / Series / ndarray 类型）"""
+    if values is None:
+        return None
+    if isinstance(values, (pd.DataFrame, pd.Series)):
+        return values.iloc[mask]
+    return np.asarray(values)[mask]
+
+
+class _IsolationTree:
+    """数组形式的孤立树（叶子的两个子节点都指向自身，按层遍历时停在叶子上）"""
+
+    def __init__(self, sample: np.ndarray, rng: np.random.Generator, max_depth: int):
+        self._feature: list[int] = []
+        self._threshold: list[float] = []
+        self._children: list[list[int]] = []
+        self._path: list[float] = []
+        self._grow(sample, rng, 0, max_depth)
+        self.feature = np.array(self._feature, dtype=np.intp)
+        self.threshold = np.array(self._threshold, dtype=np.float64)
+        self.children = np.array(self._children, dtype=np.intp).ravel()
+        self.path = np.array(self._path, dtype=np.float64)
+        del self._feature, self._threshold, self._children, self._path
+
+    def _grow(self, sample: np.ndarray, rng: np.random.Generator, depth: int, max_depth: int) -> int:
+        node = len(self._feature)
+        self._feature.append(0)
+        self._threshold.append(0.0)
+        self._children.append([node, node])
+        # 叶子的路径长度 = 深度 + 落在叶子上的子样本行数对应的平均路径
+        self._path.append(depth + float(_average_path(len(sample))))
+        if depth >= max_depth or len(sample) <= 1:
+            return node
+
+        low, high = sample.min(axis=0), sample.max(axis=0)
+        splittable = np.flatnonzero(high > low)
+        if not len(splittable):
+            return node
+        feature = int(rng.choice(splittable))
+        threshold = float(rng.uniform(low[feature], high[feature]))
+        goes_left = sample[:, feature] < threshold
+        self._feature[node] = feature
+        self._threshold[node] = threshold
+        right = self._grow(sample[~goes_left], rng, depth + 1, max_depth)
+        left = self._grow(sample[goes_left], rng, depth + 1, max_depth)
+        self._children[node] = [right, left]
+        return node
+
+    def path_length(self, flat: np.ndarray, offsets: np.ndarray, max_depth: int) -> np.ndarray:
+        """各行的路径长度
+
+        Args:
+            flat: C 连续特征块展平后的一维数组
+            offsets: 各行在 flat 中的起始下标
+            max_depth: 树的最大深度
+        """
+        node = np.zeros(len(offsets), dtype=np.intp)
+        for _ in range(max_depth):
+            node = self.children[2 * node + (flat[offsets + self.feature[node]] < self.threshold[node])]
+        return self.path[node]
+
+
+class OutlierFilter:
+    """FreqAI 特征管道中的离群点过滤步骤（datasieve 变换接口，可替换 SVM 步骤）"""
+
+    def __init__(
+        self,
+        method: str = "robust",
+        nu: float = DEFAULT_NU,
+        max_fit_rows: int = DEFAULT_MAX_FIT_ROWS,
+        n_estimators: int = 100,
+        ridge: float = 1e-6,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        random_state: int | None = 0,
+    ):
+        """初始化过滤步骤
+
+        Args:
+            method: 打分方法（robust / mahalanobis / isolation）
+            nu: 训练集中判为离群的比例（0, 1)
+            max_fit_rows: 估计统计量 / 训练树所用子样本的行数上限
+            n_estimators: 孤立森林的树数
+            ridge: 马氏距离协方差的岭系数（相对于对角线均值）
+            chunk_rows: 打分时每块的行数
+            random_state: 子样本与孤立森林的随机种子
+        """
+        if method not in OUTLIER_METHODS:
+            msg = f"未知的离群点方法 {method!r}，可选 {OUTLIER_METHODS}"
+            raise ValueError(msg)
+        if not 0.0 < nu < 1.0:
+            msg = f"nu 必须在 (0, 1) 内，实际 {nu}"
+            raise ValueError(msg)
+        if max_fit_rows < 2 or n_estimators < 1:
+            msg = f"max_fit_rows 必须 >= 2、n_estimators 必须 >= 1，实际 {max_fit_rows}、{n_estimators}"
+            raise ValueError(msg)
+
+        self.method = method
+        self.nu = nu
+        self.max_fit_rows = max_fit_rows
+        self.n_estimators = n_estimators
+        self.ridge = ridge
+        self.chunk_rows = chunk_rows
+        self.random_state = random_state
+        self.threshold: float | None = None
+        self.n_fit_rows = 0
+        self.fit_seconds = 0.0
+        self.n_rows = 0
+        self.n_dropped = 0
+        self.n_test_rows = 0
+        self.n_test_dropped = 0
+        self._center: np.ndarray | None = None
+        self._scale: np.ndarray | None = None
+        self._precision: np.ndarray | None = None
+        self._trees: list[_IsolationTree] = []
+        self._max_depth = 0
+        self._normalizer = 1.0
+        self._fitted = False
+
+    def _score_chunk(self, x: np.ndarray) -> np.ndarray:
+        if self.method == "isolation":
+            path = np.zeros(len(x))
+            for start in range(0, len(x), ISOLATION_CHUNK_ROWS):
+                block = np.ascontiguousarray(x[start:start + ISOLATION_CHUNK_ROWS])
+                flat, offsets = block.ravel(), np.arange(len(block)) * block.shape[1]
+                for tree in self._trees:
+                    path[start:start + len(block)] += tree.path_length(flat, offsets, self._max_depth)
+            return 2.0 ** (-path / len(self._trees) / self._normalizer)
+        centered = x - self._center
+        if self.method == "robust":
+            squared = np.mean((centered / self._scale) ** 2, axis=1)
+        else:
+            squared = np.maximum(((centered @ self._precision) * centered).sum(axis=1), 0.0) / x.shape[1]
+        scores: np.ndarray = np.sqrt(squared)
+        return scores
+
+    def score(self, x) -> np.ndarray:
+        """离群分数（越大越离群；含 NaN / inf 的行为 inf）"""
+        if not self._fitted:
+            msg = "OutlierFilter 尚未 fit"
+            raise ValueError(msg)
+        x = np.asarray(x, dtype=np.float64)
+        scores = np.empty(len(x))
+        for start in range(0, len(x), self.chunk_rows):
+            scores[start:start + self.chunk_rows] = self._score_chunk(x[start:start + self.chunk_rows])
+        scores[~(np.isfinite(scores) & np.isfinite(x).all(axis=1))] = np.inf
+        return scores
+
+    def _fit_model(self, sample: np.ndarray, rng: np.random.Generator) -> None:
+        if self.method == "robust":
+            self._center = np.median(sample, axis=0)
+            scale = np.median(np.abs(sample - self._center), axis=0) * MAD_SCALE
+            # MAD 为 0（大部分值相同）的列退回标准差，仍为 0 的常数列不参与打分
+            scale = np.where(scale > 0, scale, sample.std(axis=0))
+            self._scale = np.where(scale > 0, scale, np.inf)
+        elif self.method == "mahalanobis":
+            self._center = sample.mean(axis=0)
+            covariance = np.atleast_2d(np.cov(sample, rowvar=False))
+            jitter = self.ridge * max(float(np.mean(np.diag(covariance))), 1e-12)
+            self._precision = np.linalg.pinv(covariance + jitter * np.eye(len(covariance)), hermitian=True)
+        else:
+            samples = min(ISOLATION_SAMPLES, len(sample))
+            self._max_depth = int(np.ceil(np.log2(max(samples, 2))))
+            self._normalizer = float(_average_path(samples))
+            self._trees = [
+                _IsolationTree(sample[rng.choice(len(sample), samples, replace=False)], rng, self._max_depth)
+                for _ in range(self.n_estimators)
+            ]
+
+    def _fit(self, x) -> np.ndarray:
+        """拟合并返回全部训练行的分数"""
+        start = time.perf_counter()
+        values = np.asarray(x, dtype=np.float64)
+        finite = np.flatnonzero(np.isfinite(values).all(axis=1))
+        if len(finite) < 2:
+            msg = f"有限值行数 {len(finite)} 不足以拟合离群点模型"
+            raise ValueError(msg)
+
+        rng = np.random.default_rng(self.random_state)
+        if len(finite) > self.max_fit_rows:
+            finite = np.sort(rng.choice(finite, self.max_fit_rows, replace=False))
+        self.n_fit_rows = len(finite)
+        self.n_test_rows = self.n_test_dropped = 0
+        self._fit_model(values[finite], rng)
+        self._fitted = True
+
+        scores = self.score(values)
+        self.threshold = float(np.quantile(scores[np.isfinite(scores)], 1.0 - self.nu))
+        self.fit_seconds = time.perf_counter() - start
+        return scores
+
+    def fit(self, x, y=None, sample_weight=None, feature_list=None, **kwargs):
+        """在训练集的子样本上拟合打分模型，并以全部训练行的分数确定阈值"""
+        self._fit(x)
+        return x, y, sample_weight, feature_list
+
+    def keep_mask(self, x) -> np.ndarray:
+        """保留行的布尔掩码（分数 <= 阈值）"""
+        return self.score(x) <= self.threshold
+
+    def transform(self, x, y=None, sample_weight=None, feature_list=None, outlier_check=False, **kwargs):
+        """删除离群行（计入测试集行数）；outlier_check=True 时不删行，y 返回保留掩码（1 / 0）"""
+        keep = self.keep_mask(x)
+        if outlier_check:
+            return x, keep.astype(np.int64), None, feature_list
+        self.n_test_rows = len(keep)
+        self.n_test_dropped = int((~keep).sum())
+        return _take(x, keep), _take(y, keep), _take(sample_weight, keep), feature_list
+
+    def fit_transform(self, x, y=None, sample_weight=None, feature_list=None, **kwargs):
+        """fit 后删除训练集中的离群行（复用 fit 时的分数，不再重新打分；计入训练集行数）"""
+        keep = self._fit(x) <= self.threshold
+        self.n_rows = len(keep)
+        self.n_dropped = int((~keep).sum())
+        return _take(x, keep), _take(y, keep), _take(sample_weight, keep), feature_list
+
+    def inverse_transform(self, x, y=None, sample_weight=None, feature_list=None, **kwargs):
+        """删行不可逆，原样返回"""
+        return x, y, sample_weight, feature_list
+
+    def summary(self) -> dict[str, Any]:
+        """最近一次训练的过滤结果（可 JSON 序列化；n_* 为训练集，n_test_* 为之后 transform 的测试集）"""
+        return {
+            "method": self.method,
+            "nu": self.nu,
+            "threshold": self.threshold,
+            "n_fit_rows": self.n_fit_rows,
+            "fit_seconds": round(self.fit_seconds, 4),
+            "n_rows": self.n_rows,
+            "n_kept": self.n_rows - self.n_dropped,
+            "n_dropped": self.n_dropped,
+            "n_test_rows": self.n_test_rows,
+            "n_test_dropped": self.n_test_dropped,
+        }
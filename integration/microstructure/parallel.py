@@ -0,0 +1,338 @@
+"""交易对并行特征计算
+
+白名单扩展到几十个永续合约后，bot 循环里逐个交易对串行计算特征会拖过下一根 K 线。这里在每轮循环开始时
+把各交易对的特征块（共享中间量 + 特征矩阵）分发到进程池：
+
+- 输入的 OHLCV（以及可选的逐笔订单流）按列打包进一块共享内存，子进程直接映射为 numpy 数组，
+  不经 pickle / 管道传输整列数据
+- 子进程把中间量与特征矩阵写入主进程预先分配的输出共享内存，管道上只返回耗时
+- 主进程按完成顺序收集结果，复制出共享内存后立即释放
+- 设置了耗时预算时，到期仍未完成的交易对被放弃（不在结果中，由调用方回退到串行路径）：
+  取消排队中的任务，终止仍在运行的子进程（下一轮重建进程池），释放它们的共享内存
+
+子进程中的计算与串行路径（compute_intermediates + compute_feature_matrix）相同，结果逐位一致。
+每轮记录每个交易对的排队、计算与总耗时（见 latency / latency_table）。
+
+进程池在第一次 compute 时创建并常驻（默认 spawn，避免在带后台线程的 bot 进程里 fork），
+第一轮包含子进程启动与导入的耗时。
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .features import INTERMEDIATE_NAMES, compute_intermediates
+from .kernel import FEATURE_COLUMNS, compute_feature_matrix
+from .resample import OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 延迟表列
+LATENCY_COLUMNS = ("pair", "rows", "queue_ms", "compute_ms", "total_ms", "pid", "late", "error")
+
+# 共享内存中每个数组的起始偏移按缓存行对齐
+_ALIGN = 64
+
+# (名称, dtype 字符串, 形状, 字节偏移)
+_Layout = list[tuple[str, str, tuple[int, ...], int]]
+
+
+def _layout(specs: list[tuple[str, Any, tuple[int, ...]]]) -> tuple[_Layout, int]:
+    """计算数组在一块共享内存中的排布，返回 (排布, 总字节数)"""
+    layout = []
+    offset = 0
+    for name, dtype, shape in specs:
+        dtype = np.dtype(dtype)
+        layout.append((name, dtype.str, shape, offset))
+        size = dtype.itemsize * int(np.prod(shape))
+        offset += -(-size // _ALIGN) * _ALIGN
+    return layout, max(offset, 1)
+
+
+def _views(shm: shared_memory.SharedMemory, layout: _Layout) -> dict[str, np.ndarray]:
+    """共享内存上的数组视图（二维数组为列优先）"""
+    return {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset, order="F")
+        for name, dtype, shape, offset in layout
+    }
+
+
+def _fill(shm: shared_memory.SharedMemory, layout: _Layout, arrays: dict[str, np.ndarray]) -> None:
+    """把数组写入共享内存（返回后不再持有任何视图，共享内存可以关闭）"""
+    for name, view in _views(shm, layout).items():
+        view[...] = arrays[name]
+
+
+def _release(shm: shared_memory.SharedMemory | None) -> None:
+    if shm is None:
+        return
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _compute_pair(
+    inputs: dict[str, np.ndarray],
+    outputs: dict[str, np.ndarray],
+    tz: str | None,
+    kwargs: dict[str, Any],
+) -> None:
+    """在共享内存视图上计算一个交易对的中间量与特征矩阵（子进程）"""
+    dates = pd.to_datetime(inputs["date"], unit="ns", utc=tz is not None)
+    if tz is not None:
+        dates = dates.tz_convert(tz)
+    dataframe = pd.DataFrame({"date": dates, **{column: inputs[column] for column in OHLCV_COLUMNS}}, copy=True)
+    flow = {name[5:]: values.copy() for name, values in inputs.items() if name.startswith("flow:")}
+
+    intermediates = compute_intermediates(dataframe, order_flow=flow or None, **kwargs)
+    for name in INTERMEDIATE_NAMES:
+        outputs[name][...] = intermediates[name]
+    compute_feature_matrix(
+        inputs["high"], inputs["low"], inputs["close"], inputs["volume"], intermediates, out=outputs["matrix"]
+    )
+
+
+def _run_task(task: dict[str, Any]) -> dict[str, Any]:
+    """子进程入口：映射输入 / 输出共享内存并计算（只返回耗时）"""
+    started = time.time()
+    clock = time.perf_counter()
+    source = shared_memory.SharedMemory(name=task["input"])
+    target = shared_memory.SharedMemory(name=task["output"])
+    error = None
+    try:
+        _compute_pair(_views(source, task["input_layout"]), _views(target, task["output_layout"]),
+                      task["tz"], task["kwargs"])
+    except Exception as exc:  # noqa: BLE001  异常对象持有的栈帧引用着共享内存视图，先转成文本再关闭
+        error = f"{type(exc).__name__}: {exc}"
+    source.close()
+    target.close()
+    if error is not None:
+        raise RuntimeError(error)
+    return {"started": started, "compute": time.perf_counter() - clock, "pid": os.getpid()}
+
+
+def _copy_results(target: shared_memory.SharedMemory, layout: _Layout) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """把结果复制出共享内存（返回后不再持有任何视图）"""
+    views = _views(target, layout)
+    matrix = np.array(views.pop("matrix"), order="F")
+    return {name: values.copy() for name, values in views.items()}, matrix
+
+
+class ParallelFeatureComputer:
+    """按交易对并行计算特征块（进程池 + 共享内存）"""
+
+    def __init__(self, workers: int | None = None, start_method: str = "spawn", budget: float | None = None):
+        """初始化计算器
+
+        Args:
+            workers: 子进程数（None 为 CPU 核数）
+            start_method: multiprocessing 启动方式（spawn / forkserver / fork）
+            budget: 每轮的耗时预算（秒），到期仍未完成的交易对被放弃，在延迟表中标记为 late
+        """
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        if workers < 1:
+            msg = f"workers 必须 >= 1，实际 {workers}"
+            raise ValueError(msg)
+        if start_method not in multiprocessing.get_all_start_methods():
+            msg = f"不支持的启动方式: {start_method}"
+            raise ValueError(msg)
+
+        self.workers = workers
+        self.start_method = start_method
+        self.budget = budget
+        self.latency: dict[str, dict[str, Any]] = {}
+        self.last_round = 0.0
+        self.rounds = 0
+        self.pairs_computed = 0
+        self.errors = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _abandon(self, futures: set[Any]) -> None:
+        """放弃超时的任务：取消排队中的任务；有任务仍在运行时终止进程池的子进程，下一轮重建"""
+        running = [future for future in futures if not future.cancel()]
+        if not running or self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        # ProcessPoolExecutor 没有公开的终止接口，卡住的子进程不会自行退出
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=5)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method)
+            )
+        return self._executor
+
+    def compute(
+        self,
+        frames: dict[str, pd.DataFrame],
+        compute_kwargs: dict[str, dict[str, Any]] | None = None,
+        dtype: Any = np.float64,
+    ) -> dict[str, tuple[dict[str, np.ndarray], np.ndarray]]:
+        """并行计算各交易对的中间量与特征矩阵
+
+        Args:
+            frames: 交易对 -> 含 date 列的 OHLCV 数据框
+            compute_kwargs: 交易对 -> 传给 compute_intermediates 的额外参数
+                （trend_provider、compact_frames、order_flow、vpin_bucket_volume 等；order_flow 经共享内存传递）
+            dtype: 特征矩阵数据类型
+
+        Returns:
+            交易对 -> (中间量字典, 特征矩阵)；计算失败的交易对不在结果中（见 latency 中的 error）
+        """
+        compute_kwargs = compute_kwargs or {}
+        dtype = np.dtype(dtype)
+        round_start = time.perf_counter()
+        jobs: dict[Any, tuple[str, int, float]] = {}
+        buffers: dict[str, tuple[shared_memory.SharedMemory, shared_memory.SharedMemory, _Layout]] = {}
+        results: dict[str, tuple[dict[str, np.ndarray], np.ndarray]] = {}
+        latency: dict[str, dict[str, Any]] = {}
+        try:
+            pool = self._pool()
+            for pair, dataframe in frames.items():
+                kwargs = dict(compute_kwargs.get(pair, {}))
+                order_flow = kwargs.pop("order_flow", None) or {}
+                n = len(dataframe)
+                arrays = {
+                    "date": pd.DatetimeIndex(dataframe["date"]).as_unit("ns").asi8,
+                    **{column: dataframe[column].to_numpy(dtype=np.float64) for column in OHLCV_COLUMNS},
+                    **{f"flow:{name}": np.asarray(values, dtype=np.float64) for name, values in order_flow.items()},
+                }
+                input_layout, input_size = _layout([(name, value.dtype, value.shape) for name, value in arrays.items()])
+                output_layout, output_size = _layout([
+                    ("matrix", dtype, (n, len(FEATURE_COLUMNS))),
+                    *((name, np.int64 if name == "regime_state" else np.float64, (n,)) for name in INTERMEDIATE_NAMES),
+                ])
+
+                source = shared_memory.SharedMemory(create=True, size=input_size)
+                try:
+                    target = shared_memory.SharedMemory(create=True, size=output_size)
+                except Exception:
+                    _release(source)
+                    raise
+                buffers[pair] = (source, target, output_layout)
+                _fill(source, input_layout, arrays)
+
+                task = {
+                    "input": source.name,
+                    "input_layout": input_layout,
+                    "output": target.name,
+                    "output_layout": output_layout,
+                    "tz": str(dataframe["date"].dt.tz) if getattr(dataframe["date"].dt, "tz", None) else None,
+                    "kwargs": kwargs,
+                }
+                jobs[pool.submit(_run_task, task)] = (pair, n, time.time())
+
+            pending = set(jobs)
+            timeout = None if self.budget is None else max(round_start + self.budget - time.perf_counter(), 0.0)
+            try:
+                for future in as_completed(jobs, timeout=timeout):
+                    pending.discard(future)
+                    self._collect(future, jobs[future], buffers, results, latency)
+            except TimeoutError:
+                self._abandon(pending)
+                for future in pending:
+                    pair, n, submitted = jobs[future]
+                    self.errors += 1
+                    latency[pair] = {"rows": n, "queue_ms": None, "compute_ms": None,
+                                     "total_ms": (time.time() - submitted) * 1000, "pid": None, "late": True,
+                                     "error": f"超出耗时预算 {self.budget}s"}
+                    logger.warning("并行特征计算超时 - %s: 超出耗时预算 %ss，改走串行路径", pair, self.budget)
+        finally:
+            for source, target, _ in buffers.values():
+                _release(source)
+                _release(target)
+
+        self.latency = {pair: latency[pair] for pair in frames if pair in latency}
+        self.last_round = time.perf_counter() - round_start
+        self.rounds += 1
+        self.pairs_computed += len(results)
+        return results
+
+    def _collect(
+        self,
+        future: Any,
+        job: tuple[str, int, float],
+        buffers: dict[str, tuple[shared_memory.SharedMemory, shared_memory.SharedMemory, _Layout]],
+        results: dict[str, tuple[dict[str, np.ndarray], np.ndarray]],
+        latency: dict[str, dict[str, Any]],
+    ) -> None:
+        """收集一个已完成任务的结果与延迟记录"""
+        pair, n, submitted = job
+        finished = time.time()
+        record: dict[str, Any] = {"rows": n, "queue_ms": None, "compute_ms": None,
+                                  "total_ms": (finished - submitted) * 1000, "pid": None, "late": False, "error": None}
+        try:
+            timing = future.result()
+        except BrokenProcessPool as exc:
+            self._executor = None
+            record["error"] = f"BrokenProcessPool: {exc}"
+        except Exception as exc:  # noqa: BLE001  单个交易对失败不影响其他交易对
+            record["error"] = str(exc)
+        else:
+            record.update(
+                queue_ms=max(timing["started"] - submitted, 0.0) * 1000,
+                compute_ms=timing["compute"] * 1000,
+                pid=timing["pid"],
+            )
+            _, target, output_layout = buffers[pair]
+            results[pair] = _copy_results(target, output_layout)
+        if record["error"] is not None:
+            self.errors += 1
+            logger.warning("并行特征计算失败 - %s: %s", pair, record["error"])
+        record["late"] = self.budget is not None and finished - submitted > self.budget
+        latency[pair] = record
+
+    def latency_table(self) -> str:
+        """最近一轮的每交易对延迟表文本"""
+        if not self.latency:
+            return "(无记录)"
+        table = pd.DataFrame([{"pair": pair, **record} for pair, record in self.latency.items()],
+                             columns=list(LATENCY_COLUMNS))
+        return str(table.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+
+    def stats(self) -> dict[str, Any]:
+        """计算统计
+
+        Returns:
+            包含 workers、rounds、pairs_computed、errors、last_round_s、slowest_pair、slowest_ms 的字典
+        """
+        slowest = max(self.latency.items(), key=lambda item: item[1]["total_ms"], default=(None, {"total_ms": 0.0}))
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pairs_computed": self.pairs_computed,
+            "errors": self.errors,
+            "last_round_s": self.last_round,
+            "slowest_pair": slowest[0],
+            "slowest_ms": slowest[1]["total_ms"],
+        }
+
+    def close(self) -> None:
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self) -> ParallelFeatureComputer:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
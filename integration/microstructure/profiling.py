@@ -0,0 +1,277 @@
+"""特征工程耗时 / 内存埋点
+
+记录每个特征块（特征图节点）以及 populate_indicators、set_freqai_targets、populate_entry_trend、
+feature_engineering_* 每次调用的：
+
+- 墙钟耗时
+- 分配字节数（tracemalloc：区间内峰值相对进入时的增量，以及退出时仍保留的净增量）
+- 输出 dtype
+
+按交易对汇总成表，并导出 Chrome trace 格式的 JSON（chrome://tracing / Perfetto 可直接打开）。
+
+关闭时 span() 返回共享的空上下文，profile_hook 只多一次属性检查，可以常驻在实盘代码里。
+tracemalloc 会拖慢分配密集的代码，只在开启且 trace_memory=True 时启动。
+tracemalloc 的峰值是进程级的，不能按线程区分：只有第一个进入区间的线程（实盘为主循环）记录内存，
+其他线程（如 FreqAI 后台训练线程）的区间只记录耗时，内存列为 None，避免互相重置峰值。
+其他线程同时发生的分配仍会计入该线程区间的字节数。
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+_NULL_SPAN = nullcontext()
+
+# 汇总表列
+SUMMARY_COLUMNS = ("block", "calls", "total_s", "mean_ms", "max_ms", "peak_mb", "retained_mb", "dtype")
+
+
+def describe_dtypes(values: Any) -> str:
+    """输出的 dtype 描述（数组为 dtype 名；数据框为 "dtype×列数" 列表）"""
+    if isinstance(values, pd.DataFrame):
+        counts = values.dtypes.astype(str).value_counts()
+        return ",".join(f"{name}×{count}" for name, count in counts.items())
+    if isinstance(values, (np.ndarray, pd.Series)):
+        return str(values.dtype)
+    return type(values).__name__
+
+
+class FeatureProfiler:
+    """特征工程埋点记录器"""
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = True, max_events: int = 100_000):
+        """初始化记录器
+
+        Args:
+            enabled: 是否开启
+            trace_memory: 是否用 tracemalloc 记录分配字节数
+            max_events: 保留的最大事件数（超出后丢弃最早的事件）
+        """
+        if max_events < 1:
+            msg = f"max_events 必须 >= 1，实际 {max_events}"
+            raise ValueError(msg)
+
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.events: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+        self._memory_thread: int | None = None
+
+    def _owns_memory(self) -> bool:
+        """当前线程是否负责记录内存（第一个进入区间的线程）"""
+        ident = threading.get_ident()
+        with self._lock:
+            if self._memory_thread is None:
+                self._memory_thread = ident
+            return self._memory_thread == ident
+
+    def _stack(self) -> list[dict[str, Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name: str, pair: str | None = None):
+        """记录一个区间（关闭时返回空上下文）
+
+        进入时返回的字典可写入 ``dtype``；pair 为 None 时继承外层区间的交易对。
+
+        Args:
+            name: 块名称
+            pair: 交易对
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, pair)
+
+    @contextmanager
+    def _span(self, name: str, pair: str | None) -> Iterator[dict[str, Any]]:
+        stack = self._stack()
+        if pair is None and stack:
+            pair = stack[-1]["pair"]
+        memory = self.trace_memory and self._owns_memory()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        frame: dict[str, Any] = {"pair": pair, "child_peak": 0}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # 子区间会重置峰值，先把父区间到目前为止的峰值记下
+                stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+            frame["start_memory"] = current
+            tracemalloc.reset_peak()
+        stack.append(frame)
+        record: dict[str, Any] = {"name": name, "pair": pair, "dtype": None}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            peak_bytes = retained_bytes = None
+            if memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame["child_peak"])
+                peak_bytes = max(peak - frame["start_memory"], 0)
+                retained_bytes = current - frame["start_memory"]
+                if stack:
+                    stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak)
+            record.update({
+                "start": start - self._origin,
+                "seconds": elapsed,
+                "peak_bytes": peak_bytes,
+                "retained_bytes": retained_bytes,
+                "thread": threading.get_ident(),
+                "depth": len(stack),
+            })
+            with self._lock:
+                self.events.append(record)
+
+    def summary(self, pair: str | None = None) -> pd.DataFrame:
+        """按块汇总（可按交易对过滤）
+
+        Args:
+            pair: 交易对（None 表示全部）
+
+        Returns:
+            列为 SUMMARY_COLUMNS 的数据框，按总耗时降序
+        """
+        with self._lock:
+            events = [e for e in self.events if pair is None or e["pair"] == pair]
+        if not events:
+            return pd.DataFrame(columns=list(SUMMARY_COLUMNS))
+        frame = pd.DataFrame(events)
+        grouped = frame.groupby("name", sort=False)
+        table = pd.DataFrame({
+            "calls": grouped.size(),
+            "total_s": grouped["seconds"].sum(),
+            "mean_ms": grouped["seconds"].mean() * 1000,
+            "max_ms": grouped["seconds"].max() * 1000,
+            "peak_mb": grouped["peak_bytes"].max() / 1024 / 1024,
+            "retained_mb": grouped["retained_bytes"].mean() / 1024 / 1024,
+            "dtype": grouped["dtype"].last(),
+        })
+        table = table.rename_axis("block").reset_index()
+        return table.sort_values("total_s", ascending=False, ignore_index=True)
+
+    def pairs(self) -> list[str | None]:
+        """出现过的交易对"""
+        with self._lock:
+            return list(dict.fromkeys(e["pair"] for e in self.events))
+
+    def summary_table(self, pair: str | None = None) -> str:
+        """汇总表文本"""
+        table = self.summary(pair)
+        if table.empty:
+            return "(无记录)"
+        return str(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    def trace(self) -> dict[str, Any]:
+        """Chrome trace 格式（ph=X 的完整事件，时间单位微秒）"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        return {
+            "traceEvents": [
+                {
+                    "name": e["name"],
+                    "cat": e["pair"] or "",
+                    "ph": "X",
+                    "ts": e["start"] * 1e6,
+                    "dur": e["seconds"] * 1e6,
+                    "pid": pid,
+                    "tid": e["thread"],
+                    "args": {
+                        "pair": e["pair"],
+                        "dtype": e["dtype"],
+                        "peak_bytes": e["peak_bytes"],
+                        "retained_bytes": e["retained_bytes"],
+                    },
+                }
+                for e in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def dump(self, path: str | Path) -> Path:
+        """写出 JSON trace
+
+        Args:
+            path: 输出路径
+
+        Returns:
+            输出路径
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.trace(), ensure_ascii=False), encoding="utf-8")
+        return path
+
+    def reset(self) -> None:
+        """清空事件"""
+        with self._lock:
+            self.events.clear()
+
+    def close(self) -> None:
+        """停止由本记录器启动的 tracemalloc（之后由下一个进入区间的线程负责记录内存）"""
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracemalloc = False
+        with self._lock:
+            self._memory_thread = None
+
+
+def _find_pair(args: tuple, kwargs: dict) -> str | None:
+    metadata = kwargs.get("metadata")
+    if metadata is None:
+        metadata = next((arg for arg in args if isinstance(arg, dict)), None)
+    return metadata.get("pair") if metadata else None
+
+
+def profile_hook(name: str | None = None, attribute: str = "feature_profiler") -> Callable:
+    """策略钩子装饰器：记录每次调用的耗时 / 内存与新增列的 dtype
+
+    记录器取自 ``self.<attribute>``（不存在或关闭时直接调用原方法）；交易对取自 metadata 参数。
+
+    Args:
+        name: 块名称（默认方法名）
+        attribute: 记录器属性名
+    """
+    def decorator(method: Callable) -> Callable:
+        block = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, attribute, None)
+            if profiler is None or not profiler.enabled:
+                return method(self, *args, **kwargs)
+            dataframe = args[0] if args and isinstance(args[0], pd.DataFrame) else kwargs.get("dataframe")
+            before = set(dataframe.columns) if dataframe is not None else set()
+            with profiler.span(block, _find_pair(args, kwargs)) as record:
+                result = method(self, *args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    added = [column for column in result.columns if column not in before]
+                    record["dtype"] = describe_dtypes(result[added]) if added else ""
+            return result
+
+        return wrapper
+
+    return decorator
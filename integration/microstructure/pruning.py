@@ -0,0 +1,249 @@
+"""训练前冗余特征剪枝
+
+include_timeframes 与 include_shifted_candles 展开后，FreqAI 模型在数百个高度共线的列上训练，
+其中不少完全重复（如 amihud 与 kyle_lambda 及其各时间框架/平移版本）。这里在训练前：
+
+- 按行分块增量累计协方差（内存与行数无关），得到特征相关矩阵
+- 删除常数列，再按列顺序贪心保留：与已保留列的 |相关系数| >= 阈值的列视为近似重复并删除
+- 记录保留/删除的列，供按模型标识持久化；持续学习（continual_learning）时读回并冻结保留的列，
+  使每次重训的特征列与上一个模型（LightGBM init_model）一致
+
+FeaturePruner 按 datasieve 变换的接口实现（fit / transform 接受并返回 X, y, sample_weight, feature_list），
+可直接放在 FreqAI 特征管道的最前面；预测时按训练时保留的列取子集。
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+# 默认相关系数阈值（>= 该值的列视为近似重复）
+DEFAULT_CORR_THRESHOLD = 0.98
+
+# 增量累计时每块的行数
+DEFAULT_CHUNK_ROWS = 65536
+
+
+class CorrelationAccumulator:
+    """增量相关矩阵
+
+    以第一块的列均值为平移量累计 Σx、Σxxᵀ（平移后减少大均值列的相消误差）；
+    含 NaN / inf 的行整体跳过。
+    """
+
+    def __init__(self, n_features: int):
+        """初始化累计量
+
+        Args:
+            n_features: 特征列数
+        """
+        self.n_features = n_features
+        self.count = 0
+        self.shift: np.ndarray | None = None
+        self.total = np.zeros(n_features)
+        self.outer = np.zeros((n_features, n_features))
+
+    def update(self, block: np.ndarray) -> None:
+        """累计一块数据
+
+        Args:
+            block: 形状 (rows, n_features) 的数组
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim != 2 or block.shape[1] != self.n_features:
+            msg = f"数据形状 {block.shape} 与特征数 {self.n_features} 不一致"
+            raise ValueError(msg)
+        block = block[np.isfinite(block).all(axis=1)]
+        if not len(block):
+            return
+        if self.shift is None:
+            self.shift = block.mean(axis=0)
+        centered = block - self.shift
+        self.count += len(centered)
+        self.total += centered.sum(axis=0)
+        self.outer += centered.T @ centered
+
+    def covariance(self) -> np.ndarray:
+        """样本协方差矩阵（ddof=1）"""
+        if self.count < 2:
+            return np.full((self.n_features, self.n_features), np.nan)
+        mean = self.total / self.count
+        return (self.outer - self.count * np.outer(mean, mean)) / (self.count - 1)
+
+    def std(self) -> np.ndarray:
+        """各列标准差"""
+        return np.sqrt(np.maximum(np.diag(self.covariance()), 0.0))
+
+    def correlation(self) -> np.ndarray:
+        """相关矩阵（常数列所在行列为 NaN）"""
+        covariance = self.covariance()
+        std = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr: np.ndarray = covariance / np.outer(std, std)
+        corr[std == 0, :] = np.nan
+        corr[:, std == 0] = np.nan
+        np.clip(corr, -1.0, 1.0, out=corr)
+        return corr
+
+
+def select_features(
+    x: np.ndarray,
+    names: list[str] | tuple[str, ...],
+    corr_threshold: float = DEFAULT_CORR_THRESHOLD,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    min_std: float = 0.0,
+) -> tuple[list[str], dict[str, str]]:
+    """选出非冗余特征
+
+    Args:
+        x: 形状 (rows, len(names)) 的特征数组
+        names: 特征列名
+        corr_threshold: 相关系数阈值（0-1]
+        chunk_rows: 增量累计的块行数
+        min_std: 标准差 <= 该值的列视为常数列
+
+    Returns:
+        (保留的列名, 删除的列名 -> 原因)，原因为 "constant" 或 "corr>=阈值:保留列名"
+    """
+    if not 0.0 < corr_threshold <= 1.0:
+        msg = f"corr_threshold 必须在 (0, 1] 内，实际 {corr_threshold}"
+        raise ValueError(msg)
+    if x.shape[1] != len(names):
+        msg = f"特征数 {x.shape[1]} 与列名数 {len(names)} 不一致"
+        raise ValueError(msg)
+
+    accumulator = CorrelationAccumulator(len(names))
+    for start in range(0, len(x), chunk_rows):
+        accumulator.update(x[start:start + chunk_rows])
+    corr = np.abs(accumulator.correlation())
+    std = accumulator.std()
+
+    kept: list[int] = []
+    dropped: dict[str, str] = {}
+    for index, name in enumerate(names):
+        if not std[index] > min_std:
+            dropped[name] = "constant"
+            continue
+        if kept:
+            similarity = corr[index, kept]
+            best = int(np.argmax(similarity))
+            if similarity[best] >= corr_threshold:
+                dropped[name] = f"corr>={corr_threshold}:{names[kept[best]]}"
+                continue
+        kept.append(index)
+    return [names[i] for i in kept], dropped
+
+
+class FeaturePruner:
+    """FreqAI 特征管道中的冗余特征剪枝步骤（datasieve 变换接口）"""
+
+    def __init__(
+        self,
+        corr_threshold: float = DEFAULT_CORR_THRESHOLD,
+        chunk_rows: int = DEFAULT_CHUNK_ROWS,
+        min_std: float = 0.0,
+        frozen: list[str] | None = None,
+    ):
+        """初始化剪枝步骤
+
+        Args:
+            corr_threshold: 相关系数阈值
+            chunk_rows: 增量累计的块行数
+            min_std: 常数列判定阈值
+            frozen: 冻结的保留列（如上次训练持久化的 kept）；提供时不再计算相关矩阵，直接保留这些列
+        """
+        self.corr_threshold = corr_threshold
+        self.chunk_rows = chunk_rows
+        self.min_std = min_std
+        self.frozen = list(frozen) if frozen is not None else None
+        self.feature_list: list[str] | None = None
+        self.dropped: dict[str, str] = {}
+        self.mask: np.ndarray | None = None
+
+    def fit(self, x, y=None, sample_weight=None, feature_list=None, **kwargs):
+        """在训练集上确定保留的列"""
+        x = np.asarray(x)
+        names = list(feature_list) if feature_list is not None else [str(i) for i in range(x.shape[1])]
+        if self.frozen is None:
+            kept, self.dropped = select_features(x, names, self.corr_threshold, self.chunk_rows, self.min_std)
+        else:
+            missing = set(self.frozen) - set(names)
+            if missing:
+                msg = f"冻结的保留列不在当前特征中: {sorted(missing)}"
+                raise ValueError(msg)
+            frozen = set(self.frozen)
+            kept = [name for name in names if name in frozen]
+            self.dropped = {name: "frozen" for name in names if name not in frozen}
+        kept_set = set(kept)
+        self.mask = np.array([name in kept_set for name in names], dtype=bool)
+        self.feature_list = kept
+        return x, y, sample_weight, feature_list
+
+    def transform(self, x, y=None, sample_weight=None, feature_list=None, outlier_check=False, **kwargs):
+        """只保留训练时选中的列"""
+        if self.mask is None:
+            msg = "FeaturePruner 尚未 fit"
+            raise ValueError(msg)
+        return np.asarray(x)[:, self.mask], y, sample_weight, self.feature_list
+
+    def fit_transform(self, x, y=None, sample_weight=None, feature_list=None, **kwargs):
+        """fit 后 transform"""
+        self.fit(x, y, sample_weight, feature_list, **kwargs)
+        return self.transform(x, y, sample_weight, feature_list, **kwargs)
+
+    def inverse_transform(self, x, y=None, sample_weight=None, feature_list=None, **kwargs):
+        """剪枝不可逆，原样返回"""
+        return x, y, sample_weight, feature_list
+
+    def summary(self) -> dict[str, Any]:
+        """剪枝结果（可 JSON 序列化）"""
+        kept = self.feature_list or []
+        return {
+            "corr_threshold": self.corr_threshold,
+            "kept": list(kept),
+            "dropped": dict(self.dropped),
+            "n_kept": len(kept),
+            "n_dropped": len(self.dropped),
+            "frozen": self.frozen is not None,
+        }
+
+
+def load_pruning_summary(path: str | Path, key: str) -> dict[str, Any] | None:
+    """读取 save_pruning_summary 写入的条目（文件或条目不存在时返回 None）
+
+    Args:
+        path: JSON 文件路径
+        key: 条目键
+
+    Returns:
+        该键的剪枝结果
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    record: dict[str, Any] | None = json.loads(path.read_text(encoding="utf-8")).get(key)
+    return record
+
+
+def save_pruning_summary(path: str | Path, key: str, summary: dict[str, Any]) -> Path:
+    """把剪枝结果写入按键（如交易对）索引的 JSON 文件（同键覆盖）
+
+    Args:
+        path: JSON 文件路径（如 models/<identifier>/feature_pruning.json）
+        key: 条目键
+        summary: FeaturePruner.summary() 的输出
+
+    Returns:
+        文件路径
+    """
+    path = Path(path)
+    records = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    records[key] = summary
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(records, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+    return path
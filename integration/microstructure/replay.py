@@ -0,0 +1,307 @@
+"""本地加速行情回放
+
+没法对着真实交易所用几十个交易对给策略做压力测试。这里把 freqtrade 下载的 OHLCV 文件
+（如 datadir/futures/ETH_USDT_USDT-1m-futures.feather）按 K 线收盘时刻回放成实时行情流：
+
+- MarketReplayer：所有交易对共用一条收盘时间轴，按 speed 倍速（1 为实时，None 为不等待）逐根释放 K 线。
+  开始回放前已释放 warmup 根（相当于 bot 启动时下载的历史）；落后于计划时不补睡，lag 记录落后的秒数
+- ReplayDataProvider：与 freqtrade DataProvider 同形的只读接口（runmode、current_whitelist、
+  ohlcv / get_pair_dataframe、get_analyzed_dataframe），主时间框架返回最近 window 根已收盘 K 线，
+  更高时间框架由主时间框架重采样，只给出已收盘的 K 线
+- MarketReplayer.time：回放时钟（Unix 秒）。每释放一根 K 线对齐到它的收盘时刻，之后按墙钟流逝，
+  因此以它为时钟的 SignalLatencyTracker 在任意倍速下测得的都是真实的处理耗时
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from .long_horizon import resample_ohlcv, timeframe_to_timedelta
+from .trades import pair_to_filename
+
+OHLCV_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+# 主时间框架默认返回的 K 线数（与 bot 的 K 线缓存相当）
+DEFAULT_WINDOW = 1500
+
+
+def ohlcv_path(
+    datadir: str | Path,
+    pair: str,
+    timeframe: str = "1m",
+    trading_mode: str = "futures",
+    extension: str = "feather",
+) -> Path:
+    """freqtrade OHLCV 文件路径（与 freqtrade 的数据文件命名一致）
+
+    Args:
+        datadir: 数据目录（配置中的 datadir，如 user_data/data/okx）
+        pair: 交易对
+        timeframe: 时间框架
+        trading_mode: 交易模式（futures 时位于 futures 子目录，文件名带 -futures 后缀）
+        extension: 文件格式
+
+    Returns:
+        文件路径
+    """
+    name = f"{pair_to_filename(pair)}-{timeframe}"
+    if trading_mode == "futures":
+        return Path(datadir) / "futures" / f"{name}-futures.{extension}"
+    return Path(datadir) / f"{name}.{extension}"
+
+
+def _filename_to_pair(name: str, trading_mode: str) -> str:
+    """由文件名还原交易对（BASE_QUOTE[_SETTLE]；其他写法原样返回）"""
+    parts = name.split("_")
+    if trading_mode == "futures" and len(parts) == 3:
+        return f"{parts[0]}/{parts[1]}:{parts[2]}"
+    if trading_mode != "futures" and len(parts) == 2:
+        return f"{parts[0]}/{parts[1]}"
+    return name
+
+
+def load_ohlcv(
+    datadir: str | Path,
+    pairs: list[str] | None = None,
+    timeframe: str = "1m",
+    trading_mode: str = "futures",
+    tail: int | None = None,
+) -> dict[str, pd.DataFrame]:
+    """读取 feather OHLCV 文件
+
+    Args:
+        datadir: 数据目录
+        pairs: 交易对（None 表示目录下该时间框架的全部文件，交易对名由文件名还原）
+        timeframe: 时间框架
+        trading_mode: 交易模式
+        tail: 每个交易对只保留最后 tail 行（None 表示全部）
+
+    Returns:
+        交易对 -> 按时间升序、date 为 UTC 的 OHLCV 数据框
+    """
+    if pairs is None:
+        pattern = ohlcv_path(datadir, "*", timeframe, trading_mode)
+        suffix = pattern.name[1:]
+        paths = {
+            _filename_to_pair(path.name[:-len(suffix)], trading_mode): path
+            for path in sorted(pattern.parent.glob(pattern.name))
+        }
+    else:
+        paths = {pair: ohlcv_path(datadir, pair, timeframe, trading_mode) for pair in pairs}
+
+    frames = {}
+    for pair, path in paths.items():
+        if not path.exists():
+            msg = f"找不到 {pair} 的 {timeframe} 数据: {path}"
+            raise FileNotFoundError(msg)
+        frame = pd.read_feather(path, columns=list(OHLCV_COLUMNS))
+        frame["date"] = pd.to_datetime(frame["date"], utc=True)
+        frame = frame.sort_values("date", ignore_index=True)
+        frames[pair] = frame.iloc[-tail:].reset_index(drop=True) if tail else frame
+    return frames
+
+
+def _to_ns(dates: pd.Series) -> np.ndarray:
+    return np.asarray(pd.DatetimeIndex(dates).as_unit("ns").asi8)
+
+
+class MarketReplayer:
+    """按收盘时间轴逐根释放多个交易对的 K 线"""
+
+    def __init__(
+        self,
+        frames: dict[str, pd.DataFrame],
+        timeframe: str = "1m",
+        speed: float | None = 1.0,
+        warmup: int = DEFAULT_WINDOW,
+        wall_clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """初始化回放
+
+        Args:
+            frames: 交易对 -> 按时间升序的 OHLCV 数据框（date 为开盘时间）
+            timeframe: K 线时间框架
+            speed: 倍速（1 为实时；None 表示不等待，尽快释放）
+            warmup: 开始回放前已收盘的时间轴步数
+            wall_clock: 单调墙钟（秒）
+            sleep: 等待函数
+        """
+        if not frames:
+            msg = "frames 不能为空"
+            raise ValueError(msg)
+        if speed is not None and speed <= 0:
+            msg = f"speed 必须为正，实际 {speed}"
+            raise ValueError(msg)
+        if warmup < 1:
+            msg = f"warmup 必须 >= 1，实际 {warmup}"
+            raise ValueError(msg)
+
+        self.timeframe = timeframe
+        self.speed = speed
+        self.frames = {pair: frame.reset_index(drop=True) for pair, frame in frames.items()}
+        step = timeframe_to_timedelta(timeframe).value
+        self._close_ns = {pair: _to_ns(frame["date"]) + step for pair, frame in self.frames.items()}
+        self._timeline = np.unique(np.concatenate(list(self._close_ns.values())))
+        self._wall_clock = wall_clock
+        self._sleep = sleep
+
+        self._position = min(warmup, len(self._timeline)) - 1
+        self._start_position = self._position
+        self._started_wall: float | None = None
+        self._released_at = wall_clock()
+        self._released = {pair: self._count(pair) for pair in self.frames}
+        self.lag = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def pairs(self) -> list[str]:
+        return list(self.frames)
+
+    @property
+    def now(self) -> pd.Timestamp:
+        """最近一根已释放 K 线的收盘时刻"""
+        return pd.Timestamp(int(self._timeline[self._position]), tz="UTC")
+
+    @property
+    def remaining(self) -> int:
+        """尚未释放的时间轴步数"""
+        return len(self._timeline) - 1 - self._position
+
+    @property
+    def replayed(self) -> int:
+        """开始回放后已释放的时间轴步数"""
+        return self._position - self._start_position
+
+    def _count(self, pair: str) -> int:
+        return int(np.searchsorted(self._close_ns[pair], self._timeline[self._position], side="right"))
+
+    def released(self, pair: str) -> int:
+        """交易对已释放的 K 线数"""
+        return self._released[pair]
+
+    def time(self) -> float:
+        """回放时钟（Unix 秒）：最近一根 K 线的收盘时刻 + 释放后经过的墙钟秒数"""
+        return float(self._timeline[self._position]) / 1e9 + (self._wall_clock() - self._released_at)
+
+    def wait(self) -> float:
+        """等到下一根 K 线按倍速应当收盘的墙钟时刻
+
+        Returns:
+            落后计划的秒数（0 表示准时）
+        """
+        if self.speed is None or not self.remaining:
+            self.lag = 0.0
+            return self.lag
+        now = self._wall_clock()
+        if self._started_wall is None:
+            self._started_wall = now
+        offset = (self._timeline[self._position + 1] - self._timeline[self._start_position]) / 1e9
+        delay = self._started_wall + offset / self.speed - now
+        if delay > 0:
+            self._sleep(delay)
+        self.lag = max(-delay, 0.0)
+        self.max_lag = max(self.max_lag, self.lag)
+        return self.lag
+
+    def step(self) -> pd.Timestamp | None:
+        """释放下一步的 K 线（不等待）
+
+        Returns:
+            新的收盘时刻；已回放完毕时返回 None
+        """
+        if not self.remaining:
+            return None
+        self._position += 1
+        self._released_at = self._wall_clock()
+        self._released = {pair: self._count(pair) for pair in self.frames}
+        return self.now
+
+    def __iter__(self) -> Iterator[pd.Timestamp]:
+        """按倍速逐步释放，产出每一步的收盘时刻"""
+        while self.remaining:
+            self.wait()
+            yield self.step()
+
+    def window(self, pair: str, count: int) -> pd.DataFrame:
+        """交易对最近 count 根已收盘 K 线（与原数据共享内存的切片）"""
+        end = self._released[pair]
+        return self.frames[pair].iloc[max(end - count, 0):end]
+
+
+class ReplayDataProvider:
+    """与 freqtrade DataProvider 同形的回放行情接口"""
+
+    def __init__(self, replayer: MarketReplayer, window: int = DEFAULT_WINDOW, runmode: str = "dry_run"):
+        """初始化接口
+
+        Args:
+            replayer: 行情回放
+            window: 每个时间框架返回的 K 线数
+            runmode: 运行模式（策略据此走实盘 / 模拟盘路径）
+        """
+        if window < 1:
+            msg = f"window 必须 >= 1，实际 {window}"
+            raise ValueError(msg)
+        self.replayer = replayer
+        self.window = window
+        self.runmode = SimpleNamespace(value=runmode)
+        self._resampled: dict[tuple[str, str], tuple[pd.DataFrame, np.ndarray]] = {}
+        self._analyzed: dict[tuple[str, str], tuple[pd.DataFrame, pd.Timestamp]] = {}
+
+    def current_whitelist(self) -> list[str]:
+        return self.replayer.pairs
+
+    def ohlcv(self, pair: str, timeframe: str | None = None, copy: bool = True, candle_type: str = "") -> pd.DataFrame:
+        """交易对最近 window 根已收盘 K 线
+
+        Args:
+            pair: 交易对
+            timeframe: 时间框架（默认回放的时间框架；更高时间框架由其重采样）
+            copy: 是否返回副本
+            candle_type: 与 DataProvider 签名一致（忽略）
+
+        Returns:
+            OHLCV 数据框（未知交易对返回空数据框）
+        """
+        replayer = self.replayer
+        if pair not in replayer.frames:
+            return pd.DataFrame(columns=list(OHLCV_COLUMNS))
+        timeframe = timeframe or replayer.timeframe
+        if timeframe == replayer.timeframe:
+            frame = replayer.window(pair, self.window)
+        else:
+            resampled, close_ns = self._resample(pair, timeframe)
+            end = int(np.searchsorted(close_ns, replayer.now.value, side="right"))
+            frame = resampled.iloc[max(end - self.window, 0):end]
+        return frame.copy() if copy else frame
+
+    def _resample(self, pair: str, timeframe: str) -> tuple[pd.DataFrame, np.ndarray]:
+        """整段数据重采样一次；按收盘时刻截取，未收盘的 K 线不会露出"""
+        cached = self._resampled.get((pair, timeframe))
+        if cached is None:
+            if timeframe_to_timedelta(timeframe) <= timeframe_to_timedelta(self.replayer.timeframe):
+                msg = f"只能重采样到更高的时间框架: {timeframe}"
+                raise ValueError(msg)
+            resampled = resample_ohlcv(self.replayer.frames[pair], timeframe)
+            close_ns = _to_ns(resampled["date"]) + timeframe_to_timedelta(timeframe).value
+            cached = self._resampled[(pair, timeframe)] = (resampled, close_ns)
+        return cached
+
+    def get_pair_dataframe(self, pair: str, timeframe: str | None = None, candle_type: str = "") -> pd.DataFrame:
+        """实盘 / 模拟盘下与 ohlcv(copy=False) 相同"""
+        return self.ohlcv(pair, timeframe, copy=False)
+
+    def _set_cached_df(self, pair: str, timeframe: str, dataframe: pd.DataFrame, candle_type: str = "") -> None:
+        """保存分析后的数据框（与 DataProvider 同名，由分析流程调用）"""
+        self._analyzed[(pair, timeframe)] = (dataframe, self.replayer.now)
+
+    def get_analyzed_dataframe(self, pair: str, timeframe: str) -> tuple[pd.DataFrame, pd.Timestamp]:
+        """最近一次分析后的数据框及其时刻（尚未分析时返回空数据框与 Unix 纪元）"""
+        return self._analyzed.get((pair, timeframe), (pd.DataFrame(), pd.Timestamp(0, tz="UTC")))
@@ -0,0 +1,295 @@
+"""多时间框架重采样缓存
+
+FreqAI 的 include_timeframes 与长周期趋势的 1h / 1d 序列原本各自从文件（或交易所）加载并逐个处理。
+这里从基础 1m OHLCV 一次性派生全部高周期 K 线：
+
+- 所有时间框架共用一次数组提取；细周期的 K 线再聚合成粗周期（如 5m -> 15m -> 1h），
+  K 线边界统一按 UTC 纪元对齐（与交易所 / freqtrade 的 K 线一致）
+- 每个交易对保留各时间框架已收盘的 K 线和当前未收盘的部分 K 线；新的 1m K 线只更新部分 K 线，
+  其最后一分钟到达时转入已收盘序列
+- 预热时第一根基础 K 线不在高周期 K 线开头的，该高周期 K 线缺少前面的分钟，直接丢弃
+
+get_pair_dataframe 与 DataProvider 同名同义（只返回已收盘的 K 线），可传入更长的历史数据在前面补齐。
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .long_horizon import timeframe_to_timedelta
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+# (开盘时间 ns, open, high, low, close, volume)
+_Bars = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _bars(columns: Iterable[np.ndarray]) -> _Bars:
+    """由 6 个按列数组（如生成器）组成 _Bars"""
+    ts, open_, high, low, close, volume = columns
+    return ts, open_, high, low, close, volume
+
+
+def _group(bars: _Bars, step: int) -> _Bars:
+    """把按时间升序的 K 线聚合到 step 纳秒的周期（开盘价取首根、收盘价取末根）"""
+    ts, open_, high, low, close, volume = bars
+    bucket = ts - ts % step
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return (
+        bucket[starts],
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends],
+        np.add.reduceat(volume, starts),
+    )
+
+
+class _TimeframeState:
+    """单个时间框架的已收盘 K 线与部分 K 线"""
+
+    def __init__(self, step: int, valid_from: int):
+        self.step = step
+        self.valid_from = valid_from  # 早于该时间的 K 线缺少开头的分钟，丢弃
+        self.chunks: list[_Bars] = []
+        self.pending: list[float] | None = None  # [ts, open, high, low, close, volume]
+        self.frame: pd.DataFrame | None = None
+
+    def completed(self) -> _Bars | None:
+        """合并已收盘的分块（合并后只保留一块）"""
+        if not self.chunks:
+            return None
+        if len(self.chunks) > 1:
+            self.chunks = [_bars(np.concatenate(parts) for parts in zip(*self.chunks))]
+        return self.chunks[0]
+
+    def ingest(self, groups: _Bars, ready_until: int) -> None:
+        """并入本次新增的分组（ready_until 之前结束的 K 线视为已收盘）"""
+        ts, open_, high, low, close, volume = (values.copy() for values in groups)
+        pending = self.pending
+        if pending is not None:
+            if pending[0] == ts[0]:
+                # 部分 K 线延续到本次
+                open_[0] = pending[1]
+                high[0] = max(high[0], pending[2])
+                low[0] = min(low[0], pending[3])
+                volume[0] += pending[5]
+            else:
+                # 部分 K 线的最后几分钟缺失（数据断档），按已有数据收盘
+                self._append(_bars(np.array([value]) for value in pending))
+        self.pending = None
+
+        keep = ts >= self.valid_from
+        if not keep.all():
+            ts, open_, high, low, close, volume = (values[keep] for values in (ts, open_, high, low, close, volume))
+        if not len(ts):
+            return
+        if ts[-1] + self.step > ready_until:
+            self.pending = [ts[-1], open_[-1], high[-1], low[-1], close[-1], volume[-1]]
+            ts, open_, high, low, close, volume = (values[:-1] for values in (ts, open_, high, low, close, volume))
+        if len(ts):
+            self._append((ts, open_, high, low, close, volume))
+
+    def _append(self, bars: _Bars) -> None:
+        self.chunks.append(bars)
+        self.frame = None
+
+
+class _PairState:
+    """单个交易对的重采样状态"""
+
+    def __init__(self, steps: dict[str, int], first_ts: int, tz: Any):
+        self.last_ts: int | None = None
+        self.tz = tz
+        self.timeframes = {
+            tf: _TimeframeState(step, first_ts if first_ts % step == 0 else first_ts - first_ts % step + step)
+            for tf, step in steps.items()
+        }
+
+
+class ResampleCache:
+    """从基础时间框架一次性派生多个高周期 K 线的缓存（按交易对增量更新）"""
+
+    def __init__(self, base_timeframe: str = "1m", timeframes: list[str] | tuple[str, ...] = ("5m", "15m", "1h")):
+        """初始化缓存
+
+        Args:
+            base_timeframe: 基础时间框架
+            timeframes: 派生的时间框架（须为基础时间框架的整数倍；不支持按周对齐的 'w'）
+        """
+        base_step = timeframe_to_timedelta(base_timeframe).value
+        steps = {}
+        for tf in timeframes:
+            step = timeframe_to_timedelta(tf).value
+            if tf.endswith("w") or step <= base_step or step % base_step:
+                msg = f"时间框架 {tf} 不能由 {base_timeframe} 重采样得到"
+                raise ValueError(msg)
+            steps[tf] = step
+
+        self.base_timeframe = base_timeframe
+        self.base_step = base_step
+        # 按周期从短到长，粗周期尽量由能整除它的最近细周期聚合
+        self.steps = dict(sorted(steps.items(), key=lambda item: item[1]))
+        self.sources = {}
+        for tf, step in self.steps.items():
+            finer = [other for other, other_step in self.steps.items() if other_step < step and step % other_step == 0]
+            self.sources[tf] = finer[-1] if finer else None
+        self._pairs: dict[str, _PairState] = {}
+        self._lock = threading.Lock()
+        self.candles_processed = 0
+        self.bootstraps = 0
+
+    @property
+    def timeframes(self) -> list[str]:
+        return list(self.steps)
+
+    def update(self, dataframe: pd.DataFrame, pair: str) -> int:
+        """用基础 K 线更新（只处理上次之后的新行；无法衔接时用整个数据框重新预热）
+
+        Args:
+            dataframe: 含 date 列、按时间升序的基础时间框架 OHLCV
+            pair: 交易对
+
+        Returns:
+            本次处理的基础 K 线数
+        """
+        if dataframe.empty:
+            return 0
+        ts = pd.DatetimeIndex(dataframe["date"]).as_unit("ns").asi8
+        with self._lock:
+            state = self._pairs.get(pair)
+            start = None
+            if state is not None and state.last_ts is not None:
+                position = int(np.searchsorted(ts, state.last_ts))
+                if position < len(ts) and ts[position] == state.last_ts:
+                    start = position + 1
+                elif ts[-1] <= state.last_ts:
+                    # 旧数据，不回退状态
+                    return 0
+            if state is None or start is None:
+                state = _PairState(self.steps, int(ts[0]), getattr(dataframe["date"].dt, "tz", None))
+                self._pairs[pair] = state
+                self.bootstraps += 1
+                start = 0
+            if start >= len(ts):
+                return 0
+
+            base = (ts[start:], *(dataframe[column].to_numpy(dtype=np.float64)[start:] for column in OHLCV_COLUMNS))
+            ready_until = int(ts[-1]) + self.base_step
+            groups: dict[str | None, _Bars] = {None: base}
+            for tf, step in self.steps.items():
+                groups[tf] = _group(groups[self.sources[tf]], step)
+                state.timeframes[tf].ingest(groups[tf], ready_until)
+            state.last_ts = int(ts[-1])
+            self.candles_processed += len(ts) - start
+            return len(ts) - start
+
+    def get_pair_dataframe(self, pair: str, timeframe: str, history: pd.DataFrame | None = None) -> pd.DataFrame:
+        """已收盘的高周期 K 线
+
+        Args:
+            pair: 交易对
+            timeframe: 时间框架
+            history: 更早的同周期数据（如 DataProvider 提供的序列），用于补齐缓存起点之前的部分
+
+        Returns:
+            含 date 与 OHLCV 列的数据框（date 为 K 线开盘时间）
+        """
+        if timeframe not in self.steps:
+            msg = f"未缓存的时间框架: {timeframe}"
+            raise ValueError(msg)
+        with self._lock:
+            state = self._pairs.get(pair)
+            frame = self._frame(state, timeframe) if state is not None else None
+        if frame is None or frame.empty:
+            return history.copy() if history is not None else pd.DataFrame(columns=["date", *OHLCV_COLUMNS])
+        if history is None or history.empty:
+            return frame.copy()
+        head = history.loc[history["date"] < frame["date"].iloc[0], ["date", *OHLCV_COLUMNS]]
+        return pd.concat([head, frame], ignore_index=True)
+
+    def _frame(self, state: _PairState, timeframe: str) -> pd.DataFrame | None:
+        tf_state = state.timeframes[timeframe]
+        if tf_state.frame is None:
+            bars = tf_state.completed()
+            if bars is None:
+                return None
+            dates = pd.to_datetime(bars[0], unit="ns", utc=state.tz is not None)
+            if state.tz is not None:
+                dates = dates.tz_convert(state.tz)
+            tf_state.frame = pd.DataFrame({"date": dates, **dict(zip(OHLCV_COLUMNS, bars[1:]))})
+        return tf_state.frame
+
+    def partial(self, pair: str, timeframe: str) -> dict[str, Any] | None:
+        """当前未收盘的部分 K 线（没有时为 None）"""
+        with self._lock:
+            state = self._pairs.get(pair)
+            pending = state.timeframes[timeframe].pending if state is not None else None
+            if state is None or pending is None:
+                return None
+            date = pd.Timestamp(int(pending[0]), unit="ns")
+            if state.tz is not None:
+                date = date.tz_localize("UTC").tz_convert(state.tz)
+            return {"date": date, **dict(zip(OHLCV_COLUMNS, (float(value) for value in pending[1:])))}
+
+    def trim(self, keep: pd.Timedelta, pair: str | None = None) -> dict[str, int]:
+        """丢弃早于 (最后一根基础 K 线 - keep) 开盘的已收盘 K 线
+
+        Args:
+            keep: 保留时长
+            pair: 仅处理该交易对（None 表示全部）
+
+        Returns:
+            交易对 -> 释放的字节数（没有可丢弃的 K 线的交易对不在结果中）
+        """
+        reclaimed = {}
+        with self._lock:
+            pairs = [pair] if pair is not None else list(self._pairs)
+            for name in pairs:
+                state = self._pairs.get(name)
+                if state is None or state.last_ts is None:
+                    continue
+                before = state.last_ts - pd.Timedelta(keep).value
+                released = 0
+                for tf_state in state.timeframes.values():
+                    bars = tf_state.completed()
+                    if bars is None or bars[0][0] >= before:
+                        continue
+                    start = int(np.searchsorted(bars[0], before))
+                    kept = _bars(values[start:].copy() for values in bars)
+                    released += sum(values.nbytes for values in bars) - sum(values.nbytes for values in kept)
+                    tf_state.chunks = [kept] if len(kept[0]) else []
+                    tf_state.frame = None
+                if released:
+                    reclaimed[name] = released
+        return reclaimed
+
+    def reset(self, pair: str | None = None) -> None:
+        """清除状态
+
+        Args:
+            pair: 仅清除该交易对（None 表示全部）
+        """
+        with self._lock:
+            if pair is None:
+                self._pairs.clear()
+            else:
+                self._pairs.pop(pair, None)
+
+    def stats(self) -> dict[str, int]:
+        """缓存统计
+
+        Returns:
+            包含 pairs、candles_processed、bootstraps 的字典
+        """
+        return {
+            "pairs": len(self._pairs),
+            "candles_processed": self.candles_processed,
+            "bootstraps": self.bootstraps,
+        }
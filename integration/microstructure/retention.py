@@ -0,0 +1,159 @@
+"""有界内存保留策略
+
+长时间运行的模拟盘 / 实盘里，按交易对保存的 K 线历史（FreqAI 的 historic_data 每根 K 线追加一行、
+重采样缓存、逐笔订单流）会一直增长，分析后的数据框上还留着只在计算过程中用到的中间列
+（price_change、mf_multiplier、bb_upper ...）。这里按策略声明的最大回看时长统一约束：
+
+- trim：数据框跨度超过 lookback × (1 + slack) 时截到最近 lookback（slack 使复制摊销到多根 K 线）
+- drop_scratch：删除不再被引用的中间列。保留 OHLCV、信号列、FreqAI 输出（& 前缀、do_predict、DI_values）
+  与 keep_columns（如入场条件读取的列），其余都视为中间列
+- 每次释放按 (交易对, 来源) 记账（字节数、行数、列数），summary / summary_table 输出汇总
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+import pandas as pd
+
+from .long_horizon import timeframe_to_timedelta
+
+# 不属于中间列的列
+BASE_COLUMNS = ("date", "open", "high", "low", "close", "volume")
+SIGNAL_COLUMNS = ("enter_long", "enter_short", "exit_long", "exit_short", "enter_tag", "exit_tag")
+FREQAI_COLUMNS = ("do_predict", "DI_values")
+KEEP_PREFIXES = ("&",)
+
+# 汇总表列
+SUMMARY_COLUMNS = ("pair", "source", "events", "rows", "columns", "reclaimed_mb")
+
+
+def frame_nbytes(frame: pd.DataFrame) -> int:
+    """数据框的内存占用（含索引；object 列只计指针）"""
+    return int(frame.memory_usage(index=True, deep=False).sum())
+
+
+class RetentionPolicy:
+    """按最大回看时长截断历史、删除中间列，并记录释放的内存"""
+
+    def __init__(
+        self,
+        lookback: pd.Timedelta | str,
+        keep_columns: Iterable[str] = (),
+        keep_prefixes: Iterable[str] = KEEP_PREFIXES,
+        slack: float = 0.1,
+    ):
+        """初始化策略
+
+        Args:
+            lookback: 保留的最大回看时长（Timedelta，或 '30d' 这类时间框架写法）
+            keep_columns: 额外保留的列（其余非基础列视为中间列）
+            keep_prefixes: 按前缀保留的列
+            slack: 超出 lookback 的比例达到该值才截断
+        """
+        lookback = timeframe_to_timedelta(lookback) if isinstance(lookback, str) else pd.Timedelta(lookback)
+        if lookback <= pd.Timedelta(0):
+            msg = f"lookback 必须为正，实际 {lookback}"
+            raise ValueError(msg)
+        if slack < 0:
+            msg = f"slack 必须 >= 0，实际 {slack}"
+            raise ValueError(msg)
+
+        self.lookback = lookback
+        self.slack = slack
+        self.keep_columns = frozenset((*BASE_COLUMNS, *SIGNAL_COLUMNS, *FREQAI_COLUMNS, *keep_columns))
+        self.keep_prefixes = tuple(keep_prefixes)
+        self._lock = threading.Lock()
+        self._reclaimed: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+
+    def record(self, pair: str, source: str, nbytes: int, rows: int = 0, columns: int = 0) -> None:
+        """记录一次释放
+
+        Args:
+            pair: 交易对
+            source: 来源（如 freqai_1m、resample、order_flow、scratch_columns）
+            nbytes: 释放的字节数
+            rows: 截掉的行数
+            columns: 删除的列数
+        """
+        with self._lock:
+            entry = self._reclaimed[(pair, source)]
+            entry[0] += 1
+            entry[1] += rows
+            entry[2] += columns
+            entry[3] += nbytes
+
+    def trim(self, frame: pd.DataFrame, pair: str, source: str) -> pd.DataFrame:
+        """截掉早于 (最后一行 - lookback) 的行
+
+        Args:
+            frame: 含按时间升序 date 列的数据框
+            pair: 交易对
+            source: 来源（用于记账）
+
+        Returns:
+            截断后的数据框（复制，原数据框的内存随之释放）；未超出时原样返回
+        """
+        if frame is None or len(frame) < 2:
+            return frame
+        dates = pd.DatetimeIndex(frame["date"])
+        if dates[-1] - dates[0] <= self.lookback * (1 + self.slack):
+            return frame
+
+        start = int(dates.searchsorted(dates[-1] - self.lookback))
+        trimmed = frame.iloc[start:].copy()
+        self.record(pair, source, frame_nbytes(frame) - frame_nbytes(trimmed), rows=start)
+        return trimmed
+
+    def scratch_columns(self, columns: Iterable[str]) -> list[str]:
+        """不再被引用的中间列"""
+        return [
+            column for column in columns
+            if column not in self.keep_columns and not str(column).startswith(self.keep_prefixes)
+        ]
+
+    def drop_scratch(self, dataframe: pd.DataFrame, pair: str) -> list[str]:
+        """原地删除中间列
+
+        Args:
+            dataframe: 分析后的数据框
+            pair: 交易对
+
+        Returns:
+            删除的列名
+        """
+        scratch = self.scratch_columns(dataframe.columns)
+        if scratch:
+            nbytes = int(dataframe[scratch].memory_usage(index=False, deep=False).sum())
+            dataframe.drop(columns=scratch, inplace=True)
+            self.record(pair, "scratch_columns", nbytes, columns=len(scratch))
+        return scratch
+
+    def reclaimed_bytes(self, pair: str | None = None) -> int:
+        """累计释放的字节数
+
+        Args:
+            pair: 仅统计该交易对（None 表示全部）
+        """
+        with self._lock:
+            return sum(entry[3] for (name, _), entry in self._reclaimed.items() if pair is None or name == pair)
+
+    def summary(self) -> pd.DataFrame:
+        """按 (交易对, 来源) 汇总的释放记录，列见 SUMMARY_COLUMNS"""
+        with self._lock:
+            records: list[dict[str, Any]] = [
+                {"pair": pair, "source": source, "events": events, "rows": rows, "columns": columns,
+                 "reclaimed_mb": nbytes / 1024**2}
+                for (pair, source), (events, rows, columns, nbytes) in sorted(self._reclaimed.items())
+            ]
+        return pd.DataFrame(records, columns=list(SUMMARY_COLUMNS))
+
+    def summary_table(self) -> str:
+        """汇总表文本"""
+        table = self.summary()
+        if table.empty:
+            return "(无记录)"
+        return str(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
@@ -0,0 +1,277 @@
+"""滚动统计内核
+
+市场状态分类只需要在趋势闸门打开（|trend| > 阈值）的行上比较波动率与其滚动中位数。
+pandas 的 rolling().quantile() 会在每一行上维护跳表，而且策略原先对同一序列调用了 4 次。
+
+- rolling_quantile: 有序窗口 + 二分插入，计算完整序列（流式/小数据使用）
+- rolling_quantile_at: 只在指定行上计算（分块 np.partition），代价与闸门行数成正比
+
+两者均与 pandas rolling(window).quantile(q)（interpolation='linear'，
+min_periods=window，窗口内含 NaN 则输出 NaN）逐值一致。
+
+滚动均值/标准差（rolling_mean_into / rolling_std_into）用分块前缀和差分，O(n) 且与窗口大小无关，
+多个窗口共用前缀和，结果写入调用方提供的数组。
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 分块大小（每块 chunk_size * window 个 float64 的临时内存）
+DEFAULT_CHUNK_SIZE = 8192
+
+# 滚动统计分块行数（分块前缀和：临时量留在缓存内，累计误差不随序列长度增长）
+BLOCK_ROWS = 4096
+
+
+def _validate(window: int, quantile: float) -> None:
+    if window < 1:
+        msg = f"window 必须 >= 1，实际 {window}"
+        raise ValueError(msg)
+    if not 0.0 <= quantile <= 1.0:
+        msg = f"quantile 必须在 [0, 1] 内，实际 {quantile}"
+        raise ValueError(msg)
+
+
+def rolling_quantile(values: np.ndarray, window: int, quantile: float) -> np.ndarray:
+    """计算完整的滚动分位数序列
+
+    Args:
+        values: 输入序列
+        window: 窗口大小
+        quantile: 分位数（0-1）
+
+    Returns:
+        与输入等长的分位数数组
+    """
+    _validate(window, quantile)
+    data = np.asarray(values, dtype=np.float64).tolist()
+    n = len(data)
+    result = [math.nan] * n
+
+    position = quantile * (window - 1)
+    lower = int(position)
+    upper = min(lower + 1, window - 1)
+    fraction = position - lower
+
+    ordered: list[float] = []
+    nan_count = 0
+    insort = bisect.insort
+    bisect_left = bisect.bisect_left
+    for i in range(n):
+        value = data[i]
+        if value != value:
+            nan_count += 1
+        else:
+            insort(ordered, value)
+
+        if i >= window:
+            old = data[i - window]
+            if old != old:
+                nan_count -= 1
+            else:
+                del ordered[bisect_left(ordered, old)]
+
+        if i >= window - 1 and not nan_count:
+            low_value = ordered[lower]
+            result[i] = low_value + (ordered[upper] - low_value) * fraction if fraction else low_value
+
+    return np.array(result, dtype=np.float64)
+
+
+def rolling_quantile_at(
+    values: np.ndarray,
+    window: int,
+    quantile: float,
+    positions: np.ndarray,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> np.ndarray:
+    """只在指定位置计算滚动分位数
+
+    Args:
+        values: 输入序列
+        window: 窗口大小
+        quantile: 分位数（0-1）
+        positions: 需要计算的行号（窗口右端，含本行）
+        chunk_size: 每块处理的行数
+
+    Returns:
+        与 positions 等长的分位数数组（窗口不足或含 NaN 时为 NaN）
+    """
+    _validate(window, quantile)
+    data = np.asarray(values, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.int64)
+    result = np.full(len(positions), np.nan)
+
+    valid = positions >= window - 1
+    if not valid.any():
+        return result
+
+    # 窗口内 NaN 计数（前缀和）
+    nan_prefix = np.concatenate([[0], np.cumsum(np.isnan(data))])
+    end = positions + 1
+    start = np.maximum(end - window, 0)
+    valid &= (nan_prefix[end] - nan_prefix[start]) == 0
+
+    target = np.flatnonzero(valid)
+    if len(target) == 0:
+        return result
+
+    position = quantile * (window - 1)
+    lower = int(position)
+    upper = min(lower + 1, window - 1)
+    fraction = position - lower
+    kth = (lower, upper) if upper != lower else (lower,)
+
+    windows = sliding_window_view(data, window)
+    for chunk_start in range(0, len(target), chunk_size):
+        chunk = target[chunk_start:chunk_start + chunk_size]
+        block = np.partition(windows[positions[chunk] - window + 1], kth, axis=1)
+        low_value = block[:, lower]
+        if fraction:
+            result[chunk] = low_value + (block[:, upper] - low_value) * fraction
+        else:
+            result[chunk] = low_value
+
+    return result
+
+
+def _prepare(values: np.ndarray, center: bool) -> tuple[np.ndarray, np.ndarray | None]:
+    """NaN 置 0（可选先减去全序列均值），返回 (处理后数组, NaN 前缀计数或 None)"""
+    nan_mask = np.isnan(values)
+    has_nan = bool(nan_mask.any())
+    if center:
+        finite = values[~nan_mask] if has_nan else values
+        prepared = values - (finite.mean() if len(finite) else 0.0)
+    else:
+        prepared = values.copy() if has_nan else values
+    if not has_nan:
+        return prepared, None
+    prepared[nan_mask] = 0.0
+    nan_prefix = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(nan_mask, out=nan_prefix[1:])
+    return prepared, nan_prefix
+
+
+def _prefix_blocks(arrays: tuple[np.ndarray, ...], widest: int):
+    """逐块生成局部前缀和
+
+    每块覆盖输出行 [start, stop)，局部前缀和从 base = start - widest + 1 起算：
+    prefix[j] = sum(array[base:base + j])。
+
+    Yields:
+        (start, stop, base, prefixes)
+    """
+    n = len(arrays[0])
+    buffers = [np.empty(min(BLOCK_ROWS, n) + widest) for _ in arrays]
+    for start in range(0, n, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n)
+        base = max(start - widest + 1, 0)
+        for array, buffer in zip(arrays, buffers):
+            buffer[0] = 0.0
+            np.cumsum(array[base:stop], out=buffer[1:stop - base + 1])
+        yield start, stop, base, buffers
+
+
+def _window_slices(start: int, stop: int, base: int, window: int) -> tuple[int, slice, slice] | None:
+    """块内窗口和的前缀下标：sum(rows lo..stop) = prefix[upper] - prefix[lower]"""
+    lo = max(start, window - 1)
+    if lo >= stop:
+        return None
+    upper = slice(lo + 1 - base, stop + 1 - base)
+    lower = slice(lo + 1 - window - base, stop + 1 - window - base)
+    return lo, upper, lower
+
+
+def _run_starts(values: np.ndarray) -> np.ndarray:
+    """每行所在的相等值连续段的起始行（NaN 不与任何值相等）"""
+    n = len(values)
+    changed = np.empty(n, dtype=bool)
+    changed[:1] = True
+    np.not_equal(values[1:], values[:-1], out=changed[1:])
+    return np.maximum.accumulate(np.where(changed, np.arange(n), 0))
+
+
+def _mask_nan_windows(out: np.ndarray, nan_prefix: np.ndarray | None, window: int) -> None:
+    """窗口内含 NaN 的行置 NaN（与 pandas min_periods=window 一致）"""
+    if nan_prefix is None or len(out) < window:
+        return
+    counts = nan_prefix[window:] - nan_prefix[:-window]
+    out[window - 1:][counts > 0] = np.nan
+
+
+def rolling_mean_into(values: np.ndarray, window: int, out: np.ndarray) -> np.ndarray:
+    """滚动均值写入 out（前 window-1 行为 NaN，窗口含 NaN 时为 NaN）"""
+    out[:window - 1] = np.nan
+    if len(values) < window:
+        return out
+    prepared, nan_prefix = _prepare(values, center=False)
+    for start, stop, base, (prefix,) in _prefix_blocks((prepared,), window):
+        bounds = _window_slices(start, stop, base, window)
+        if bounds is None:
+            continue
+        lo, upper, lower = bounds
+        target = out[lo:stop]
+        np.subtract(prefix[upper], prefix[lower], out=target)
+        target /= window
+    _mask_nan_windows(out, nan_prefix, window)
+    return out
+
+
+def rolling_std_into(
+    values: np.ndarray,
+    windows: int | tuple[int, ...],
+    outs: np.ndarray | tuple[np.ndarray, ...],
+) -> np.ndarray | tuple[np.ndarray, ...]:
+    """滚动标准差（ddof=1）写入 out（前 window-1 行为 NaN，窗口含 NaN 时为 NaN）
+
+    多个窗口共用同一组一阶/二阶前缀和。先减去全序列均值，避免成交量这类大均值序列的相消误差。
+    前缀和差分在常数窗口（如连续零成交量）上会留下浮点残差，这些窗口按 pandas 的做法直接置 0。
+
+    Args:
+        values: 输入序列
+        windows: 窗口大小（或多个窗口）
+        outs: 输出数组（与 windows 一一对应）
+
+    Returns:
+        outs
+    """
+    window_list = (windows,) if isinstance(windows, int) else tuple(windows)
+    out_list = (outs,) if isinstance(outs, np.ndarray) else tuple(outs)
+    n = len(values)
+    for window, out in zip(window_list, out_list):
+        out[:window - 1] = np.nan
+    if n < min(window_list):
+        return outs
+
+    centered, nan_prefix = _prepare(values, center=True)
+    squared = centered * centered
+    scratch = np.empty(BLOCK_ROWS)
+    for start, stop, base, (prefix, prefix_sq) in _prefix_blocks((centered, squared), max(window_list)):
+        for window, out in zip(window_list, out_list):
+            bounds = _window_slices(start, stop, base, window)
+            if bounds is None:
+                continue
+            lo, upper, lower = bounds
+            target = out[lo:stop]
+            first = scratch[:stop - lo]
+            # var = (Σx² - (Σx)² / w) / (w - 1)
+            np.subtract(prefix[upper], prefix[lower], out=first)
+            first *= first
+            first /= window
+            np.subtract(prefix_sq[upper], prefix_sq[lower], out=target)
+            target -= first
+            target /= window - 1
+            np.maximum(target, 0.0, out=target)
+            np.sqrt(target, out=target)
+    run_starts = _run_starts(values)
+    rows = np.arange(n)
+    for window, out in zip(window_list, out_list):
+        constant = run_starts[window - 1:] <= rows[:n - window + 1]
+        out[window - 1:][constant] = 0.0
+        _mask_nan_windows(out, nan_prefix, window)
+    return outs
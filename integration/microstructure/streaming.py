@@ -0,0 +1,470 @@
+"""增量流式特征引擎
+
+实盘/模拟盘（process_only_new_candles）每分钟只新增一根 K 线，但批量路径会对整个
+DataFrame 重算所有滚动窗口。这里为每个交易对维护滚动状态，只用新收盘的 K 线更新：
+
+- VPIN：滚动和（Kahan 补偿）；成交量同步 VPIN 只填充当前桶（见 vpin.BucketVPIN）
+- 已实现波动率：Welford 滑动方差
+- 市场状态分位数：有序窗口（bisect）
+- 趋势：环形缓冲区（shift 1440 / 43200），或只为新行计算的 LongHorizonTrendProvider 趋势
+- 订单流：与批量路径相同，有逐笔成交覆盖的 K 线用真实主动买卖量；已按近似值处理的 K 线
+  之后被成交文件覆盖时重新预热
+
+输出写入预分配的双倍长度 numpy 环形缓冲（每个值写两份），最近 n 行总是一段连续切片，
+返回视图而不复制：每根 K 线的工作量与保留长度无关。输出与批量路径 compute_intermediates 在同一段历史上的结果一致。
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .features import (
+    INTERMEDIATE_NAMES,
+    REGIME_QUANTILE,
+    REGIME_TREND_THRESHOLD,
+    REGIME_WINDOW,
+    TREND_30D_PERIOD,
+    TREND_PERIOD,
+    VOL_WINDOW,
+    VPIN_WINDOW,
+)
+from .vpin import BucketVPIN, bulk_buy_fraction
+
+
+class RollingSum:
+    """固定窗口滚动和（Kahan 补偿，窗口内有 NaN 时输出 NaN）"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque[float] = deque()
+        self._nan_count = 0
+        self._sum = 0.0
+        self._comp = 0.0
+
+    def _add(self, value: float) -> None:
+        y = value - self._comp
+        t = self._sum + y
+        self._comp = (t - self._sum) - y
+        self._sum = t
+
+    def update(self, value: float) -> float:
+        """加入新值并返回当前窗口和"""
+        self._values.append(value)
+        if math.isnan(value):
+            self._nan_count += 1
+        else:
+            self._add(value)
+
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nan_count -= 1
+            else:
+                self._add(-old)
+
+        if len(self._values) < self.window or self._nan_count:
+            return math.nan
+        return self._sum
+
+
+class RollingVariance:
+    """固定窗口滑动方差（Welford 增删，ddof=1，与 pandas rolling().std() 一致）"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values: deque[float] = deque()
+        self._nan_count = 0
+        self._nobs = 0
+        self._mean = 0.0
+        self._ssqdm = 0.0
+
+    def _add(self, value: float) -> None:
+        self._nobs += 1
+        delta = value - self._mean
+        self._mean += delta / self._nobs
+        self._ssqdm += delta * (value - self._mean)
+
+    def _remove(self, value: float) -> None:
+        self._nobs -= 1
+        if self._nobs == 0:
+            self._mean = 0.0
+            self._ssqdm = 0.0
+            return
+        delta = value - self._mean
+        self._mean -= delta / self._nobs
+        self._ssqdm -= delta * (value - self._mean)
+
+    def update(self, value: float) -> float:
+        """加入新值并返回当前窗口标准差"""
+        self._values.append(value)
+        if math.isnan(value):
+            self._nan_count += 1
+        else:
+            self._add(value)
+
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nan_count -= 1
+            else:
+                self._remove(old)
+
+        if len(self._values) < self.window or self._nan_count or self._nobs < 2:
+            return math.nan
+        return math.sqrt(max(self._ssqdm / (self._nobs - 1), 0.0))
+
+
+class RollingQuantile:
+    """固定窗口滚动分位数（有序窗口 + 二分插入，线性插值，与 pandas 一致）"""
+
+    def __init__(self, window: int, quantile: float):
+        if not 0.0 <= quantile <= 1.0:
+            msg = f"quantile 必须在 [0, 1] 内，实际 {quantile}"
+            raise ValueError(msg)
+        self.window = window
+        self.quantile = quantile
+        self._values: deque[float] = deque()
+        self._sorted: list[float] = []
+        self._nan_count = 0
+
+    def update(self, value: float) -> float:
+        """加入新值并返回当前窗口分位数"""
+        self._values.append(value)
+        if math.isnan(value):
+            self._nan_count += 1
+        else:
+            bisect.insort(self._sorted, value)
+
+        if len(self._values) > self.window:
+            old = self._values.popleft()
+            if math.isnan(old):
+                self._nan_count -= 1
+            else:
+                del self._sorted[bisect.bisect_left(self._sorted, old)]
+
+        if len(self._values) < self.window or self._nan_count:
+            return math.nan
+        return interpolate_sorted(self._sorted, self.quantile)
+
+
+def interpolate_sorted(sorted_values: list[float], quantile: float) -> float:
+    """在有序序列上按线性插值取分位数（pandas interpolation='linear'）"""
+    position = quantile * (len(sorted_values) - 1)
+    lower = int(position)
+    fraction = position - lower
+    low_value = sorted_values[lower]
+    if fraction == 0.0:
+        return low_value
+    return low_value + (sorted_values[lower + 1] - low_value) * fraction
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    """numerator / denominator（分母为 0 时按 numpy 语义返回 inf/nan）"""
+    if denominator == 0.0:
+        if numerator == 0.0 or math.isnan(numerator):
+            return math.nan
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+class LagBuffer:
+    """固定滞后环形缓冲（等价于 shift(lag)）"""
+
+    def __init__(self, lag: int):
+        self.lag = lag
+        self._values: deque[float] = deque(maxlen=lag + 1)
+
+    def update(self, value: float) -> float:
+        """加入新值并返回 lag 根之前的值"""
+        self._values.append(value)
+        if len(self._values) <= self.lag:
+            return math.nan
+        return self._values[0]
+
+
+class _PairState:
+    """单个交易对的流式状态"""
+
+    def __init__(self, retention: int, vpin_bucket_volume: float | None = None, order_flow: bool = False):
+        self.last_date: Any = None
+        self.prev_close = math.nan
+        self.vpin_bucket_volume = vpin_bucket_volume
+        self.order_flow = order_flow
+        # 提供订单流时，最后一根有成交覆盖的 K 线之后第一根按近似值处理的 K 线时间
+        # （成交文件只在末尾追加，之后补到的成交最先覆盖这根 K 线）
+        self.first_uncovered: Any = None
+        self.imbalance_sum = RollingSum(VPIN_WINDOW)
+        self.volume_sum = RollingSum(VPIN_WINDOW)
+        self.bucket_vpin = BucketVPIN(vpin_bucket_volume) if vpin_bucket_volume is not None else None
+        self.vol = RollingVariance(VOL_WINDOW)
+        self.vol_median = RollingQuantile(REGIME_WINDOW, REGIME_QUANTILE)
+        # 仅在未提供长周期趋势时创建（43200 行缓冲）
+        self.close_lag: LagBuffer | None = None
+        self.close_lag_30d: LagBuffer | None = None
+        self.retention = retention
+        self.count = 0
+        # 双倍长度环形缓冲：第 k 个值写入 k % retention 与 k % retention + retention
+        self.outputs: dict[str, np.ndarray] = {
+            name: np.full(2 * retention, np.nan) for name in INTERMEDIATE_NAMES if name != "regime_state"
+        }
+        self.outputs["regime_state"] = np.ones(2 * retention, dtype=np.int64)
+
+    def step(
+        self,
+        date: Any,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+        trend: float | None = None,
+        trend_30d: float | None = None,
+        buy_volume: float = math.nan,
+        sell_volume: float = math.nan,
+    ) -> None:
+        """用一根新收盘的 K 线更新状态
+
+        trend / trend_30d 为 None 时用滞后缓冲计算；buy_volume / sell_volume 为该 K 线的真实主动买卖量
+        （NaN 表示没有成交覆盖，用 Money Flow 近似）。
+        """
+        price_change = _ratio(close, self.prev_close) - 1.0
+        self.prev_close = close
+
+        spread = high - low
+        if spread != 0.0:
+            mf_multiplier = ((close - low) - (high - close)) / spread
+        else:
+            mf_multiplier = math.nan
+        if math.isnan(mf_multiplier):
+            mf_multiplier = 0.0
+        mf_volume = mf_multiplier * volume
+        covered = not math.isnan(buy_volume)
+        if covered:
+            buy_pressure, sell_pressure = buy_volume, sell_volume
+            flow_volume = buy_volume + sell_volume
+            self.first_uncovered = None
+        else:
+            buy_pressure = mf_volume if mf_volume > 0 else 0.0
+            sell_pressure = -mf_volume if mf_volume < 0 else 0.0
+            flow_volume = volume
+            if self.order_flow and self.first_uncovered is None:
+                self.first_uncovered = date
+        volume_imbalance = abs(buy_pressure - sell_pressure)
+
+        realized_vol = self.vol.update(price_change)
+        if self.bucket_vpin is None:
+            vpin = self.imbalance_sum.update(volume_imbalance) / (self.volume_sum.update(flow_volume) + 1e-10)
+        else:
+            if covered:
+                buy_fraction = _ratio(buy_volume, flow_volume)
+            else:
+                buy_fraction = float(bulk_buy_fraction(price_change, realized_vol))
+            vpin = self.bucket_vpin.update(flow_volume, buy_fraction)
+        vol_median = self.vol_median.update(realized_vol)
+
+        if trend is None or trend_30d is None:
+            if self.close_lag is None or self.close_lag_30d is None:
+                self.close_lag = LagBuffer(TREND_PERIOD)
+                self.close_lag_30d = LagBuffer(TREND_30D_PERIOD)
+            lagged = self.close_lag.update(close)
+            trend = _ratio(close - lagged, lagged)
+            lagged_30d = self.close_lag_30d.update(close)
+            trend_30d = _ratio(close - lagged_30d, lagged_30d)
+
+        regime = 1
+        if realized_vol > vol_median:
+            if trend > REGIME_TREND_THRESHOLD:
+                regime = 2
+            elif trend < -REGIME_TREND_THRESHOLD:
+                regime = 0
+
+        self.last_date = date
+        slot = self.count % self.retention
+        self.count += 1
+        outputs = self.outputs
+        for name, value in (
+            ("price_change", price_change),
+            ("mf_multiplier", mf_multiplier),
+            ("mf_volume", mf_volume),
+            ("buy_pressure", buy_pressure),
+            ("sell_pressure", sell_pressure),
+            ("volume_imbalance", volume_imbalance),
+            ("vpin", vpin),
+            ("realized_vol", realized_vol),
+            ("trend", trend),
+            ("trend_30d", trend_30d),
+            ("regime_state", regime),
+        ):
+            buffer = outputs[name]
+            buffer[slot] = value
+            buffer[slot + self.retention] = value
+
+    def tail(self, n: int) -> dict[str, np.ndarray]:
+        """最近 n 行输出（n <= retention；缓冲区上的只读视图，不复制）"""
+        end = (self.count - 1) % self.retention + self.retention + 1
+        result = {}
+        for name, buffer in self.outputs.items():
+            view = buffer[end - n:end]
+            view.flags.writeable = False
+            result[name] = view
+        return result
+
+
+class StreamingFeatureEngine:
+    """按交易对维护滚动状态的流式特征引擎
+
+    每次调用 update 只处理上次之后新收盘的 K 线（每根 O(1)），然后返回与输入
+    DataFrame 对齐的中间量数组（环形缓冲上的只读视图，下一次更新同一交易对后失效，需要保留时请复制）。
+    无法衔接（首次调用、数据断档）时用整个 DataFrame 重新预热；
+    无法服务的请求（如 FreqAI 训练用的长窗口）返回 None，由调用方回退到批量路径。
+    """
+
+    def __init__(self, retention: int = 5000, max_bootstrap_rows: int = 5000):
+        """初始化引擎
+
+        Args:
+            retention: 每个交易对保留的输出行数（需 >= 策略 DataFrame 长度）
+            max_bootstrap_rows: 允许用于预热的最大行数，超过则返回 None
+        """
+        self.retention = retention
+        self.max_bootstrap_rows = max_bootstrap_rows
+        self._states: dict[str, _PairState] = {}
+        self._lock = threading.Lock()
+        self.candles_processed = 0
+        self.bootstraps = 0
+
+    def reset(self, pair: str | None = None) -> None:
+        """清除状态
+
+        Args:
+            pair: 仅清除该交易对（None 表示全部）
+        """
+        with self._lock:
+            if pair is None:
+                self._states.clear()
+            else:
+                self._states.pop(pair, None)
+
+    def update(
+        self,
+        dataframe: pd.DataFrame,
+        pair: str,
+        long_horizon: dict[str, np.ndarray] | Callable[[int], dict[str, np.ndarray]] | None = None,
+        vpin_bucket_volume: float | None = None,
+        order_flow: dict[str, np.ndarray] | None = None,
+    ) -> dict[str, np.ndarray] | None:
+        """用新收盘的 K 线更新状态并返回对齐后的中间量
+
+        Args:
+            dataframe: 含 date 列、按时间升序的 OHLCV 数据框
+            pair: 交易对
+            long_horizon: 与 dataframe 对齐的 trend / trend_30d（只读取新行），或传入起始行号 start、
+                返回 dataframe 第 start 行起的 trend / trend_30d 的函数（只为新行计算）
+            vpin_bucket_volume: 成交量同步 VPIN 的每桶成交量（None 为滚动失衡比；变化时重新预热）
+            order_flow: 与 dataframe 对齐的订单流（见 trades.align_order_flow，只读取新行；
+                开启 / 关闭，或已按近似值处理的 K 线之后被成交覆盖时重新预热）
+
+        Returns:
+            中间量字典（与 compute_intermediates 同键），无法服务时返回 None
+        """
+        n = len(dataframe)
+        if n == 0 or n > self.retention:
+            return None
+
+        dates = dataframe["date"]
+        with self._lock:
+            state = self._states.get(pair)
+            start = self._resume_position(state, dates)
+            if state is not None and (
+                state.vpin_bucket_volume != vpin_bucket_volume
+                or state.order_flow != (order_flow is not None)
+                or self._flow_arrived(state, dates, order_flow)
+            ):
+                start = None
+            if state is None or start is None:
+                if n > self.max_bootstrap_rows:
+                    return None
+                if state is not None and dates.iloc[-1] <= state.last_date:
+                    # 旧数据，不回退状态
+                    return None
+                state = _PairState(self.retention, vpin_bucket_volume, order_flow is not None)
+                self._states[pair] = state
+                self.bootstraps += 1
+                start = 0
+
+            if start < n:
+                rows = slice(start, n)
+                high = dataframe["high"].to_numpy(dtype=np.float64)[rows]
+                low = dataframe["low"].to_numpy(dtype=np.float64)[rows]
+                close = dataframe["close"].to_numpy(dtype=np.float64)[rows]
+                volume = dataframe["volume"].to_numpy(dtype=np.float64)[rows]
+                date_values = dates.iloc[rows].tolist()
+                if order_flow is None:
+                    buy = sell = np.full(n - start, np.nan)
+                else:
+                    buy = np.asarray(order_flow["buy_volume"], dtype=np.float64)[rows]
+                    sell = np.asarray(order_flow["sell_volume"], dtype=np.float64)[rows]
+                if long_horizon is None:
+                    for i, date in enumerate(date_values):
+                        state.step(date, high[i], low[i], close[i], volume[i], buy_volume=buy[i], sell_volume=sell[i])
+                else:
+                    if callable(long_horizon):
+                        trends = long_horizon(start)
+                        trend, trend_30d = trends["trend"], trends["trend_30d"]
+                    else:
+                        trend, trend_30d = long_horizon["trend"][rows], long_horizon["trend_30d"][rows]
+                    for i, date in enumerate(date_values):
+                        state.step(
+                            date, high[i], low[i], close[i], volume[i], float(trend[i]), float(trend_30d[i]),
+                            buy[i], sell[i],
+                        )
+                self.candles_processed += n - start
+
+            if state.last_date != dates.iloc[-1] or state.count < n:
+                return None
+            return state.tail(n)
+
+    @staticmethod
+    def _flow_arrived(state: _PairState, dates: pd.Series, order_flow: dict[str, np.ndarray] | None) -> bool:
+        """按近似值处理过的第一根 K 线现在是否已有成交覆盖
+
+        这根 K 线滑出数据框时，数据框内的行都是在它之后按近似值处理的，改为检查第一行。
+        """
+        if order_flow is None or state.first_uncovered is None:
+            return False
+        position = int(dates.searchsorted(state.first_uncovered))
+        if position >= len(dates):
+            return False
+        if dates.iloc[position] != state.first_uncovered:
+            state.first_uncovered = dates.iloc[0]
+            position = 0
+        return not math.isnan(order_flow["buy_volume"][position])
+
+    @staticmethod
+    def _resume_position(state: _PairState | None, dates: pd.Series) -> int | None:
+        """返回需要处理的第一行位置；无法衔接时返回 None"""
+        if state is None or state.last_date is None:
+            return None
+        position = int(dates.searchsorted(state.last_date))
+        if position >= len(dates) or dates.iloc[position] != state.last_date:
+            return None
+        return position + 1
+
+    def stats(self) -> dict[str, int]:
+        """引擎统计
+
+        Returns:
+            包含 pairs、candles_processed、bootstraps 的字典
+        """
+        return {
+            "pairs": len(self._states),
+            "candles_processed": self.candles_processed,
+            "bootstraps": self.bootstraps,
+        }
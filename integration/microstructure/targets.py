@@ -0,0 +1,133 @@
+"""多窗口前向极值标签
+
+set_freqai_targets 与标签研究脚本都需要未来 w 根 K 线内的最高价/最低价：
+
+    future_max(t) = max(high[t+1 .. t+w])   # 即 high.rolling(w).max().shift(-w)
+    future_min(t) = min(low[t+1 .. t+w])
+
+原写法每个窗口都要复制整张表再跑一遍 rolling。这里对 high / low 各构建一次稀疏表
+（第 k 层为长度 2^k 的区间极值），之后任意窗口都用两个重叠的 2^k 区间在 O(n) 内回答。
+
+与 pandas 写法逐值一致：窗口不足（最后 w 行）或窗口内含 NaN 时为 NaN。
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# 交易成本（与策略一致）：双向 (手续费 0.1% + 滑点 0.1%)
+FEE = 0.001
+SLIPPAGE = 0.001
+TOTAL_COST = 2 * (FEE + SLIPPAGE)
+
+# 单个窗口的标签名称
+TARGET_NAMES = (
+    "future_max",
+    "future_min",
+    "potential_long_return",
+    "potential_short_return",
+    "target_roi",
+)
+
+
+class ForwardExtrema:
+    """前向区间极值（稀疏表）
+
+    预处理 O(n log H)，每个窗口查询 O(n)，H 为最大窗口。
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray, max_horizon: int):
+        """构建稀疏表
+
+        Args:
+            high: 最高价
+            low: 最低价
+            max_horizon: 支持的最大窗口
+        """
+        if max_horizon < 1:
+            msg = f"max_horizon 必须 >= 1，实际 {max_horizon}"
+            raise ValueError(msg)
+        self.max_horizon = max_horizon
+        self._max_levels = self._build(np.asarray(high, dtype=np.float64), max_horizon, np.maximum)
+        self._min_levels = self._build(np.asarray(low, dtype=np.float64), max_horizon, np.minimum)
+
+    @staticmethod
+    def _build(values: np.ndarray, max_horizon: int, combine: np.ufunc) -> list[np.ndarray]:
+        # levels[k][i] = combine(values[i : i + 2^k])，只保留完整区间（长度 n - 2^k + 1）
+        levels = [values]
+        span = 1
+        while span * 2 <= max_horizon and span * 2 <= len(values):
+            previous = levels[-1]
+            levels.append(combine(previous[:-span], previous[span:]))
+            span *= 2
+        return levels
+
+    def _query(self, levels: list[np.ndarray], horizon: int, combine: np.ufunc) -> np.ndarray:
+        n = len(levels[0])
+        result = np.full(n, np.nan)
+        count = n - horizon  # 有完整前向窗口的行数
+        if count <= 0:
+            return result
+        # 区间 [t+1, t+horizon] = [t+1, t+span] ∪ [t+horizon-span+1, t+horizon]
+        level = horizon.bit_length() - 1
+        span = 1 << level
+        table = levels[level]
+        combine(table[1:count + 1], table[horizon - span + 1:horizon - span + 1 + count], out=result[:count])
+        return result
+
+    def _check(self, horizon: int) -> None:
+        if not 1 <= horizon <= self.max_horizon:
+            msg = f"horizon 必须在 [1, {self.max_horizon}] 内，实际 {horizon}"
+            raise ValueError(msg)
+
+    def future_max(self, horizon: int) -> np.ndarray:
+        """未来 horizon 根 K 线的最高价（不含当前 K 线）"""
+        self._check(horizon)
+        return self._query(self._max_levels, horizon, np.maximum)
+
+    def future_min(self, horizon: int) -> np.ndarray:
+        """未来 horizon 根 K 线的最低价（不含当前 K 线）"""
+        self._check(horizon)
+        return self._query(self._min_levels, horizon, np.minimum)
+
+
+def compute_targets(
+    dataframe: pd.DataFrame,
+    horizons: int | list[int] | tuple[int, ...],
+    total_cost: float = TOTAL_COST,
+) -> dict[int, dict[str, np.ndarray]]:
+    """一次调用计算多个窗口的前向极值与潜在收益标签
+
+    Args:
+        dataframe: OHLCV 数据框
+        horizons: 前向窗口（K 线数量），单个或多个
+        total_cost: 往返交易成本（从潜在收益中扣除）
+
+    Returns:
+        窗口 -> {名称 -> 数组}，名称见 TARGET_NAMES；
+        target_roi = max(做多潜在收益, 做空潜在收益)
+    """
+    horizon_list = [horizons] if isinstance(horizons, int) else list(horizons)
+    if not horizon_list:
+        msg = "horizons 不能为空"
+        raise ValueError(msg)
+
+    close = dataframe["close"].to_numpy(dtype=np.float64)
+    extrema = ForwardExtrema(dataframe["high"].to_numpy(), dataframe["low"].to_numpy(), max(horizon_list))
+
+    result = {}
+    for horizon in horizon_list:
+        future_max = extrema.future_max(horizon)
+        future_min = extrema.future_min(horizon)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            long_return = (future_max / close - 1) - total_cost
+            short_return = (1 - future_min / close) - total_cost
+        result[horizon] = {
+            "future_max": future_max,
+            "future_min": future_min,
+            "potential_long_return": long_return,
+            "potential_short_return": short_return,
+            "target_roi": np.maximum(long_return, short_return),
+        }
+    return result
@@ -0,0 +1,281 @@
+"""逐笔成交订单流聚合
+
+策略在没有带方向的成交量时用 Money Flow 乘数从 OHLC 近似买卖压力。这里从 freqtrade 下载的逐笔成交
+（``dataformat_trades: feather``，列为 timestamp/id/type/side/price/amount/cost）直接聚合出每根 K 线的：
+
+- buy_volume / sell_volume：主动买入 / 卖出成交量
+- trade_count：成交笔数
+- vwap：成交量加权均价
+
+成交文件按 Arrow 记录批次逐批读取（不映射整个文件），每批聚合后即释放，内存只与批大小和 K 线数有关，
+与文件大小无关。方向优先取交易所给出的 side，缺失时用 tick rule（价格上涨记为买、下跌记为卖、
+持平沿用上一笔方向）；两者都无法判断的成交（文件开头的持平成交）买卖各计一半。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .long_horizon import timeframe_to_timedelta
+
+# 聚合输出列
+ORDER_FLOW_COLUMNS = ("buy_volume", "sell_volume", "trade_count", "vwap")
+
+# 每次读入的最大成交笔数
+DEFAULT_BATCH_ROWS = 1_000_000
+
+CLASSIFICATIONS = ("side", "tick")
+
+_PAIR_FILENAME_CHARS = ("/", " ", ".", "@", "$", "+", ":")
+
+
+def pair_to_filename(pair: str) -> str:
+    """交易对在 freqtrade 数据文件名中的写法（如 ETH/USDT:USDT -> ETH_USDT_USDT）"""
+    for char in _PAIR_FILENAME_CHARS:
+        pair = pair.replace(char, "_")
+    return pair
+
+
+def trades_path(datadir: str | Path, pair: str, trading_mode: str = "spot", extension: str = "feather") -> Path:
+    """freqtrade 逐笔成交文件路径（与 freqtrade 的 pair_trades_filename 一致）
+
+    Args:
+        datadir: 数据目录（配置中的 datadir）
+        pair: 交易对
+        trading_mode: 交易模式（futures 时位于 futures 子目录）
+        extension: 文件格式
+
+    Returns:
+        文件路径
+    """
+    directory = Path(datadir) / "futures" if trading_mode == "futures" else Path(datadir)
+    return directory / f"{pair_to_filename(pair)}-trades.{extension}"
+
+
+def iter_trade_batches(
+    path: str | Path,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """逐批读取 Feather（Arrow IPC）成交文件
+
+    Args:
+        path: 成交文件路径
+        batch_rows: 每批最大行数（文件中的记录批次更大时再切分）
+
+    Yields:
+        (timestamp 毫秒 int64, price, amount, side 方向 int8：买 1 / 卖 -1 / 未知 0)
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if batch_rows < 1:
+        msg = f"batch_rows 必须 >= 1，实际 {batch_rows}"
+        raise ValueError(msg)
+
+    with pa.OSFile(str(path)) as source:
+        reader = pa.ipc.open_file(source)
+        has_side = "side" in reader.schema.names
+        for index in range(reader.num_record_batches):
+            record_batch = reader.get_batch(index)
+            for offset in range(0, record_batch.num_rows, batch_rows):
+                batch = record_batch.slice(offset, batch_rows)
+                timestamp = batch.column("timestamp").cast(pa.int64()).to_numpy(zero_copy_only=False)
+                price = batch.column("price").cast(pa.float64()).to_numpy(zero_copy_only=False)
+                amount = batch.column("amount").cast(pa.float64()).to_numpy(zero_copy_only=False)
+                side = np.zeros(len(timestamp), dtype=np.int8)
+                if has_side:
+                    column = batch.column("side")
+                    side[pc.fill_null(pc.equal(column, "buy"), False).to_numpy(zero_copy_only=False)] = 1
+                    side[pc.fill_null(pc.equal(column, "sell"), False).to_numpy(zero_copy_only=False)] = -1
+                yield timestamp, price, amount, side
+
+
+class OrderFlowAggregator:
+    """按 K 线聚合逐笔成交（流式，成交须按时间升序输入）
+
+    跨批次保留 tick rule 状态（上一笔价格与方向）以及尚未收盘的最后一根 K 线的部分和。
+    """
+
+    def __init__(self, timeframe: str = "1m", classification: str = "side"):
+        """初始化聚合器
+
+        Args:
+            timeframe: K 线周期
+            classification: 方向判定方式（side：优先用成交的 side，缺失时 tick rule；tick：只用 tick rule）
+        """
+        if classification not in CLASSIFICATIONS:
+            msg = f"classification 必须是 {CLASSIFICATIONS} 之一，实际 {classification!r}"
+            raise ValueError(msg)
+
+        self.timeframe = timeframe
+        self.classification = classification
+        self.step_ms = int(timeframe_to_timedelta(timeframe) / pd.Timedelta(milliseconds=1))
+        self.trades = 0
+        self._last_timestamp: int | None = None
+        self._last_price: float | None = None
+        self._last_tick = 0
+        self._pending: tuple[int, float, float, int, float, float] | None = None
+        self._chunks: list[tuple[np.ndarray, ...]] = []
+
+    def _tick_signs(self, price: np.ndarray) -> np.ndarray:
+        """tick rule 方向（持平沿用上一笔非零方向，跨批次延续）"""
+        previous = np.empty_like(price)
+        previous[0] = price[0] if self._last_price is None else self._last_price
+        previous[1:] = price[:-1]
+        tick = np.sign(price - previous).astype(np.int8)
+
+        # 每个位置上最近一次非零 tick 的下标（没有时为 -1，沿用上一批的方向）
+        last_nonzero = np.where(tick != 0, np.arange(len(tick)), -1)
+        np.maximum.accumulate(last_nonzero, out=last_nonzero)
+        signs = np.where(last_nonzero >= 0, tick[np.maximum(last_nonzero, 0)], self._last_tick).astype(np.int8)
+
+        self._last_price = float(price[-1])
+        self._last_tick = int(signs[-1])
+        return signs
+
+    def update(
+        self,
+        timestamp: np.ndarray,
+        price: np.ndarray,
+        amount: np.ndarray,
+        side: np.ndarray | None = None,
+    ) -> None:
+        """聚合一批成交
+
+        Args:
+            timestamp: 成交时间（毫秒）
+            price: 成交价
+            amount: 成交量
+            side: 方向（1 / -1 / 0，可选）
+        """
+        timestamp = np.asarray(timestamp, dtype=np.int64)
+        if not len(timestamp):
+            return
+        price = np.asarray(price, dtype=np.float64)
+        amount = np.asarray(amount, dtype=np.float64)
+        if (self._last_timestamp is not None and timestamp[0] < self._last_timestamp) or np.any(
+            np.diff(timestamp) < 0
+        ):
+            msg = "成交未按时间升序排列"
+            raise ValueError(msg)
+        self._last_timestamp = int(timestamp[-1])
+        self.trades += len(timestamp)
+
+        signs = self._tick_signs(price)
+        if self.classification == "side" and side is not None:
+            side = np.asarray(side, dtype=np.int8)
+            signs = np.where(side != 0, side, signs)
+
+        # 方向未知的成交买卖各计一半
+        weight = np.where(signs > 0, 1.0, np.where(signs < 0, 0.0, 0.5))
+        buy = amount * weight
+        sell = amount - buy
+
+        bucket = timestamp - timestamp % self.step_ms
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        buckets = bucket[starts]
+        sums = [
+            np.add.reduceat(values, starts)
+            for values in (buy, sell, np.ones(len(bucket)), price * amount, amount)
+        ]
+        buy_sum, sell_sum, count, notional, volume = sums
+
+        if self._pending is not None:
+            if self._pending[0] == buckets[0]:
+                # 上一批最后一根 K 线延续到本批
+                buy_sum[0] += self._pending[1]
+                sell_sum[0] += self._pending[2]
+                count[0] += self._pending[3]
+                notional[0] += self._pending[4]
+                volume[0] += self._pending[5]
+            else:
+                self._chunks.append(tuple(np.array([value]) for value in self._pending))
+
+        # 最后一根可能在下一批继续，暂存为部分和
+        self._pending = (
+            int(buckets[-1]), float(buy_sum[-1]), float(sell_sum[-1]), int(count[-1]),
+            float(notional[-1]), float(volume[-1]),
+        )
+        if len(buckets) > 1:
+            self._chunks.append((buckets[:-1], buy_sum[:-1], sell_sum[:-1], count[:-1], notional[:-1], volume[:-1]))
+
+    def result(self) -> pd.DataFrame:
+        """已聚合的 K 线（含尚未收盘的最后一根）
+
+        Returns:
+            列为 date 与 ORDER_FLOW_COLUMNS 的数据框（date 为 K 线开盘时间，UTC）
+        """
+        chunks = list(self._chunks)
+        if self._pending is not None:
+            chunks.append(tuple(np.array([value]) for value in self._pending))
+        if chunks:
+            buckets, buy, sell, count, notional, volume = (np.concatenate(parts) for parts in zip(*chunks))
+        else:
+            buckets = np.empty(0, dtype=np.int64)
+            buy = sell = count = notional = volume = np.empty(0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(volume > 0, notional / volume, np.nan)
+        return pd.DataFrame({
+            "date": pd.to_datetime(buckets.astype(np.int64), unit="ms", utc=True),
+            "buy_volume": buy.astype(np.float64),
+            "sell_volume": sell.astype(np.float64),
+            "trade_count": count.astype(np.int64),
+            "vwap": vwap,
+        })
+
+
+def aggregate_trades(
+    path: str | Path,
+    timeframe: str = "1m",
+    classification: str = "side",
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> pd.DataFrame:
+    """把成交文件聚合为 K 线订单流
+
+    Args:
+        path: Feather 成交文件
+        timeframe: K 线周期
+        classification: 方向判定方式（见 OrderFlowAggregator）
+        batch_rows: 每批最大行数
+
+    Returns:
+        列为 date 与 ORDER_FLOW_COLUMNS 的数据框
+    """
+    aggregator = OrderFlowAggregator(timeframe, classification)
+    for timestamp, price, amount, side in iter_trade_batches(path, batch_rows):
+        aggregator.update(timestamp, price, amount, side)
+    return aggregator.result()
+
+
+def align_order_flow(dates: pd.Series | pd.DatetimeIndex, flow: pd.DataFrame) -> dict[str, np.ndarray]:
+    """把订单流按 K 线开盘时间对齐
+
+    成交文件覆盖范围内没有成交的 K 线记为 0（vwap 为 NaN）；覆盖范围之外的行全部为 NaN，
+    供下游回退到 OHLC 近似。
+
+    Args:
+        dates: K 线开盘时间
+        flow: aggregate_trades 的输出
+
+    Returns:
+        ORDER_FLOW_COLUMNS 中各列 -> 与 dates 等长的 float64 数组
+    """
+    keys = pd.DatetimeIndex(dates).as_unit("ns").asi8
+    flow_keys = pd.DatetimeIndex(flow["date"]).as_unit("ns").asi8
+    n = len(keys)
+    if not len(flow_keys):
+        return {name: np.full(n, np.nan) for name in ORDER_FLOW_COLUMNS}
+
+    position = np.minimum(np.searchsorted(flow_keys, keys), len(flow_keys) - 1)
+    found = flow_keys[position] == keys
+    covered = (keys >= flow_keys[0]) & (keys <= flow_keys[-1])
+    aligned = {}
+    for name in ORDER_FLOW_COLUMNS:
+        values = flow[name].to_numpy(dtype=np.float64)[position]
+        missing = np.nan if name == "vwap" else 0.0
+        aligned[name] = np.where(found, values, np.where(covered, missing, np.nan))
+    return aligned
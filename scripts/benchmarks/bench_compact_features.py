@@ -0,0 +1,159 @@
+"""紧凑特征（float32 / int8）基准测试
+
+按 FreqAI 的展开方式构造训练特征表：每个 include_timeframes 时间框架上计算全部 %- 特征，
+对齐回基础时间框架后再加 include_shifted_candles 个平移副本，分别以 float64 与紧凑模式构建，对比：
+
+- 特征表内存（DataFrame.memory_usage）与构建峰值内存（tracemalloc）
+- 训练耗时（已安装 lightgbm 时用 LGBMRegressor，否则用 numpy 岭回归作为替代）
+- 预测漂移：紧凑模式与 float64 模型预测之差相对 float64 预测标准差的最大值
+
+漂移超过 --tolerance 时返回非零退出码。
+
+用法:
+    python scripts/benchmarks/bench_compact_features.py [--days 60] [--timeframes 1m 5m 15m] [--shifts 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.features import compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, REGIME_COLUMN, build_features, feature_dtypes
+from microstructure.long_horizon import resample_ohlcv
+from microstructure.targets import compute_targets
+from synthetic_data import generate_ohlcv
+
+FEATURES = (*FEATURE_COLUMNS, REGIME_COLUMN)
+
+
+def build_training_frame(df: pd.DataFrame, timeframes: list[str], shifts: int, compact: bool) -> pd.DataFrame:
+    """按 FreqAI 展开方式构造特征表（各时间框架特征 + 平移副本）
+
+    Args:
+        df: 基础时间框架 OHLCV
+        timeframes: include_timeframes（第一个为基础时间框架）
+        shifts: include_shifted_candles
+        compact: 是否使用紧凑模式
+
+    Returns:
+        与 df 等长的特征表
+    """
+    dtype, regime_dtype = feature_dtypes(compact)
+    blocks = []
+    for tf in timeframes:
+        frame = df if tf == timeframes[0] else resample_ohlcv(df, tf)
+        features = build_features(frame, compute_intermediates(frame), dtype, regime_dtype)[["date", *FEATURES]]
+        if tf != timeframes[0]:
+            # 高周期 K 线收盘后才可用：按收盘时间对齐并前向填充（与 merge_informative_pair 一致）
+            features["date"] = features["date"] + (frame["date"].iloc[1] - frame["date"].iloc[0]) - (
+                df["date"].iloc[1] - df["date"].iloc[0]
+            )
+            features = pd.merge_asof(df[["date"]], features, on="date")
+            # 首根高周期 K 线收盘前没有数据，整数列被提升为浮点：以 -1 填充后还原（这些行的其他特征为 NaN，训练时被剔除）
+            features[REGIME_COLUMN] = features[REGIME_COLUMN].fillna(-1).astype(regime_dtype)
+        features = features.drop(columns="date").add_suffix(f"_{tf}")
+        blocks.append(features)
+        for shift in range(1, shifts + 1):
+            blocks.append(features.shift(shift).add_suffix(f"_shift-{shift}"))
+    return pd.concat(blocks, axis=1)
+
+
+def _train_predict(x_train: np.ndarray, y_train: np.ndarray, x_test: np.ndarray) -> tuple[str, float, np.ndarray]:
+    """训练并预测，返回 (模型名, 训练耗时, 预测)"""
+    try:
+        from lightgbm import LGBMRegressor
+    except ImportError:
+        pass
+    else:
+        start = time.perf_counter()
+        model = LGBMRegressor(n_estimators=200, learning_rate=0.05, num_leaves=64, random_state=0, verbose=-1)
+        model.fit(x_train, y_train)
+        elapsed = time.perf_counter() - start
+        return "lightgbm", elapsed, model.predict(x_test).astype(np.float64)
+
+    # 岭回归（正规方程在 float64 中求解，输入精度差异体现在 Gram 矩阵上）
+    start = time.perf_counter()
+    mean = x_train.mean(axis=0, dtype=np.float64)
+    scale = x_train.std(axis=0, dtype=np.float64) + 1e-12
+    design = ((x_train - mean) / scale).astype(np.float64)
+    gram = design.T @ design + np.eye(design.shape[1]) * len(design) * 1e-3
+    coef = np.linalg.solve(gram, design.T @ (y_train - y_train.mean()))
+    elapsed = time.perf_counter() - start
+    prediction = ((x_test - mean) / scale).astype(np.float64) @ coef + y_train.mean()
+    return "ridge", elapsed, prediction
+
+
+def run(days: int, timeframes: list[str], shifts: int) -> dict:
+    """运行一轮基准"""
+    df = generate_ohlcv(days * 1440)
+    target = compute_targets(df, 5)[5]["target_roi"]
+
+    results = {}
+    for compact in (False, True):
+        tracemalloc.start()
+        start = time.perf_counter()
+        table = build_training_frame(df, timeframes, shifts, compact)
+        build_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        valid = table.notna().all(axis=1).to_numpy() & np.isfinite(target)
+        x = table.to_numpy()[valid]
+        y = target[valid]
+        split = int(len(x) * 0.75)
+        model, train_time, prediction = _train_predict(x[:split], y[:split], x[split:])
+        results[compact] = {
+            "columns": table.shape[1],
+            "table_mb": table.memory_usage(deep=True).sum() / 1024 / 1024,
+            "peak_mb": peak / 1024 / 1024,
+            "build_time": build_time,
+            "model": model,
+            "train_time": train_time,
+            "prediction": prediction,
+        }
+
+    reference, compact = results[False]["prediction"], results[True]["prediction"]
+    drift = np.abs(compact - reference).max() / (reference.std() + 1e-12)
+    return {"rows": len(df), "float64": results[False], "compact": results[True], "drift": drift}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="紧凑特征基准测试")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--timeframes", nargs="+", default=["1m", "5m", "15m"])
+    parser.add_argument("--shifts", type=int, default=2)
+    parser.add_argument("--tolerance", type=float, default=0.01, help="最大预测漂移（相对 float64 预测标准差）")
+    args = parser.parse_args()
+
+    r = run(args.days, args.timeframes, args.shifts)
+    base, compact = r["float64"], r["compact"]
+    print(f"行数: {r['rows']}，特征列: {base['columns']}，模型: {base['model']}")
+    print(f"{'':>10} {'特征表':>10} {'构建峰值':>10} {'构建耗时':>10} {'训练耗时':>10}")
+    for name, x in (("float64", base), ("compact", compact)):
+        print(
+            f"{name:>10} {x['table_mb']:>8.1f}MB {x['peak_mb']:>8.1f}MB "
+            f"{x['build_time']:>9.2f}s {x['train_time']:>9.2f}s"
+        )
+    print(f"特征表内存节省: {1 - compact['table_mb'] / base['table_mb']:.1%}")
+    print(f"训练耗时变化: {compact['train_time'] / base['train_time'] - 1:+.1%}")
+    print(f"预测漂移: {r['drift']:.2e}（容差 {args.tolerance:.0e}）")
+    if r["drift"] > args.tolerance:
+        print("预测漂移超出容差")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""特征融合内核基准测试
+
+对比 feature_engineering_expand_all 的两种实现（共享中间量预先计算，不计入耗时）：
+
+- pandas: 策略原写法（逐列 pandas 运算，临时列留在 DataFrame 上）
+- kernel: build_features（预分配矩阵 + out= 写入）
+
+同时用 tracemalloc 记录峰值内存。
+
+用法:
+    python scripts/benchmarks/bench_feature_kernel.py [--rows 86400 525600 1576800]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.features import compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, build_features
+from synthetic_data import generate_ohlcv
+
+
+def _pandas_features(df: pd.DataFrame, intermediates: dict) -> pd.DataFrame:
+    """策略原 pandas 写法"""
+    for name in ("price_change", "mf_multiplier", "mf_volume", "buy_pressure", "sell_pressure", "volume_imbalance"):
+        df[name] = intermediates[name]
+    df["%-price_change"] = intermediates["price_change"]
+    df["%-vpin"] = intermediates["vpin"]
+    df["tr"] = np.maximum(
+        df["high"] - df["low"],
+        np.maximum(abs(df["high"] - df["close"].shift(1)), abs(df["low"] - df["close"].shift(1)))
+    )
+    df["%-atr_14"] = df["tr"].rolling(14).mean()
+    df["%-atr_normalized"] = df["%-atr_14"] / df["close"]
+    for window in [12, 24, 48]:
+        df[f"%-realized_vol_{window}"] = df["close"].pct_change().rolling(window).std()
+    for window in [5, 10, 15]:
+        df[f"%-momentum_{window}"] = df["close"].pct_change(window)
+    df["%-volume_sma_12"] = df["volume"].rolling(12).mean()
+    df["%-volume_ratio"] = df["volume"] / (df["%-volume_sma_12"] + 1e-10)
+    df["bid_approx"] = df["low"]
+    df["ask_approx"] = df["high"]
+    df["bid_volume_approx"] = df["buy_pressure"]
+    df["ask_volume_approx"] = df["sell_pressure"]
+    total_vol = df["bid_volume_approx"] + df["ask_volume_approx"]
+    df["%-microprice"] = np.where(
+        total_vol > 0,
+        (df["ask_volume_approx"] * df["bid_approx"] + df["bid_volume_approx"] * df["ask_approx"]) / total_vol,
+        (df["bid_approx"] + df["ask_approx"]) / 2
+    )
+    df["%-microprice_vs_close"] = (df["%-microprice"] - df["close"]) / df["close"]
+    df["%-amihud"] = abs(df["%-price_change"]) / (df["volume"] + 1e-10)
+    df["%-amihud_ma"] = df["%-amihud"].rolling(20).mean()
+    df["%-kyle_lambda"] = abs(df["%-price_change"]) / (df["volume"] + 1e-10)
+    df["%-kyle_lambda_ma"] = df["%-kyle_lambda"].rolling(20).mean()
+    df["%-realized_vol"] = intermediates["realized_vol"]
+    df["%-price_range"] = (df["high"] - df["low"]) / df["close"]
+    df["%-price_range_ma"] = df["%-price_range"].rolling(20).mean()
+    df["%-volume_vol"] = df["volume"].rolling(20).std() / (df["volume"].rolling(20).mean() + 1e-10)
+    df["%-trend"] = intermediates["trend"]
+    df["%-regime_state"] = intermediates["regime_state"]
+    df["%-volume_ratio"] = df["volume"] / (df["volume"].rolling(20).mean() + 1e-10)
+    df["%-momentum_5"] = (df["close"] - df["close"].shift(5)) / df["close"].shift(5)
+    df["%-momentum_10"] = (df["close"] - df["close"].shift(10)) / df["close"].shift(10)
+    return df
+
+
+def _measure(func: Callable[[], pd.DataFrame], repeat: int) -> tuple[float, float, pd.DataFrame]:
+    """返回 (最短耗时秒, 峰值内存 MB, 结果)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024, result
+
+
+def run(n_rows: int, repeat: int = 3) -> dict:
+    """对给定行数运行一轮基准
+
+    Args:
+        n_rows: 行数
+        repeat: 计时重复次数（取最短）
+
+    Returns:
+        各实现耗时与峰值内存
+    """
+    df = generate_ohlcv(n_rows)
+    intermediates = compute_intermediates(df)
+
+    t_pandas, m_pandas, expected = _measure(lambda: _pandas_features(df.copy(), intermediates), repeat)
+    t_kernel, m_kernel, result = _measure(lambda: build_features(df.copy(), intermediates), repeat)
+
+    for name in FEATURE_COLUMNS:
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, atol=1e-15, equal_nan=True)
+
+    return {
+        "rows": n_rows,
+        "pandas_time": t_pandas,
+        "kernel_time": t_kernel,
+        "pandas_peak_mb": m_pandas,
+        "kernel_peak_mb": m_kernel,
+        "pandas_columns": expected.shape[1],
+        "kernel_columns": result.shape[1],
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="特征融合内核基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[86_400, 525_600, 1_576_800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'行数':>10} {'pandas':>10} {'kernel':>10} {'加速比':>8} {'pandas 峰值':>12} {'kernel 峰值':>12} {'列数':>10}")
+    print("-" * 80)
+    for n_rows in args.rows:
+        r = run(n_rows, args.repeat)
+        speedup = r["pandas_time"] / r["kernel_time"] if r["kernel_time"] > 0 else float("inf")
+        print(
+            f"{r['rows']:>10} {r['pandas_time']:>9.3f}s {r['kernel_time']:>9.3f}s {speedup:>7.1f}x "
+            f"{r['pandas_peak_mb']:>10.1f}MB {r['kernel_peak_mb']:>10.1f}MB "
+            f"{r['pandas_columns']:>4} -> {r['kernel_columns']:<4}"
+        )
+
+
+if __name__ == "__main__":
+    main()
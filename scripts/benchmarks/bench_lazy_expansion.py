@@ -0,0 +1,111 @@
+"""惰性特征展开基准测试
+
+按 FreqAI 的展开方式（各 include_timeframes 时间框架的特征 + include_shifted_candles 个平移副本，
+对齐回基础时间框架，丢弃含 NaN 的行）组装训练矩阵，对比：
+
+- eager: 逐列物化（平移副本 concat、merge_asof 对齐），再取有效行转为矩阵
+- lazy: LazyFeatureExpansion（各时间框架一份缓冲区 + 行号引用），valid_rows 后一次性 materialize
+
+输出两者的构建峰值内存（tracemalloc）与耗时，并校验矩阵逐位一致。
+
+用法:
+    python scripts/benchmarks/bench_lazy_expansion.py [--days 90] [--timeframes 1m 5m 15m 1h] [--shifts 2]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.expansion import LazyFeatureExpansion
+from microstructure.features import compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, REGIME_COLUMN, build_features
+from microstructure.long_horizon import resample_ohlcv, timeframe_to_timedelta
+from synthetic_data import generate_ohlcv
+
+FEATURES = [*FEATURE_COLUMNS, REGIME_COLUMN]
+
+
+def timeframe_features(df: pd.DataFrame, timeframes: list[str]) -> dict[str, pd.DataFrame]:
+    """各时间框架的特征（含 date 列），两种展开方式共用"""
+    return {
+        tf: build_features(frame, compute_intermediates(frame))[["date", *FEATURES]]
+        for tf in timeframes
+        for frame in [df if tf == timeframes[0] else resample_ohlcv(df, tf)]
+    }
+
+
+def eager_matrix(df: pd.DataFrame, features: dict[str, pd.DataFrame], shifts: int) -> tuple[list[str], np.ndarray]:
+    """逐列物化的训练矩阵（与 FreqAI 相同：各时间框架上平移后按收盘时刻并入）"""
+    base = next(iter(features))
+    blocks = []
+    for tf, frame in features.items():
+        expanded = pd.concat(
+            [frame] + [frame[FEATURES].shift(n).add_suffix(f"_shift-{n}") for n in range(1, shifts + 1)], axis=1
+        )
+        expanded = expanded.rename(columns=lambda c: c if c == "date" else f"{c}_{tf}")
+        expanded["date"] += timeframe_to_timedelta(tf) - timeframe_to_timedelta(base)
+        blocks.append(pd.merge_asof(df[["date"]], expanded, on="date").drop(columns="date"))
+    table = pd.concat(blocks, axis=1)
+    table = table[table.notna().all(axis=1)]
+    return list(table.columns), table.to_numpy(dtype=np.float64)
+
+
+def lazy_matrix(df: pd.DataFrame, features: dict[str, pd.DataFrame], shifts: int) -> tuple[list[str], np.ndarray]:
+    """惰性展开后一次性物化有效行"""
+    expansion = LazyFeatureExpansion(df["date"], next(iter(features)), shifts)
+    for tf, frame in features.items():
+        expansion.add(tf, frame)
+    return expansion.columns, expansion.materialize(expansion.valid_rows())
+
+
+def measure(build, *args) -> tuple[float, float, tuple]:
+    """返回 (峰值内存 MB, 耗时秒, 结果)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed, result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="惰性特征展开基准测试")
+    parser.add_argument("--days", type=int, default=90, help="1h 的 1 天趋势需要 60 天以上的数据")
+    parser.add_argument("--timeframes", nargs="+", default=["1m", "5m", "15m", "1h"])
+    parser.add_argument("--shifts", type=int, default=2)
+    args = parser.parse_args()
+
+    df = generate_ohlcv(args.days * 1440)
+    features = timeframe_features(df, args.timeframes)
+
+    eager_peak, eager_time, (eager_columns, eager) = measure(eager_matrix, df, features, args.shifts)
+    lazy_peak, lazy_time, (lazy_columns, lazy) = measure(lazy_matrix, df, features, args.shifts)
+
+    print(f"行数: {len(df)}  时间框架: {' '.join(args.timeframes)}  平移: {args.shifts}  列数: {len(lazy_columns)}")
+    print(f"训练矩阵: {lazy.shape[0]} 行 × {lazy.shape[1]} 列 = {lazy.nbytes / 1024 / 1024:.1f}MB")
+    print(f"{'':>6} {'构建峰值':>10} {'耗时':>8}")
+    print(f"{'eager':>6} {eager_peak:>8.1f}MB {eager_time:>7.2f}s")
+    print(f"{'lazy':>6} {lazy_peak:>8.1f}MB {lazy_time:>7.2f}s")
+    print(f"峰值内存降低: {1 - lazy_peak / eager_peak:.1%}")
+
+    if eager_columns != lazy_columns or not np.array_equal(eager, lazy):
+        print("惰性展开结果与逐列物化不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
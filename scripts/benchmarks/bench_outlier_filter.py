@@ -0,0 +1,126 @@
+"""离群点过滤步骤基准测试
+
+按 FreqAI 的展开方式（各 include_timeframes 时间框架特征 + include_shifted_candles 个平移副本，丢弃含 NaN 的行，
+MinMax 缩放到 [-1, 1]）构造不同天数的训练矩阵，对比重训时离群点步骤的耗时（fit + 删行）：
+
+- svm: FreqAI 默认的 SVMOutlierExtractor（SGDOneClassSVM；需要 datasieve 或 scikit-learn，未安装时跳过）
+- robust / mahalanobis / isolation: OutlierFilter 的三种方法（子样本拟合）
+
+同时输出每种方法删除的行数，以及与 SVM（未安装时与 robust）删除集合的重合度（Jaccard）。
+
+用法:
+    python scripts/benchmarks/bench_outlier_filter.py [--days 30 90] [--timeframes 1m 5m 15m 1h] [--shifts 2] [--nu 0.1]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.expansion import LazyFeatureExpansion
+from microstructure.features import compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, REGIME_COLUMN, build_features
+from microstructure.long_horizon import resample_ohlcv
+from microstructure.outliers import OUTLIER_METHODS, OutlierFilter
+from synthetic_data import generate_ohlcv
+
+FEATURES = [*FEATURE_COLUMNS, REGIME_COLUMN]
+
+
+def training_matrix(days: int, timeframes: list[str], shifts: int) -> np.ndarray:
+    """展开、去 NaN 并缩放到 [-1, 1] 的训练矩阵（与 FreqAI 管道中离群点步骤的输入一致）"""
+    df = generate_ohlcv(days * 1440)
+    expansion = LazyFeatureExpansion(df["date"], timeframes[0], shifts)
+    for tf in timeframes:
+        frame = df if tf == timeframes[0] else resample_ohlcv(df, tf)
+        expansion.add(tf, build_features(frame, compute_intermediates(frame))[["date", *FEATURES]])
+    x = expansion.materialize(expansion.valid_rows())
+    low, high = x.min(axis=0), x.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    scaled: np.ndarray = 2.0 * (x - low) / span - 1.0
+    return scaled
+
+
+def svm_step(nu: float):
+    """FreqAI 的 SVM 步骤（datasieve 优先，其次直接用 scikit-learn；都未安装时返回 None）"""
+    try:
+        from datasieve.transforms import SVMOutlierExtractor
+
+        return SVMOutlierExtractor(shuffle=False, nu=nu)
+    except ImportError:
+        pass
+    try:
+        from sklearn.linear_model import SGDOneClassSVM
+    except ImportError:
+        return None
+
+    class _SVM:
+        """与 SVMOutlierExtractor 相同的拟合与删行"""
+
+        def __init__(self):
+            self.model = SGDOneClassSVM(shuffle=False, nu=nu)
+
+        def fit_transform(self, x, y=None, sample_weight=None, feature_list=None):
+            keep = self.model.fit(x).predict(x) == 1
+            return x[keep], y[keep], None, feature_list
+
+    return _SVM()
+
+
+def run(step, x: np.ndarray) -> tuple[float, np.ndarray]:
+    """返回 (重训耗时秒, 删除行的布尔掩码)；以行号作为标签传入，删行后剩下的标签即保留的行"""
+    rows = np.arange(len(x))
+    start = time.perf_counter()
+    _, kept_rows, _, _ = step.fit_transform(x, rows)
+    elapsed = time.perf_counter() - start
+    dropped = np.ones(len(x), dtype=bool)
+    dropped[np.asarray(kept_rows, dtype=np.int64)] = False
+    return elapsed, dropped
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """两个删除集合的 Jaccard 重合度"""
+    union = (a | b).sum()
+    return (a & b).sum() / union if union else 1.0
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="离群点过滤步骤基准测试")
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90], help="每个天数分别构造训练矩阵")
+    parser.add_argument("--timeframes", nargs="+", default=["1m", "5m", "15m"])
+    parser.add_argument("--shifts", type=int, default=2)
+    parser.add_argument("--nu", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if svm_step(args.nu) is None:
+        print("未安装 datasieve / scikit-learn，跳过 SVM 对照")
+
+    for days in args.days:
+        x = training_matrix(days, args.timeframes, args.shifts)
+        print(f"\n{days} 天: 训练矩阵 {x.shape[0]} 行 × {x.shape[1]} 列")
+        results = {}
+        svm = svm_step(args.nu)
+        if svm is not None:
+            results["svm"] = run(svm, x)
+        for method in OUTLIER_METHODS:
+            results[method] = run(OutlierFilter(method, nu=args.nu), x)
+
+        reference = "svm" if "svm" in results else "robust"
+        print(f"{'方法':>12} {'重训耗时':>10} {'删除行数':>10} {'删除比例':>8} {'与' + reference + '重合':>10}")
+        for name, (elapsed, dropped) in results.items():
+            overlap = f"{jaccard(dropped, results[reference][1]):.2f}"
+            print(f"{name:>12} {elapsed:>9.2f}s {dropped.sum():>10} {dropped.mean():>8.1%} {overlap:>10}")
+
+
+if __name__ == "__main__":
+    main()
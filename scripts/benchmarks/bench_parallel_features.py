@@ -0,0 +1,89 @@
+"""交易对并行特征计算基准测试
+
+模拟多交易对白名单的一轮 bot 循环：每个交易对一段独立的合成 1m 数据，对比
+
+- serial: 主进程逐对 compute_intermediates + compute_feature_matrix
+- parallel(workers=N): ParallelFeatureComputer（进程池 + 共享内存），取预热后多轮的中位数
+
+并输出最后一轮的每交易对延迟表（排队 / 计算 / 总耗时）。单核机器上并行只会更慢，加速比取决于可用核数。
+
+用法:
+    python scripts/benchmarks/bench_parallel_features.py [--pairs 32] [--rows 20000] [--workers 2 4 8] [--rounds 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.features import compute_intermediates
+from microstructure.kernel import compute_feature_matrix
+from microstructure.parallel import ParallelFeatureComputer
+from synthetic_data import generate_ohlcv
+
+
+def serial_round(frames: dict) -> float:
+    """主进程串行计算一轮，返回耗时（秒）"""
+    start = time.perf_counter()
+    for dataframe in frames.values():
+        intermediates = compute_intermediates(dataframe)
+        compute_feature_matrix(
+            *(dataframe[column].to_numpy() for column in ("high", "low", "close", "volume")), intermediates
+        )
+    return time.perf_counter() - start
+
+
+def parallel_rounds(frames: dict, workers: int, rounds: int) -> tuple[float, ParallelFeatureComputer]:
+    """进程池计算多轮（第一轮预热不计时），返回 (单轮耗时中位数, 计算器)"""
+    computer = ParallelFeatureComputer(workers)
+    computer.compute(frames)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        results = computer.compute(frames)
+        timings.append(time.perf_counter() - start)
+        if len(results) != len(frames):
+            msg = f"{len(frames) - len(results)} 个交易对计算失败:\n{computer.latency_table()}"
+            raise RuntimeError(msg)
+    computer.close()
+    return float(np.median(timings)), computer
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="交易对并行特征计算基准测试")
+    parser.add_argument("--pairs", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = {f"PAIR{i:02d}/USDT:USDT": generate_ohlcv(args.rows, seed=i) for i in range(args.pairs)}
+    serial = float(np.median([serial_round(frames) for _ in range(args.rounds)]))
+
+    print(f"交易对: {args.pairs}  行数: {args.rows}  CPU 核数: {os.cpu_count()}")
+    print(f"{'模式':>14} {'单轮耗时':>10} {'加速比':>8}")
+    print("-" * 36)
+    print(f"{'serial':>14} {serial:>9.3f}s {1.0:>7.2f}x")
+    computer = None
+    for workers in args.workers:
+        elapsed, computer = parallel_rounds(frames, workers, args.rounds)
+        print(f"{f'parallel({workers})':>14} {elapsed:>9.3f}s {serial / elapsed:>7.2f}x")
+
+    if computer is not None:
+        print(f"\n最后一轮延迟（workers={computer.workers}）:")
+        print(computer.latency_table())
+
+
+if __name__ == "__main__":
+    main()
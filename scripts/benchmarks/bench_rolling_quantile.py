@@ -0,0 +1,106 @@
+"""滚动分位数基准测试
+
+对比市场状态分类中波动率滚动中位数的几种实现：
+
+- pandas_x2: 策略原写法（牛市/熊市掩码各调用一次 rolling(100).quantile(0.5)）
+- pandas_x1: pandas 只调用一次
+- sorted_window: rolling_quantile（有序窗口，完整序列）
+- gated_kernel: classify_regime（只在趋势闸门打开的行上计算一次）
+
+用法:
+    python scripts/benchmarks/bench_rolling_quantile.py [--rows 100000 500000 2000000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.features import classify_regime
+from microstructure.rolling import rolling_quantile
+from synthetic_data import generate_ohlcv
+
+WINDOW = 100
+QUANTILE = 0.5
+THRESHOLD = 0.10
+
+
+def _timed(func) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def _pandas_regime(trend: pd.Series, realized_vol: pd.Series, calls: int) -> np.ndarray:
+    regime = pd.Series(1, index=trend.index)
+    if calls == 2:
+        regime.loc[(trend > THRESHOLD) & (realized_vol > realized_vol.rolling(WINDOW).quantile(QUANTILE))] = 2
+        regime.loc[(trend < -THRESHOLD) & (realized_vol > realized_vol.rolling(WINDOW).quantile(QUANTILE))] = 0
+    else:
+        high_vol = realized_vol > realized_vol.rolling(WINDOW).quantile(QUANTILE)
+        regime.loc[(trend > THRESHOLD) & high_vol] = 2
+        regime.loc[(trend < -THRESHOLD) & high_vol] = 0
+    return np.asarray(regime.to_numpy())
+
+
+def run(n_rows: int) -> dict:
+    """对给定行数运行一轮基准
+
+    Args:
+        n_rows: 行数
+
+    Returns:
+        各实现耗时（秒）与闸门比例
+    """
+    df = generate_ohlcv(n_rows)
+    close = df["close"]
+    trend = (close - close.shift(1440)) / close.shift(1440)
+    realized_vol = close.pct_change().rolling(20).std()
+
+    t_x2, expected = _timed(lambda: _pandas_regime(trend, realized_vol, calls=2))
+    t_x1, _ = _timed(lambda: _pandas_regime(trend, realized_vol, calls=1))
+    t_sorted, median = _timed(lambda: rolling_quantile(realized_vol.to_numpy(), WINDOW, QUANTILE))
+    t_gated, regime = _timed(lambda: classify_regime(trend, realized_vol))
+
+    np.testing.assert_array_equal(regime, expected)
+    np.testing.assert_array_equal(median, realized_vol.rolling(WINDOW).quantile(QUANTILE).to_numpy())
+
+    return {
+        "rows": n_rows,
+        "gate_ratio": float((trend.abs() > THRESHOLD).mean()),
+        "pandas_x2": t_x2,
+        "pandas_x1": t_x1,
+        "sorted_window": t_sorted,
+        "gated_kernel": t_gated,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="滚动分位数基准测试")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 500_000, 2_000_000])
+    args = parser.parse_args()
+
+    print(f"{'行数':>10} {'闸门比例':>8} {'pandas_x2':>10} {'pandas_x1':>10} {'sorted':>10} {'gated':>10} {'加速比':>8}")
+    print("-" * 76)
+    for n_rows in args.rows:
+        r = run(n_rows)
+        speedup = r["pandas_x2"] / r["gated_kernel"] if r["gated_kernel"] > 0 else float("inf")
+        print(
+            f"{r['rows']:>10} {r['gate_ratio']:>8.1%} {r['pandas_x2']:>9.3f}s {r['pandas_x1']:>9.3f}s "
+            f"{r['sorted_window']:>9.3f}s {r['gated_kernel']:>9.3f}s {speedup:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""策略钩子吞吐基准测试
+
+在确定性合成 ETH 1 分钟 OHLCV（1 个月 / 1 年 / 3 年）上按回测顺序调用 ETHMicrostructureStrategy 的：
+
+- feature_engineering_expand_all（共享中间量缓存为冷）
+- set_freqai_targets
+- populate_indicators（FreqAI 以桩代替：只写入确定性的预测列与 do_predict，不训练模型）
+- populate_entry_trend
+
+记录每个钩子的吞吐（行/秒，多次取最快）与峰值内存（tracemalloc），并与基线 JSON 对比：
+任一钩子吞吐低于基线 × (1 - 容差) 时返回非零退出码。--update-baseline 把本次结果写为新基线。
+
+基线与机器相关：换机器后应先在基线提交上 --update-baseline，再对比改动。
+需要 freqtrade 与 TA-Lib（策略的依赖）。
+
+用法:
+    python scripts/benchmarks/bench_strategy.py [--sizes 1month 1year 3years] [--repeat 3]
+    python scripts/benchmarks/bench_strategy.py --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(project_root / "ft_userdir" / "strategies"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from synthetic_data import generate_ohlcv
+
+# 数据规模（1 分钟 K 线根数）
+SIZES = {
+    "1month": 30 * 1440,
+    "1year": 365 * 1440,
+    "3years": 3 * 365 * 1440,
+}
+
+HOOKS = ("feature_engineering_expand_all", "set_freqai_targets", "populate_indicators", "populate_entry_trend")
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "bench_strategy.json"
+
+# 默认容差：吞吐下降超过 20% 视为回归
+DEFAULT_TOLERANCE = 0.2
+
+PAIR = "ETH/USDT:USDT"
+
+
+class StubFreqAI:
+    """FreqAI 桩：写入确定性的预测列，不训练、不调用特征钩子（特征钩子单独计时）"""
+
+    def __init__(self, seed: int = 7):
+        self.seed = seed
+
+    def start(self, dataframe: pd.DataFrame, metadata: dict, strategy) -> pd.DataFrame:
+        rng = np.random.default_rng(self.seed)
+        dataframe["&-s_target_roi"] = rng.normal(0.002, 0.003, len(dataframe))
+        dataframe["do_predict"] = 1
+        return dataframe
+
+
+def load_strategy(user_data_dir: Path):
+    """实例化策略（FreqAI 以桩代替，无 DataProvider，即回测式的批量路径且不使用特征存储）"""
+    from ETHMicrostructureStrategy import ETHMicrostructureStrategy
+
+    strategy = ETHMicrostructureStrategy({"user_data_dir": str(user_data_dir), "freqai": {"enabled": True}})
+    strategy.dp = None
+    strategy.freqai = StubFreqAI()
+    return strategy
+
+
+def _run_hooks(strategy, df: pd.DataFrame, record) -> None:
+    """按回测顺序调用一遍钩子；record(name, func) 负责计时 / 记内存并返回 func 的结果"""
+    metadata = {"pair": PAIR, "tf": strategy.timeframe}
+    strategy.bot_start()  # 清空共享中间量缓存
+
+    frame = df.copy()
+    record("feature_engineering_expand_all", lambda: strategy.feature_engineering_expand_all(frame, 10, metadata))
+    frame = df.copy()
+    record("set_freqai_targets", lambda: strategy.set_freqai_targets(frame, metadata))
+    frame = df.copy()
+    indicators = record("populate_indicators", lambda: strategy.populate_indicators(frame, {"pair": PAIR}))
+    record("populate_entry_trend", lambda: strategy.populate_entry_trend(indicators, {"pair": PAIR}))
+
+
+def run(strategy, n_rows: int, repeat: int = 3) -> dict:
+    """对给定行数运行一轮基准
+
+    Args:
+        strategy: 策略实例
+        n_rows: 行数
+        repeat: 计时重复次数（取最快）
+
+    Returns:
+        钩子名 -> {"seconds", "rows_per_s", "peak_mb"}
+    """
+    df = generate_ohlcv(n_rows)
+    seconds = dict.fromkeys(HOOKS, float("inf"))
+    peaks = {}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        result = func()
+        seconds[name] = min(seconds[name], time.perf_counter() - start)
+        return result
+
+    def traced(name, func):
+        tracemalloc.start()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks[name] = peak / 1024 / 1024
+        return result
+
+    for _ in range(repeat):
+        _run_hooks(strategy, df, timed)
+    _run_hooks(strategy, df, traced)
+
+    return {
+        name: {"seconds": seconds[name], "rows_per_s": n_rows / seconds[name], "peak_mb": peaks[name]}
+        for name in HOOKS
+    }
+
+
+def machine_info() -> dict:
+    """基线所在机器的描述"""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """与基线对比，返回回归描述（只比较双方都有的规模与钩子）
+
+    Args:
+        results: 规模 -> 钩子 -> 指标
+        baseline: 基线 JSON 的 "results"
+        tolerance: 允许的吞吐下降比例
+
+    Returns:
+        回归列表（空表示通过）
+    """
+    regressions = []
+    for size, hooks in results.items():
+        for name, metrics in hooks.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                continue
+            floor = reference["rows_per_s"] * (1 - tolerance)
+            if metrics["rows_per_s"] < floor:
+                regressions.append(
+                    f"{size} {name}: {metrics['rows_per_s']:,.0f} 行/秒 < 基线 "
+                    f"{reference['rows_per_s']:,.0f} × (1 - {tolerance:.0%})"
+                )
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="策略钩子吞吐基准测试")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=None, help=f"吞吐下降容差（默认取基线中的值或 {DEFAULT_TOLERANCE}）")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写为基线")
+    args = parser.parse_args()
+
+    try:
+        with tempfile.TemporaryDirectory() as user_data_dir:
+            strategy = load_strategy(Path(user_data_dir))
+            results = {size: run(strategy, SIZES[size], args.repeat) for size in args.sizes}
+    except ImportError as e:
+        print(f"无法导入策略（需要 freqtrade 与 TA-Lib）: {e}")
+        sys.exit(2)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else None
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE) if baseline else DEFAULT_TOLERANCE
+
+    print(f"{'规模':>8} {'钩子':<32} {'耗时':>9} {'吞吐(行/秒)':>14} {'峰值内存':>10} {'相对基线':>9}")
+    print("-" * 90)
+    for size, hooks in results.items():
+        for name, x in hooks.items():
+            reference = (baseline or {}).get("results", {}).get(size, {}).get(name)
+            change = f"{x['rows_per_s'] / reference['rows_per_s'] - 1:+.1%}" if reference else "-"
+            print(
+                f"{size:>8} {name:<32} {x['seconds']:>8.3f}s {x['rows_per_s']:>14,.0f} "
+                f"{x['peak_mb']:>8.1f}MB {change:>9}"
+            )
+
+    if args.update_baseline or baseline is None:
+        payload = {
+            "created": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+            "machine": machine_info(),
+            "tolerance": tolerance,
+            "repeat": args.repeat,
+            "rows": {**(baseline or {}).get("rows", {}), **{size: SIZES[size] for size in results}},
+            "results": {**(baseline or {}).get("results", {}), **results},
+        }
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"基线已写入: {args.baseline}")
+        return
+
+    if baseline.get("machine") != machine_info():
+        print("警告: 基线来自不同的机器 / 依赖版本，吞吐对比仅供参考")
+    regressions = compare(results, baseline.get("results", {}), tolerance)
+    if regressions:
+        print("吞吐回归:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"未发现超过 {tolerance:.0%} 的吞吐回归")
+
+
+if __name__ == "__main__":
+    main()
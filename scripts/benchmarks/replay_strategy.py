@@ -0,0 +1,240 @@
+"""本地加速行情回放压力测试
+
+把 OHLCV feather 文件（默认 ft_userdir/data/okx/futures，没有数据时用合成数据）按 K 线收盘回放成
+实时行情流，以模拟盘模式驱动 ETHMicrostructureStrategy 的完整分析路径：每根 K 线先调用 bot_loop_start，
+再逐对 populate_indicators（FreqAI 以桩代替：与实盘 FreqAI 一样逐个 include_timeframes / 周期调用
+feature_engineering_*，按收盘时刻引用高周期特征、按行号引用平移 K 线后，用固定的线性模型写出预测列）→
+populate_entry_trend → populate_exit_trend。
+
+输出：
+- 吞吐：每轮（所有交易对处理一根 K 线）耗时分位数、交易对·K 线 / 秒；按倍速是否跟得上（落后秒数）
+- 每根 K 线延迟：策略自带的 SignalLatencyTracker，时钟换成回放时钟，倍速下测得的是真实处理耗时
+- 内存增长：按 K 线采样 RSS，输出起止、峰值与后半段的增长斜率（MB / 1000 根 K 线）
+
+需要 freqtrade 与 TA-Lib（策略的依赖）。
+
+用法:
+    python scripts/benchmarks/replay_strategy.py --pairs ETH/USDT:USDT BTC/USDT:USDT --candles 240 --speed 60
+    python scripts/benchmarks/replay_strategy.py --synthetic 50 --candles 120 --speed 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(project_root / "ft_userdir" / "strategies"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.expansion import LazyFeatureExpansion
+from microstructure.latency import SignalLatencyTracker
+from microstructure.long_horizon import timeframe_to_timedelta
+from microstructure.replay import DEFAULT_WINDOW, MarketReplayer, ReplayDataProvider, load_ohlcv
+from synthetic_data import generate_ohlcv
+
+DEFAULT_DATADIR = project_root / "ft_userdir" / "data" / "okx"
+DEFAULT_CONFIG = project_root / "ft_userdir" / "config_freqai.json"
+
+
+class ReplayFreqAI:
+    """FreqAI 桩：按实盘 FreqAI 的方式构建特征，用固定的线性模型代替训练好的模型"""
+
+    def __init__(self, freqai_config: dict, seed: int = 7):
+        parameters = freqai_config.get("feature_parameters", {})
+        self.include_timeframes = parameters.get("include_timeframes", [])
+        self.periods = parameters.get("indicator_periods_candles", [10])
+        self.shifted = parameters.get("include_shifted_candles", 0)
+        self.seed = seed
+        self._weights: dict[int, np.ndarray] = {}
+
+    def _features(self, strategy, frame: pd.DataFrame, pair: str, timeframe: str) -> pd.DataFrame:
+        metadata = {"pair": pair, "tf": timeframe}
+        for period in self.periods:
+            frame = strategy.feature_engineering_expand_all(frame, period, metadata)
+        frame = strategy.feature_engineering_expand_basic(frame, metadata)
+        return frame[["date", *(c for c in frame.columns if str(c).startswith("%"))]]
+
+    def start(self, dataframe: pd.DataFrame, metadata: dict, strategy) -> pd.DataFrame:
+        pair, base = metadata["pair"], strategy.timeframe
+        dataframe = strategy.feature_engineering_standard(dataframe, {"pair": pair, "tf": base})
+
+        # 高周期特征按收盘时刻引用、平移 K 线按行号引用（与 FreqAI 展开一致），预测前一次性物化
+        expansion = LazyFeatureExpansion(dataframe["date"], base, self.shifted)
+        expansion.add(base, self._features(strategy, dataframe.copy(), pair, base))
+        for timeframe in [tf for tf in self.include_timeframes if tf != base]:
+            informative = strategy.dp.get_pair_dataframe(pair, timeframe).copy()
+            expansion.add(timeframe, self._features(strategy, informative, pair, timeframe))
+        matrix = np.nan_to_num(expansion.materialize(), nan=0.0, posinf=0.0, neginf=0.0, copy=False)
+        matrix -= matrix.mean(axis=0)
+        matrix /= matrix.std(axis=0) + 1e-12
+
+        weights = self._weights.get(matrix.shape[1])
+        if weights is None:
+            weights = self._weights[matrix.shape[1]] = np.random.default_rng(self.seed).normal(0, 0.1, matrix.shape[1])
+        dataframe["&-s_target_roi"] = np.tanh(matrix @ weights) * 0.01
+        dataframe["do_predict"] = 1
+        return dataframe
+
+
+def rss_mb() -> float:
+    """当前常驻内存（MB）；无 /proc 时退回峰值常驻内存"""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_frames(args) -> dict[str, pd.DataFrame]:
+    """读取回放数据：指定 --synthetic 或数据目录下没有文件时生成合成数据"""
+    rows = args.history + args.candles
+    if not args.synthetic:
+        try:
+            frames: dict[str, pd.DataFrame] = load_ohlcv(
+                args.datadir, args.pairs, args.timeframe, args.trading_mode, tail=rows
+            )
+            if frames:
+                return frames
+        except FileNotFoundError as e:
+            print(f"{e}，改用合成数据")
+    count = args.synthetic or len(args.pairs or []) or 1
+    freq = timeframe_to_timedelta(args.timeframe)
+    return {
+        f"SYN{i:02d}/USDT:USDT": generate_ohlcv(rows, seed=i, start_price=float(10 + 200 * i), freq=freq)
+        for i in range(count)
+    }
+
+
+def load_strategy(config_path: Path, user_data_dir: Path, provider: ReplayDataProvider, replayer: MarketReplayer):
+    """以模拟盘模式实例化策略，行情来自回放，信号延迟用回放时钟计时"""
+    from ETHMicrostructureStrategy import ETHMicrostructureStrategy
+
+    config = json.loads(config_path.read_text(encoding="utf-8"))
+    config.update({"user_data_dir": str(user_data_dir), "runmode": provider.runmode.value})
+    strategy = ETHMicrostructureStrategy(config)
+    strategy.dp = provider
+    strategy.freqai = ReplayFreqAI(config.get("freqai", {}))
+    strategy.bot_start()
+    strategy.signal_latency = SignalLatencyTracker(strategy.timeframe, clock=replayer.time)
+    strategy._latency_flushed_at = time.monotonic()
+    return strategy
+
+
+def replay(strategy, replayer: MarketReplayer, provider: ReplayDataProvider, sample_every: int) -> dict:
+    """回放全部 K 线，返回每轮耗时、落后秒数与 RSS 采样"""
+    round_s, lags, memory = [], [], [(0, rss_mb())]
+    for now in replayer:
+        started = time.perf_counter()
+        strategy.bot_loop_start(current_time=now.to_pydatetime())
+        strategy._loop_started_at = replayer.time()  # 到达时刻按回放时钟计
+        for pair in provider.current_whitelist():
+            metadata = {"pair": pair}
+            dataframe = strategy.populate_indicators(provider.ohlcv(pair, strategy.timeframe), metadata)
+            dataframe = strategy.populate_entry_trend(dataframe, metadata)
+            dataframe = strategy.populate_exit_trend(dataframe, metadata)
+            provider._set_cached_df(pair, strategy.timeframe, dataframe)
+        round_s.append(time.perf_counter() - started)
+        lags.append(replayer.lag)
+        if replayer.replayed % sample_every == 0 or not replayer.remaining:
+            memory.append((replayer.replayed, rss_mb()))
+    return {"round_s": np.array(round_s), "lag_s": np.array(lags), "memory": memory}
+
+
+def report(result: dict, strategy, replayer: MarketReplayer, speed: float | None, elapsed: float) -> dict:
+    """打印并返回汇总"""
+    rounds, pairs = len(result["round_s"]), len(replayer.pairs)
+    interval = timeframe_to_timedelta(replayer.timeframe).total_seconds()
+    budget = interval / speed if speed else None
+    candles, rss = zip(*result["memory"])
+    tail = [i for i, candle in enumerate(candles) if candle >= candles[-1] / 2]
+    slope = np.polyfit(np.take(candles, tail), np.take(rss, tail), 1)[0] * 1000 if len(tail) >= 2 else float("nan")
+
+    summary = {
+        "pairs": pairs,
+        "candles": rounds,
+        "speed": speed,
+        "elapsed_s": elapsed,
+        "pair_candles_per_s": rounds * pairs / elapsed if elapsed else float("nan"),
+        "round_ms": {f"p{q}": float(np.percentile(result["round_s"], q)) * 1000 for q in (50, 95, 99)}
+        | {"max": float(result["round_s"].max()) * 1000},
+        "round_budget_ms": budget * 1000 if budget else None,
+        "late_rounds": int((result["round_s"] > budget).sum()) if budget else None,
+        "max_lag_s": replayer.max_lag,
+        "rss_mb": {"start": rss[0], "end": rss[-1], "peak": max(rss), "slope_per_1000_candles": slope},
+    }
+
+    print(f"交易对: {pairs}  K 线: {rounds}  倍速: {speed or '不等待'}  CPU 核数: {os.cpu_count()}")
+    print(f"吞吐: {summary['pair_candles_per_s']:,.1f} 交易对·K 线/秒（总耗时 {elapsed:.1f}s）")
+    print("每轮耗时: " + "  ".join(f"{name} {value:.1f}ms" for name, value in summary["round_ms"].items()))
+    if budget:
+        print(f"每轮预算 {budget * 1000:.1f}ms，超出 {summary['late_rounds']} 轮，最大落后 {replayer.max_lag:.2f}s")
+    print(
+        f"RSS: 起始 {rss[0]:.1f}MB  结束 {rss[-1]:.1f}MB  峰值 {max(rss):.1f}MB  "
+        f"后半段增长 {slope:+.2f}MB/1000 根 K 线"
+    )
+
+    latency = strategy.signal_latency.summary()
+    signal = latency[latency["metric"] == "signal"].sort_values("p99_ms", ascending=False)
+    print("\nK 线收盘到入场信号延迟（p99 最高的 10 个交易对）:")
+    print(signal.head(10).to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+    summary["signal_latency"] = latency.to_dict(orient="records")
+    return summary
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="本地加速行情回放压力测试")
+    parser.add_argument("--datadir", type=Path, default=DEFAULT_DATADIR)
+    parser.add_argument("--pairs", nargs="+", default=None, help="交易对（默认数据目录下的全部文件）")
+    parser.add_argument("--synthetic", type=int, default=0, help="使用 N 个合成交易对")
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--trading-mode", default="futures")
+    parser.add_argument("--candles", type=int, default=240, help="回放的 K 线数")
+    parser.add_argument("--history", type=int, default=31 * 1440, help="回放开始前已收盘的 K 线数")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="DataProvider 每个时间框架返回的 K 线数")
+    parser.add_argument("--speed", type=float, default=60.0, help="倍速（1 为实时，0 为不等待）")
+    parser.add_argument("--config", type=Path, default=DEFAULT_CONFIG)
+    parser.add_argument("--user-data-dir", type=Path, default=None, help="策略输出目录（默认临时目录）")
+    parser.add_argument("--sample-every", type=int, default=10, help="每隔多少根 K 线采样一次 RSS")
+    parser.add_argument("--output", type=Path, default=None, help="把汇总写为 JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    speed = args.speed or None
+    replayer = MarketReplayer(
+        frames, args.timeframe, speed=speed, warmup=max(max(len(f) for f in frames.values()) - args.candles, 1)
+    )
+    provider = ReplayDataProvider(replayer, window=args.window)
+    user_data_dir = args.user_data_dir or Path(tempfile.mkdtemp(prefix="replay_"))
+
+    try:
+        strategy = load_strategy(args.config, user_data_dir, provider, replayer)
+    except ImportError as e:
+        print(f"无法导入策略（需要 freqtrade 与 TA-Lib）: {e}")
+        sys.exit(2)
+
+    started = time.perf_counter()
+    result = replay(strategy, replayer, provider, args.sample_every)
+    summary = report(result, strategy, replayer, speed, time.perf_counter() - started)
+    print(f"\n策略输出目录: {user_data_dir}")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(summary, ensure_ascii=False, indent=2, default=float), encoding="utf-8")
+        print(f"汇总已写出: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 import json
+import zipfile
 from pathlib import Path
 from typing import Any
 
@@ -136,6 +137,57 @@ def compare_results(result_files: list[str | Path]) -> pd.DataFrame:
     return df
 
 
+def _result_entry(names: list[str], result_path: Path) -> str:
+    """freqtrade 回测 zip 中的结果 JSON
+
+    freqtrade 把结果写成 <名称>.json，其余文件都以 <名称>_ 开头（_config.json、策略参数 _<策略>.json、
+    策略源码等）。优先取与 zip 同名的条目；zip 被改名时取其余文件名都以其主名开头的 JSON。
+    """
+    expected = f"{result_path.stem}.json"
+    if expected in names:
+        return expected
+    for name in names:
+        stem = name[:-len(".json")]
+        if name.endswith(".json") and all(other == name or other.startswith(f"{stem}_") for other in names):
+            return name
+    msg = f"回测 zip 中找不到结果 JSON: {result_path}（条目: {names}）"
+    raise ValueError(msg)
+
+
+def load_strategy_result(result_file: str | Path, strategy: str | None = None) -> dict[str, Any]:
+    """读取 freqtrade 回测导出中单个策略的结果（含 trades 与出场参数）
+
+    Args:
+        result_file: 回测导出文件（.json 或 .zip）
+        strategy: 策略名称（None 取第一个）
+
+    Returns:
+        策略结果字典（trades、minimal_roi、stoploss、trailing_* 等）
+    """
+    result_path = Path(result_file)
+    if not result_path.exists():
+        msg = f"回测结果文件不存在: {result_path}"
+        raise FileNotFoundError(msg)
+
+    if result_path.suffix == ".zip":
+        with zipfile.ZipFile(result_path) as archive:
+            data = json.loads(archive.read(_result_entry(archive.namelist(), result_path)))
+    else:
+        with open(result_path, encoding="utf-8") as f:
+            data = json.load(f)
+
+    strategies = data.get("strategy", {})
+    if not strategies:
+        msg = f"回测结果中没有策略数据: {result_path}"
+        raise ValueError(msg)
+    name = strategy or next(iter(strategies))
+    if name not in strategies:
+        msg = f"回测结果中没有策略 {name}，可选: {list(strategies)}"
+        raise ValueError(msg)
+    result: dict[str, Any] = strategies[name]
+    return result
+
+
 def generate_markdown_report(df: pd.DataFrame, output_file: str | Path) -> None:
     """生成 Markdown 格式的回测报告
 
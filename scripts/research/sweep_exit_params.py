@@ -0,0 +1,145 @@
+"""出场参数批量扫描
+
+把 ETHMicrostructureStrategy 的入场信号固定下来，对 minimal_roi（按比例缩放）、
+trailing_stop_positive / _offset 与 custom_stoploss 时间止损做网格扫描，
+用 microstructure.exits 在多进程中批量模拟，不再为每组参数跑一次完整回测。
+
+入场信号来源：
+- freqtrade 回测导出（.json / .zip）：以回测交易的入场 K 线作为信号，出场基准参数也取自导出
+- feather 文件：含 date、enter_long、enter_short 列（如 populate_entry_trend 的输出）
+
+用法:
+    python scripts/research/sweep_exit_params.py \\
+        --data ft_userdir/data/okx/futures/ETH_USDT_USDT-1m-futures.feather \\
+        --signals ft_userdir/backtest_results/backtest-result-xxx.zip \\
+        --tsp 0.001 0.0015 0.002 --offset 0.002 0.0025 0.003 --roi-scale 0.8 1.0 1.2 \\
+        --time-stops on off --output sweep.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "integration"))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from microstructure.exits import ExitParams, sweep_exit_params
+from microstructure.long_horizon import timeframe_to_timedelta
+from validate_exit_simulator import PARAM_NAMES, signals_from_trades
+
+from scripts.lib.backtest_utils import load_strategy_result
+
+# 策略默认出场参数（与 ETHMicrostructureStrategy 一致）
+STRATEGY_DEFAULTS = ExitParams(
+    minimal_roi={"0": 0.005, "3": 0.003, "5": 0.002},
+    stoploss=-0.99,
+    trailing_stop=True,
+    trailing_stop_positive=0.002,
+    trailing_stop_positive_offset=0.003,
+    trailing_only_offset_is_reached=True,
+)
+
+
+def load_inputs(data_file: str, signals_file: str, timeframe: str) -> tuple[pd.DataFrame, ExitParams, float | None]:
+    """加载行情与入场信号
+
+    Args:
+        data_file: OHLCV feather
+        signals_file: 回测导出或信号 feather
+        timeframe: K 线时间框架
+
+    Returns:
+        (带信号的行情, 基准出场参数, 回测手续费或 None)
+    """
+    candles = pd.read_feather(data_file)
+    if Path(signals_file).suffix in (".json", ".zip"):
+        result = load_strategy_result(signals_file)
+        trades = pd.DataFrame(result["trades"])
+        start = pd.to_datetime(trades["open_date"], utc=True).min() - timeframe_to_timedelta(timeframe)
+        end = pd.to_datetime(trades["close_date"], utc=True).max() + pd.Timedelta(days=3)
+        candles = candles[(candles["date"] >= start) & (candles["date"] <= end)].reset_index(drop=True)
+        base = ExitParams(**{name: result[name] for name in PARAM_NAMES if name in result})
+        return signals_from_trades(candles, trades, timeframe), base, float(trades["fee_open"].iloc[0])
+
+    signals = pd.read_feather(signals_file)[["date", "enter_long", "enter_short"]]
+    candles = candles.merge(signals, on="date", how="inner").fillna({"enter_long": 0, "enter_short": 0})
+    return candles, STRATEGY_DEFAULTS, None
+
+
+def build_grid(base: ExitParams, args: argparse.Namespace) -> list[ExitParams]:
+    """参数网格"""
+    grid = []
+    for scale, tsp, offset, time_stops, loss_hours, max_hold in itertools.product(
+        args.roi_scale, args.tsp, args.offset, args.time_stops, args.loss_hours, args.max_hold,
+    ):
+        roi = {k: (v if v == -1 else v * scale) for k, v in base.minimal_roi.items()}
+        grid.append(base.replace(
+            minimal_roi=roi,
+            trailing_stop_positive=tsp,
+            trailing_stop_positive_offset=offset,
+            use_custom_stoploss=time_stops == "on",
+            loss_time_stop_hours=loss_hours,
+            max_hold_hours=max_hold,
+        ))
+    return grid
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="出场参数批量扫描")
+    parser.add_argument("--data", required=True, help="OHLCV feather 文件")
+    parser.add_argument("--signals", required=True, help="回测导出（.json / .zip）或信号 feather")
+    parser.add_argument("--timeframe", default="1m")
+    parser.add_argument("--fee", type=float, default=None, help="单边手续费（默认取回测导出，否则 0.05%%）")
+    parser.add_argument("--roi-scale", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--tsp", type=float, nargs="+", default=[0.002])
+    parser.add_argument("--offset", type=float, nargs="+", default=[0.003])
+    parser.add_argument("--time-stops", choices=["on", "off"], nargs="+", default=["off"])
+    parser.add_argument("--loss-hours", type=float, nargs="+", default=[2.0])
+    parser.add_argument("--max-hold", type=float, nargs="+", default=[48.0])
+    parser.add_argument("--workers", type=int, default=None, help="进程数（默认 CPU 核数）")
+    parser.add_argument("--output", default=None, help="结果 CSV")
+    args = parser.parse_args()
+
+    candles, base, fee = load_inputs(args.data, args.signals, args.timeframe)
+    fee = args.fee if args.fee is not None else (fee if fee is not None else 0.0005)
+    grid = build_grid(base, args)
+    minutes = int(timeframe_to_timedelta(args.timeframe).total_seconds() // 60)
+    print(f"行情: {len(candles)} 行，参数组合: {len(grid)}，手续费: {fee:.4%}")
+
+    start = time.perf_counter()
+    result = sweep_exit_params(candles, grid, fee=fee, timeframe_minutes=minutes, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"耗时: {elapsed:.1f}s（{elapsed / len(grid) * 1000:.0f}ms / 组合）")
+
+    params = pd.DataFrame([
+        {
+            "roi": p.minimal_roi,
+            "tsp": p.trailing_stop_positive,
+            "offset": p.trailing_stop_positive_offset,
+            "time_stops": p.use_custom_stoploss,
+            "loss_hours": p.loss_time_stop_hours,
+            "max_hold": p.max_hold_hours,
+        }
+        for p in grid
+    ])
+    table = pd.concat([params, result.drop(columns="combo")], axis=1).sort_values("total_profit", ascending=False)
+    print("\n前 20 组:")
+    print(table.head(20).to_string(index=False))
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+        print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
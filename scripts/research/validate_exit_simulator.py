@@ -0,0 +1,122 @@
+"""出场模拟器对照验证
+
+用一次真实 freqtrade 回测的导出结果校验 microstructure.exits：
+以回测中每笔交易的入场 K 线重建入场信号，用回测记录的出场参数与手续费模拟出场，
+逐笔对比出场时间、出场价格与出场原因。
+
+用法:
+    ./scripts/ft.ps1 backtesting --strategy ETHMicrostructureStrategy --timerange 20240401-20240630 --export trades
+    python scripts/research/validate_exit_simulator.py \\
+        --result ft_userdir/backtest_results/backtest-result-xxx.zip \\
+        --data ft_userdir/data/okx/futures/ETH_USDT_USDT-1m-futures.feather
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "integration"))
+
+from microstructure.exits import ExitParams, simulate_exits
+from microstructure.long_horizon import timeframe_to_timedelta
+
+from scripts.lib.backtest_utils import load_strategy_result
+
+PARAM_NAMES = (
+    "minimal_roi",
+    "stoploss",
+    "trailing_stop",
+    "trailing_stop_positive",
+    "trailing_stop_positive_offset",
+    "trailing_only_offset_is_reached",
+    "use_custom_stoploss",
+)
+
+
+def signals_from_trades(candles: pd.DataFrame, trades: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """按回测交易的入场时间重建入场信号（信号在入场前一根 K 线）
+
+    Args:
+        candles: OHLCV 数据框
+        trades: 回测交易（open_date、is_short 列）
+        timeframe: K 线时间框架
+
+    Returns:
+        带 enter_long / enter_short 列的数据框
+    """
+    candles = candles.copy()
+    candles["enter_long"] = 0
+    candles["enter_short"] = 0
+    signal_dates = pd.to_datetime(trades["open_date"], utc=True) - timeframe_to_timedelta(timeframe)
+    rows = candles["date"].searchsorted(signal_dates)
+    found = (rows < len(candles)) & (candles["date"].to_numpy()[np.minimum(rows, len(candles) - 1)] == signal_dates.to_numpy())
+    is_short = trades["is_short"].to_numpy(dtype=bool)
+    candles.loc[candles.index[rows[found & ~is_short]], "enter_long"] = 1
+    candles.loc[candles.index[rows[found & is_short]], "enter_short"] = 1
+    return candles
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="出场模拟器对照验证")
+    parser.add_argument("--result", required=True, help="freqtrade 回测导出（.json / .zip）")
+    parser.add_argument("--data", required=True, help="OHLCV feather 文件")
+    parser.add_argument("--strategy", default=None, help="策略名称（默认取第一个）")
+    parser.add_argument("--timeframe", default="1m")
+    args = parser.parse_args()
+
+    result = load_strategy_result(args.result, args.strategy)
+    trades = pd.DataFrame(result["trades"])
+    if trades.empty:
+        print("回测没有交易")
+        return
+
+    params = ExitParams(**{name: result[name] for name in PARAM_NAMES if name in result})
+    fee = float(trades["fee_open"].iloc[0])
+    print(f"出场参数: {params}")
+    print(f"手续费: {fee:.4%}")
+
+    candles = pd.read_feather(args.data)
+    start = pd.to_datetime(trades["open_date"], utc=True).min() - timeframe_to_timedelta(args.timeframe)
+    end = pd.to_datetime(trades["close_date"], utc=True).max() + pd.Timedelta(days=3)
+    candles = candles[(candles["date"] >= start) & (candles["date"] <= end)].reset_index(drop=True)
+
+    candles = signals_from_trades(candles, trades, args.timeframe)
+    minutes = int(timeframe_to_timedelta(args.timeframe).total_seconds() // 60)
+    simulated = simulate_exits(candles, params, fee=fee, timeframe_minutes=minutes)
+
+    actual = trades.assign(
+        open_date=pd.to_datetime(trades["open_date"], utc=True),
+        close_date=pd.to_datetime(trades["close_date"], utc=True),
+    )
+    merged = actual.merge(simulated, on="open_date", how="left", suffixes=("", "_sim"))
+    matched = merged["close_date_sim"].notna()
+    same_exit = matched & (merged["close_date"] == merged["close_date_sim"])
+    same_reason = matched & (merged["exit_reason"] == merged["exit_reason_sim"])
+    rate_error = (merged["close_rate_sim"] / merged["close_rate"] - 1).abs()
+
+    print(f"\n回测交易: {len(actual)}，模拟交易: {len(simulated)}，按入场时间匹配: {matched.sum()}")
+    print(f"出场时间一致: {same_exit.sum()} ({same_exit.mean():.2%})")
+    print(f"出场原因一致: {same_reason.sum()} ({same_reason.mean():.2%})")
+    print(f"出场价相对误差: 中位数 {rate_error[same_exit].median():.2e}，最大 {rate_error[same_exit].max():.2e}")
+    print(f"总收益（回测 profit_ratio 之和）: {actual['profit_ratio'].sum():.4f}")
+    print(f"总收益（模拟 profit_ratio 之和）: {simulated['profit_ratio'].sum():.4f}")
+
+    mismatches = merged[~same_exit | ~same_reason]
+    if len(mismatches):
+        print("\n不一致的交易（前 20 笔）:")
+        columns = ["open_date", "is_short", "close_date", "close_date_sim", "exit_reason", "exit_reason_sim",
+                   "close_rate", "close_rate_sim"]
+        print(mismatches[columns].head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """测试 1 分钟数据下的特征区分度"""
 
+import sys
+from pathlib import Path
+
 import pyarrow.feather as feather
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).parent / "integration"))
+from microstructure.targets import compute_targets
+
 # 读取ETH 1分钟数据
 df = feather.read_feather("ft_userdir/data/okx/futures/ETH_USDT_USDT-1m-futures.feather")
 df = df[(df['date'] >= '2024-04-01') & (df['date'] <= '2024-06-30')].copy()
@@ -68,30 +74,27 @@ print("\n" + "=" * 80)
 print("测试不同预测窗口")
 print("=" * 80)
 
-for forward_window, threshold, desc in test_configs:
-    df_test = df.copy()
+# 所有窗口的标签一次算完（稀疏表共用一次预处理，不再逐窗口复制整张表）
+targets = compute_targets(df, [forward_window for forward_window, _, _ in test_configs], total_cost)
+feature_valid = df.notna().all(axis=1).to_numpy()
 
-    # 生成标签
-    df_test['future_max'] = df_test['high'].rolling(forward_window).max().shift(-forward_window)
-    df_test['future_min'] = df_test['low'].rolling(forward_window).min().shift(-forward_window)
-    df_test['potential_long_return'] = (df_test['future_max'] / df_test['close'] - 1) - total_cost
-    df_test['potential_short_return'] = (1 - df_test['future_min'] / df_test['close']) - total_cost
-
-    df_test['label'] = 0
-    df_test.loc[
-        (df_test['potential_long_return'] > threshold) | (df_test['potential_short_return'] > threshold),
-        'label'
-    ] = 1
+for forward_window, threshold, desc in test_configs:
+    window_targets = targets[forward_window]
+    long_return = window_targets['potential_long_return']
+    short_return = window_targets['potential_short_return']
 
-    df_test = df_test.dropna()
+    # 生成标签（1 = trade，0 = no_trade），移除 NaN
+    valid = feature_valid & ~np.isnan(long_return) & ~np.isnan(short_return)
+    label = ((long_return > threshold) | (short_return > threshold))[valid]
+    df_test = df[valid]
 
     total = len(df_test)
-    trade_count = (df_test['label'] == 1).sum()
+    trade_count = label.sum()
     trade_pct = trade_count / total * 100
 
     # 计算特征区分度
-    trade_data = df_test[df_test['label'] == 1]
-    no_trade_data = df_test[df_test['label'] == 0]
+    trade_data = df_test[label]
+    no_trade_data = df_test[~label]
 
     features = ['vpin', 'atr_normalized', 'realized_vol_12', 'momentum_10', 'volume_ratio']
     discriminations = []
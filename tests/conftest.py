@@ -59,3 +59,29 @@ def sample_ohlcv_with_trend():
     })
 
     return df
+
+
+@pytest.fixture
+def minute_ohlcv():
+    """
+    生成带上涨/下跌趋势段的 1 分钟 OHLCV 数据（覆盖牛市/熊市状态）
+
+    Returns:
+        pd.DataFrame: 包含 4000 行、UTC 时间戳的 OHLCV 数据
+    """
+    np.random.seed(7)
+    n = 4000
+
+    drift = np.concatenate([np.full(n // 2, 0.0002), np.full(n - n // 2, -0.0003)])
+    close_prices = 2000 * np.exp(np.cumsum(drift + np.random.randn(n) * 0.002))
+
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=n, freq='1min', tz='UTC'),
+        'open': close_prices * (1 + np.random.randn(n) * 0.0005),
+        'high': close_prices * (1 + np.abs(np.random.randn(n)) * 0.002),
+        'low': close_prices * (1 - np.abs(np.random.randn(n)) * 0.002),
+        'close': close_prices,
+        'volume': np.random.uniform(100, 1000, n)
+    })
+
+    return df
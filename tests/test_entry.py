@@ -0,0 +1,114 @@
+"""
+声明式入场条件单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.entry import Clause, EntryRules
+
+
+def _strategy_rules() -> EntryRules:
+    """与策略一致的入场规则"""
+    return EntryRules(
+        shared=[
+            Clause('do_predict', 'do_predict', '==', 1),
+            Clause('roi', '&-s_target_roi', '>', 0.005),
+            Clause('vpin', 'vpin', '<', 0.7),
+            Clause('volume', 'volume', '>', 0),
+            Clause('adx', 'adx', '<', 25),
+            Clause('bb_width', 'bb_width', '<', 0.04),
+            Clause('trend_30d', 'trend_30d', '<', 0.15, absolute=True),
+        ],
+        sides={
+            'enter_long': [Clause('momentum_up', 'momentum_signal', '>', 0)],
+            'enter_short': [Clause('momentum_down', 'momentum_signal', '<', 0)],
+        },
+    )
+
+
+@pytest.fixture
+def signal_frame():
+    """随机预测/指标数据（含 NaN）"""
+    np.random.seed(17)
+    n = 5000
+    df = pd.DataFrame({
+        'do_predict': np.random.choice([0, 1, 2], n, p=[0.1, 0.85, 0.05]),
+        '&-s_target_roi': np.random.normal(0.005, 0.002, n),
+        'vpin': np.random.uniform(0.3, 0.9, n),
+        'volume': np.random.choice([0.0, 10.0], n, p=[0.05, 0.95]),
+        'adx': np.random.uniform(10, 40, n),
+        'bb_width': np.random.uniform(0.01, 0.06, n),
+        'trend_30d': np.random.normal(0, 0.15, n),
+        'momentum_signal': np.random.normal(0, 0.002, n),
+    })
+    df.loc[:50, 'trend_30d'] = np.nan
+    df.loc[100:104, 'momentum_signal'] = np.nan
+    return df
+
+
+def _reference_signals(df: pd.DataFrame, roi_threshold: float = 0.005) -> pd.DataFrame:
+    """按策略原始 .loc 写法计算（作为对照）"""
+    out = df.copy()
+    shared = (
+        (out['do_predict'] == 1) &
+        (out['&-s_target_roi'] > roi_threshold) &
+        (out['vpin'] < 0.7) &
+        (out['volume'] > 0) &
+        (out['adx'] < 25) &
+        (out['bb_width'] < 0.04) &
+        (abs(out['trend_30d']) < 0.15)
+    )
+    out.loc[shared & (out['momentum_signal'] > 0), 'enter_long'] = 1
+    out.loc[shared & (out['momentum_signal'] < 0), 'enter_short'] = 1
+    return out.fillna({'enter_long': 0, 'enter_short': 0})
+
+
+class TestEntryRules:
+    """入场规则测试"""
+
+    def test_matches_loc_assignments(self, signal_frame):
+        """测试与原 .loc 写法信号一致"""
+        stats = _strategy_rules().apply(signal_frame)
+        expected = _reference_signals(signal_frame)
+
+        for side in ('enter_long', 'enter_short'):
+            np.testing.assert_array_equal(signal_frame[side], expected[side].astype(int))
+            assert stats['signals'][side] == expected[side].sum()
+        assert stats['signals']['enter_long'] > 0
+        assert stats['signals']['enter_short'] > 0
+
+    def test_pass_counts(self, signal_frame):
+        """测试各条件通过数"""
+        _, pass_counts = _strategy_rules().evaluate(signal_frame)
+
+        assert pass_counts['do_predict'] == (signal_frame['do_predict'] == 1).sum()
+        assert pass_counts['trend_30d'] == (signal_frame['trend_30d'].abs() < 0.15).sum()
+        assert pass_counts['momentum_down'] == (signal_frame['momentum_signal'] < 0).sum()
+        assert len(pass_counts) == 9
+
+    def test_threshold_override(self, signal_frame):
+        """测试阈值覆盖（阈值扫描）"""
+        rules = _strategy_rules()
+        signals, _ = rules.evaluate(signal_frame, overrides={'roi': 0.004})
+        expected = _reference_signals(signal_frame, roi_threshold=0.004)
+
+        np.testing.assert_array_equal(signals['enter_long'], expected['enter_long'].astype(bool))
+        assert rules.clauses[1].value == 0.005
+
+    def test_wide_bitset(self, signal_frame):
+        """测试超过 8 个条件时使用更宽的位图"""
+        shared = [Clause(f'vpin_{i}', 'vpin', '<', 0.7 + i * 0.01) for i in range(20)]
+        rules = EntryRules(shared=shared, sides={'enter_long': [Clause('up', 'momentum_signal', '>', 0)]})
+        signals, _ = rules.evaluate(signal_frame)
+
+        expected = (signal_frame['vpin'] < 0.7) & (signal_frame['momentum_signal'] > 0)
+        np.testing.assert_array_equal(signals['enter_long'], expected.to_numpy())
+
+    def test_invalid_definitions(self, signal_frame):
+        with pytest.raises(ValueError):
+            Clause('bad', 'vpin', '~', 0.5)
+        with pytest.raises(ValueError):
+            EntryRules(shared=[Clause('a', 'vpin', '<', 1), Clause('a', 'adx', '<', 1)], sides={})
+        with pytest.raises(ValueError):
+            _strategy_rules().evaluate(signal_frame, overrides={'missing': 1.0})
@@ -0,0 +1,193 @@
+"""
+向量化出场模拟器单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.exits import ExitParams, simulate_exits, summarize_trades, sweep_exit_params
+
+FEE = 0.0005
+
+
+def _profit(open_rate, rate, is_short):
+    if is_short:
+        return 1 - rate * (1 + FEE) / (open_rate * (1 - FEE))
+    return rate * (1 - FEE) / (open_rate * (1 + FEE)) - 1
+
+
+def _reference_trades(df: pd.DataFrame, params: ExitParams) -> list[tuple]:
+    """逐根 K 线的标量实现（按 freqtrade 回测循环的顺序）"""
+    o, h, lo, c = (df[col].to_numpy() for col in ('open', 'high', 'low', 'close'))
+    long_signal = df['enter_long'].to_numpy() == 1
+    short_signal = df['enter_short'].to_numpy() == 1
+    roi_table = sorted((int(k), v) for k, v in params.minimal_roi.items())
+    trades = []
+    trade = None
+    for row in range(1, len(df)):
+        if trade is None and long_signal[row - 1] != short_signal[row - 1]:
+            is_short = bool(short_signal[row - 1])
+            side = -1 if is_short else 1
+            stop = o[row] * (1 - side * abs(params.stoploss))
+            trade = {'entry': row, 'open': o[row], 'short': is_short, 'stop': stop, 'initial': stop,
+                     'pct': abs(params.stoploss)}
+        if trade is None:
+            continue
+
+        side = -1 if trade['short'] else 1
+        step = row - trade['entry']
+        bound, worst = (lo[row], h[row]) if trade['short'] else (h[row], lo[row])
+        bound_profit = _profit(trade['open'], bound, trade['short'])
+        dir_correct = trade['stop'] > worst if trade['short'] else trade['stop'] < worst
+
+        def adjust(trade, pct):
+            candidate = bound * (1 - side * abs(pct))
+            if (candidate < trade['stop']) if trade['short'] else (candidate > trade['stop']):
+                trade['stop'] = candidate
+                trade['pct'] = abs(pct)
+
+        hours = step / 60
+        if params.use_custom_stoploss and dir_correct:
+            if hours > params.max_hold_hours or (bound_profit < 0 and hours > params.loss_time_stop_hours):
+                adjust(trade, params.time_stop_value)
+        if params.trailing_stop and dir_correct:
+            offset = params.trailing_stop_positive_offset
+            if not (params.trailing_only_offset_is_reached and bound_profit < offset):
+                value = params.stoploss
+                if params.trailing_stop_positive is not None and bound_profit > offset:
+                    value = params.trailing_stop_positive
+                adjust(trade, value)
+
+        stop_hit = trade['stop'] <= h[row] if trade['short'] else trade['stop'] >= lo[row]
+        trailing = trade['stop'] != trade['initial']
+        roi_key, roi = max(((k, v) for k, v in roi_table if k <= step), default=(0, np.inf))
+        roi_hit = bound_profit > roi
+        if roi_hit and not (stop_hit and not trailing):
+            if roi == -1:
+                rate = o[row]
+            else:
+                if trade['short']:
+                    rate = trade['open'] * (1 - FEE - roi) / (1 + FEE)
+                    beyond = o[row] < rate
+                else:
+                    rate = trade['open'] * (roi + 1 + FEE) / (1 - FEE)
+                    beyond = o[row] > rate
+                rate = o[row] if (step > 0 and step == roi_key and beyond) else min(max(rate, lo[row]), h[row])
+            reason = 'roi'
+        elif stop_hit:
+            gapped = trade['stop'] < lo[row] if trade['short'] else trade['stop'] > h[row]
+            rate = trade['stop']
+            if step == 0 and trailing:
+                if (not params.use_custom_stoploss and params.trailing_only_offset_is_reached
+                        and params.trailing_stop_positive):
+                    rate = o[row] * (1 + side * params.trailing_stop_positive_offset
+                                     - side * params.trailing_stop_positive)
+                else:
+                    rate = o[row] * (1 - side * trade['pct'])
+                rate = min(h[row], rate) if trade['short'] else max(lo[row], rate)
+            if gapped:
+                rate = o[row]
+            reason = 'trailing_stop_loss' if trailing else 'stop_loss'
+        else:
+            continue
+
+        trades.append((trade['entry'], row, trade['short'], rate, reason))
+        trade = None
+
+    if trade is not None:
+        trades.append((trade['entry'], len(df) - 1, trade['short'], c[-1], 'force_exit'))
+    return trades
+
+
+@pytest.fixture
+def signal_candles(minute_ohlcv):
+    """带随机多空信号的 1m 行情"""
+    np.random.seed(23)
+    df = minute_ohlcv.copy()
+    df['enter_long'] = (np.random.rand(len(df)) < 0.02).astype(int)
+    df['enter_short'] = (np.random.rand(len(df)) < 0.02).astype(int)
+    return df
+
+
+PARAM_CASES = [
+    ExitParams({'0': 0.005, '3': 0.003, '5': 0.002}, trailing_stop=True, trailing_stop_positive=0.002,
+               trailing_stop_positive_offset=0.003, trailing_only_offset_is_reached=True),
+    ExitParams({'0': 0.005, '5': 0.003, '10': 0.002, '30': 0.001, '60': -1}, trailing_stop=True,
+               trailing_stop_positive=0.0015, trailing_stop_positive_offset=0.0025,
+               trailing_only_offset_is_reached=True),
+    ExitParams({'0': 0.01}, stoploss=-0.01, use_custom_stoploss=True, loss_time_stop_hours=0.5,
+               max_hold_hours=3),
+    ExitParams({'0': 0.004}, stoploss=-0.003, trailing_stop=True),
+]
+
+
+class TestSimulateExits:
+    """出场模拟测试"""
+
+    @pytest.mark.parametrize('params', PARAM_CASES)
+    def test_matches_scalar_backtest_loop(self, signal_candles, params):
+        """测试与逐根 K 线的标量实现一致"""
+        trades = simulate_exits(signal_candles, params, fee=FEE)
+        expected = _reference_trades(signal_candles, params)
+
+        dates = signal_candles['date'].to_numpy()
+        assert len(trades) == len(expected)
+        np.testing.assert_array_equal(trades['open_date'].to_numpy(), dates[[t[0] for t in expected]])
+        np.testing.assert_array_equal(trades['close_date'].to_numpy(), dates[[t[1] for t in expected]])
+        np.testing.assert_array_equal(trades['is_short'], [t[2] for t in expected])
+        np.testing.assert_allclose(trades['close_rate'], [t[3] for t in expected], rtol=1e-12)
+        assert list(trades['exit_reason']) == [t[4] for t in expected]
+
+    def test_time_stops_exit_losing_trades(self, signal_candles):
+        """测试只有时间止损时，交易在时限之后由止损平仓"""
+        params = ExitParams({'0': 1.0}, use_custom_stoploss=True, loss_time_stop_hours=2, max_hold_hours=4)
+        trades = simulate_exits(signal_candles, params, fee=FEE)
+        closed = trades[trades['exit_reason'] != 'force_exit']
+
+        assert len(closed) > 1
+        assert (closed['duration'] > 2 * 60).all()
+        assert (closed['exit_reason'] == 'trailing_stop_loss').all()
+        assert len(simulate_exits(signal_candles, params.replace(use_custom_stoploss=False), fee=FEE)) == 1
+
+    def test_no_signals(self, minute_ohlcv):
+        """测试没有信号时返回空表"""
+        df = minute_ohlcv.assign(enter_long=0, enter_short=0)
+        trades = simulate_exits(df, PARAM_CASES[0])
+
+        assert trades.empty
+        assert summarize_trades(trades)['trades'] == 0
+
+
+class TestExitParams:
+    """出场参数测试"""
+
+    def test_from_strategy_and_replace(self):
+        """测试从策略属性读取并覆盖"""
+        class Strategy:
+            minimal_roi = {'0': 0.005}
+            stoploss = -0.99
+            trailing_stop = True
+            trailing_stop_positive = 0.002
+
+        params = ExitParams.from_strategy(Strategy, use_custom_stoploss=True)
+        changed = params.replace(trailing_stop_positive=0.003)
+
+        assert params.trailing_stop_positive == 0.002
+        assert params.use_custom_stoploss
+        assert changed.trailing_stop_positive == 0.003
+        assert changed.minimal_roi == {'0': 0.005}
+
+
+class TestSweep:
+    """参数扫描测试"""
+
+    def test_sweep_matches_single_runs(self, signal_candles):
+        """测试并行扫描结果与逐个模拟一致"""
+        grid = [PARAM_CASES[0].replace(trailing_stop_positive=v) for v in (0.001, 0.002, 0.003)]
+        result = sweep_exit_params(signal_candles, grid, fee=FEE, workers=2, batch_size=2)
+
+        assert list(result['combo']) == [0, 1, 2]
+        for index, params in enumerate(grid):
+            expected = summarize_trades(simulate_exits(signal_candles, params, fee=FEE))
+            assert result.loc[index, 'trades'] == expected['trades']
+            assert result.loc[index, 'total_profit'] == pytest.approx(expected['total_profit'])
@@ -0,0 +1,102 @@
+"""
+惰性特征展开单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.expansion import LazyFeatureExpansion
+from microstructure.features import compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, REGIME_COLUMN, build_features
+from microstructure.long_horizon import resample_ohlcv, timeframe_to_timedelta
+
+TIMEFRAMES = ('1m', '5m', '15m')
+FEATURES = [*FEATURE_COLUMNS, REGIME_COLUMN]
+
+
+def _features(df: pd.DataFrame, tf: str) -> pd.DataFrame:
+    """某个时间框架的特征（高周期去掉 1 天趋势：测试数据不足 1440 根高周期 K 线，整列为 NaN）"""
+    frame = df if tf == '1m' else resample_ohlcv(df, tf)
+    columns = FEATURES if tf == '1m' else [c for c in FEATURES if c != '%-trend']
+    return build_features(frame, compute_intermediates(frame))[['date', *columns]]
+
+
+def _eager(df: pd.DataFrame, shifts: int) -> pd.DataFrame:
+    """按 FreqAI 的方式逐列物化：各时间框架上平移后再 merge_informative_pair 对齐"""
+    blocks = []
+    for tf in TIMEFRAMES:
+        features = _features(df, tf)
+        values = features.drop(columns='date')
+        expanded = pd.concat(
+            [features] + [values.shift(n).add_suffix(f'_shift-{n}') for n in range(1, shifts + 1)], axis=1
+        )
+        expanded = expanded.rename(columns=lambda c: c if c == 'date' else f'{c}_{tf}')
+        expanded['date'] += timeframe_to_timedelta(tf) - timeframe_to_timedelta('1m')
+        blocks.append(pd.merge_asof(df[['date']], expanded, on='date').drop(columns='date'))
+    return pd.concat(blocks, axis=1)
+
+
+def _lazy(df: pd.DataFrame, shifts: int) -> LazyFeatureExpansion:
+    expansion = LazyFeatureExpansion(df['date'], '1m', shifts)
+    for tf in TIMEFRAMES:
+        expansion.add(tf, _features(df, tf))
+    return expansion
+
+
+class TestLazyFeatureExpansion:
+    """惰性展开测试"""
+
+    def test_matches_eager_expansion(self, minute_ohlcv):
+        """测试列名与数值都与逐列物化的 FreqAI 展开一致（含高周期收盘对齐与按各自时间框架平移）"""
+        eager = _eager(minute_ohlcv, shifts=2)
+        expansion = _lazy(minute_ohlcv, shifts=2)
+
+        assert set(expansion.columns) == set(eager.columns)
+        matrix = expansion.materialize()
+        assert matrix.flags.c_contiguous
+        np.testing.assert_array_equal(matrix, eager[expansion.columns].to_numpy(dtype=np.float64))
+
+    def test_valid_rows_without_materializing(self, minute_ohlcv):
+        """测试有效行掩码与物化后逐行检查一致，按掩码物化只分配有效行"""
+        eager = _eager(minute_ohlcv, shifts=2)
+        expansion = _lazy(minute_ohlcv, shifts=2)
+
+        valid = expansion.valid_rows()
+        assert valid.any() and not valid.all()
+        np.testing.assert_array_equal(valid, np.isfinite(eager.to_numpy(dtype=np.float64)).all(axis=1))
+        train = expansion.materialize(valid, dtype=np.float32)
+        assert train.shape == (valid.sum(), len(expansion.columns)) and train.dtype == np.float32
+        assert np.isfinite(train).all()
+
+    def test_column_subset_and_frame(self, minute_ohlcv):
+        """测试按列子集与行切片物化"""
+        expansion = _lazy(minute_ohlcv, shifts=1)
+        columns = ['%-vpin_shift-1_15m', '%-vpin_1m']
+        frame = expansion.to_frame(slice(-100, None), columns)
+
+        assert list(frame.columns) == columns
+        eager = _eager(minute_ohlcv, shifts=1)
+        np.testing.assert_array_equal(frame.to_numpy(), eager[columns].iloc[-100:].to_numpy())
+        with pytest.raises(KeyError):
+            expansion.materialize(columns=['%-missing_1m'])
+
+    def test_memory_footprint(self, minute_ohlcv):
+        """测试惰性表只占约一份基础特征加行号数组"""
+        expansion = LazyFeatureExpansion(minute_ohlcv['date'], '1m', shifts=2)
+        matrix = np.zeros((len(minute_ohlcv), 4), dtype=np.float32)
+        expansion.add('1m', matrix, columns=list('abcd'))
+
+        assert expansion.materialize().shape == (len(minute_ohlcv), 12)
+        assert expansion.nbytes == matrix.nbytes
+        assert expansion.materialized_nbytes(np.float32) == 3 * matrix.nbytes
+
+    def test_invalid_arguments(self, minute_ohlcv):
+        expansion = LazyFeatureExpansion(minute_ohlcv['date'])
+        with pytest.raises(ValueError):
+            expansion.add('1m', np.zeros((10, 2)), columns=['a', 'b'])
+        with pytest.raises(ValueError):
+            expansion.add('5m', np.zeros((10, 2)), columns=['a', 'b'])
+        with pytest.raises(ValueError):
+            expansion.add('1m', np.zeros((len(minute_ohlcv), 2)))
+        with pytest.raises(ValueError):
+            LazyFeatureExpansion(minute_ohlcv['date'], shifts=-1)
@@ -0,0 +1,136 @@
+"""
+微观结构特征缓存单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.feature_cache import FeatureCache, assign_columns
+from microstructure.features import INTERMEDIATE_NAMES, compute_intermediates
+
+
+def _reference_intermediates(df: pd.DataFrame) -> pd.DataFrame:
+    """按策略原始写法逐列计算（作为对照）"""
+    out = df.copy()
+    out['price_change'] = out['close'].pct_change()
+    out['mf_multiplier'] = ((out['close'] - out['low']) - (out['high'] - out['close'])) / (out['high'] - out['low'])
+    out['mf_multiplier'] = out['mf_multiplier'].fillna(0)
+    out['mf_volume'] = out['mf_multiplier'] * out['volume']
+    out['buy_pressure'] = np.where(out['mf_volume'] > 0, out['mf_volume'], 0)
+    out['sell_pressure'] = np.where(out['mf_volume'] < 0, abs(out['mf_volume']), 0)
+    out['volume_imbalance'] = abs(out['buy_pressure'] - out['sell_pressure'])
+    out['vpin'] = out['volume_imbalance'].rolling(20).sum() / (out['volume'].rolling(20).sum() + 1e-10)
+    out['realized_vol'] = out['price_change'].rolling(20).std()
+    out['trend'] = (out['close'] - out['close'].shift(1440)) / out['close'].shift(1440)
+    out['trend_30d'] = (out['close'] - out['close'].shift(43200)) / out['close'].shift(43200)
+    out['regime_state'] = 1
+    out.loc[
+        (out['trend'] > 0.10) & (out['realized_vol'] > out['realized_vol'].rolling(100).quantile(0.5)),
+        'regime_state'
+    ] = 2
+    out.loc[
+        (out['trend'] < -0.10) & (out['realized_vol'] > out['realized_vol'].rolling(100).quantile(0.5)),
+        'regime_state'
+    ] = 0
+    return out
+
+
+class TestComputeIntermediates:
+    """中间量计算测试"""
+
+    def test_matches_strategy_formulas(self, minute_ohlcv):
+        """测试与策略原始逐列写法一致"""
+        result = compute_intermediates(minute_ohlcv)
+        expected = _reference_intermediates(minute_ohlcv)
+
+        assert set(result) == set(INTERMEDIATE_NAMES)
+        for name in INTERMEDIATE_NAMES:
+            np.testing.assert_allclose(result[name], expected[name].to_numpy(dtype=float), equal_nan=True)
+
+    def test_regime_states_present(self, minute_ohlcv):
+        """测试趋势段能产生非震荡状态"""
+        regime = compute_intermediates(minute_ohlcv)['regime_state']
+        assert set(np.unique(regime)) <= {0, 1, 2}
+        assert (regime != 1).any()
+
+
+class TestFeatureCache:
+    """特征缓存测试"""
+
+    def test_hit_and_miss_counters(self, minute_ohlcv):
+        """测试命中/未命中计数"""
+        cache = FeatureCache()
+        first = cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m')
+        second = cache.get_or_compute(minute_ohlcv.copy(), 'ETH/USDT:USDT', '1m')
+
+        assert first is second
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_key_includes_pair_timeframe_and_length(self, minute_ohlcv):
+        """测试不同交易对、时间框架、窗口长度互不命中"""
+        cache = FeatureCache()
+        cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m')
+        cache.get_or_compute(minute_ohlcv, 'BTC/USDT:USDT', '1m')
+        cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '5m')
+        cache.get_or_compute(minute_ohlcv.iloc[-500:], 'ETH/USDT:USDT', '1m')
+
+        assert cache.stats()['misses'] == 4
+        assert len(cache) == 4
+
+    def test_new_candle_evicts_stale_entry(self, minute_ohlcv):
+        """测试新 K 线到来时淘汰同一交易对的旧条目"""
+        cache = FeatureCache()
+        cache.get_or_compute(minute_ohlcv.iloc[:-1], 'ETH/USDT:USDT', '1m')
+        cache.get_or_compute(minute_ohlcv.iloc[1:], 'ETH/USDT:USDT', '1m')
+
+        assert len(cache) == 1
+
+    def test_invalidate(self, minute_ohlcv):
+        """测试显式失效"""
+        cache = FeatureCache()
+        cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m')
+        cache.get_or_compute(minute_ohlcv, 'BTC/USDT:USDT', '1m')
+
+        assert cache.invalidate(pair='ETH/USDT:USDT') == 1
+        assert len(cache) == 1
+        assert cache.invalidate() == 1
+        assert cache.stats()['invalidations'] == 2
+
+        cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m')
+        assert cache.stats()['misses'] == 3
+
+    def test_put_is_served_by_get(self, minute_ohlcv):
+        """测试预先写入的中间量被 get_or_compute 直接命中并设为只读"""
+        cache = FeatureCache()
+        entry = compute_intermediates(minute_ohlcv)
+        cache.put(FeatureCache.make_key(minute_ohlcv, 'ETH/USDT:USDT', '1m'), entry)
+
+        assert cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m') is entry
+        assert cache.stats()['misses'] == 0
+        assert not entry['vpin'].flags.writeable
+
+    def test_lru_bound(self, minute_ohlcv):
+        """测试条目数上限"""
+        cache = FeatureCache(max_entries=2)
+        for pair in ['A/USDT', 'B/USDT', 'C/USDT']:
+            cache.get_or_compute(minute_ohlcv, pair, '1m')
+
+        assert len(cache) == 2
+
+    def test_invalid_max_entries(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            FeatureCache(max_entries=0)
+
+    def test_assign_columns_copies(self, minute_ohlcv):
+        """测试写入 DataFrame 后修改不会污染缓存"""
+        cache = FeatureCache()
+        intermediates = cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m')
+        df = assign_columns(minute_ohlcv.copy(), intermediates, {'vpin': 'vpin'})
+        df.loc[:, 'vpin'] = -1.0
+
+        assert not (intermediates['vpin'] == -1.0).any()
+        assert not intermediates['vpin'].flags.writeable
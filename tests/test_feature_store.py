@@ -0,0 +1,116 @@
+"""
+持久化特征存储单元测试
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from microstructure.feature_cache import FeatureCache
+from microstructure.feature_store import (
+    FeatureStore,
+    attach_columns,
+    code_fingerprint,
+    data_fingerprint,
+    feature_code_fingerprint,
+)
+from microstructure.kernel import FEATURE_COLUMNS, REGIME_COLUMN, build_features
+
+
+def _compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    return build_features(df, FeatureCache().get_or_compute(df, 'ETH/USDT:USDT', '1m'))[
+        [*FEATURE_COLUMNS, REGIME_COLUMN]
+    ]
+
+
+class TestFingerprints:
+    """指纹测试"""
+
+    def test_data_fingerprint_tracks_content(self, minute_ohlcv):
+        """测试数据指纹随内容与长度变化"""
+        base = data_fingerprint(minute_ohlcv)
+        changed = minute_ohlcv.copy()
+        changed.loc[100, 'close'] *= 1.0001
+
+        assert data_fingerprint(minute_ohlcv.copy()) == base
+        assert data_fingerprint(changed) != base
+        assert data_fingerprint(minute_ohlcv.iloc[1:]) != base
+        assert data_fingerprint(minute_ohlcv, None) != base
+
+    def test_code_fingerprint(self):
+        """测试代码指纹包含额外对象"""
+        assert feature_code_fingerprint() == feature_code_fingerprint()
+        assert feature_code_fingerprint('v2') != feature_code_fingerprint()
+        assert code_fingerprint(_compute_features) != code_fingerprint(data_fingerprint)
+
+
+class TestFeatureStore:
+    """特征存储测试"""
+
+    def test_roundtrip_hit_and_miss(self, tmp_path, minute_ohlcv):
+        """测试未命中时计算写入，命中时读回一致且不再计算"""
+        store = FeatureStore(tmp_path, code_hash=feature_code_fingerprint())
+        fingerprint = data_fingerprint(minute_ohlcv)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return _compute_features(minute_ohlcv)
+
+        first = store.get_or_compute('ETH/USDT:USDT', '1m', fingerprint, compute)
+        second = store.get_or_compute('ETH/USDT:USDT', '1m', fingerprint, compute)
+
+        assert len(calls) == 1
+        assert store.stats()['hits'] == 1
+        assert store.stats()['files'] == 1
+        pd.testing.assert_frame_equal(second, first)
+        assert second[REGIME_COLUMN].dtype == first[REGIME_COLUMN].dtype
+        assert np.isnan(second['%-trend'].to_numpy()).any()
+        assert not second['%-vpin'].to_numpy().flags.writeable
+
+    def test_code_hash_invalidates(self, tmp_path, minute_ohlcv):
+        """测试代码指纹变化后不复用旧文件"""
+        fingerprint = data_fingerprint(minute_ohlcv)
+        FeatureStore(tmp_path, code_hash='a').get_or_compute(
+            'ETH/USDT:USDT', '1m', fingerprint, lambda: _compute_features(minute_ohlcv)
+        )
+        store = FeatureStore(tmp_path, code_hash='b')
+
+        assert store.load(store.make_key('ETH/USDT:USDT', '1m', fingerprint)) is None
+
+    def test_attach_columns(self, tmp_path, minute_ohlcv):
+        """测试读回的特征挂载结果与直接计算一致"""
+        df = minute_ohlcv.set_index(minute_ohlcv.index + 10)
+        store = FeatureStore(tmp_path)
+        features = store.get_or_compute('ETH/USDT:USDT', '1m', data_fingerprint(df), lambda: _compute_features(df))
+        stored = store.get_or_compute('ETH/USDT:USDT', '1m', data_fingerprint(df), lambda: _compute_features(df))
+
+        expected = build_features(df, FeatureCache().get_or_compute(df, 'ETH/USDT:USDT', '1m'))
+        pd.testing.assert_frame_equal(attach_columns(df, stored), expected)
+        assert len(features) == len(df)
+        with pytest.raises(ValueError):
+            attach_columns(df.iloc[1:], stored)
+
+    def test_size_bounded_eviction(self, tmp_path, minute_ohlcv):
+        """测试超过容量时淘汰最久未访问的文件"""
+        features = _compute_features(minute_ohlcv)
+        store = FeatureStore(tmp_path, max_bytes=10**9)
+        paths = [store.save(f'key{i}', features) for i in range(3)]
+        for i, path in enumerate(paths):
+            os.utime(path, (1000 + i, 1000 + i))
+        store.load('key0')  # 访问后成为最新
+
+        store.max_bytes = paths[0].stat().st_size * 2
+        removed = store.evict()
+
+        assert removed == 1
+        assert not paths[1].exists()
+        assert paths[0].exists() and paths[2].exists()
+
+    def test_invalid_capacity(self, tmp_path):
+        with pytest.raises(ValueError):
+            FeatureStore(tmp_path, max_bytes=0)
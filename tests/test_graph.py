@@ -0,0 +1,96 @@
+"""
+声明式特征图单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.graph import FeatureGraph
+from microstructure.kernel import FEATURE_COLUMNS, FEATURE_GRAPH
+
+
+@pytest.fixture
+def columns():
+    np.random.seed(5)
+    n = 500
+    close = 100 * np.exp(np.cumsum(np.random.randn(n) * 0.01))
+    return {'close': close, 'volume': np.random.uniform(10, 100, n)}
+
+
+class TestFeatureGraph:
+    """特征图测试"""
+
+    def test_common_subexpressions_share_nodes(self):
+        """测试相同表达式只建一个节点（含交换律）"""
+        graph = FeatureGraph()
+        close, volume = graph.input('close'), graph.input('volume')
+
+        assert (close.shift(1) / close).node == (close.shift(1) / close).node
+        assert (close + volume).node == (volume + close).node
+        assert (close - volume).node != (volume - close).node
+        assert close.rolling_mean(20).node != close.rolling_mean(12).node
+        assert graph.requests > len(graph.nodes)
+
+    def test_overwritten_output_rejected(self):
+        """测试同名输出在定义期报错"""
+        graph = FeatureGraph()
+        volume = graph.input('volume')
+        graph.output('%-volume_ratio', volume / volume.rolling_mean(12))
+
+        with pytest.raises(ValueError, match='重复定义'):
+            graph.output('%-volume_ratio', volume / volume.rolling_mean(20))
+
+    def test_evaluate_matches_pandas(self, columns):
+        """测试求值结果与 pandas 一致，且只计算输出可达的节点"""
+        graph = FeatureGraph()
+        close, volume = graph.input('close'), graph.input('volume')
+        graph.output('momentum', close / close.shift(5) - 1)
+        graph.output('vol_std', close.rolling_std(12))
+        graph.output('vol_std_24', close.rolling_std(24))
+        graph.output('volume_ma', volume.rolling_mean(20))
+        _unused = volume * 3.0
+
+        result = graph.evaluate(columns)
+        close_s, volume_s = pd.Series(columns['close']), pd.Series(columns['volume'])
+
+        np.testing.assert_allclose(result['momentum'], close_s.pct_change(5), equal_nan=True)
+        np.testing.assert_allclose(result['vol_std'], close_s.rolling(12).std(), rtol=1e-8, equal_nan=True)
+        np.testing.assert_allclose(result['vol_std_24'], close_s.rolling(24).std(), rtol=1e-8, equal_nan=True)
+        np.testing.assert_allclose(result['volume_ma'], volume_s.rolling(20).mean(), rtol=1e-10, equal_nan=True)
+        assert graph.stats()['live_nodes'] == graph.stats()['nodes'] - 1
+
+    def test_evaluate_into_out(self, columns):
+        """测试写入预分配数组（按其 dtype 转换）"""
+        graph = FeatureGraph()
+        close = graph.input('close')
+        graph.output('range', abs(close - close.shift(1)))
+        out = {'range': np.empty(len(columns['close']), dtype=np.float32)}
+
+        result = graph.evaluate(columns, out=out)
+
+        assert result['range'] is out['range']
+        np.testing.assert_allclose(out['range'][1:], np.abs(np.diff(columns['close'])), rtol=1e-6)
+
+    def test_invalid_usage(self, columns):
+        graph = FeatureGraph()
+        close = graph.input('close')
+        graph.output('x', close.shift(1))
+        with pytest.raises(ValueError):
+            graph.evaluate({'volume': columns['volume']})
+        with pytest.raises(ValueError):
+            FeatureGraph().output('y', close)
+        with pytest.raises(ValueError):
+            close.shift(-1)
+
+
+class TestStrategyGraph:
+    """策略特征图测试"""
+
+    def test_outputs_and_sharing(self):
+        """测试策略特征图的输出与去重"""
+        stats = FEATURE_GRAPH.stats()
+
+        assert FEATURE_GRAPH.output_names == FEATURE_COLUMNS
+        assert len(FEATURE_COLUMNS) == 23
+        assert stats['aliases'] == 2  # %-kyle_lambda / %-kyle_lambda_ma 与 Amihud 共用节点
+        assert stats['requested'] > stats['nodes']
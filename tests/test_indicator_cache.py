@@ -0,0 +1,152 @@
+"""
+跨策略指标记忆化单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from microstructure.feature_store import FeatureStore
+from microstructure.indicator_cache import IndicatorCache, shared_indicator_cache
+
+
+def _bollinger(close: pd.Series, window: int = 20, stds: int = 2) -> pd.DataFrame:
+    """与 qtpylib.bollinger_bands 同形的输出（lower / mid / upper）"""
+    mid = close.rolling(window).mean()
+    std = close.rolling(window).std(ddof=0)
+    return pd.DataFrame({'lower': mid - std * stds, 'mid': mid, 'upper': mid + std * stds})
+
+
+class Counter:
+    """记录被调用次数的指标函数"""
+
+    def __init__(self, func):
+        self.func = func
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.func(*args, **kwargs)
+
+
+class TestIndicatorCache:
+    """指标缓存测试"""
+
+    def test_shared_across_strategies(self, minute_ohlcv):
+        """测试同一数据与参数只计算一次（另一策略传入的是数据副本）"""
+        cache = IndicatorCache()
+        bollinger = Counter(_bollinger)
+        first = cache.get_or_compute(
+            minute_ohlcv, 'ETH/USDT:USDT', '1m', 'bollinger_bands', {'window': 20, 'stds': 2},
+            lambda: bollinger(minute_ohlcv['close'], window=20, stds=2),
+        )
+        other = minute_ohlcv.copy()
+        second = cache.get_or_compute(
+            other, 'ETH/USDT:USDT', '1m', 'bollinger_bands', {'stds': 2, 'window': 20},
+            lambda: bollinger(other['close'], window=20, stds=2),
+        )
+
+        assert bollinger.calls == 1
+        assert second is first
+        assert set(first) == {'lower', 'mid', 'upper'}
+        np.testing.assert_allclose(first['mid'], _bollinger(minute_ohlcv['close'])['mid'].to_numpy())
+        assert not first['upper'].flags.writeable
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    def test_key_includes_params_pair_and_data(self, minute_ohlcv):
+        """测试参数、交易对或数据范围不同时互不命中"""
+        cache = IndicatorCache()
+        sma = Counter(lambda df, n: df['close'].rolling(n).mean())
+        for frame, pair, n in [
+            (minute_ohlcv, 'ETH/USDT:USDT', 10),
+            (minute_ohlcv, 'ETH/USDT:USDT', 20),
+            (minute_ohlcv, 'BTC/USDT:USDT', 10),
+            (minute_ohlcv.iloc[1:], 'ETH/USDT:USDT', 10),
+        ]:
+            cache.get_or_compute(frame, pair, '1m', 'sma', {'n': n}, lambda: sma(frame, n))
+
+        assert sma.calls == 4
+        assert len(cache) == 4
+
+    def test_same_span_different_content(self, tmp_path, minute_ohlcv):
+        """测试时间跨度相同但价格不同（如 Heikin-Ashi、修正后的 K 线）时不读到旧指标，也不写错磁盘条目"""
+        cache = IndicatorCache(FeatureStore(tmp_path))
+        sma = Counter(lambda df: df['close'].rolling(10).mean())
+        heikin_ashi = minute_ohlcv.copy()
+        heikin_ashi['close'] = minute_ohlcv[['open', 'high', 'low', 'close']].mean(axis=1)
+        corrected = minute_ohlcv.copy()
+        corrected.loc[2000, 'volume'] += 1.0
+
+        results = [
+            cache.get_or_compute(frame, 'ETH/USDT:USDT', '1m', 'sma', {'n': 10}, lambda frame=frame: sma(frame))
+            for frame in (minute_ohlcv, heikin_ashi, corrected)
+        ]
+        assert sma.calls == 3
+        np.testing.assert_allclose(results[1]['sma'], heikin_ashi['close'].rolling(10).mean().to_numpy())
+        fingerprints = {cache.fingerprint(frame, 'ETH/USDT:USDT', '1m') for frame in (minute_ohlcv, heikin_ashi, corrected)}
+        assert len(fingerprints) == 3
+
+    def test_persisted_across_processes(self, tmp_path, minute_ohlcv):
+        """测试落盘后新的缓存实例（如下一个回测进程）直接读回，数据内容或指标库版本变化时失效"""
+        adx = Counter(lambda: minute_ohlcv['close'].diff().abs().rolling(14).mean())
+        IndicatorCache(FeatureStore(tmp_path, code_hash='talib 0.4')).get_or_compute(
+            minute_ohlcv, 'ETH/USDT:USDT', '1m', 'adx', {'timeperiod': 14}, adx
+        )
+
+        cache = IndicatorCache(FeatureStore(tmp_path, code_hash='talib 0.4'))
+        restored = cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m', 'adx', {'timeperiod': 14}, adx)
+        assert adx.calls == 1
+        assert cache.stats()['store_hits'] == 1
+        np.testing.assert_array_equal(restored['adx'], adx.func().to_numpy())
+
+        changed = minute_ohlcv.copy()
+        changed.loc[10, 'close'] *= 1.01
+        IndicatorCache(FeatureStore(tmp_path, code_hash='talib 0.4')).get_or_compute(
+            changed, 'ETH/USDT:USDT', '1m', 'adx', {'timeperiod': 14}, adx
+        )
+        IndicatorCache(FeatureStore(tmp_path, code_hash='talib 0.5')).get_or_compute(
+            minute_ohlcv, 'ETH/USDT:USDT', '1m', 'adx', {'timeperiod': 14}, adx
+        )
+        assert adx.calls == 3
+
+    def test_disabled_computes_directly(self, minute_ohlcv):
+        """测试关闭时每次直接计算且不缓存"""
+        cache = IndicatorCache(enabled=False)
+        close = Counter(lambda: minute_ohlcv['close'].to_numpy())
+        for _ in range(2):
+            result = cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m', 'close', {}, close)
+
+        assert close.calls == 2
+        assert len(cache) == 0
+        np.testing.assert_array_equal(result['close'], minute_ohlcv['close'].to_numpy())
+
+    def test_byte_bound(self, minute_ohlcv):
+        """测试超过容量上限时按 LRU 淘汰"""
+        cache = IndicatorCache(max_bytes=2 * len(minute_ohlcv) * 8)
+        for n in (5, 10, 20):
+            cache.get_or_compute(
+                minute_ohlcv, 'ETH/USDT:USDT', '1m', 'sma', {'n': n},
+                lambda: minute_ohlcv['close'].rolling(n).mean(),
+            )
+
+        assert len(cache) == 2
+        assert cache.stats()['bytes'] <= cache.max_bytes
+
+    def test_invalid_output(self, minute_ohlcv):
+        """测试输出长度与数据不一致"""
+        cache = IndicatorCache()
+        with pytest.raises(ValueError):
+            cache.get_or_compute(minute_ohlcv, 'ETH/USDT:USDT', '1m', 'bad', {}, lambda: np.zeros(3))
+        with pytest.raises(ValueError):
+            IndicatorCache(max_bytes=0)
+
+    def test_shared_instance(self, tmp_path):
+        """测试进程内共享实例，首次提供的存储被挂上"""
+        cache = shared_indicator_cache()
+        store = FeatureStore(tmp_path)
+
+        assert shared_indicator_cache(store) is cache
+        assert cache.store is not None
+        assert shared_indicator_cache(FeatureStore(tmp_path / 'other')).store is cache.store
@@ -0,0 +1,198 @@
+"""
+微观结构特征融合内核单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.features import compute_intermediates
+from microstructure.kernel import (
+    FEATURE_COLUMNS,
+    REGIME_COLUMN,
+    build_features,
+    compute_feature_matrix,
+    feature_dtypes,
+)
+from microstructure.rolling import rolling_mean_into, rolling_std_into
+
+
+def _reference_features(df: pd.DataFrame, intermediates: dict) -> pd.DataFrame:
+    """按策略原始 pandas 写法逐列计算（作为对照）"""
+    out = df.copy()
+    out['%-price_change'] = intermediates['price_change']
+    out['%-vpin'] = intermediates['vpin']
+    out['tr'] = np.maximum(
+        out['high'] - out['low'],
+        np.maximum(abs(out['high'] - out['close'].shift(1)), abs(out['low'] - out['close'].shift(1)))
+    )
+    out['%-atr_14'] = out['tr'].rolling(14).mean()
+    out['%-atr_normalized'] = out['%-atr_14'] / out['close']
+    for window in [12, 24, 48]:
+        out[f'%-realized_vol_{window}'] = out['close'].pct_change().rolling(window).std()
+    for window in [5, 10, 15]:
+        out[f'%-momentum_{window}'] = out['close'].pct_change(window)
+    out['%-volume_sma_12'] = out['volume'].rolling(12).mean()
+
+    buy = pd.Series(intermediates['buy_pressure'], index=out.index)
+    sell = pd.Series(intermediates['sell_pressure'], index=out.index)
+    total_vol = buy + sell
+    out['%-microprice'] = np.where(
+        total_vol > 0,
+        (sell * out['low'] + buy * out['high']) / total_vol,
+        (out['low'] + out['high']) / 2
+    )
+    out['%-microprice_vs_close'] = (out['%-microprice'] - out['close']) / out['close']
+    out['%-amihud'] = abs(out['%-price_change']) / (out['volume'] + 1e-10)
+    out['%-amihud_ma'] = out['%-amihud'].rolling(20).mean()
+    out['%-kyle_lambda'] = abs(out['%-price_change']) / (out['volume'] + 1e-10)
+    out['%-kyle_lambda_ma'] = out['%-kyle_lambda'].rolling(20).mean()
+    out['%-realized_vol'] = intermediates['realized_vol']
+    out['%-price_range'] = (out['high'] - out['low']) / out['close']
+    out['%-price_range_ma'] = out['%-price_range'].rolling(20).mean()
+    out['%-volume_vol'] = out['volume'].rolling(20).std() / (out['volume'].rolling(20).mean() + 1e-10)
+    out['%-trend'] = intermediates['trend']
+    out['%-regime_state'] = intermediates['regime_state']
+    out['%-volume_ratio'] = out['volume'] / (out['volume'].rolling(20).mean() + 1e-10)
+    out['%-momentum_5'] = (out['close'] - out['close'].shift(5)) / out['close'].shift(5)
+    out['%-momentum_10'] = (out['close'] - out['close'].shift(10)) / out['close'].shift(10)
+    return out
+
+
+class TestRollingHelpers:
+    """滚动辅助函数测试"""
+
+    @pytest.mark.parametrize('window', [1, 3, 20])
+    def test_mean_and_std_match_pandas(self, window):
+        """测试与 pandas rolling().mean() / std() 一致（含 NaN）"""
+        np.random.seed(3)
+        values = np.random.randn(500)
+        values[[0, 250]] = np.nan
+        series = pd.Series(values)
+
+        mean = rolling_mean_into(values, window, np.empty(len(values)))
+        np.testing.assert_allclose(mean, series.rolling(window).mean(), rtol=1e-9, equal_nan=True)
+        if window > 1:
+            std = rolling_std_into(values, window, np.empty(len(values)))
+            np.testing.assert_allclose(std, series.rolling(window).std(), rtol=1e-9, equal_nan=True)
+
+    def test_constant_windows_are_zero(self):
+        """测试常数窗口（连续零成交量）的标准差与 pandas 一样为 0，而不是前缀和的浮点残差"""
+        np.random.seed(4)
+        volume = np.random.lognormal(8, 1, 600)
+        volume[100:160] = 0.0
+        volume[300:330] = 2.5
+        series = pd.Series(volume)
+
+        std, std_short = rolling_std_into(volume, (20, 5), (np.empty(len(volume)), np.empty(len(volume))))
+        np.testing.assert_allclose(std, series.rolling(20).std(), rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(std_short, series.rolling(5).std(), rtol=1e-9, equal_nan=True)
+        assert (std[119:160] == 0).all() and (std[319:330] == 0).all()
+        assert (std[160:180] > 0).all()
+
+    def test_shorter_than_window(self):
+        """测试数据短于窗口时全部为 NaN"""
+        out = rolling_std_into(np.arange(5.0), 10, np.empty(5))
+        assert np.isnan(out).all()
+
+
+class TestFeatureKernel:
+    """融合内核测试"""
+
+    def test_matches_pandas_reference(self, minute_ohlcv):
+        """测试与策略原 pandas 实现逐列一致"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        result = build_features(minute_ohlcv, intermediates)
+        expected = _reference_features(minute_ohlcv, intermediates)
+
+        for name in FEATURE_COLUMNS:
+            np.testing.assert_allclose(
+                result[name].to_numpy(), expected[name].to_numpy(dtype=float),
+                rtol=1e-9, atol=1e-15, equal_nan=True, err_msg=name,
+            )
+        np.testing.assert_array_equal(result[REGIME_COLUMN], expected[REGIME_COLUMN])
+        assert result[REGIME_COLUMN].dtype == np.int64
+
+    def test_zero_volume_run(self, minute_ohlcv):
+        """测试连续零成交量时 %-volume_vol 为 0（不被 std / (0 + 1e-10) 的残差放大）"""
+        df = minute_ohlcv.copy()
+        df.loc[200:260, 'volume'] = 0.0
+        intermediates = compute_intermediates(df)
+        result = build_features(df, intermediates)
+        expected = _reference_features(df, intermediates)
+
+        np.testing.assert_allclose(
+            result['%-volume_vol'].to_numpy(), expected['%-volume_vol'].to_numpy(), rtol=1e-9, equal_nan=True
+        )
+        assert (result['%-volume_vol'].to_numpy()[219:261] == 0).all()
+
+    def test_no_scratch_columns(self, minute_ohlcv):
+        """测试只新增特征列，不留下临时列"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        result = build_features(minute_ohlcv, intermediates)
+
+        added = set(result.columns) - set(minute_ohlcv.columns)
+        assert added == set(FEATURE_COLUMNS) | {REGIME_COLUMN}
+        assert all(name.startswith('%-') for name in added)
+
+    def test_recompute_replaces_existing_columns(self, minute_ohlcv):
+        """测试重复调用时覆盖已有特征列而不是重复追加"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        once = build_features(minute_ohlcv, intermediates)
+        twice = build_features(once, intermediates)
+
+        assert list(twice.columns) == list(once.columns)
+
+    def test_matrix_layout_and_dtype(self, minute_ohlcv):
+        """测试矩阵为列优先并支持指定 dtype"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        arrays = [minute_ohlcv[c].to_numpy() for c in ('high', 'low', 'close', 'volume')]
+        matrix = compute_feature_matrix(*arrays, intermediates, dtype=np.float32)
+
+        assert matrix.shape == (len(minute_ohlcv), len(FEATURE_COLUMNS))
+        assert matrix.dtype == np.float32
+        assert matrix.flags.f_contiguous
+
+    def test_empty_frame(self, minute_ohlcv):
+        """测试空数据框"""
+        empty = minute_ohlcv.iloc[:0]
+        result = build_features(empty, compute_intermediates(empty))
+
+        assert len(result) == 0
+        assert REGIME_COLUMN in result.columns
+
+
+class TestCompactMode:
+    """紧凑特征测试"""
+
+    def test_dtypes_and_values(self, minute_ohlcv):
+        """测试紧凑模式的列类型，且数值与 float64 在 float32 精度内一致"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        full = build_features(minute_ohlcv, intermediates)
+        compact = build_features(minute_ohlcv, intermediates, *feature_dtypes(True))
+
+        assert all(compact[name].dtype == np.float32 for name in FEATURE_COLUMNS)
+        assert compact[REGIME_COLUMN].dtype == np.int8
+        np.testing.assert_array_equal(compact[REGIME_COLUMN], full[REGIME_COLUMN])
+        for name in FEATURE_COLUMNS:
+            np.testing.assert_allclose(
+                compact[name].to_numpy(dtype=float), full[name], rtol=1e-6, atol=1e-30, equal_nan=True, err_msg=name,
+            )
+        assert compact.memory_usage().sum() < full.memory_usage().sum() * 0.6
+
+    def test_prediction_drift(self, minute_ohlcv):
+        """测试用紧凑特征训练的线性模型预测与 float64 的漂移在容差内"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        target = minute_ohlcv['close'].pct_change(5).shift(-5).to_numpy()
+        predictions = []
+        for compact in (False, True):
+            features = build_features(minute_ohlcv, intermediates, *feature_dtypes(compact))
+            x = features[list(FEATURE_COLUMNS)].to_numpy()
+            valid = np.isfinite(x).all(axis=1) & np.isfinite(target)
+            design = (x[valid] - x[valid].mean(axis=0)) / x[valid].std(axis=0, dtype=np.float64)
+            design = design.astype(np.float64)
+            gram = design.T @ design + np.eye(design.shape[1]) * len(design) * 1e-3
+            coef = np.linalg.solve(gram, design.T @ target[valid])
+            predictions.append(design @ coef)
+
+        drift = np.abs(predictions[1] - predictions[0]).max() / predictions[0].std()
+        assert drift < 1e-3
@@ -0,0 +1,115 @@
+"""
+K 线收盘到入场信号延迟埋点单元测试
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.latency import DEFAULT_BIN_EDGES, LatencyHistogram, SignalLatencyTracker
+
+
+class FakeClock:
+    """可手动推进的墙钟"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyHistogram:
+    """对数分桶直方图测试"""
+
+    def test_quantiles_within_bin_width(self):
+        """测试分位数估计与精确值的相对误差不超过一个桶宽"""
+        rng = np.random.default_rng(11)
+        samples = rng.lognormal(np.log(0.8), 0.7, 20000)
+        histogram = LatencyHistogram(DEFAULT_BIN_EDGES)
+        for value in samples:
+            histogram.add(value)
+
+        stats = histogram.stats()
+        assert stats['count'] == len(samples)
+        assert stats['max'] == samples.max()
+        assert stats['mean'] == pytest.approx(samples.mean())
+        for q in (0.5, 0.95, 0.99):
+            assert stats[f'p{round(q * 100)}'] == pytest.approx(np.quantile(samples, q), rel=0.13)
+
+    def test_edges_and_empty(self):
+        histogram = LatencyHistogram(DEFAULT_BIN_EDGES)
+        assert np.isnan(histogram.quantile(0.5))
+        histogram.add(-0.5)
+        histogram.add(5000.0)
+        assert histogram.quantile(0.01) <= DEFAULT_BIN_EDGES[0]
+        assert histogram.quantile(0.99) == 5000.0
+
+
+class TestSignalLatencyTracker:
+    """信号延迟埋点测试"""
+
+    def test_stage_latencies_and_durations(self):
+        """测试各阶段相对收盘的延迟与相邻阶段耗时"""
+        candle_open = pd.Timestamp('2024-01-01 00:00', tz='UTC')
+        close = candle_open.timestamp() + 60
+        clock = FakeClock(close + 3.0)
+        tracker = SignalLatencyTracker('1m', clock=clock)
+
+        tracker.mark('ETH/USDT:USDT', 'arrival', candle_open, at=close + 1.5)
+        for stage, at in (('analysis', 3.0), ('freqai', 3.4), ('indicators', 3.45), ('signal', 3.5)):
+            clock.now = close + at
+            assert tracker.mark('ETH/USDT:USDT', stage, candle_open) == pytest.approx(at)
+        clock.now += 10
+        assert tracker.mark('ETH/USDT:USDT', 'signal', candle_open) == pytest.approx(3.5)
+
+        summary = tracker.summary().set_index('metric')
+        assert list(summary.index) == [
+            'arrival', 'analysis', 'freqai', 'indicators', 'signal', 'queue', 'freqai_s', 'indicators_s', 'entry_s'
+        ]
+        assert (summary['count'] == 1).all()
+        expected = {'arrival': 1500, 'signal': 3500, 'queue': 1500, 'freqai_s': 400, 'indicators_s': 50,
+                    'entry_s': 50}
+        for metric, value in expected.items():
+            assert summary.loc[metric, 'max_ms'] == pytest.approx(value)
+            assert summary.loc[metric, 'p50_ms'] == pytest.approx(value, rel=0.13)
+
+    def test_new_candle_discards_incomplete(self):
+        """测试换到新 K 线后不会用上一根 K 线的阶段计算耗时；无时区时间按 UTC"""
+        tracker = SignalLatencyTracker('1m', clock=FakeClock(0.0))
+        first, second = pd.Timestamp('2024-01-01 00:00'), pd.Timestamp('2024-01-01 00:01')
+        tracker.mark('ETH/USDT:USDT', 'analysis', first, at=first.tz_localize('UTC').timestamp() + 61)
+        tracker.mark('ETH/USDT:USDT', 'freqai', second, at=second.tz_localize('UTC').timestamp() + 62)
+
+        summary = tracker.summary('ETH/USDT:USDT')
+        assert set(summary['metric']) == {'analysis', 'freqai'}
+        assert summary.set_index('metric').loc['freqai', 'max_ms'] == pytest.approx(2000)
+
+    def test_flush_appends_windows(self, tmp_path):
+        """测试 flush 追加上一窗口的统计并开始新窗口，累计统计不受影响"""
+        clock = FakeClock(1000.0)
+        tracker = SignalLatencyTracker('1m', clock=clock)
+        candle_open = pd.Timestamp(0, unit='s', tz='UTC')
+        path = tmp_path / 'latency' / 'signal_latency.jsonl'
+
+        tracker.mark('ETH/USDT:USDT', 'signal', candle_open, at=62.0)
+        tracker.mark('BTC/USDT:USDT', 'signal', candle_open, at=61.0)
+        assert tracker.flush(path) == 2
+        assert tracker.flush(path) == 0
+        clock.now = 2000.0
+        tracker.mark('ETH/USDT:USDT', 'signal', candle_open + pd.Timedelta(minutes=1), at=125.0)
+        assert tracker.flush(path) == 1
+
+        lines = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        assert [(line['pair'], line['count'], line['window_end']) for line in lines] == [
+            ('ETH/USDT:USDT', 1, 1000.0), ('BTC/USDT:USDT', 1, 1000.0), ('ETH/USDT:USDT', 1, 2000.0)
+        ]
+        assert lines[2]['max'] == pytest.approx(5.0)
+        assert tracker.summary('ETH/USDT:USDT')['count'].iloc[0] == 2
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            SignalLatencyTracker(bin_edges=[0.0, 1.0])
+        with pytest.raises(ValueError):
+            SignalLatencyTracker().mark('ETH/USDT:USDT', 'exit', pd.Timestamp(0))
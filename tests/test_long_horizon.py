@@ -0,0 +1,117 @@
+"""
+多分辨率长周期趋势单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.features import compute_intermediates
+from microstructure.long_horizon import (
+    LongHorizonTrendProvider,
+    resample_ohlcv,
+    timeframe_to_timedelta,
+)
+
+
+@pytest.fixture
+def three_days_1m():
+    """3 天的 1 分钟数据（从非整点开始）"""
+    np.random.seed(5)
+    n = 3 * 1440
+    close = 2000 * np.exp(np.cumsum(np.random.randn(n) * 0.001))
+    return pd.DataFrame({
+        'date': pd.date_range('2024-03-01 00:17', periods=n, freq='1min', tz='UTC'),
+        'open': close,
+        'high': close * 1.001,
+        'low': close * 0.999,
+        'close': close,
+        'volume': np.random.uniform(100, 1000, n),
+    })
+
+
+class TestTimeframe:
+    """时间框架转换测试"""
+
+    def test_conversion(self):
+        assert timeframe_to_timedelta('1m') == pd.Timedelta(minutes=1)
+        assert timeframe_to_timedelta('15m') == pd.Timedelta(minutes=15)
+        assert timeframe_to_timedelta('1h') == pd.Timedelta(hours=1)
+        assert timeframe_to_timedelta('1d') == pd.Timedelta(days=1)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            timeframe_to_timedelta('1x')
+
+
+class TestLongHorizonTrend:
+    """长周期趋势测试"""
+
+    def test_matches_shift_at_hour_close(self, three_days_1m):
+        """测试整点收盘的 1m K 线与 shift(1440) 完全一致"""
+        provider = LongHorizonTrendProvider()
+        result = provider.compute(three_days_1m)
+
+        close = three_days_1m['close']
+        expected = ((close - close.shift(1440)) / close.shift(1440)).to_numpy()
+        at_hour_close = (three_days_1m['date'].dt.minute == 59).to_numpy() & ~np.isnan(expected)
+
+        assert at_hour_close.sum() > 24
+        np.testing.assert_allclose(result['trend'][at_hour_close], expected[at_hour_close])
+
+    def test_reference_is_at_most_one_hour_stale(self, three_days_1m):
+        """测试基准价格最多比 shift(1440) 早一个小时"""
+        provider = LongHorizonTrendProvider()
+        result = provider.compute(three_days_1m)
+
+        close = three_days_1m['close'].to_numpy()
+        reference = close / (1 + result['trend'])
+        valid = ~np.isnan(reference)
+        for i in np.flatnonzero(valid)[::97]:
+            window = close[max(i - 1440 - 60, 0):i - 1440 + 1]
+            assert np.isclose(window, reference[i]).any()
+
+    def test_no_lookahead(self, three_days_1m):
+        """测试修改未来数据不影响已有结果"""
+        provider = LongHorizonTrendProvider()
+        base = provider.compute(three_days_1m)
+
+        modified = three_days_1m.copy()
+        modified.loc[modified.index[-300:], 'close'] *= 1.5
+        changed = provider.compute(modified)
+
+        np.testing.assert_array_equal(base['trend'][:-300], changed['trend'][:-300])
+
+    def test_provided_frames_take_priority(self, three_days_1m):
+        """测试外部提供的 1h 数据优先，未覆盖部分由 1m 重采样补齐"""
+        provider = LongHorizonTrendProvider()
+        hourly = resample_ohlcv(three_days_1m, '1h')
+        partial = hourly.iloc[30:].copy()
+
+        expected = provider.compute(three_days_1m)
+        result = provider.compute(three_days_1m, {'1h': partial})
+        np.testing.assert_array_equal(result['trend'], expected['trend'])
+
+        shifted = partial.copy()
+        shifted['close'] *= 2
+        result = provider.compute(three_days_1m, {'1h': shifted})
+        uses_provided = (three_days_1m['date'] >= hourly['date'].iloc[30] + pd.Timedelta(days=1)).to_numpy()
+        assert not np.allclose(result['trend'][uses_provided], expected['trend'][uses_provided])
+        np.testing.assert_array_equal(result['trend'][~uses_provided], expected['trend'][~uses_provided])
+
+    def test_short_live_frame_gets_trend(self, three_days_1m):
+        """测试只有 100 根 1m K 线时也能从 1h / 1d 数据得到趋势"""
+        provider = LongHorizonTrendProvider()
+        hourly = resample_ohlcv(three_days_1m, '1h')
+        live = three_days_1m.iloc[-100:].reset_index(drop=True)
+
+        result = provider.compute(live, {'1h': hourly})
+
+        assert not np.isnan(result['trend']).any()
+        assert np.isnan(result['trend_30d']).all()
+
+    def test_compute_intermediates_uses_provider(self, three_days_1m):
+        """测试中间量计算接入提供器"""
+        provider = LongHorizonTrendProvider()
+        result = compute_intermediates(three_days_1m, trend_provider=provider)
+
+        np.testing.assert_array_equal(result['trend'], provider.compute(three_days_1m)['trend'])
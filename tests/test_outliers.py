@@ -0,0 +1,99 @@
+"""
+离群点过滤单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.outliers import OUTLIER_METHODS, OutlierFilter
+
+
+@pytest.fixture
+def training_set():
+    """相关的高斯特征 + 前 50 行注入的离群点 + 一列常数"""
+    rng = np.random.default_rng(5)
+    n = 4000
+    base = rng.standard_normal((n, 6)) @ rng.standard_normal((6, 6))
+    base[:50] += rng.choice([-1.0, 1.0], size=(50, 6)) * 12
+    x = np.column_stack([base, np.full(n, 0.5)])
+    return x, rng.standard_normal(n), rng.uniform(0.5, 1.0, n)
+
+
+class TestOutlierFilter:
+    """离群点过滤步骤测试"""
+
+    @pytest.mark.parametrize('method', OUTLIER_METHODS)
+    def test_drops_injected_outliers(self, method, training_set):
+        """测试各方法删除约 nu 比例的训练行且覆盖注入的离群点，y 与权重同步删行"""
+        x, y, weight = training_set
+        step = OutlierFilter(method, nu=0.05, max_fit_rows=1500, n_estimators=50)
+        x_kept, y_kept, weight_kept, names = step.fit_transform(x, y, weight, ['a', 'b', 'c', 'd', 'e', 'f', 'g'])
+
+        keep = step.keep_mask(x)
+        assert not keep[:50].any()
+        assert len(x_kept) == keep.sum() == len(x) - round(0.05 * len(x))
+        np.testing.assert_array_equal(y_kept, y[keep])
+        np.testing.assert_array_equal(weight_kept, weight[keep])
+        assert names == ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+        assert step.n_fit_rows == 1500
+        summary = step.summary()
+        assert summary['n_dropped'] == len(x) - len(x_kept) and summary['n_rows'] == len(x)
+
+    def test_summary_reports_training_rows(self, training_set):
+        """测试 FreqAI 先 fit_transform 训练集、再 transform 测试集时，摘要里的训练集删除行数不被测试集覆盖"""
+        x, y, weight = training_set
+        step = OutlierFilter(nu=0.1)
+        step.fit_transform(x[:3000], y[:3000], weight[:3000])
+        step.transform(x[3000:], y[3000:], weight[3000:])
+
+        summary = step.summary()
+        assert summary['n_rows'] == 3000 and summary['n_dropped'] == 300 and summary['n_kept'] == 2700
+        assert summary['n_test_rows'] == 1000
+        assert summary['n_test_dropped'] == int((~step.keep_mask(x[3000:])).sum())
+
+    def test_prediction_outlier_check(self, training_set):
+        """测试预测时不删行，y 返回 1 / 0 保留掩码（与 SVMOutlierExtractor 一致），不改变训练统计"""
+        x, y, weight = training_set
+        step = OutlierFilter(nu=0.05)
+        step.fit_transform(x, y, weight)
+        dropped = step.n_dropped
+
+        x_out, mask, weight_out, _ = step.transform(x[:100], outlier_check=True)
+        assert x_out.shape == (100, x.shape[1])
+        assert weight_out is None
+        assert set(np.unique(mask)) <= {0, 1} and (mask[:50] == 0).all()
+        assert step.n_dropped == dropped
+
+    def test_dataframe_and_non_finite_rows(self, training_set):
+        """测试 DataFrame 输入保持类型与索引，含 NaN 的行判为离群"""
+        x, y, _ = training_set
+        frame = pd.DataFrame(x, columns=list('abcdefg'))
+        labels = pd.DataFrame({'&-target': y})
+        step = OutlierFilter('isolation', n_estimators=20)
+        step.fit(frame, labels)
+
+        frame.iloc[60, 2] = np.nan
+        x_kept, y_kept, _, _ = step.transform(frame, labels)
+        assert isinstance(x_kept, pd.DataFrame) and isinstance(y_kept, pd.DataFrame)
+        assert 60 not in x_kept.index
+        assert x_kept.index.equals(y_kept.index)
+
+    def test_reproducible(self, training_set):
+        """测试相同 random_state 的子样本拟合结果一致"""
+        x = training_set[0]
+        first, second = (OutlierFilter('isolation', max_fit_rows=1000, n_estimators=10) for _ in range(2))
+        first.fit(x)
+        second.fit(x)
+
+        assert first.threshold == second.threshold
+        np.testing.assert_array_equal(first.score(x), second.score(x))
+
+    def test_invalid_arguments(self, training_set):
+        with pytest.raises(ValueError):
+            OutlierFilter('svm')
+        with pytest.raises(ValueError):
+            OutlierFilter(nu=0.0)
+        with pytest.raises(ValueError):
+            OutlierFilter().transform(training_set[0])
+        with pytest.raises(ValueError):
+            OutlierFilter().fit(np.full((10, 2), np.nan))
@@ -0,0 +1,118 @@
+"""
+交易对并行特征计算单元测试
+"""
+
+import time
+
+import numpy as np
+import pytest
+from microstructure.features import INTERMEDIATE_NAMES, compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, compute_feature_matrix
+from microstructure.long_horizon import LongHorizonTrendProvider
+from microstructure.parallel import ParallelFeatureComputer
+
+
+@pytest.fixture(scope='module')
+def computer():
+    """两个子进程的计算器（模块内共用，避免重复启动进程池）"""
+    with ParallelFeatureComputer(workers=2, budget=60.0) as instance:
+        yield instance
+
+
+class SlowTrendProvider(LongHorizonTrendProvider):
+    """模拟卡住的子进程计算"""
+
+    def compute(self, dataframe, compact_frames=None, start=0):
+        time.sleep(30)
+        return super().compute(dataframe, compact_frames, start)
+
+
+def _pairs(minute_ohlcv):
+    """三个交易对：原始数据、价格缩放、较短窗口"""
+    scaled = minute_ohlcv.copy()
+    scaled[['open', 'high', 'low', 'close']] *= 0.05
+    return {
+        'ETH/USDT:USDT': minute_ohlcv,
+        'SOL/USDT:USDT': scaled,
+        'BTC/USDT:USDT': minute_ohlcv.iloc[-1500:].reset_index(drop=True),
+    }
+
+
+class TestParallelFeatureComputer:
+    """并行特征计算测试"""
+
+    def test_matches_serial(self, computer, minute_ohlcv):
+        """测试子进程结果与串行路径逐位一致（含长周期趋势、订单流与成交量同步 VPIN）"""
+        frames = _pairs(minute_ohlcv)
+        provider = LongHorizonTrendProvider()
+        order_flow = {
+            'buy_volume': minute_ohlcv['volume'].to_numpy() * 0.6,
+            'sell_volume': minute_ohlcv['volume'].to_numpy() * 0.4,
+        }
+        kwargs = {
+            'ETH/USDT:USDT': {'trend_provider': provider, 'order_flow': order_flow},
+            'SOL/USDT:USDT': {'vpin_bucket_volume': 5000.0},
+        }
+        results = computer.compute(frames, kwargs, dtype=np.float32)
+
+        assert set(results) == set(frames)
+        for pair, dataframe in frames.items():
+            expected = compute_intermediates(dataframe, **kwargs.get(pair, {}))
+            intermediates, matrix = results[pair]
+            for name in INTERMEDIATE_NAMES:
+                np.testing.assert_array_equal(intermediates[name], expected[name])
+            assert intermediates['regime_state'].dtype == np.int64
+            expected_matrix = compute_feature_matrix(
+                *(dataframe[c].to_numpy() for c in ('high', 'low', 'close', 'volume')), expected, dtype=np.float32
+            )
+            assert matrix.dtype == np.float32 and matrix.shape == (len(dataframe), len(FEATURE_COLUMNS))
+            np.testing.assert_array_equal(matrix, expected_matrix)
+
+    def test_latency_report(self, computer, minute_ohlcv):
+        """测试每个交易对都有延迟记录，统计按轮累计"""
+        frames = _pairs(minute_ohlcv)
+        rounds = computer.stats()['rounds']
+        computer.compute(frames)
+
+        assert list(computer.latency) == list(frames)
+        for pair, record in computer.latency.items():
+            assert record['rows'] == len(frames[pair])
+            assert record['error'] is None and not record['late']
+            assert 0 <= record['compute_ms'] <= record['total_ms']
+        stats = computer.stats()
+        assert stats['rounds'] == rounds + 1
+        assert stats['slowest_pair'] in frames
+        assert 'BTC/USDT:USDT' in computer.latency_table()
+
+    def test_failed_pair_is_isolated(self, computer, minute_ohlcv):
+        """测试单个交易对在子进程中出错时其余交易对正常返回"""
+        frames = _pairs(minute_ohlcv)
+        errors = computer.errors
+        results = computer.compute(frames, {'SOL/USDT:USDT': {'vpin_bucket_volume': -1.0}})
+
+        assert set(results) == {'ETH/USDT:USDT', 'BTC/USDT:USDT'}
+        assert 'bucket_volume' in computer.latency['SOL/USDT:USDT']['error']
+        assert computer.errors == errors + 1
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            ParallelFeatureComputer(workers=0)
+        with pytest.raises(ValueError):
+            ParallelFeatureComputer(start_method='thread')
+
+    def test_budget_abandons_hung_pair(self, minute_ohlcv):
+        """测试超出耗时预算的交易对被放弃（不阻塞本轮、子进程被终止），其余交易对正常返回，下一轮重建进程池"""
+        frames = _pairs(minute_ohlcv)
+        with ParallelFeatureComputer(workers=2, budget=5.0) as computer:
+            computer.compute({'ETH/USDT:USDT': frames['ETH/USDT:USDT']})  # 预热进程池（spawn 启动与导入）
+            start = time.perf_counter()
+            results = computer.compute(frames, {'SOL/USDT:USDT': {'trend_provider': SlowTrendProvider()}})
+            elapsed = time.perf_counter() - start
+
+            assert elapsed < 15
+            assert set(results) == {'ETH/USDT:USDT', 'BTC/USDT:USDT'}
+            record = computer.latency['SOL/USDT:USDT']
+            assert record['late'] and record['error'] is not None
+            assert computer.stats()['errors'] == 1
+
+            assert set(computer.compute(frames)) == set(frames)
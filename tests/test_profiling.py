@@ -0,0 +1,122 @@
+"""
+特征工程埋点单元测试
+"""
+
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.features import compute_intermediates
+from microstructure.kernel import FEATURE_COLUMNS, build_features
+from microstructure.profiling import FeatureProfiler, describe_dtypes, profile_hook
+
+
+class _Strategy:
+    """带埋点钩子的最小策略"""
+
+    def __init__(self, profiler):
+        self.feature_profiler = profiler
+
+    @profile_hook()
+    def populate_indicators(self, dataframe, metadata):
+        dataframe['x'] = np.zeros(len(dataframe), dtype=np.float32)
+        dataframe['y'] = np.zeros(len(dataframe), dtype=np.int8)
+        return dataframe
+
+
+@pytest.fixture
+def profiler():
+    profiler = FeatureProfiler(enabled=True)
+    yield profiler
+    profiler.close()
+
+
+class TestFeatureProfiler:
+    """埋点记录器测试"""
+
+    def test_disabled_records_nothing(self, minute_ohlcv):
+        """测试关闭时不记录、不启动 tracemalloc"""
+        profiler = FeatureProfiler()
+        with profiler.span('block', 'ETH') as record:
+            assert record is None
+        _Strategy(profiler).populate_indicators(minute_ohlcv.copy(), {'pair': 'ETH'})
+
+        assert len(profiler.events) == 0
+        assert profiler.summary().empty
+
+    def test_nested_spans_memory_and_pair(self, profiler):
+        """测试嵌套区间的分配字节数与交易对继承"""
+        with profiler.span('outer', 'ETH/USDT:USDT'):
+            with profiler.span('inner') as record:
+                data = np.ones(1_000_000)
+                record['dtype'] = str(data.dtype)
+            del data
+
+        inner, outer = profiler.events
+        assert inner['pair'] == outer['pair'] == 'ETH/USDT:USDT'
+        assert inner['peak_bytes'] >= 8_000_000
+        assert inner['retained_bytes'] >= 8_000_000
+        assert outer['peak_bytes'] >= 8_000_000
+        assert outer['retained_bytes'] < 1_000_000
+        assert inner['depth'] == 1 and outer['depth'] == 0
+
+    def test_memory_traced_on_owner_thread_only(self, profiler):
+        """测试后台线程（如 FreqAI 训练）的区间只记录耗时，不重置主线程区间的内存峰值"""
+        def train():
+            with profiler.span('train', 'ETH/USDT:USDT'):
+                np.ones(100_000).sum()
+
+        with profiler.span('populate_indicators', 'ETH/USDT:USDT'):
+            data = np.ones(1_000_000)
+            del data
+            worker = threading.Thread(target=train)
+            worker.start()
+            worker.join()
+
+        train_event, main_event = profiler.events
+        assert train_event['name'] == 'train'
+        assert train_event['peak_bytes'] is None and train_event['retained_bytes'] is None
+        assert train_event['seconds'] > 0
+        assert main_event['peak_bytes'] >= 8_000_000
+
+    def test_hook_summary_and_trace(self, profiler, minute_ohlcv, tmp_path):
+        """测试钩子装饰器、汇总表与 JSON trace"""
+        strategy = _Strategy(profiler)
+        for _ in range(3):
+            strategy.populate_indicators(minute_ohlcv.copy(), {'pair': 'ETH/USDT:USDT'})
+        strategy.populate_indicators(minute_ohlcv.copy(), {'pair': 'BTC/USDT:USDT'})
+
+        table = profiler.summary('ETH/USDT:USDT')
+        assert list(table['block']) == ['populate_indicators']
+        assert table.loc[0, 'calls'] == 3
+        assert table.loc[0, 'dtype'] == 'float32×1,int8×1'
+        assert profiler.pairs() == ['ETH/USDT:USDT', 'BTC/USDT:USDT']
+        assert 'populate_indicators' in profiler.summary_table('ETH/USDT:USDT')
+
+        trace = json.loads(profiler.dump(tmp_path / 'trace.json').read_text(encoding='utf-8'))
+        assert len(trace['traceEvents']) == 4
+        assert {e['ph'] for e in trace['traceEvents']} == {'X'}
+        assert trace['traceEvents'][0]['args']['pair'] == 'ETH/USDT:USDT'
+
+    def test_feature_graph_nodes(self, profiler, minute_ohlcv):
+        """测试特征图按节点记录，输出节点以特征列名命名"""
+        intermediates = compute_intermediates(minute_ohlcv)
+        with profiler.span('feature_engineering_expand_all', 'ETH/USDT:USDT'):
+            result = build_features(minute_ohlcv, intermediates, np.float32, np.int8, profiler=profiler)
+
+        blocks = set(profiler.summary()['block'])
+        assert '%-atr_14' in blocks
+        assert '%-amihud+%-kyle_lambda' in blocks
+        assert any(block.startswith('shift(1)#') for block in blocks)
+        assert all(result[name].dtype == np.float32 for name in FEATURE_COLUMNS)
+
+    def test_describe_dtypes(self):
+        frame = pd.DataFrame({'a': np.zeros(2), 'b': np.zeros(2), 'c': np.zeros(2, dtype=np.int8)})
+        assert describe_dtypes(frame) == 'float64×2,int8×1'
+        assert describe_dtypes(np.zeros(2, dtype=np.float32)) == 'float32'
+
+    def test_invalid_capacity(self):
+        with pytest.raises(ValueError):
+            FeatureProfiler(max_events=0)
@@ -0,0 +1,125 @@
+"""
+冗余特征剪枝单元测试
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.pruning import (
+    CorrelationAccumulator,
+    FeaturePruner,
+    load_pruning_summary,
+    save_pruning_summary,
+    select_features,
+)
+
+
+@pytest.fixture
+def feature_table():
+    """含重复 / 近似重复 / 常数列的特征表"""
+    np.random.seed(11)
+    n = 3000
+    base = np.random.randn(n, 3)
+    return pd.DataFrame({
+        '%-amihud': base[:, 0],
+        '%-kyle_lambda': base[:, 0],
+        '%-momentum': base[:, 1] * 1e6 + 5e8,
+        '%-momentum_scaled': -2 * (base[:, 1] * 1e6 + 5e8) + np.random.randn(n) * 1e3,
+        '%-constant': np.full(n, 3.0),
+        '%-vpin': base[:, 2],
+        '%-vpin_noisy': base[:, 2] + np.random.randn(n),
+    })
+
+
+class TestCorrelationAccumulator:
+    """增量相关矩阵测试"""
+
+    def test_chunked_matches_numpy(self, feature_table):
+        """测试分块累计结果与一次性计算一致（含大均值列）"""
+        values = feature_table.drop(columns='%-constant').to_numpy()
+        accumulator = CorrelationAccumulator(values.shape[1])
+        for start in range(0, len(values), 700):
+            accumulator.update(values[start:start + 700])
+
+        np.testing.assert_allclose(accumulator.correlation(), np.corrcoef(values, rowvar=False), atol=1e-9)
+        np.testing.assert_allclose(accumulator.std(), values.std(axis=0, ddof=1), rtol=1e-9)
+
+    def test_skips_non_finite_rows(self):
+        """测试含 NaN 的行被跳过"""
+        accumulator = CorrelationAccumulator(2)
+        accumulator.update(np.array([[1.0, 2.0], [np.nan, 1.0], [2.0, 4.0], [3.0, 7.0]]))
+
+        assert accumulator.count == 3
+
+
+class TestSelectFeatures:
+    """特征选择测试"""
+
+    def test_drops_duplicates_and_constants(self, feature_table):
+        """测试删除完全重复、近似重复（含负相关）与常数列，保留先出现的列"""
+        kept, dropped = select_features(feature_table.to_numpy(), list(feature_table.columns), chunk_rows=512)
+
+        assert kept == ['%-amihud', '%-momentum', '%-vpin', '%-vpin_noisy']
+        assert dropped['%-kyle_lambda'].endswith(':%-amihud')
+        assert dropped['%-momentum_scaled'].endswith(':%-momentum')
+        assert dropped['%-constant'] == 'constant'
+
+    def test_invalid_arguments(self, feature_table):
+        with pytest.raises(ValueError):
+            select_features(feature_table.to_numpy(), list(feature_table.columns), corr_threshold=0)
+        with pytest.raises(ValueError):
+            select_features(feature_table.to_numpy(), ['a'])
+
+
+class TestFeaturePruner:
+    """管道步骤测试"""
+
+    def test_fit_transform_and_predict(self, feature_table, tmp_path):
+        """测试训练时确定的列子集用于预测，并可持久化"""
+        names = list(feature_table.columns)
+        pruner = FeaturePruner(corr_threshold=0.98)
+        x, _, _, kept = pruner.fit_transform(feature_table.to_numpy(), feature_list=names)
+        predict, _, _, predict_names = pruner.transform(feature_table.iloc[:10].to_numpy(), outlier_check=True)
+
+        assert x.shape == (len(feature_table), 4)
+        assert predict.shape == (10, 4)
+        assert kept == predict_names == pruner.summary()['kept']
+        np.testing.assert_array_equal(predict, feature_table[kept].iloc[:10].to_numpy())
+
+        path = save_pruning_summary(tmp_path / 'models' / 'feature_pruning.json', 'ETH/USDT:USDT', pruner.summary())
+        save_pruning_summary(path, 'BTC/USDT:USDT', pruner.summary())
+        records = json.loads(path.read_text(encoding='utf-8'))
+        assert set(records) == {'ETH/USDT:USDT', 'BTC/USDT:USDT'}
+        assert records['ETH/USDT:USDT']['n_dropped'] == 3
+
+    def test_frozen_kept_set(self, feature_table, tmp_path):
+        """测试持续学习时读回上次保留的列并冻结：数据变化后列集合不变"""
+        names = list(feature_table.columns)
+        first = FeaturePruner()
+        first.fit(feature_table.to_numpy(), feature_list=names)
+        path = save_pruning_summary(tmp_path / 'feature_pruning.json', 'ETH/USDT:USDT', first.summary())
+
+        record = load_pruning_summary(path, 'ETH/USDT:USDT')
+        assert load_pruning_summary(path, 'BTC/USDT:USDT') is None
+        assert load_pruning_summary(tmp_path / 'missing.json', 'ETH/USDT:USDT') is None
+
+        # 新训练集中原本被删除的重复列不再重复，重新剪枝会多保留一列
+        shifted = feature_table.copy()
+        duplicate = next(name for name, reason in first.dropped.items() if reason.startswith('corr'))
+        shifted[duplicate] = np.random.randn(len(shifted))
+        assert len(select_features(shifted.to_numpy(), names)[0]) != first.summary()['n_kept']
+
+        frozen = FeaturePruner(frozen=record['kept'])
+        x, _, _, kept = frozen.fit_transform(shifted.to_numpy(), feature_list=names)
+        assert kept == record['kept'] and x.shape[1] == len(kept)
+        assert frozen.summary()['frozen'] and not first.summary()['frozen']
+        assert set(frozen.dropped.values()) == {'frozen'}
+
+        with pytest.raises(ValueError):
+            FeaturePruner(frozen=[*record['kept'], '%-missing']).fit(shifted.to_numpy(), feature_list=names)
+
+    def test_transform_before_fit(self, feature_table):
+        with pytest.raises(ValueError):
+            FeaturePruner().transform(feature_table.to_numpy())
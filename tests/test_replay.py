@@ -0,0 +1,175 @@
+"""
+本地加速行情回放单元测试
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from microstructure.latency import SignalLatencyTracker
+from microstructure.long_horizon import resample_ohlcv
+from microstructure.replay import MarketReplayer, ReplayDataProvider, load_ohlcv, ohlcv_path
+
+
+class FakeClock:
+    """可手动推进的墙钟，sleep 直接推进时间"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _frames(minute_ohlcv):
+    """两个交易对：完整数据，以及晚 100 分钟上市的交易对"""
+    return {
+        'ETH/USDT:USDT': minute_ohlcv,
+        'SOL/USDT:USDT': minute_ohlcv.iloc[100:].reset_index(drop=True),
+    }
+
+
+class TestOhlcvFiles:
+    """OHLCV 文件读写测试"""
+
+    def test_path_matches_freqtrade_naming(self):
+        """测试与 freqtrade 数据文件命名一致"""
+        assert ohlcv_path('data/okx', 'ETH/USDT:USDT') == Path('data/okx/futures/ETH_USDT_USDT-1m-futures.feather')
+        assert ohlcv_path('data/okx', 'ETH/USDT', '5m', 'spot').name == 'ETH_USDT-5m.feather'
+
+    def test_load_discovers_pairs(self, tmp_path, minute_ohlcv):
+        """测试按目录发现交易对、还原交易对名并截取最后 tail 行"""
+        for pair in ('ETH/USDT:USDT', 'SOL/USDT:USDT'):
+            path = ohlcv_path(tmp_path, pair)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            minute_ohlcv.iloc[::-1].reset_index(drop=True).to_feather(path)
+
+        frames = load_ohlcv(tmp_path, tail=500)
+
+        assert list(frames) == ['ETH/USDT:USDT', 'SOL/USDT:USDT']
+        expected = minute_ohlcv.iloc[-500:].reset_index(drop=True)
+        pd.testing.assert_frame_equal(frames['SOL/USDT:USDT'], expected, check_dtype=False)
+
+    def test_missing_pair(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            load_ohlcv(tmp_path, ['ETH/USDT:USDT'])
+
+
+class TestMarketReplayer:
+    """行情回放测试"""
+
+    def test_warmup_and_step(self, minute_ohlcv):
+        """测试预热后逐根释放，晚上市的交易对按同一时间轴对齐"""
+        replayer = MarketReplayer(_frames(minute_ohlcv), speed=None, warmup=200)
+
+        assert replayer.released('ETH/USDT:USDT') == 200
+        assert replayer.released('SOL/USDT:USDT') == 100
+        assert replayer.now == minute_ohlcv['date'].iloc[199] + pd.Timedelta(minutes=1)
+
+        closed = replayer.step()
+        assert closed == minute_ohlcv['date'].iloc[200] + pd.Timedelta(minutes=1)
+        assert replayer.released('ETH/USDT:USDT') == 201
+        assert replayer.window('SOL/USDT:USDT', 50)['date'].iloc[-1] == minute_ohlcv['date'].iloc[200]
+        assert replayer.replayed == 1
+
+    def test_iterates_to_end(self, minute_ohlcv):
+        """测试不等待模式回放到最后一根"""
+        replayer = MarketReplayer(_frames(minute_ohlcv), speed=None, warmup=len(minute_ohlcv) - 10)
+
+        assert len(list(replayer)) == 10
+        assert replayer.remaining == 0
+        assert replayer.step() is None
+        assert replayer.released('SOL/USDT:USDT') == len(minute_ohlcv) - 100
+
+    def test_speed_schedule_and_lag(self, minute_ohlcv):
+        """测试按倍速等待；处理超时后不补睡并记录落后秒数"""
+        clock = FakeClock()
+        replayer = MarketReplayer(
+            _frames(minute_ohlcv), speed=60.0, warmup=200, wall_clock=clock, sleep=clock.sleep
+        )
+
+        iterator = iter(replayer)
+        next(iterator)
+        assert clock.sleeps == [pytest.approx(1.0)]
+        clock.now += 0.25
+        next(iterator)
+        assert clock.sleeps[-1] == pytest.approx(0.75)
+
+        clock.now += 1.5
+        next(iterator)
+        assert len(clock.sleeps) == 2
+        assert replayer.lag == pytest.approx(0.5)
+        assert replayer.max_lag == pytest.approx(0.5)
+
+    def test_replay_clock_measures_processing_time(self, minute_ohlcv):
+        """测试回放时钟对齐 K 线收盘，延迟埋点在倍速下测得真实处理耗时"""
+        clock = FakeClock()
+        replayer = MarketReplayer(
+            _frames(minute_ohlcv), speed=600.0, warmup=200, wall_clock=clock, sleep=clock.sleep
+        )
+        tracker = SignalLatencyTracker('1m', clock=replayer.time)
+
+        replayer.wait()
+        replayer.step()
+        clock.now += 0.04
+        candle_open = replayer.window('ETH/USDT:USDT', 1)['date'].iloc[-1]
+
+        assert tracker.mark('ETH/USDT:USDT', 'signal', candle_open) == pytest.approx(0.04)
+
+    def test_invalid_arguments(self, minute_ohlcv):
+        with pytest.raises(ValueError):
+            MarketReplayer({})
+        with pytest.raises(ValueError):
+            MarketReplayer(_frames(minute_ohlcv), speed=0)
+        with pytest.raises(ValueError):
+            MarketReplayer(_frames(minute_ohlcv), warmup=0)
+
+
+class TestReplayDataProvider:
+    """回放 DataProvider 测试"""
+
+    def test_window_and_runmode(self, minute_ohlcv):
+        """测试返回最近 window 根 K 线，副本不影响回放数据"""
+        provider = ReplayDataProvider(MarketReplayer(_frames(minute_ohlcv), speed=None, warmup=1000), window=300)
+
+        assert provider.runmode.value == 'dry_run'
+        assert provider.current_whitelist() == ['ETH/USDT:USDT', 'SOL/USDT:USDT']
+        dataframe = provider.ohlcv('ETH/USDT:USDT')
+        assert len(dataframe) == 300
+        assert dataframe['date'].iloc[-1] == minute_ohlcv['date'].iloc[999]
+
+        dataframe.loc[:, 'close'] = -1.0
+        assert (provider.get_pair_dataframe('ETH/USDT:USDT')['close'] > 0).all()
+        assert provider.ohlcv('BTC/USDT:USDT').empty
+
+    def test_higher_timeframe_only_closed_candles(self, minute_ohlcv):
+        """测试高周期由 1m 重采样且只给出已收盘的 K 线"""
+        replayer = MarketReplayer(_frames(minute_ohlcv), speed=None, warmup=150)
+        provider = ReplayDataProvider(replayer)
+        expected = resample_ohlcv(minute_ohlcv, '1h')
+
+        hourly = provider.get_pair_dataframe('ETH/USDT:USDT', '1h')
+        pd.testing.assert_frame_equal(hourly, expected.iloc[:2])
+
+        for _ in range(30):
+            replayer.step()
+        assert len(provider.get_pair_dataframe('ETH/USDT:USDT', '1h')) == 3
+
+    def test_analyzed_dataframe(self, minute_ohlcv):
+        """测试分析结果缓存"""
+        replayer = MarketReplayer(_frames(minute_ohlcv), speed=None, warmup=150)
+        provider = ReplayDataProvider(replayer)
+
+        empty, since = provider.get_analyzed_dataframe('ETH/USDT:USDT', '1m')
+        assert empty.empty and since == pd.Timestamp(0, tz='UTC')
+
+        analyzed = provider.ohlcv('ETH/USDT:USDT')
+        provider._set_cached_df('ETH/USDT:USDT', '1m', analyzed)
+        cached, since = provider.get_analyzed_dataframe('ETH/USDT:USDT', '1m')
+        assert cached is analyzed
+        assert since == replayer.now
@@ -0,0 +1,93 @@
+"""
+多时间框架重采样缓存单元测试
+"""
+
+import pandas as pd
+import pytest
+from microstructure.long_horizon import resample_ohlcv, timeframe_to_timedelta
+from microstructure.resample import ResampleCache
+
+TIMEFRAMES = ['5m', '15m', '1h', '1d']
+
+
+@pytest.fixture
+def base_frame(minute_ohlcv):
+    """约 3 天 1 分钟数据（删去若干分钟模拟断档，最后一小时未收盘）"""
+    frame = pd.concat([minute_ohlcv, minute_ohlcv.assign(date=minute_ohlcv['date'] + pd.Timedelta(minutes=4000))])
+    frame = frame.iloc[:4300].reset_index(drop=True)
+    return frame.drop(index=[100, 101, 102, 2000]).reset_index(drop=True)
+
+
+def _closed(frame, timeframe):
+    """pandas 重采样结果去掉尚未收盘的最后一根"""
+    expected = resample_ohlcv(frame, timeframe)
+    last_close = frame['date'].iloc[-1] + pd.Timedelta(minutes=1)
+    return expected[expected['date'] + timeframe_to_timedelta(timeframe) <= last_close].reset_index(drop=True)
+
+
+class TestResampleCache:
+    """重采样缓存测试"""
+
+    def test_bootstrap_matches_pandas(self, base_frame):
+        """测试一次性派生的各时间框架与 pandas 重采样一致"""
+        cache = ResampleCache('1m', TIMEFRAMES)
+        cache.update(base_frame, 'ETH/USDT:USDT')
+
+        for timeframe in TIMEFRAMES:
+            result = cache.get_pair_dataframe('ETH/USDT:USDT', timeframe)
+            pd.testing.assert_frame_equal(result, _closed(base_frame, timeframe), check_dtype=False, obj=timeframe)
+
+    def test_incremental_matches_bootstrap(self, base_frame):
+        """测试逐根更新（滑动窗口）与一次性派生一致，部分 K 线单独给出"""
+        cache = ResampleCache('1m', TIMEFRAMES)
+        cache.update(base_frame.iloc[:1000], 'ETH/USDT:USDT')
+        for end in range(1001, len(base_frame) + 1):
+            cache.update(base_frame.iloc[max(end - 1000, 0):end], 'ETH/USDT:USDT')
+
+        assert cache.stats() == {'pairs': 1, 'candles_processed': len(base_frame), 'bootstraps': 1}
+        for timeframe in TIMEFRAMES:
+            pd.testing.assert_frame_equal(
+                cache.get_pair_dataframe('ETH/USDT:USDT', timeframe), _closed(base_frame, timeframe),
+                check_dtype=False, obj=timeframe,
+            )
+        partial = cache.partial('ETH/USDT:USDT', '1h')
+        last_hour = base_frame[base_frame['date'] >= partial['date']]
+        assert partial['volume'] == pytest.approx(last_hour['volume'].sum())
+        assert partial['high'] == last_hour['high'].max()
+
+    def test_misaligned_start_and_history(self, base_frame):
+        """测试起点不在 K 线开头时丢弃不完整的首根，并可用更早的数据补齐"""
+        frame = base_frame.iloc[7:].reset_index(drop=True)
+        cache = ResampleCache('1m', ['5m'])
+        cache.update(frame, 'ETH/USDT:USDT')
+        result = cache.get_pair_dataframe('ETH/USDT:USDT', '5m')
+        assert result['date'].iloc[0] == base_frame['date'].iloc[10]
+
+        history = _closed(base_frame.iloc[:20], '5m')
+        spliced = cache.get_pair_dataframe('ETH/USDT:USDT', '5m', history=history)
+        pd.testing.assert_frame_equal(spliced, _closed(base_frame, '5m'), check_dtype=False)
+
+    def test_trim_keeps_recent_bars(self, base_frame):
+        """测试按保留时长丢弃旧的已收盘 K 线，之后仍可继续增量更新"""
+        cache = ResampleCache('1m', ['5m', '1h'])
+        cache.update(base_frame.iloc[:-10], 'ETH/USDT:USDT')
+        reclaimed = cache.trim(pd.Timedelta(hours=6))
+
+        assert reclaimed['ETH/USDT:USDT'] > 0
+        cutoff = base_frame['date'].iloc[-11] - pd.Timedelta(hours=6)
+        cache.update(base_frame, 'ETH/USDT:USDT')
+        for timeframe in ('5m', '1h'):
+            expected = _closed(base_frame, timeframe)
+            pd.testing.assert_frame_equal(
+                cache.get_pair_dataframe('ETH/USDT:USDT', timeframe),
+                expected[expected['date'] >= cutoff].reset_index(drop=True), check_dtype=False, obj=timeframe,
+            )
+        assert cache.trim(pd.Timedelta(days=30)) == {}
+
+    def test_invalid_timeframe(self):
+        with pytest.raises(ValueError):
+            ResampleCache('5m', ['7m'])
+        with pytest.raises(ValueError):
+            ResampleCache('1m', ['1w'])
+        with pytest.raises(ValueError):
+            ResampleCache('1m', ['5m']).get_pair_dataframe('ETH/USDT:USDT', '1h')
@@ -0,0 +1,59 @@
+"""
+有界内存保留策略单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.entry import Clause, EntryRules
+from microstructure.retention import RetentionPolicy
+
+
+class TestRetentionPolicy:
+    """保留策略测试"""
+
+    def test_trim_with_slack(self, minute_ohlcv):
+        """测试跨度超过 lookback × (1 + slack) 才截断，截断后恰好保留 lookback"""
+        policy = RetentionPolicy('1000m', slack=0.5)
+        head = minute_ohlcv.iloc[:1400]
+        assert policy.trim(head, 'ETH/USDT:USDT', 'freqai_1m') is head
+
+        trimmed = policy.trim(minute_ohlcv, 'ETH/USDT:USDT', 'freqai_1m')
+        assert len(trimmed) == 1001
+        assert trimmed['date'].iloc[-1] - trimmed['date'].iloc[0] == pd.Timedelta(minutes=1000)
+        pd.testing.assert_frame_equal(trimmed, minute_ohlcv.iloc[-1001:])
+
+        summary = policy.summary()
+        assert summary[['events', 'rows']].values.tolist() == [[1, len(minute_ohlcv) - 1001]]
+        assert policy.reclaimed_bytes('ETH/USDT:USDT') == pytest.approx(
+            (len(minute_ohlcv) - 1001) / len(minute_ohlcv) * minute_ohlcv.memory_usage().sum(), rel=0.01
+        )
+
+    def test_drop_scratch_columns(self, minute_ohlcv):
+        """测试只删除中间列：OHLCV、信号列、FreqAI 输出与入场条件读取的列保留"""
+        rules = EntryRules(
+            shared=[Clause('vpin', 'vpin', '<', 0.7), Clause('roi', '&-s_target_roi', '>', 0.005)],
+            sides={'enter_long': [Clause('momentum', 'momentum_signal', '>', 0)]},
+        )
+        policy = RetentionPolicy('1d', keep_columns=rules.columns)
+        dataframe = minute_ohlcv.copy()
+        for name in ('vpin', '&-s_target_roi', 'momentum_signal', 'do_predict', 'enter_long', 'exit_long',
+                     'mf_multiplier', 'bb_upper', 'realized_vol'):
+            dataframe[name] = np.zeros(len(dataframe))
+
+        dropped = policy.drop_scratch(dataframe, 'ETH/USDT:USDT')
+
+        assert dropped == ['mf_multiplier', 'bb_upper', 'realized_vol']
+        assert list(dataframe.columns) == [
+            *minute_ohlcv.columns, 'vpin', '&-s_target_roi', 'momentum_signal', 'do_predict', 'enter_long', 'exit_long'
+        ]
+        assert policy.reclaimed_bytes() == 3 * len(dataframe) * 8
+        assert policy.drop_scratch(dataframe, 'ETH/USDT:USDT') == []
+        assert 'scratch_columns' in policy.summary_table()
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            RetentionPolicy('0m')
+        with pytest.raises(ValueError):
+            RetentionPolicy('1d', slack=-0.1)
+        assert RetentionPolicy('1d').summary_table() == '(无记录)'
@@ -0,0 +1,73 @@
+"""
+滚动分位数内核单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.features import classify_regime
+from microstructure.rolling import rolling_quantile, rolling_quantile_at
+
+
+@pytest.fixture
+def noisy_values():
+    """带 NaN 与重复值的测试序列"""
+    np.random.seed(11)
+    values = np.round(np.random.randn(3000), 2)
+    values[:20] = np.nan
+    values[[500, 1700]] = np.nan
+    return values
+
+
+class TestRollingQuantile:
+    """完整序列内核测试"""
+
+    @pytest.mark.parametrize('window,quantile', [(100, 0.5), (20, 0.1), (7, 0.9), (1, 0.5), (50, 1.0)])
+    def test_matches_pandas(self, noisy_values, window, quantile):
+        """测试与 pandas rolling().quantile() 一致"""
+        expected = pd.Series(noisy_values).rolling(window).quantile(quantile).to_numpy()
+        result = rolling_quantile(noisy_values, window, quantile)
+
+        np.testing.assert_array_equal(result, expected)
+
+    def test_invalid_arguments(self, noisy_values):
+        with pytest.raises(ValueError):
+            rolling_quantile(noisy_values, 0, 0.5)
+        with pytest.raises(ValueError):
+            rolling_quantile_at(noisy_values, 10, -0.1, np.arange(5))
+
+
+class TestRollingQuantileAt:
+    """指定位置内核测试"""
+
+    @pytest.mark.parametrize('window,quantile', [(100, 0.5), (20, 0.25), (1, 0.5)])
+    def test_matches_pandas_at_positions(self, noisy_values, window, quantile):
+        """测试任意位置与 pandas 一致（含窗口不足、含 NaN 的位置）"""
+        expected = pd.Series(noisy_values).rolling(window).quantile(quantile).to_numpy()
+        positions = np.array([0, 19, 99, 100, 150, 520, 640, 1700, 1799, 2999])
+
+        result = rolling_quantile_at(noisy_values, window, quantile, positions, chunk_size=3)
+
+        np.testing.assert_array_equal(result, expected[positions])
+
+    def test_empty_positions(self, noisy_values):
+        assert len(rolling_quantile_at(noisy_values, 100, 0.5, np.array([], dtype=np.int64))) == 0
+
+
+class TestClassifyRegime:
+    """市场状态分类测试"""
+
+    def test_matches_original_masks(self, minute_ohlcv):
+        """测试与策略原始两次 rolling quantile 写法一致"""
+        close = minute_ohlcv['close']
+        trend = (close - close.shift(1440)) / close.shift(1440)
+        realized_vol = close.pct_change().rolling(20).std()
+
+        expected = pd.Series(1, index=minute_ohlcv.index)
+        expected.loc[(trend > 0.10) & (realized_vol > realized_vol.rolling(100).quantile(0.5))] = 2
+        expected.loc[(trend < -0.10) & (realized_vol > realized_vol.rolling(100).quantile(0.5))] = 0
+
+        result = classify_regime(trend, realized_vol)
+
+        np.testing.assert_array_equal(result, expected.to_numpy())
+        assert (result != 1).any()
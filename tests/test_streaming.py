@@ -0,0 +1,226 @@
+"""
+流式特征引擎单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.features import INTERMEDIATE_NAMES, compute_intermediates
+from microstructure.streaming import (
+    LagBuffer,
+    RollingQuantile,
+    RollingSum,
+    RollingVariance,
+    StreamingFeatureEngine,
+)
+
+
+def _stream(primitive, values):
+    return np.array([primitive.update(v) for v in values])
+
+
+class TestRollingPrimitives:
+    """滚动原语测试（与 pandas 对照）"""
+
+    @pytest.fixture
+    def values(self):
+        np.random.seed(3)
+        values = np.random.randn(500)
+        values[[0, 37, 250]] = np.nan
+        return values
+
+    def test_rolling_sum(self, values):
+        expected = pd.Series(values).rolling(20).sum().to_numpy()
+        np.testing.assert_allclose(_stream(RollingSum(20), values), expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+    def test_rolling_std(self, values):
+        expected = pd.Series(values).rolling(20).std().to_numpy()
+        np.testing.assert_allclose(_stream(RollingVariance(20), values), expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+    @pytest.mark.parametrize('quantile', [0.0, 0.25, 0.5, 0.9, 1.0])
+    def test_rolling_quantile(self, values, quantile):
+        expected = pd.Series(values).rolling(100).quantile(quantile).to_numpy()
+        np.testing.assert_allclose(_stream(RollingQuantile(100, quantile), values), expected, equal_nan=True)
+
+    def test_lag_buffer(self, values):
+        expected = pd.Series(values).shift(30).to_numpy()
+        np.testing.assert_array_equal(_stream(LagBuffer(30), values), expected)
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            RollingQuantile(5, 1.5)
+
+
+class TestStreamingFeatureEngine:
+    """流式引擎测试"""
+
+    def test_matches_batch_on_sliding_frames(self, minute_ohlcv):
+        """测试逐根更新（模拟实盘滑动窗口）结果与批量路径一致"""
+        frame_len = 1000
+        engine = StreamingFeatureEngine()
+        expected = compute_intermediates(minute_ohlcv)
+
+        result = engine.update(minute_ohlcv.iloc[:frame_len], 'ETH/USDT:USDT')
+        assert result is not None
+        for end in range(frame_len + 1, len(minute_ohlcv) + 1, 7):
+            result = engine.update(minute_ohlcv.iloc[end - frame_len:end], 'ETH/USDT:USDT')
+            assert result is not None
+        result = engine.update(minute_ohlcv.iloc[-frame_len:], 'ETH/USDT:USDT')
+
+        for name in INTERMEDIATE_NAMES:
+            np.testing.assert_allclose(
+                result[name], expected[name][-frame_len:], rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name
+            )
+        assert engine.stats()['bootstraps'] == 1
+        assert engine.stats()['candles_processed'] == len(minute_ohlcv)
+
+    def test_same_candle_is_not_reprocessed(self, minute_ohlcv):
+        """测试同一根 K 线重复调用不会重复计算"""
+        engine = StreamingFeatureEngine()
+        frame = minute_ohlcv.iloc[:500]
+        first = engine.update(frame, 'ETH/USDT:USDT')
+        second = engine.update(frame.copy(), 'ETH/USDT:USDT')
+
+        assert engine.stats()['candles_processed'] == 500
+        np.testing.assert_array_equal(first['vpin'], second['vpin'])
+
+    def test_gap_triggers_bootstrap(self, minute_ohlcv):
+        """测试数据断档时重新预热"""
+        engine = StreamingFeatureEngine()
+        engine.update(minute_ohlcv.iloc[:500], 'ETH/USDT:USDT')
+        result = engine.update(minute_ohlcv.iloc[1000:1500], 'ETH/USDT:USDT')
+
+        assert engine.stats()['bootstraps'] == 2
+        expected = compute_intermediates(minute_ohlcv.iloc[1000:1500])
+        np.testing.assert_allclose(result['realized_vol'], expected['realized_vol'], rtol=1e-9, equal_nan=True)
+
+    def test_long_frame_falls_back(self, minute_ohlcv):
+        """测试超出保留长度的窗口（如训练数据）返回 None 且不破坏状态"""
+        engine = StreamingFeatureEngine(retention=1000, max_bootstrap_rows=1000)
+        engine.update(minute_ohlcv.iloc[:1000], 'ETH/USDT:USDT')
+
+        assert engine.update(minute_ohlcv, 'ETH/USDT:USDT') is None
+        assert engine.update(minute_ohlcv.iloc[1:1001], 'ETH/USDT:USDT') is not None
+        assert engine.stats()['bootstraps'] == 1
+
+    def test_reset(self, minute_ohlcv):
+        """测试清除状态"""
+        engine = StreamingFeatureEngine()
+        engine.update(minute_ohlcv.iloc[:100], 'ETH/USDT:USDT')
+        engine.update(minute_ohlcv.iloc[:100], 'BTC/USDT:USDT')
+        engine.reset('ETH/USDT:USDT')
+
+        assert engine.stats()['pairs'] == 1
+
+    def test_long_horizon_trend(self, minute_ohlcv):
+        """测试使用长周期趋势提供器时与批量路径一致"""
+        from microstructure.long_horizon import LongHorizonTrendProvider
+
+        provider = LongHorizonTrendProvider()
+        expected = compute_intermediates(minute_ohlcv, trend_provider=provider)
+        long_horizon = provider.compute(minute_ohlcv)
+
+        engine = StreamingFeatureEngine()
+        result = engine.update(minute_ohlcv, 'ETH/USDT:USDT', long_horizon)
+
+        for name in ('trend', 'trend_30d', 'regime_state'):
+            np.testing.assert_allclose(result[name], expected[name], equal_nan=True, err_msg=name)
+
+    def test_ring_buffer_wraparound(self, minute_ohlcv):
+        """测试保留长度等于窗口长度时环形缓冲多次回绕后仍与批量路径一致，输出为缓冲区上的只读视图"""
+        frame_len = 300
+        engine = StreamingFeatureEngine(retention=frame_len, max_bootstrap_rows=frame_len)
+        expected = compute_intermediates(minute_ohlcv)
+
+        for end in range(frame_len, len(minute_ohlcv) + 1, 13):
+            result = engine.update(minute_ohlcv.iloc[end - frame_len:end], 'ETH/USDT:USDT')
+            for name in ('vpin', 'realized_vol', 'regime_state'):
+                np.testing.assert_allclose(
+                    result[name], expected[name][end - frame_len:end], rtol=1e-9, atol=1e-12, equal_nan=True,
+                    err_msg=name,
+                )
+        assert engine.stats()['bootstraps'] == 1
+        assert not result['vpin'].flags.writeable and not result['vpin'].flags.owndata
+        assert result['regime_state'].dtype == np.int64
+
+    def test_long_horizon_computed_for_new_rows_only(self, minute_ohlcv):
+        """测试传入趋势函数时只为新收盘的行计算长周期趋势"""
+        from microstructure.long_horizon import LongHorizonTrendProvider, resample_ohlcv
+
+        provider = LongHorizonTrendProvider()
+        compact_frames = {tf: resample_ohlcv(minute_ohlcv, tf) for tf in provider.informative_timeframes}
+        expected = provider.compute(minute_ohlcv, compact_frames)
+        engine = StreamingFeatureEngine()
+        starts = []
+
+        def trends(frame):
+            def compute(start):
+                starts.append((start, len(frame)))
+                return provider.compute(frame, compact_frames, start=start)
+            return compute
+
+        frame_len = 1000
+        for end in range(3000, 3005):
+            frame = minute_ohlcv.iloc[end - frame_len:end].reset_index(drop=True)
+            result = engine.update(frame, 'ETH/USDT:USDT', trends(frame))
+
+        assert starts == [(0, frame_len)] + [(frame_len - 1, frame_len)] * 4
+        assert np.isfinite(result['trend']).all()
+        np.testing.assert_allclose(result['trend'], expected['trend'][end - frame_len:end], rtol=1e-12)
+
+    @staticmethod
+    def _order_flow(frame, covered_from, covered_to):
+        """合成订单流：[covered_from, covered_to) 行有成交覆盖，其余为 NaN"""
+        rng = np.random.default_rng(11)
+        volume = frame['volume'].to_numpy() * 1.1
+        buy = volume * rng.uniform(0, 1, len(frame))
+        flow = {'buy_volume': buy, 'sell_volume': volume - buy}
+        for values in flow.values():
+            values[:covered_from] = np.nan
+            values[covered_to:] = np.nan
+        return flow
+
+    @pytest.mark.parametrize('bucket_volume', [None, 20000.0])
+    def test_order_flow_matches_batch(self, minute_ohlcv, bucket_volume):
+        """测试传入订单流时与批量路径一致（成交文件开始之前的行用近似值），覆盖不变时不重新预热"""
+        flow = self._order_flow(minute_ohlcv, 300, len(minute_ohlcv))
+        expected = compute_intermediates(minute_ohlcv, order_flow=flow, vpin_bucket_volume=bucket_volume)
+        engine = StreamingFeatureEngine()
+
+        frame_len = 1000
+        for end in range(frame_len, len(minute_ohlcv) + 1, 11):
+            rows = slice(end - frame_len, end)
+            result = engine.update(
+                minute_ohlcv.iloc[rows], 'ETH/USDT:USDT', vpin_bucket_volume=bucket_volume,
+                order_flow={name: values[rows] for name, values in flow.items()},
+            )
+        for name in ('buy_pressure', 'sell_pressure', 'volume_imbalance', 'vpin'):
+            np.testing.assert_allclose(
+                result[name], expected[name][rows], rtol=1e-9, atol=1e-12, equal_nan=True, err_msg=name
+            )
+        assert engine.stats()['bootstraps'] == 1
+
+    def test_late_trades_trigger_bootstrap(self, minute_ohlcv):
+        """测试按近似值处理过的 K 线之后补到成交时重新预热，结果与批量路径在当前数据上一致"""
+        engine = StreamingFeatureEngine()
+        frame_len = 500
+        full_flow = self._order_flow(minute_ohlcv, 0, len(minute_ohlcv))
+        for end in range(frame_len, frame_len + 4):
+            frame = minute_ohlcv.iloc[end - frame_len:end].reset_index(drop=True)
+            # 成交文件落后最新 K 线 2 根
+            flow = {name: values[end - frame_len:end].copy() for name, values in full_flow.items()}
+            for values in flow.values():
+                values[-2:] = np.nan
+            result = engine.update(frame, 'ETH/USDT:USDT', order_flow=flow)
+            expected = compute_intermediates(frame, order_flow=flow)
+            for name in ('buy_pressure', 'vpin', 'regime_state'):
+                np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, equal_nan=True, err_msg=name)
+        assert engine.stats()['bootstraps'] == 4
+
+        # 成交没有再补到时正常增量更新；关闭订单流时重新预热
+        assert engine.update(frame, 'ETH/USDT:USDT', order_flow=flow) is not None
+        assert engine.stats()['bootstraps'] == 4
+        next_frame = minute_ohlcv.iloc[end - frame_len + 1:end + 1]
+        result = engine.update(next_frame, 'ETH/USDT:USDT')
+        np.testing.assert_allclose(result['vpin'], compute_intermediates(next_frame)['vpin'], equal_nan=True)
+        assert engine.stats()['bootstraps'] == 5
@@ -0,0 +1,81 @@
+"""
+多窗口前向极值标签单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from microstructure.targets import TARGET_NAMES, TOTAL_COST, ForwardExtrema, compute_targets
+
+
+def _reference_targets(df: pd.DataFrame, forward_window: int) -> pd.DataFrame:
+    """按策略原始写法计算（作为对照）"""
+    out = df.copy()
+    out['future_max'] = out['high'].rolling(forward_window).max().shift(-forward_window)
+    out['future_min'] = out['low'].rolling(forward_window).min().shift(-forward_window)
+    out['potential_long_return'] = (out['future_max'] / out['close'] - 1) - TOTAL_COST
+    out['potential_short_return'] = (1 - out['future_min'] / out['close']) - TOTAL_COST
+    out['target_roi'] = np.maximum(out['potential_long_return'], out['potential_short_return'])
+    return out
+
+
+class TestForwardExtrema:
+    """稀疏表前向极值测试"""
+
+    @pytest.mark.parametrize('horizon', [1, 2, 3, 5, 7, 8, 13, 64])
+    def test_matches_pandas(self, horizon):
+        """测试与 rolling().max/min().shift(-w) 一致（含 NaN）"""
+        np.random.seed(5)
+        high = np.random.rand(700) + 1
+        low = high - np.random.rand(700)
+        high[[100, 400]] = np.nan
+        low[300] = np.nan
+
+        extrema = ForwardExtrema(high, low, max_horizon=64)
+        expected_max = pd.Series(high).rolling(horizon).max().shift(-horizon).to_numpy()
+        expected_min = pd.Series(low).rolling(horizon).min().shift(-horizon).to_numpy()
+
+        np.testing.assert_array_equal(extrema.future_max(horizon), expected_max)
+        np.testing.assert_array_equal(extrema.future_min(horizon), expected_min)
+
+    def test_shorter_than_horizon(self):
+        """测试数据短于窗口时全部为 NaN"""
+        extrema = ForwardExtrema(np.arange(3.0), np.arange(3.0), max_horizon=10)
+        assert np.isnan(extrema.future_max(10)).all()
+        assert np.isnan(extrema.future_min(3)).all()
+
+    def test_invalid_horizon(self):
+        extrema = ForwardExtrema(np.arange(10.0), np.arange(10.0), max_horizon=4)
+        with pytest.raises(ValueError):
+            extrema.future_max(5)
+        with pytest.raises(ValueError):
+            ForwardExtrema(np.arange(10.0), np.arange(10.0), max_horizon=0)
+
+
+class TestComputeTargets:
+    """多窗口标签测试"""
+
+    def test_matches_strategy_formulas(self, minute_ohlcv):
+        """测试每个窗口都与策略原写法一致"""
+        horizons = [1, 5, 6, 12, 15]
+        result = compute_targets(minute_ohlcv, horizons)
+
+        assert list(result) == horizons
+        for horizon in horizons:
+            expected = _reference_targets(minute_ohlcv, horizon)
+            assert set(result[horizon]) == set(TARGET_NAMES)
+            for name in TARGET_NAMES:
+                np.testing.assert_allclose(
+                    result[horizon][name], expected[name].to_numpy(), rtol=1e-12, equal_nan=True, err_msg=name,
+                )
+
+    def test_single_horizon_and_custom_cost(self, minute_ohlcv):
+        """测试单窗口调用与自定义成本"""
+        free = compute_targets(minute_ohlcv, 5, total_cost=0.0)[5]
+        costed = compute_targets(minute_ohlcv, 5)[5]
+
+        np.testing.assert_allclose(free['target_roi'] - TOTAL_COST, costed['target_roi'], equal_nan=True)
+
+    def test_empty_horizons(self, minute_ohlcv):
+        with pytest.raises(ValueError):
+            compute_targets(minute_ohlcv, [])
@@ -0,0 +1,87 @@
+"""
+训练标签分布遥测单元测试
+"""
+
+import json
+
+import numpy as np
+import pytest
+from microstructure.telemetry import TargetTelemetry
+
+
+@pytest.fixture
+def target_values():
+    """带 NaN 的标签序列"""
+    np.random.seed(13)
+    values = np.random.normal(0.001, 0.003, 5000)
+    values[-5:] = np.nan
+    return values
+
+
+class TestTargetTelemetry:
+    """标签分布遥测测试"""
+
+    def test_record_matches_full_reductions(self, target_values):
+        """测试均值与阈值计数与整列归约一致，中位数估计落在一个桶宽内"""
+        telemetry = TargetTelemetry()
+        record = telemetry.record(target_values, 'ETH/USDT:USDT')
+        finite = target_values[~np.isnan(target_values)]
+
+        assert record['count'] == len(finite)
+        assert record['nan_count'] == 5
+        assert record['mean'] == pytest.approx(finite.mean())
+        assert record['above']['0.002'] == (finite > 0.002).sum()
+        assert record['above']['0.005'] == (finite > 0.005).sum()
+        assert abs(record['median_estimate'] - np.median(finite)) <= 0.0005
+        assert sum(record['histogram']) == len(finite)
+
+    def test_threshold_on_boundary_is_exclusive(self):
+        """测试恰好等于阈值的样本不计入 > 阈值"""
+        telemetry = TargetTelemetry(bin_edges=[0.0, 0.01], thresholds=(0.002,))
+        record = telemetry.record(np.array([0.002, 0.002, 0.0021, -1.0, 5.0]), 'A/USDT')
+
+        assert record['above']['0.002'] == 2
+
+    def test_totals_accumulate_per_pair(self, target_values):
+        """测试同一交易对的直方图跨窗口累加"""
+        telemetry = TargetTelemetry()
+        telemetry.record(target_values[:2000], 'ETH/USDT:USDT')
+        telemetry.record(target_values[2000:], 'ETH/USDT:USDT')
+        telemetry.record(target_values, 'BTC/USDT:USDT')
+
+        totals = telemetry.totals()
+        assert totals['ETH/USDT:USDT']['windows'] == 2
+        assert totals['ETH/USDT:USDT']['histogram'] == totals['BTC/USDT:USDT']['histogram']
+        assert totals['ETH/USDT:USDT']['mean'] == pytest.approx(totals['BTC/USDT:USDT']['mean'])
+        assert len(telemetry.records('ETH/USDT:USDT')) == 2
+
+    def test_record_limit(self, target_values):
+        """测试窗口记录数上限"""
+        telemetry = TargetTelemetry(max_records=2)
+        for _ in range(3):
+            telemetry.record(target_values, 'ETH/USDT:USDT')
+
+        assert len(telemetry.records()) == 2
+        assert telemetry.totals()['ETH/USDT:USDT']['windows'] == 3
+
+    def test_empty_window(self):
+        """测试全 NaN 窗口"""
+        record = TargetTelemetry().record(np.full(10, np.nan), 'ETH/USDT:USDT')
+
+        assert record['count'] == 0
+        assert np.isnan(record['mean'])
+        assert np.isnan(record['median_estimate'])
+
+    def test_dump_is_json(self, target_values, tmp_path):
+        """测试快照可 json 导出"""
+        telemetry = TargetTelemetry()
+        telemetry.record(target_values, 'ETH/USDT:USDT', start='2024-01-01', end='2024-01-31')
+        path = telemetry.dump(tmp_path / 'telemetry' / 'targets.json')
+
+        data = json.loads(path.read_text(encoding='utf-8'))
+        assert data['records'][0]['start'] == '2024-01-01'
+        assert len(data['totals']['ETH/USDT:USDT']['histogram']) == len(data['bin_edges']) + 1
+
+    def test_invalid_max_records(self):
+        with pytest.raises(ValueError):
+            TargetTelemetry(max_records=0)
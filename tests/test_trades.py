@@ -0,0 +1,137 @@
+"""
+逐笔成交订单流聚合单元测试
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from microstructure.features import compute_intermediates
+from microstructure.trades import (
+    OrderFlowAggregator,
+    aggregate_trades,
+    align_order_flow,
+    iter_trade_batches,
+    trades_path,
+)
+
+
+@pytest.fixture
+def trades():
+    """freqtrade 格式的逐笔成交（约 10 分钟，含缺失 side 与持平成交）"""
+    rng = np.random.default_rng(5)
+    n = 5000
+    timestamp = np.sort(rng.integers(1_704_067_200_000, 1_704_067_200_000 + 600_000, n))
+    price = 2000 + np.round(np.cumsum(rng.choice([-0.5, 0, 0.5], n)), 2)
+    side = rng.choice(['buy', 'sell', ''], n, p=[0.45, 0.45, 0.1])
+    amount = rng.lognormal(0, 1, n)
+    return pd.DataFrame({
+        'timestamp': timestamp,
+        'id': np.arange(n).astype(str),
+        'type': '',
+        'side': side,
+        'price': price,
+        'amount': amount,
+        'cost': price * amount,
+    })
+
+
+def _write_feather(frame, path, chunksize=700):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), path, chunksize=chunksize)
+    return path
+
+
+def _reference(trades, classification):
+    """逐笔循环的参考实现"""
+    last_price, last_tick = None, 0
+    signs = []
+    for price, side in zip(trades['price'], trades['side']):
+        if last_price is not None and price != last_price:
+            last_tick = 1 if price > last_price else -1
+        last_price = price
+        sign = {'buy': 1, 'sell': -1}.get(side, 0) if classification == 'side' else 0
+        signs.append(sign or last_tick)
+    direction = np.array(signs)
+    weight = np.where(direction > 0, 1.0, np.where(direction < 0, 0.0, 0.5))
+    frame = pd.DataFrame({
+        'date': pd.to_datetime(trades['timestamp'] // 60_000 * 60_000, unit='ms', utc=True),
+        'buy_volume': trades['amount'] * weight,
+        'sell_volume': trades['amount'] * (1 - weight),
+        'notional': trades['price'] * trades['amount'],
+        'amount': trades['amount'],
+    })
+    grouped = frame.groupby('date')
+    result = grouped[['buy_volume', 'sell_volume']].sum()
+    result['trade_count'] = grouped.size()
+    result['vwap'] = grouped['notional'].sum() / grouped['amount'].sum()
+    return result.reset_index()
+
+
+class TestOrderFlowAggregator:
+    """订单流聚合测试"""
+
+    @pytest.mark.parametrize('classification', ['side', 'tick'])
+    def test_batched_matches_reference(self, trades, tmp_path, classification):
+        """测试分批读取（批边界落在 K 线中间）与逐笔参考实现一致"""
+        path = _write_feather(trades, tmp_path / 'ETH_USDT_USDT-trades.feather')
+        result = aggregate_trades(path, '1m', classification, batch_rows=333)
+        expected = _reference(trades, classification)
+
+        assert list(result['date']) == list(expected['date'])
+        np.testing.assert_array_equal(result['trade_count'], expected['trade_count'])
+        for name in ('buy_volume', 'sell_volume', 'vwap'):
+            np.testing.assert_allclose(result[name], expected[name], rtol=1e-12)
+
+    def test_batches_are_bounded(self, trades, tmp_path):
+        """测试每批行数不超过 batch_rows"""
+        path = _write_feather(trades, tmp_path / 'trades.feather', chunksize=4000)
+        sizes = [len(batch[0]) for batch in iter_trade_batches(path, batch_rows=1000)]
+
+        assert max(sizes) <= 1000
+        assert sum(sizes) == len(trades)
+
+    def test_unsorted_raises(self):
+        aggregator = OrderFlowAggregator()
+        aggregator.update(np.array([120_000]), np.array([1.0]), np.array([1.0]))
+        with pytest.raises(ValueError):
+            aggregator.update(np.array([60_000]), np.array([1.0]), np.array([1.0]))
+
+    def test_invalid_classification(self):
+        with pytest.raises(ValueError):
+            OrderFlowAggregator(classification='lee-ready')
+
+
+class TestAlignOrderFlow:
+    """订单流对齐与接入中间量测试"""
+
+    def test_align_and_fallback(self, minute_ohlcv):
+        """测试覆盖范围内无成交记 0、范围外为 NaN，中间量在范围外回退到 Money Flow"""
+        dates = minute_ohlcv['date']
+        flow = pd.DataFrame({
+            'date': dates.iloc[[10, 12]].to_numpy(),
+            'buy_volume': [3.0, 5.0],
+            'sell_volume': [1.0, 0.0],
+            'trade_count': [4, 2],
+            'vwap': [100.0, 101.0],
+        })
+        aligned = align_order_flow(dates, flow)
+
+        assert aligned['buy_volume'][10] == 3.0 and aligned['trade_count'][12] == 2
+        assert aligned['buy_volume'][11] == 0.0 and np.isnan(aligned['vwap'][11])
+        assert np.isnan(aligned['buy_volume'][9]) and np.isnan(aligned['sell_volume'][13])
+
+        baseline = compute_intermediates(minute_ohlcv)
+        result = compute_intermediates(minute_ohlcv, order_flow=aligned)
+        np.testing.assert_array_equal(result['buy_pressure'][10:13], [3.0, 0.0, 5.0])
+        np.testing.assert_array_equal(result['sell_pressure'][10:13], [1.0, 0.0, 0.0])
+        np.testing.assert_array_equal(result['buy_pressure'][:10], baseline['buy_pressure'][:10])
+        np.testing.assert_array_equal(result['sell_pressure'][13:], baseline['sell_pressure'][13:])
+
+    def test_trades_path(self):
+        assert trades_path('data', 'ETH/USDT:USDT', 'futures').as_posix() == 'data/futures/ETH_USDT_USDT-trades.feather'
+        assert trades_path('data', 'ETH/USDT').as_posix() == 'data/ETH_USDT-trades.feather'
@@ -0,0 +1,70 @@
+"""
+成交量同步 VPIN 单元测试
+"""
+
+import math
+
+import numpy as np
+import pytest
+from microstructure.features import compute_intermediates
+from microstructure.streaming import StreamingFeatureEngine
+from microstructure.vpin import BucketVPIN, bucket_vpin, estimate_bucket_volume, normal_cdf
+
+
+class TestBucketVPIN:
+    """批量 / 增量 VPIN 测试"""
+
+    def test_hand_computed(self):
+        """测试跨桶拆分 K 线与按完整桶数映射回 K 线"""
+        volume = np.array([5.0, 10.0, 10.0, 5.0])
+        fraction = np.array([1.0, 0.0, 0.5, 1.0])
+        # 桶 1：买 5 卖 5 -> 0；桶 2：买 2.5 卖 7.5 -> 5；桶 3：买 7.5 卖 2.5 -> 5
+        expected = [np.nan, np.nan, 0.25, 0.5]
+
+        np.testing.assert_allclose(bucket_vpin(volume, fraction, 10.0, window=2), expected, equal_nan=True)
+        state = BucketVPIN(10.0, window=2)
+        np.testing.assert_allclose([state.update(v, f) for v, f in zip(volume, fraction)], expected, equal_nan=True)
+        assert state.buckets == 3
+
+    def test_incremental_matches_batch(self):
+        """测试增量版本与批量版本一致（含零成交量、NaN 与跨多个桶的大 K 线）"""
+        rng = np.random.default_rng(3)
+        volume = rng.lognormal(0, 1.5, 20000)
+        volume[rng.random(len(volume)) < 0.05] = 0.0
+        volume[[10, 500]] = np.nan
+        fraction = rng.random(len(volume))
+        fraction[[20, 700]] = np.nan
+
+        bucket_volume = float(np.nanmean(volume)) * 7
+        expected = bucket_vpin(volume, fraction, bucket_volume, window=30)
+        state = BucketVPIN(bucket_volume, window=30)
+        result = np.array([state.update(v, f) for v, f in zip(volume, fraction)])
+
+        assert np.isfinite(expected).sum() > 15000
+        np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+    def test_streaming_engine_matches_batch(self, minute_ohlcv):
+        """测试流式引擎在同一起点的增长窗口上与批量路径一致"""
+        bucket_volume = estimate_bucket_volume(minute_ohlcv['volume'].to_numpy(), buckets_per_day=200)
+        expected = compute_intermediates(minute_ohlcv, vpin_bucket_volume=bucket_volume)['vpin']
+
+        engine = StreamingFeatureEngine(retention=len(minute_ohlcv))
+        for end in range(1000, len(minute_ohlcv) + 1, 250):
+            result = engine.update(minute_ohlcv.iloc[:end], 'ETH/USDT:USDT', vpin_bucket_volume=bucket_volume)
+
+        assert engine.stats()['bootstraps'] == 1
+        assert np.isfinite(expected).sum() > 2000
+        assert np.nanmax(expected) <= 1.0
+        np.testing.assert_allclose(result['vpin'], expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            bucket_vpin(np.ones(3), np.ones(3), 0.0)
+        with pytest.raises(ValueError):
+            BucketVPIN(1.0, window=0)
+        assert math.isnan(estimate_bucket_volume(np.zeros(10)))
+
+    def test_normal_cdf(self):
+        x = np.linspace(-6, 6, 241)
+        expected = [0.5 * (1 + math.erf(v / math.sqrt(2))) for v in x]
+        np.testing.assert_allclose(normal_cdf(x), expected, atol=2e-7)
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """验证标签设计的正确性"""
 
+import sys
+from pathlib import Path
+
 import pyarrow.feather as feather
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).parent / "integration"))
+from microstructure.targets import TOTAL_COST, compute_targets
+
 # 读取ETH 5分钟数据
 df = feather.read_feather("ft_userdir/data/okx/futures/ETH_USDT_USDT-5m-futures.feather")
 
@@ -17,17 +23,13 @@ print("=" * 80)
 
 # 按照策略代码计算标签
 forward_window = 6  # 30分钟
-fee = 0.001
-slippage = 0.001
-total_cost = 2 * (fee + slippage)  # 0.4%
+total_cost = TOTAL_COST  # 0.4%（双向 0.1% 手续费 + 0.1% 滑点）
 threshold = 0.005  # 0.5%
 
 # 计算未来收益
-df['future_max'] = df['high'].rolling(forward_window).max().shift(-forward_window)
-df['future_min'] = df['low'].rolling(forward_window).min().shift(-forward_window)
-
-df['potential_long_return'] = (df['future_max'] / df['close'] - 1) - total_cost
-df['potential_short_return'] = (1 - df['future_min'] / df['close']) - total_cost
+targets = compute_targets(df, forward_window, total_cost)[forward_window]
+for name in ('future_max', 'future_min', 'potential_long_return', 'potential_short_return'):
+    df[name] = targets[name]
 
 # 生成标签
 df['label'] = 'no_trade'